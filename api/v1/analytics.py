@@ -334,7 +334,7 @@ class Summary(Resource):
 
         try:
             dashboard_data = analytics_service.get_dashboard_data(
-                current_user_id, scope_ids=scope_ids)
+                current_user_id, scope_ids=scope_ids, with_rows=False)
 
             # Extract key metrics for dashboard cards
             summary = {
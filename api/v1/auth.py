@@ -18,7 +18,7 @@ from werkzeug.security import check_password_hash, generate_password_hash
 # module-list fallback, and the verification-email guard whose whole purpose is
 # that registration succeeds even if mail fails.
 from werkzeug.exceptions import HTTPException
-from src.models.user import User, RevokedToken
+from src.models.user import User
 from src.models.invitation import Invitation
 from src.extensions import db, limiter
 from datetime import datetime, timedelta
@@ -30,6 +30,7 @@ import logging
 import threading
 from src.models.personal_access_token import SCOPE_READ
 from src.utils.api_auth import api_auth_required
+from src.services.auth import revocation
 
 logger = logging.getLogger(__name__)
 
@@ -607,10 +608,9 @@ class Logout(Resource):
     @jwt_required()
     def post(self):
         """Logout — revoke the access token so it cannot be reused."""
-        jti = get_jwt()['jti']
+        claims = get_jwt()
         try:
-            if not RevokedToken.is_revoked(jti):
-                db.session.add(RevokedToken(jti=jti))
+            if revocation.revoke(claims['jti'], revocation.token_expiry(claims)):
                 db.session.commit()
         except HTTPException:
             raise
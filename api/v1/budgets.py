@@ -8,6 +8,7 @@ from schemas import budget_schema, budgets_schema
 from schemas.input_schemas import budget_input
 from src.utils.validation import validate_request, validation_error_response
 from src.services.budget.service import BudgetService
+from src.services.budget.spend import BudgetSpendCalculator
 from datetime import datetime
 import logging
 from src.models.personal_access_token import SCOPE_READ
@@ -261,6 +262,9 @@ class BudgetOverview(Resource):
             budgets = Budget.query.filter(
                 Budget.user_id.in_(visible_user_ids(current_user_id)),
                 Budget.active == True).all()
+            # Every budget's spend in one pass, so the loop and the per-budget
+            # dump below read it rather than querying for each.
+            BudgetSpendCalculator(budgets).prime()
 
             total_budget = 0
             total_spent = 0
@@ -317,6 +321,7 @@ class BudgetProgress(Resource):
             return {'success': False, 'error': 'Budget not found'}, 404
 
         # Calculate spending if methods exist
+        BudgetSpendCalculator([budget]).prime()
         spent = budget.get_spent() if hasattr(budget, 'get_spent') else 0
         remaining = budget.get_remaining() if hasattr(budget, 'get_remaining') else budget.amount
         percentage = budget.get_percentage() if hasattr(budget, 'get_percentage') else 0
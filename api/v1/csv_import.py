@@ -7,7 +7,7 @@ from flask_restx import Namespace, Resource, fields, reqparse
 from werkzeug.datastructures import FileStorage
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.extensions import db
-from src.services.csv_import import Mapping, MapperConfig, import_rows
+from src.services.csv_import import Mapping, MapperConfig, import_rows, read_csv
 from src.services.csv_import.fingerprint import save_profile
 from src.utils.decorators import demo_restricted
 from werkzeug.datastructures import FileStorage
@@ -50,7 +50,6 @@ import_config_model = ns.model('ImportConfig', {
 })
 
 
-CSV_MAX_ROWS = 10_000
 CSV_ALLOWED_MIMETYPES = {'text/csv', 'application/csv', 'text/plain', 'application/vnd.ms-excel'}
 
 
@@ -82,8 +81,8 @@ class CSVPreview(Resource):
             if err:
                 return {'success': False, 'error': err}, 400
 
-            stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-            csv_reader = csv.DictReader(stream)
+            # Counted as it is read, so there is no longer a cap to stop at.
+            csv_reader = read_csv(file.stream)
             columns = csv_reader.fieldnames
 
             sample_rows = []
@@ -92,8 +91,6 @@ class CSVPreview(Resource):
                 total += 1
                 if idx < 5:
                     sample_rows.append(row)
-                if total > CSV_MAX_ROWS:
-                    break
 
             return {
                 'success': True,
@@ -101,7 +98,9 @@ class CSVPreview(Resource):
                     'columns': columns,
                     'sample_rows': sample_rows,
                     'total_rows': total,
-                    'truncated': total > CSV_MAX_ROWS,
+                    # Kept for clients that read it: with no row cap, the
+                    # preview always counts the whole file.
+                    'truncated': False,
                 }
             }, 200
 
@@ -152,8 +151,9 @@ class CSVImport(Resource):
                     'error': 'Required mappings: date, description, amount'
                 }, 400
 
-            stream = io.StringIO(file.stream.read().decode('UTF8'), newline=None)
-            csv_reader = csv.DictReader(stream)
+            # Decoded as `import_rows` reads it, a chunk at a time: no row cap,
+            # and no copy of the whole file in memory.
+            csv_reader = read_csv(file.stream)
             # Read before iterating: DictReader consumes the header row on first
             # access, and import_rows will have exhausted the reader afterwards.
             headers = list(csv_reader.fieldnames or [])
@@ -175,7 +175,6 @@ class CSVImport(Resource):
                     account_id=config.get('account_id'),
                 ),
                 current_user_id,
-                max_rows=CSV_MAX_ROWS,
             )
 
             # Teach the system this bank's format so folder-watch can auto-map it.
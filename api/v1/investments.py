@@ -3,6 +3,7 @@ from flask import request, current_app
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.investment import Portfolio, Investment, InvestmentTransaction
+from src.models.user import User
 from src.extensions import db
 from src.utils.household import visible_user_ids, is_household_member, can_manage_owned
 from schemas import (
@@ -10,7 +11,8 @@ from schemas import (
     investment_schema, investments_schema,
     investment_transaction_schema, investment_transactions_schema
 )
-from integrations.investments.yfinance import YFinanceCache, get_stock_data_with_fallback
+from integrations.investments import quote_cache
+from integrations.investments.yfinance import get_stock_data_with_fallback, shared_cache
 from datetime import datetime
 import logging
 
@@ -27,7 +29,7 @@ def _investments_required():
 ns = Namespace('investments', description='Investment operations')
 
 # Initialize yfinance cache
-yf_cache = YFinanceCache()
+yf_cache = shared_cache()
 
 # Define request/response models
 portfolio_model = ns.model('Portfolio', {
@@ -704,3 +706,19 @@ class ExchangeList(Resource):
             'success': True,
             'exchanges': exchanges
         }, 200
+
+
+@ns.route('/cache-stats')
+class QuoteCacheStats(Resource):
+    @ns.doc('get_quote_cache_stats', security='Bearer')
+    @jwt_required()
+    def get(self):
+        """Quote cache hit rates across every worker (administrators only)"""
+        user = db.session.get(User, get_jwt_identity())
+        if not user or not user.is_admin:
+            return {'success': False, 'error': 'Administrator access required'}, 403
+
+        return {
+            'success': True,
+            'cache': quote_cache.shared().stats()
+        }, 200
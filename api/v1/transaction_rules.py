@@ -420,6 +420,8 @@ bulk_apply_model = ns.model('BulkApplyRules', {
     # Optional: omitted means "apply every rule".
     'rule_ids': fields.List(fields.Integer, required=False,
                             description='Restrict to these rules; omit to apply all'),
+    'dry_run': fields.Boolean(required=False, default=False,
+                              description='Count what would change; write nothing'),
 })
 
 suggest_rule_model = ns.model('SuggestRule', {
@@ -439,9 +441,10 @@ class BulkApplyRules(Resource):
         data = request.get_json() or {}
 
         rule_ids = data.get('rule_ids')  # Optional: specific rules to apply
+        dry_run = data.get('dry_run') is True
 
         try:
-            result = bulk_apply_rules(current_user_id, rule_ids)
+            result = bulk_apply_rules(current_user_id, rule_ids, dry_run=dry_run)
             return result, 200 if result['success'] else 400
 
         except Exception as e:
@@ -9,6 +9,7 @@ from src.utils.household import (
     can_manage_owned, owner_scope_filter, read_scope, scope_query,
     visible_user_ids)
 from src.services.transaction import balances
+from src.services.transaction.serialisation import with_serialised_relations
 from schemas import transaction_schema, transactions_schema
 from schemas.input_schemas import transaction_input
 from src.utils.validation import validate_request, validation_error_response
@@ -149,6 +150,70 @@ def _totals_for(query):
     expense = float(sums.get('expense') or 0)
     return round(income, 2), round(expense, 2)
 
+def _parse_cursor(raw):
+    """`?after=<date>,<id>` as `(datetime, int)`, or None for an empty `after`.
+
+    Raises ValueError for anything else — a malformed cursor is the client's
+    mistake, and quietly restarting from the top would duplicate rows on screen.
+    """
+    if not raw:
+        return None
+    date_part, _, id_part = raw.rpartition(',')
+    return datetime.fromisoformat(date_part), int(id_part)
+
+
+def _cursor_for(transaction):
+    return f'{transaction.date.isoformat()},{transaction.id}'
+
+
+def _keyset_page(query, cursor, per_page, with_totals):
+    """One page of `query` after `cursor`, ordered `(date desc, id desc)`.
+
+    Keyset, not OFFSET: the page starts from the last row the client saw, so the
+    database seeks to it through `ix_expenses_date` instead of counting past every
+    earlier row — page 2,000 costs what page 1 does. And no `COUNT(*)` or totals
+    unless `with_totals`: an infinite-scroll client asks for them once, with its
+    first page, rather than paying for them on every scroll.
+
+    `id` breaks ties, because many rows share a date and a cursor on the date alone
+    would skip or repeat the ones that straddle a page boundary.
+    """
+    base = query
+    if cursor is not None:
+        after_date, after_id = cursor
+        query = query.filter(or_(
+            Expense.date < after_date,
+            and_(Expense.date == after_date, Expense.id < after_id)))
+
+    rows = (with_serialised_relations(query)
+            .order_by(Expense.date.desc(), Expense.id.desc())
+            .limit(per_page + 1).all())
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    pagination = {
+        'per_page': per_page,
+        'has_next': has_next,
+        'next_cursor': _cursor_for(rows[-1]) if has_next else None,
+    }
+    body = {
+        'success': True,
+        'transactions': transactions_schema.dump(rows),
+        'pagination': pagination,
+    }
+    if with_totals:
+        # Over the whole filtered set, not from the cursor on — the same figures
+        # page mode returns, for the same filters.
+        income_total, expense_total = _totals_for(base)
+        body['summary'] = {
+            'total_income': income_total,
+            'total_expense': expense_total,
+            'net_balance': round(income_total - expense_total, 2),
+        }
+        pagination['total'] = base.order_by(None).count()
+    return body, 200
+
+
 # Create namespace
 ns = Namespace('transactions', description='Transaction operations')
 
@@ -243,6 +308,18 @@ class TransactionList(Resource):
         if group_id:
             query = query.filter(Expense.group_id == group_id)
 
+        # Cursor mode, opted into by sending `after` at all — empty for the first
+        # page, then each response's `next_cursor`. Page mode below is unchanged
+        # for the clients that still send `page`.
+        if 'after' in request.args:
+            try:
+                cursor = _parse_cursor(request.args.get('after', type=str))
+            except ValueError:
+                return {'success': False, 'error': 'Invalid cursor'}, 400
+            with_totals = request.args.get('include_totals', '').lower() in (
+                '1', 'true', 'yes')
+            return _keyset_page(query, cursor, per_page, with_totals)
+
         # Order by date descending
         query = query.order_by(Expense.date.desc())
 
@@ -254,7 +331,9 @@ class TransactionList(Resource):
         income_total, expense_total = _totals_for(query)
 
         # Paginate
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        # Everything the schema dumps, loaded per page rather than per row.
+        pagination = with_serialised_relations(query).paginate(
+            page=page, per_page=per_page, error_out=False)
         transactions = pagination.items
 
         # Serialize
@@ -584,7 +663,8 @@ class RecentTransactions(Resource):
         current_user_id = get_jwt_identity()
         limit = request.args.get('limit', 10, type=int)
 
-        transactions = _transactions_in_scope(current_user_id).order_by(Expense.date.desc()).limit(limit).all()
+        transactions = (with_serialised_relations(_transactions_in_scope(current_user_id))
+                        .order_by(Expense.date.desc()).limit(limit).all())
 
         result = transactions_schema.dump(transactions)
 
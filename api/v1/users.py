@@ -1,5 +1,5 @@
 """User management API endpoints"""
-from flask import request, send_file
+from flask import Response, request, stream_with_context
 from flask_restx import Namespace, Resource, fields, reqparse
 from werkzeug.datastructures import FileStorage
 from flask_jwt_extended import jwt_required, get_jwt_identity
@@ -12,8 +12,6 @@ from src.utils.locale import is_a_usable_number_locale
 from datetime import datetime
 from flask import current_app
 import os
-import json
-import io
 
 import logging
 
@@ -328,13 +326,11 @@ class SessionDetail(Resource):
     @jwt_required()
     def delete(self, session_id):
         """Revoke a JWT token (add JTI to blocklist)"""
-        from flask_jwt_extended import get_jwt
-        from src.models.user import RevokedToken
+        from src.services.auth import revocation
 
-        # session_id is the JTI of the token to revoke
-        jti = session_id
-        if not RevokedToken.is_revoked(jti):
-            db.session.add(RevokedToken(jti=jti))
+        # session_id is the JTI of the token to revoke. Its expiry is not known
+        # here, so the row is kept for the longest a token can live.
+        if revocation.revoke(session_id):
             db.session.commit()
 
         return {'message': 'Session terminated'}, 200
@@ -412,107 +408,25 @@ class Export(Resource):
     @ns.doc('export_data')
     @jwt_required()
     def get(self):
-        """Export all user data as JSON"""
+        """Export all user data as JSON
+
+        Streamed: `export_chunks` reads each table in batches and the response
+        sends them as they are encoded, so a decade of history costs a worker
+        one batch of memory rather than three copies of all of it.
+        """
+        from src.services.backup.export import export_chunks, export_filename
+
         user_id = get_jwt_identity()
         user = User.query.filter_by(id=user_id).first()
 
         if not user:
             return {'message': 'User not found'}, 404
 
-        from src.models.account import Account
-        from src.models.transaction import Expense
-        from src.models.budget import Budget
-        from src.models.category import Category
-
-        accounts = Account.query.filter_by(user_id=user_id).all()
-        transactions = Expense.query.filter_by(user_id=user_id).order_by(Expense.date.desc()).all()
-        budgets = Budget.query.filter_by(user_id=user_id).all()
-        # Export subcategories after parents so import can rebuild the tree
-        categories = Category.query.filter_by(user_id=user_id).order_by(
-            Category.parent_id.nullsfirst()
-        ).all()
-
-        data = {
-            'schema_version': '1.0',
-            'exported_at': datetime.utcnow().isoformat(),
-            'user': {
-                'email': user.id,
-                'name': user.name,
-                'default_currency_code': user.default_currency_code,
-                'timezone': user.timezone,
-                'created_at': user.created_at.isoformat() if user.created_at else None,
-            },
-            'categories': [
-                {
-                    'exported_id': c.id,
-                    'name': c.name,
-                    'icon': c.icon,
-                    'color': c.color,
-                    'parent_exported_id': c.parent_id,
-                    'is_system': c.is_system,
-                }
-                for c in categories
-            ],
-            'accounts': [
-                {
-                    'name': a.name,
-                    'type': a.type,
-                    'institution': a.institution,
-                    'balance': a.balance,
-                    'currency_code': a.currency_code,
-                    'color': a.color,
-                    'import_source': a.import_source,
-                }
-                for a in accounts
-            ],
-            'transactions': [
-                {
-                    'description': e.description,
-                    'amount': e.amount,
-                    'date': e.date.isoformat() if e.date else None,
-                    'transaction_type': e.transaction_type,
-                    'category_exported_id': e.category_id,
-                    'card_used': e.card_used,
-                    'split_method': e.split_method,
-                    'paid_by': e.paid_by,
-                    'currency_code': e.currency_code,
-                    'original_amount': e.original_amount,
-                    'import_source': e.import_source,
-                    'external_id': e.external_id,
-                }
-                for e in transactions
-            ],
-            'budgets': [
-                {
-                    'name': b.name,
-                    'amount': b.amount,
-                    'period': b.period,
-                    'category_exported_id': b.category_id,
-                    'include_subcategories': b.include_subcategories,
-                    'is_recurring': b.is_recurring,
-                    'active': b.active,
-                    'rollover': b.rollover,
-                }
-                for b in budgets
-            ],
-        }
-
-        # Create JSON file in memory.
-        # `cls=` is not optional (D-73): this called the standard library's `dumps`
-        # with no encoder, so it bypassed the app's entirely and raised on the first
-        # `datetime` — and, once money became `numeric` (D-58), on the first
-        # `Decimal` too. Every other response route already goes through this class.
-        from src import _DecimalJSONEncoder
-        json_data = json.dumps(data, indent=2, cls=_DecimalJSONEncoder)
-        buffer = io.BytesIO(json_data.encode('utf-8'))
-        buffer.seek(0)
-
-        return send_file(
-            buffer,
+        return Response(
+            stream_with_context(export_chunks(user_id)),
             mimetype='application/json',
-            as_attachment=True,
-            download_name=f'finpal_export_{datetime.now().strftime("%Y%m%d")}.json'
-        )
+            headers={'Content-Disposition':
+                     f'attachment; filename={export_filename()}'})
 
 
 @ns.route('/import')
@@ -521,7 +435,15 @@ class Import(Resource):
     @ns.expect(import_parser)
     @jwt_required()
     def post(self):
-        """Import user data from JSON backup"""
+        """Import user data from JSON backup
+
+        Read and written in chunks: `read_backup` decodes the upload a row at a
+        time and `restore` inserts each table in batches, committing once at
+        the end so a bad file changes nothing.
+        """
+        from src.services.backup.restore import (BackupUnreadable, read_backup,
+                                                 restore)
+
         user_id = get_jwt_identity()
 
         if 'data' not in request.files:
@@ -533,21 +455,16 @@ class Import(Resource):
             return {'message': 'No file selected'}, 400
 
         try:
-            data = json.load(file)
-        except json.JSONDecodeError as e:
+            stats = restore(user_id, read_backup(file.stream))
+            return {'message': 'Data imported successfully', 'stats': stats}, 200
+        except BackupUnreadable as e:
+            db.session.rollback()
+            if e.lineno is None:
+                return {'message': 'That file could not be read as JSON.'}, 400
             # The position is the user's own file and is what they need to fix
-            # it; `str(e)` is not, because a decoder can quote the offending
-            # bytes back. Read the structured attributes instead.
+            # it. The exception carries no text from the file.
             return {'message': 'That file is not valid JSON '
                                f'(line {e.lineno}, column {e.colno}).'}, 400
-        except Exception:
-            logger.exception('Could not read the uploaded backup for %s',
-                             user_id)
-            return {'message': 'That file could not be read as JSON.'}, 400
-
-        try:
-            stats = _import_user_data(user_id, data)
-            return {'message': 'Data imported successfully', 'stats': stats}, 200
         except Exception:
             db.session.rollback()
             logger.exception('Import error for %s', user_id)
@@ -582,12 +499,14 @@ class ResetCategories(Resource):
         from src.models.transaction_rule import TransactionRule
         from src.models.budget import Budget
         from src.data import seed_user_defaults
+        from src.services.analytics import rollups
 
         try:
             # Nullify category_id on expenses (allows FK constraint to be removed)
             Expense.query.filter_by(user_id=user_id).update(
                 {'category_id': None}, synchronize_session=False
             )
+            rollups.rebuild([user_id])
 
             # Delete category splits for this user's expenses (category_id is NOT NULL there)
             expense_ids = [
@@ -758,6 +677,10 @@ def _delete_all_user_data(user_id):
     from src.models.category import Tag
     from src.models.user import LoginEvent
     from src.models.associations import expense_tags, group_users
+    from src.services.account import snapshots
+    from src.services.analytics import rollups
+    from src.services.group import ledger
+    from src.services.transaction import shares
 
     # Collect expense IDs for association cleanup
     expense_ids = [
@@ -774,11 +697,16 @@ def _delete_all_user_data(user_id):
             CategorySplit.expense_id.in_(expense_ids)
         ).delete(synchronize_session=False)
 
+    groups = ledger.groups_with(Expense.user_id == user_id)
+    shares.forget(Expense.user_id == user_id)
     Expense.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    rollups.rebuild([user_id])
+    ledger.rebuild(groups)
     RecurringExpense.query.filter_by(user_id=user_id).delete(synchronize_session=False)
     Budget.query.filter_by(user_id=user_id).delete(synchronize_session=False)
     CategoryMapping.query.filter_by(user_id=user_id).delete(synchronize_session=False)
     TransactionRule.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    snapshots.forget(Account.user_id == user_id)
     Account.query.filter_by(user_id=user_id).delete(synchronize_session=False)
 
     # Investments: delete transactions → investments → portfolios (no DB cascade)
@@ -819,107 +747,9 @@ def _import_user_data(user_id, data: dict) -> dict:
     """
     Restore data from an export payload produced by GET /users/export.
     Returns a stats dict. Caller is responsible for rollback on exception.
+    The upload itself is streamed through `restore(read_backup(...))`; this is
+    the same restore for a payload that is already a dict.
     """
-    from src.models.category import Category
-    from src.models.account import Account
-    from src.models.transaction import Expense
-    from src.models.budget import Budget
-
-    stats = {'categories': 0, 'accounts': 0, 'transactions': 0, 'budgets': 0}
-
-    # --- 1. Categories (ordered parents-first by the export) ---
-    # Map exported_id → new DB id so transactions/budgets can reference them
-    cat_id_map = {}  # exported_id (int) → new id (int)
-
-    for cat_data in data.get('categories', []):
-        exported_id = cat_data.get('exported_id')
-        parent_exported_id = cat_data.get('parent_exported_id')
-        new_parent_id = cat_id_map.get(parent_exported_id) if parent_exported_id else None
-
-        cat = Category(
-            name=cat_data.get('name', 'Unnamed'),
-            icon=cat_data.get('icon', '🏷️'),
-            color=cat_data.get('color', '#6c757d'),
-            parent_id=new_parent_id,
-            user_id=user_id,
-            is_system=cat_data.get('is_system', False),
-        )
-        db.session.add(cat)
-        db.session.flush()  # get the new id
-
-        if exported_id is not None:
-            cat_id_map[exported_id] = cat.id
-        stats['categories'] += 1
-
-    # --- 2. Accounts ---
-    acct_name_map = {}  # name → new Account.id (for transactions)
-
-    for acct_data in data.get('accounts', []):
-        name = acct_data.get('name', 'Unnamed Account')
-        acct = Account(
-            name=name,
-            type=acct_data.get('type', 'checking'),
-            institution=acct_data.get('institution'),
-            balance=acct_data.get('balance', 0.0),
-            currency_code=acct_data.get('currency_code'),
-            color=acct_data.get('color'),
-            import_source=acct_data.get('import_source'),
-            user_id=user_id,
-        )
-        db.session.add(acct)
-        db.session.flush()
-        acct_name_map[name] = acct.id
-        stats['accounts'] += 1
-
-    # --- 3. Transactions ---
-    for tx_data in data.get('transactions', []):
-        date_raw = tx_data.get('date')
-        try:
-            date = datetime.fromisoformat(date_raw) if date_raw else datetime.utcnow()
-        except ValueError:
-            date = datetime.utcnow()
-
-        cat_exported_id = tx_data.get('category_exported_id')
-        category_id = cat_id_map.get(cat_exported_id) if cat_exported_id else None
-
-        expense = Expense(
-            description=tx_data.get('description', ''),
-            amount=tx_data.get('amount', 0.0),
-            date=date,
-            transaction_type=tx_data.get('transaction_type', 'expense'),
-            category_id=category_id,
-            card_used=tx_data.get('card_used', ''),
-            split_method=tx_data.get('split_method', 'none'),
-            paid_by=tx_data.get('paid_by', user_id),
-            user_id=user_id,
-            currency_code=tx_data.get('currency_code'),
-            original_amount=tx_data.get('original_amount'),
-            import_source=tx_data.get('import_source', 'import'),
-            external_id=tx_data.get('external_id'),
-        )
-        db.session.add(expense)
-        stats['transactions'] += 1
-
-    # --- 4. Budgets ---
-    for bgt_data in data.get('budgets', []):
-        cat_exported_id = bgt_data.get('category_exported_id')
-        category_id = cat_id_map.get(cat_exported_id) if cat_exported_id else None
-        if not category_id:
-            continue  # budgets require a category
-
-        budget = Budget(
-            name=bgt_data.get('name'),
-            amount=bgt_data.get('amount', 0.0),
-            period=bgt_data.get('period', 'monthly'),
-            category_id=category_id,
-            include_subcategories=bgt_data.get('include_subcategories', True),
-            is_recurring=bgt_data.get('is_recurring', True),
-            active=bgt_data.get('active', True),
-            rollover=bgt_data.get('rollover', False),
-            user_id=user_id,
-        )
-        db.session.add(budget)
-        stats['budgets'] += 1
+    from src.services.backup.restore import restore
 
-    db.session.commit()
-    return stats
+    return restore(user_id, data.items())
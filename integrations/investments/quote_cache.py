@@ -0,0 +1,209 @@
+"""One quote and history cache for every worker, in a SQLite file.
+
+`FMPCache` named its files with Python's `hash()`, which is salted per process:
+each gunicorn worker, and every restart, computed different names, missed, and
+paid for the FMP call again. `YFinanceCache` wrote a JSON file per key with a
+plain `open(..., 'w')`, so a reader in another worker could find it half
+written, and both kept their hit counts in the memory of whichever worker
+happened to answer.
+
+`QuoteCache` keeps entries in one SQLite database (WAL, so readers never wait
+on the writer) keyed by a SHA-256 of what was asked, which is the same in every
+process. A write is a single `INSERT OR REPLACE`, so an entry is either the old
+value or the new one. Each entry carries its own expiry from the TTL of its
+kind; expired entries are deleted at most every EVICT_SECONDS by whichever
+process writes next. Hits and misses are counted per kind in the same file —
+batched in memory and added every STATS_FLUSH_SECONDS — so `stats()` is the
+whole instance's, not one worker's.
+
+The file is QUOTE_CACHE_PATH, or `cache/quotes.sqlite3` in the Flask app's
+instance folder — never a path relative to wherever the process started.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+#: Under the app's instance folder, unless QUOTE_CACHE_PATH says otherwise.
+DEFAULT_FILENAME = os.path.join('cache', 'quotes.sqlite3')
+
+#: Seconds an entry of each kind is trusted. A quote moves all day; a company
+#: profile or a finished month of history does not.
+TTL_SECONDS = {
+    'info': 15 * 60,
+    'history': 6 * 3600,
+    'fmp-quote': 15 * 60,
+}
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+EVICT_SECONDS = 600
+STATS_FLUSH_SECONDS = 30
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS entries ('
+    ' key TEXT PRIMARY KEY, kind TEXT NOT NULL, value TEXT NOT NULL,'
+    ' expires_at REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS ix_entries_expires_at ON entries (expires_at)',
+    'CREATE TABLE IF NOT EXISTS stats ('
+    ' kind TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0,'
+    ' misses INTEGER NOT NULL DEFAULT 0)',
+)
+
+
+def cache_key(kind, *parts):
+    """A key that is the same in every process: `kind` and a digest of `parts`."""
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+    return f"{kind}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def default_path():
+    """QUOTE_CACHE_PATH, or the cache file in the current app's instance folder."""
+    configured = os.getenv('QUOTE_CACHE_PATH')
+    if configured:
+        return configured
+    from flask import current_app, has_app_context
+    if not has_app_context():
+        raise RuntimeError(
+            'The quote cache has no path: set QUOTE_CACHE_PATH, or open it inside '
+            'the app context so it goes in the instance folder')
+    return os.path.join(current_app.instance_path, DEFAULT_FILENAME)
+
+
+def _json_default(value):
+    # numpy scalars from pandas rows (history volumes are int64).
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class QuoteCache:
+    """A TTL cache shared by every process that opens the same `path`."""
+
+    def __init__(self, path=None, clock=time.time):
+        self.path = path or default_path()
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = {}  # kind → [hits, misses] not yet added to the file
+        self._next_flush = 0.0
+        self._next_evict = 0.0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, kind, key):
+        """The cached value for `key`, or None if it is missing or expired."""
+        try:
+            row = self._connect().execute(
+                'SELECT value FROM entries WHERE key = ? AND expires_at > ?',
+                (key, self._clock())).fetchone()
+        except sqlite3.Error:
+            logger.exception('Quote cache read failed')
+            row = None
+        self._count(kind, hit=row is not None)
+        return json.loads(row[0]) if row else None
+
+    def put(self, kind, key, value, ttl=None):
+        """Store `value` for `ttl` seconds, or the TTL of its `kind`."""
+        if ttl is None:
+            ttl = TTL_SECONDS.get(kind, DEFAULT_TTL_SECONDS)
+        now = self._clock()
+        try:
+            encoded = json.dumps(value, default=_json_default)
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO entries (key, kind, value, expires_at) '
+                    'VALUES (?, ?, ?, ?)', (key, kind, encoded, now + ttl))
+        except (sqlite3.Error, TypeError, ValueError):
+            logger.exception('Quote cache write failed')
+            return
+        if now >= self._next_evict:
+            self._next_evict = now + EVICT_SECONDS
+            self.evict_expired()
+
+    def evict_expired(self):
+        """Delete every expired entry. Returns how many went."""
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM entries WHERE expires_at <= ?',
+                                (self._clock(),)).rowcount
+
+    def clear(self, kind=None):
+        """Delete every entry, or every entry of one kind. Returns how many went."""
+        with self._connect() as conn:
+            if kind is None:
+                return conn.execute('DELETE FROM entries').rowcount
+            return conn.execute('DELETE FROM entries WHERE kind = ?', (kind,)).rowcount
+
+    def _count(self, kind, hit):
+        with self._lock:
+            counts = self._pending.setdefault(kind, [0, 0])
+            counts[0 if hit else 1] += 1
+        if self._clock() >= self._next_flush:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Add this process's hits and misses to the shared counts."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._next_flush = self._clock() + STATS_FLUSH_SECONDS
+        if not pending:
+            return
+        try:
+            with self._connect() as conn:
+                for kind, (hits, misses) in pending.items():
+                    conn.execute('INSERT OR IGNORE INTO stats (kind) VALUES (?)', (kind,))
+                    conn.execute('UPDATE stats SET hits = hits + ?, misses = misses + ? '
+                                 'WHERE kind = ?', (hits, misses, kind))
+        except sqlite3.Error:
+            logger.exception('Quote cache stats could not be saved')
+
+    def stats(self):
+        """Hits, misses and hit rate per kind and in total, across every process."""
+        self.flush_stats()
+        conn = self._connect()
+        kinds = {}
+        for kind, hits, misses in conn.execute('SELECT kind, hits, misses FROM stats'):
+            kinds[kind] = _rates(hits, misses)
+        entries, expired = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(expires_at <= ?), 0) FROM entries',
+            (self._clock(),)).fetchone()
+        total = _rates(sum(k['hits'] for k in kinds.values()),
+                       sum(k['misses'] for k in kinds.values()))
+        return dict(total, kinds=kinds, entries=entries, expired=expired,
+                    ttl_seconds=dict(TTL_SECONDS, default=DEFAULT_TTL_SECONDS))
+
+
+def _rates(hits, misses):
+    requests = hits + misses
+    return {'hits': hits, 'misses': misses,
+            'hit_rate': round(hits / requests * 100, 1) if requests else 0.0}
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared():
+    """This process's handle on the instance's quote cache."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = QuoteCache()
+        return _shared
@@ -1,10 +1,8 @@
-import os
-import json
-import time
 import logging
-from datetime import datetime, timedelta
 import yfinance as yf
 
+from integrations.investments import quote_cache
+
 # Dictionary of common stock exchanges with their Yahoo Finance suffix and country
 STOCK_EXCHANGES = {
     'US': {'suffix': '', 'name': 'United States (Default)', 'currency': 'USD'},
@@ -39,18 +37,23 @@ class YFinanceCache:
     """
     Cache wrapper for yfinance API calls to respect rate limits
     With support for international markets
+
+    Entries live in the shared quote cache (integrations/investments/quote_cache.py),
+    so every worker reads what any of them fetched
     """
-    def __init__(self, cache_dir='instance/yfcache', expire_seconds=86400):  # Default: 24 hours
-        self.cache_dir = cache_dir
-        self.expire_seconds = expire_seconds
-        self.hits = 0
-        self.misses = 0
-        
-        # Create cache directory if it doesn't exist
-        os.makedirs(cache_dir, exist_ok=True)
-        
+    def __init__(self, cache=None):
+        # The shared one is opened at first use, not here: this is built when
+        # api/v1/investments.py is imported, before there is an app to say
+        # where its instance folder is.
+        self._cache = cache
+
         # Set up logging
         self.logger = logging.getLogger(__name__)
+
+    @property
+    def cache(self):
+        """The QuoteCache entries live in"""
+        return self._cache if self._cache is not None else quote_cache.shared()
     
     def get_ticker_info(self, symbol, exchange=None):
         """
@@ -67,8 +70,8 @@ class YFinanceCache:
         formatted_symbol = self._format_symbol(symbol, exchange)
         
         # Create cache key based on the full symbol
-        cache_key = f"info_{formatted_symbol}"
-        cached_data = self._get_from_cache(cache_key)
+        cache_key = quote_cache.cache_key('info', formatted_symbol)
+        cached_data = self.cache.get('info', cache_key)
         
         if cached_data:
             return cached_data
@@ -105,7 +108,7 @@ class YFinanceCache:
             }
             
             # Cache the result
-            self._save_to_cache(cache_key, data)
+            self.cache.put('info', cache_key, data)
             return data
             
         except Exception as e:
@@ -127,8 +130,8 @@ class YFinanceCache:
         # Format the symbol with exchange suffix if provided
         formatted_symbol = self._format_symbol(symbol, exchange)
         
-        cache_key = f"history_{formatted_symbol}_{period}"
-        cached_data = self._get_from_cache(cache_key)
+        cache_key = quote_cache.cache_key('history', formatted_symbol, period)
+        cached_data = self.cache.get('history', cache_key)
         
         if cached_data:
             return cached_data
@@ -151,7 +154,7 @@ class YFinanceCache:
                 })
             
             # Cache the result
-            self._save_to_cache(cache_key, history_data)
+            self.cache.put('history', cache_key, history_data)
             return history_data
             
         except Exception as e:
@@ -178,95 +181,42 @@ class YFinanceCache:
         """Get list of available exchanges"""
         return {k: v['name'] for k, v in STOCK_EXCHANGES.items()}
     
-    def _get_cache_path(self, key):
-        """Get the file path for a cache key"""
-        return os.path.join(self.cache_dir, f"{key}.json")
-    
-    def _get_from_cache(self, key):
-        """Retrieve data from cache if it exists and is not expired"""
-        cache_path = self._get_cache_path(key)
-        
-        if not os.path.exists(cache_path):
-            self.misses += 1
-            return None
-        
-        try:
-            with open(cache_path, 'r') as f:
-                cached = json.load(f)
-            
-            # Check if cache is expired
-            timestamp = cached.get('timestamp', 0)
-            if time.time() - timestamp >= self.expire_seconds:
-                self.misses += 1
-                return None
-            
-            self.hits += 1
-            return cached.get('data')
-            
-        except Exception as e:
-            self.logger.error(f"Error reading cache file {cache_path}: {str(e)}")
-            self.misses += 1
-            return None
-    
-    def _save_to_cache(self, key, data):
-        """Save data to cache with timestamp"""
-        cache_path = self._get_cache_path(key)
-        
-        try:
-            cache_data = {
-                'timestamp': time.time(),
-                'data': data
-            }
-            
-            with open(cache_path, 'w') as f:
-                json.dump(cache_data, f)
-                
-        except Exception as e:
-            self.logger.error(f"Error saving to cache file {cache_path}: {str(e)}")
-    
     def get_stats(self):
-        """Get cache statistics"""
-        total_requests = self.hits + self.misses
-        hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+        """Get cache statistics, aggregated across every worker"""
+        stats = self.cache.stats()
+        kinds = [stats['kinds'].get(kind, {}) for kind in ('info', 'history')]
+        hits = sum(k.get('hits', 0) for k in kinds)
+        misses = sum(k.get('misses', 0) for k in kinds)
+        total_requests = hits + misses
+        hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
         
         return {
             'total_requests': total_requests,
-            'cache_hits': self.hits,
-            'cache_misses': self.misses,
+            'cache_hits': hits,
+            'cache_misses': misses,
             'hit_rate': f"{hit_rate:.1f}%",
-            'cache_expiry': f"{self.expire_seconds // 3600} hours"
+            'cache_expiry': {kind: f"{quote_cache.TTL_SECONDS[kind] // 60} minutes"
+                             for kind in ('info', 'history')}
         }
     
     def clear_expired(self):
         """Clear expired cache entries"""
-        count = 0
-        for filename in os.listdir(self.cache_dir):
-            if filename.endswith('.json'):
-                file_path = os.path.join(self.cache_dir, filename)
-                try:
-                    with open(file_path, 'r') as f:
-                        cached = json.load(f)
-                    
-                    timestamp = cached.get('timestamp', 0)
-                    if time.time() - timestamp >= self.expire_seconds:
-                        os.remove(file_path)
-                        count += 1
-                except:
-                    # If the file is corrupt, remove it
-                    os.remove(file_path)
-                    count += 1
-        
-        return count
+        return self.cache.evict_expired()
     
     def clear_all(self):
-        """Clear all cache entries"""
-        count = 0
-        for filename in os.listdir(self.cache_dir):
-            if filename.endswith('.json'):
-                os.remove(os.path.join(self.cache_dir, filename))
-                count += 1
-        
-        return count
+        """Clear all yfinance cache entries"""
+        return self.cache.clear('info') + self.cache.clear('history')
+
+_shared_cache = None
+
+
+def shared_cache():
+    """The process's YFinanceCache, so its hit counts and directory are set up once."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = YFinanceCache()
+    return _shared_cache
+
 
 # Function to create stock data object for compatibility with existing code
 def get_stock_data_yfinance(symbol, cache_instance=None, exchange=None):
@@ -282,7 +232,7 @@ def get_stock_data_yfinance(symbol, cache_instance=None, exchange=None):
         dict: Stock data in the same format as the original FMP function
     """
     if cache_instance is None:
-        cache_instance = YFinanceCache()
+        cache_instance = shared_cache()
         
     data = cache_instance.get_ticker_info(symbol, exchange)
     if not data:
@@ -314,8 +264,7 @@ def get_stock_data_with_fallback(symbol, exchange=None):
 
     # Try yfinance first
     try:
-        yf_cache = YFinanceCache()
-        data = yf_cache.get_ticker_info(symbol, exchange)
+        data = shared_cache().get_ticker_info(symbol, exchange)
         if data:
             logger.info(f"Successfully fetched {symbol} from yfinance")
             return data
@@ -367,4 +316,101 @@ def get_stock_data_with_fallback(symbol, exchange=None):
     else:
         logger.info("FMP_API_KEY not configured, no fallback available")
 
-    return None
\ No newline at end of file
+    return None
+
+# Symbols per request. Yahoo's chart endpoint is asked once per symbol inside a
+# download, on at most YAHOO_THREADS threads; FMP takes a comma-separated list.
+YAHOO_BATCH_SIZE = 100
+YAHOO_THREADS = 8
+FMP_BATCH_SIZE = 50
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def get_latest_closes(symbols):
+    """
+    Get the latest price of many symbols from Yahoo Finance in batched downloads
+
+    One `yf.download` per YAHOO_BATCH_SIZE symbols rather than a `Ticker.info`
+    call each. During trading hours the last daily bar is the day so far, so its
+    close is the current price.
+
+    Args:
+        symbols (list): Yahoo symbols, exchange suffix included
+
+    Returns:
+        dict: {symbol: price} for the symbols that had one
+    """
+    logger = logging.getLogger(__name__)
+    prices = {}
+    for batch in _batches(sorted(set(symbols)), YAHOO_BATCH_SIZE):
+        try:
+            frame = yf.download(batch, period='5d', interval='1d', auto_adjust=False,
+                                threads=min(YAHOO_THREADS, len(batch)),
+                                progress=False, multi_level_index=True)
+        except Exception as e:
+            logger.warning(f"yfinance download failed for {len(batch)} symbol(s): {e}")
+            continue
+        if frame is None or frame.empty or 'Close' not in frame:
+            continue
+        closes = frame['Close']
+        for symbol in batch:
+            if symbol not in closes:
+                continue
+            series = closes[symbol].dropna()
+            if not series.empty and float(series.iloc[-1]) > 0:
+                prices[symbol] = float(series.iloc[-1])
+    return prices
+
+
+def get_fmp_prices(symbols):
+    """
+    Get the current price of many symbols from FMP, FMP_BATCH_SIZE per request
+
+    Returns:
+        dict: {symbol: price}; empty when FMP_API_KEY is not configured
+    """
+    from src.config import Config
+    from integrations.investments.fmp_cache import FMPCache
+
+    logger = logging.getLogger(__name__)
+    if not Config.FMP_API_KEY or not symbols:
+        return {}
+
+    fmp_cache = FMPCache()
+    prices = {}
+    for batch in _batches(sorted(set(symbols)), FMP_BATCH_SIZE):
+        try:
+            quotes = fmp_cache.get(Config.FMP_API_URL, f"quote/{','.join(batch)}",
+                                   Config.FMP_API_KEY)
+        except Exception as e:
+            logger.error(f"FMP quote failed for {len(batch)} symbol(s): {e}")
+            continue
+        for quote in quotes if isinstance(quotes, list) else []:
+            if quote.get('symbol') and quote.get('price'):
+                prices[quote['symbol'].upper()] = float(quote['price'])
+    return prices
+
+
+def get_prices_with_fallback(symbols):
+    """
+    Get the current price of many symbols: Yahoo first, FMP for what it missed
+
+    The batched counterpart of `get_stock_data_with_fallback`, for price
+    refreshes that need only the price.
+
+    Args:
+        symbols (iterable): Symbols as Yahoo spells them
+
+    Returns:
+        dict: {symbol: price} for the symbols either source priced
+    """
+    symbols = sorted({s.upper() for s in symbols if s})
+    prices = get_latest_closes(symbols)
+    missing = [s for s in symbols if s not in prices]
+    if missing:
+        prices.update(get_fmp_prices(missing))
+    return prices
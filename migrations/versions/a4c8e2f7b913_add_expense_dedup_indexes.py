@@ -0,0 +1,47 @@
+"""add composite indexes for import duplicate detection
+
+`external_ids_for` loads an account's SimpleFin ids with
+`account_id = ? AND external_id IS NOT NULL`, and `CsvDuplicates` loads a user's
+keys for a date window with `user_id = ? AND date BETWEEN ? AND ?`. The single-column
+indexes from f6a7b8c9d0e1 leave both filtering a whole user's or account's history;
+these answer them from the index.
+
+Revision ID: a4c8e2f7b913
+Revises: 9d3e7a1c5b20
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'a4c8e2f7b913'
+down_revision = '9d3e7a1c5b20'
+branch_labels = None
+depends_on = None
+
+_INDEXES = [
+    # (index_name, table, columns)
+    ('ix_expenses_account_external_id', 'expenses', ['account_id', 'external_id']),
+    ('ix_expenses_user_date',           'expenses', ['user_id', 'date']),
+]
+
+
+def _index_exists(conn, name):
+    r = conn.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname='public' AND indexname=:i"
+    ), {"i": name})
+    return r.fetchone() is not None
+
+
+def upgrade():
+    conn = op.get_bind()
+    for idx_name, table, cols in _INDEXES:
+        if not _index_exists(conn, idx_name):
+            op.create_index(idx_name, table, cols)
+
+
+def downgrade():
+    conn = op.get_bind()
+    for idx_name, table, _ in reversed(_INDEXES):
+        if _index_exists(conn, idx_name):
+            op.drop_index(idx_name, table_name=table)
@@ -0,0 +1,61 @@
+"""add investment_prices table
+
+A symbol's closing price per day, filled nightly from the provider's history by
+the `update_investment_prices` job, and read by the portfolio valuation behind
+the asset/debt and net-worth trends. See src/services/investment/history.py.
+
+No backfill here: the history comes from the provider, which a migration does
+not call. The first nightly run after this fetches a year for every held symbol;
+until then the trends value holdings at their current price, as they did.
+
+Revision ID: a9d4e6b2c8f1
+Revises: f3a8c6d2b9e4
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'a9d4e6b2c8f1'
+down_revision = 'f3a8c6d2b9e4'
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(conn, name):
+    r = conn.execute(sa.text(
+        "SELECT tablename FROM pg_tables WHERE schemaname='public' AND tablename=:t"
+    ), {"t": name})
+    return r.fetchone() is not None
+
+
+def _index_exists(conn, name):
+    r = conn.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname='public' AND indexname=:i"
+    ), {"i": name})
+    return r.fetchone() is not None
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not _table_exists(conn, 'investment_prices'):
+        op.create_table(
+            'investment_prices',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('symbol', sa.String(length=20), nullable=False),
+            sa.Column('date', sa.Date(), nullable=False),
+            sa.Column('close', sa.Numeric(18, 4), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    if not _index_exists(conn, 'ix_investment_prices_symbol_date'):
+        op.create_index('ix_investment_prices_symbol_date',
+                        'investment_prices', ['symbol', 'date'], unique=True)
+
+
+def downgrade():
+    conn = op.get_bind()
+    if _index_exists(conn, 'ix_investment_prices_symbol_date'):
+        op.drop_index('ix_investment_prices_symbol_date',
+                      table_name='investment_prices')
+    if _table_exists(conn, 'investment_prices'):
+        op.drop_table('investment_prices')
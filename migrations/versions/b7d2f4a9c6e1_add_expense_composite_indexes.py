@@ -0,0 +1,55 @@
+"""add composite indexes for the expense access paths
+
+Every hot read of `expenses` is an equality on one column plus a range or an
+ORDER BY on `date`: an account's history, a category's spend for a budget period,
+and the account-owner half of `scope_query`. The single-column indexes from
+f6a7b8c9d0e1 answer the equality and leave the date to a filter over every
+matching row; these answer both. `category_splits.expense_id` had no index at all,
+so the budget calculator's join scanned the table once per matching expense.
+
+`ix_expenses_date` is created by f6a7b8c9d0e1 and is only re-checked here. The
+models declare it too, so an instance built by `create_all()` gets it from the
+boot reconcile instead.
+
+Revision ID: b7d2f4a9c6e1
+Revises: a4c8e2f7b913
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'b7d2f4a9c6e1'
+down_revision = 'a4c8e2f7b913'
+branch_labels = None
+depends_on = None
+
+_INDEXES = [
+    # (index_name, table, columns)
+    ('ix_expenses_account_date',  'expenses', ['account_id', 'date']),
+    ('ix_expenses_category_date', 'expenses', ['category_id', 'date']),
+    ('ix_category_splits_expense_id', 'category_splits', ['expense_id']),
+]
+
+
+def _index_exists(conn, name):
+    r = conn.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname='public' AND indexname=:i"
+    ), {"i": name})
+    return r.fetchone() is not None
+
+
+def upgrade():
+    conn = op.get_bind()
+    for idx_name, table, cols in _INDEXES:
+        if not _index_exists(conn, idx_name):
+            op.create_index(idx_name, table, cols)
+    if not _index_exists(conn, 'ix_expenses_date'):
+        op.create_index('ix_expenses_date', 'expenses', ['date'])
+
+
+def downgrade():
+    conn = op.get_bind()
+    for idx_name, table, _ in reversed(_INDEXES):
+        if _index_exists(conn, idx_name):
+            op.drop_index(idx_name, table_name=table)
@@ -0,0 +1,67 @@
+"""add account_balance_snapshots table
+
+An account's balance per day, written when a transaction or SimpleFin moves it
+and by the nightly `account_balance_snapshots` job, and read by the net-worth and
+asset/debt trends instead of replaying every transaction on each load. See
+src/services/account/snapshots.py.
+
+No backfill here. History before the first snapshot is a replay of transactions
+from today's balance — application logic, with currency conversion — and it is
+written per account the first time one is snapshotted, or all at once by
+`flask backfill-balance-snapshots`. Until then the trends replay, as they did.
+
+Revision ID: c3a9e5d1f7b4
+Revises: b7d2f4a9c6e1
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'c3a9e5d1f7b4'
+down_revision = 'b7d2f4a9c6e1'
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(conn, name):
+    r = conn.execute(sa.text(
+        "SELECT tablename FROM pg_tables WHERE schemaname='public' AND tablename=:t"
+    ), {"t": name})
+    return r.fetchone() is not None
+
+
+def _index_exists(conn, name):
+    r = conn.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname='public' AND indexname=:i"
+    ), {"i": name})
+    return r.fetchone() is not None
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not _table_exists(conn, 'account_balance_snapshots'):
+        op.create_table(
+            'account_balance_snapshots',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('account_id', sa.Integer(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('balance', sa.Numeric(18, 2), nullable=False, server_default='0'),
+            sa.Column('source', sa.String(length=20), nullable=False,
+                      server_default='daily'),
+            sa.Column('recorded_at', sa.DateTime(), nullable=False,
+                      server_default=sa.func.now()),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    if not _index_exists(conn, 'ix_account_balance_snapshots_account_day'):
+        op.create_index('ix_account_balance_snapshots_account_day',
+                        'account_balance_snapshots', ['account_id', 'day'])
+
+
+def downgrade():
+    conn = op.get_bind()
+    if _index_exists(conn, 'ix_account_balance_snapshots_account_day'):
+        op.drop_index('ix_account_balance_snapshots_account_day',
+                      table_name='account_balance_snapshots')
+    if _table_exists(conn, 'account_balance_snapshots'):
+        op.drop_table('account_balance_snapshots')
@@ -0,0 +1,193 @@
+"""add expense_shares table
+
+One row per person per split transaction — what `Expense.calculate_splits` says
+they owe — written by a flush hook in src/services/transaction/shares.py and read
+by the cash-flow shares, the dashboard IOUs, `calculate_balances` and group
+balances instead of re-splitting every row.
+
+The backfill is written out here rather than calling `shares.rebuild()`, for the
+reason 9d3e7a1c5b20 gives: a migration must keep doing the same thing to the same
+database after the application code has moved on. `_shares` is
+`calculate_splits` as of this revision, folded per person the way `shares_of`
+folds it. An instance that never runs Alembic is backfilled at boot instead
+(`_backfill_expense_shares` in src/__init__.py).
+
+Revision ID: d8b4f2a6e3c9
+Revises: c3a9e5d1f7b4
+Create Date: 2026-10-17
+
+"""
+import json
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd8b4f2a6e3c9'
+down_revision = 'c3a9e5d1f7b4'
+branch_labels = None
+depends_on = None
+
+_CENTS = Decimal('0.01')
+_PRECISE = Decimal('0.00000001')
+_BATCH = 500
+
+
+def _table_exists(conn, name):
+    r = conn.execute(sa.text(
+        "SELECT tablename FROM pg_tables WHERE schemaname='public' AND tablename=:t"
+    ), {"t": name})
+    return r.fetchone() is not None
+
+
+def _index_exists(conn, name):
+    r = conn.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname='public' AND indexname=:i"
+    ), {"i": name})
+    return r.fetchone() is not None
+
+
+def _money(value, quantum=_CENTS):
+    if value is None or value == '':
+        return Decimal('0')
+    try:
+        return Decimal(str(value)).quantize(quantum, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError, TypeError):
+        return Decimal('0')
+
+
+def _shares(row, user_ids):
+    """{user_id: (amount, original_amount)} for one split `expenses` row."""
+    amount = _money(row.amount)
+    original = _money(row.original_amount) if row.original_amount is not None else amount
+    raw_ids = row.split_with.split(',')
+    participants = [uid.strip() for uid in raw_ids if uid.strip() in user_ids]
+    payer_in = row.paid_by in raw_ids
+
+    details = {}
+    if row.split_details:
+        try:
+            details = json.loads(row.split_details)
+        except ValueError:
+            details = {}
+    if not isinstance(details, dict):
+        details = {}
+
+    payer = Decimal('0')
+    splits = []  # (user_id, amount, original_amount)
+
+    def fix_remainder():
+        assigned = (payer if not payer_in else 0) + sum(s[1] for s in splits)
+        if abs(_money(assigned) - amount) > _CENTS:
+            difference = amount - assigned
+            if splits:
+                uid, share, share_original = splits[-1]
+                splits[-1] = (uid, share + difference, share_original)
+                return payer
+            if payer > 0:
+                return payer + difference
+        return payer
+
+    if row.split_method == 'equal':
+        count = len(participants) + (0 if payer_in else 1)
+        if count:
+            payer = Decimal('0') if payer_in else amount / count
+            splits = [(uid, amount / count, original / count) for uid in participants]
+    elif row.split_method == 'percentage':
+        if details.get('type') == 'percentage':
+            values = details.get('values', {})
+            percent = _money(values.get(row.paid_by, 0), _PRECISE)
+            payer = Decimal('0') if payer_in else amount * percent / 100
+            for uid in participants:
+                percent = _money(values.get(uid, 0), _PRECISE)
+                splits.append((uid, amount * percent / 100, original * percent / 100))
+            payer = fix_remainder()
+        else:
+            percent = _money(row.split_value, _PRECISE)
+            payer = Decimal('0') if payer_in else amount * percent / 100
+            if participants:
+                remaining = (original - original * percent / 100) / len(participants)
+                per = (amount - payer) / len(participants)
+                splits = [(uid, per, remaining) for uid in participants]
+    elif row.split_method == 'custom':
+        if details.get('type') in ('amount', 'custom'):
+            values = details.get('values', {})
+            payer = Decimal('0') if payer_in else _money(values.get(row.paid_by, 0))
+            for uid in participants:
+                share = _money(values.get(uid, 0))
+                ratio = share / amount if amount else 0
+                splits.append((uid, share, original * ratio))
+            payer = fix_remainder()
+        else:
+            stated = _money(row.split_value, _PRECISE)
+            payer = Decimal('0') if payer_in else stated
+            if participants:
+                ratio = stated / amount if amount else 0
+                remaining = (original - original * ratio) / len(participants)
+                per = (amount - payer) / len(participants)
+                splits = [(uid, per, remaining) for uid in participants]
+
+    folded = {}
+    for uid, share, share_original in splits:
+        total, total_original = folded.get(uid, (Decimal('0'), Decimal('0')))
+        folded[uid] = (total + share, total_original + share_original)
+    if payer or row.paid_by not in folded:
+        ratio = original / amount if amount else Decimal('0')
+        total, total_original = folded.get(row.paid_by, (Decimal('0'), Decimal('0')))
+        folded[row.paid_by] = (total + payer, total_original + payer * ratio)
+    return {uid: (_money(total), _money(total_original))
+            for uid, (total, total_original) in folded.items()}
+
+
+def _backfill(conn, shares):
+    user_ids = {r[0] for r in conn.execute(sa.text('SELECT id FROM users'))}
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.text(
+            "SELECT id, amount, original_amount, paid_by, split_method, split_with, "
+            "split_details, split_value FROM expenses "
+            "WHERE split_method != 'none' AND split_with IS NOT NULL "
+            "AND split_with != '' AND id > :last ORDER BY id LIMIT :n"
+        ), {"last": last_id, "n": _BATCH}).fetchall()
+        if not rows:
+            return
+        values = [{'expense_id': row.id, 'user_id': uid, 'paid_by': row.paid_by,
+                   'amount': share, 'original_amount': share_original}
+                  for row in rows
+                  for uid, (share, share_original) in _shares(row, user_ids).items()]
+        if values:
+            op.bulk_insert(shares, values)
+        last_id = rows[-1].id
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not _table_exists(conn, 'expense_shares'):
+        shares = op.create_table(
+            'expense_shares',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('expense_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.String(length=120), nullable=False),
+            sa.Column('paid_by', sa.String(length=120), nullable=False),
+            sa.Column('amount', sa.Numeric(18, 2), nullable=False, server_default='0'),
+            sa.Column('original_amount', sa.Numeric(18, 2), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        _backfill(conn, shares)
+    if not _index_exists(conn, 'ix_expense_shares_user_expense'):
+        op.create_index('ix_expense_shares_user_expense', 'expense_shares',
+                        ['user_id', 'expense_id'])
+    if not _index_exists(conn, 'ix_expense_shares_paid_by'):
+        op.create_index('ix_expense_shares_paid_by', 'expense_shares', ['paid_by'])
+    if not _index_exists(conn, 'ix_expense_shares_expense'):
+        op.create_index('ix_expense_shares_expense', 'expense_shares', ['expense_id'])
+
+
+def downgrade():
+    conn = op.get_bind()
+    for name in ('ix_expense_shares_expense', 'ix_expense_shares_paid_by',
+                 'ix_expense_shares_user_expense'):
+        if _index_exists(conn, name):
+            op.drop_index(name, table_name='expense_shares')
+    if _table_exists(conn, 'expense_shares'):
+        op.drop_table('expense_shares')
@@ -0,0 +1,73 @@
+"""add ledger_balances table
+
+What each person owes each other person within a group, kept as running sums.
+A flush hook in src/services/group/ledger.py maintains them, and group balances
+read them instead of every group expense and settlement.
+
+The backfill is written out in SQL here, for the reason 9d3e7a1c5b20 gives. It
+sums `expense_shares`, which d8b4f2a6e3c9 has just filled, and `settlements`.
+It matches `ledger.rebuild()` row for row. An instance that never runs Alembic is
+backfilled at boot instead, by `_backfill_ledger_balances` in src/__init__.py.
+
+Revision ID: e2c7a9f4b1d6
+Revises: d8b4f2a6e3c9
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e2c7a9f4b1d6'
+down_revision = 'd8b4f2a6e3c9'
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(conn, name):
+    r = conn.execute(sa.text(
+        "SELECT tablename FROM pg_tables WHERE schemaname='public' AND tablename=:t"
+    ), {"t": name})
+    return r.fetchone() is not None
+
+
+def _index_exists(conn, name):
+    r = conn.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname='public' AND indexname=:i"
+    ), {"i": name})
+    return r.fetchone() is not None
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not _table_exists(conn, 'ledger_balances'):
+        op.create_table(
+            'ledger_balances',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('group_id', sa.Integer(), nullable=True),
+            sa.Column('debtor', sa.String(length=120), nullable=False),
+            sa.Column('creditor', sa.String(length=120), nullable=False),
+            sa.Column('amount', sa.Numeric(18, 2), nullable=False, server_default='0'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        # Settlements name no group; they are kept under NULL.
+        op.execute(
+            "INSERT INTO ledger_balances (group_id, debtor, creditor, amount) "
+            "SELECT e.group_id, s.user_id, s.paid_by, SUM(s.amount) "
+            "FROM expense_shares s JOIN expenses e ON e.id = s.expense_id "
+            "WHERE e.group_id IS NOT NULL AND s.user_id != s.paid_by "
+            "GROUP BY e.group_id, s.user_id, s.paid_by")
+        op.execute(
+            "INSERT INTO ledger_balances (group_id, debtor, creditor, amount) "
+            "SELECT NULL, payer_id, receiver_id, -SUM(amount) FROM settlements "
+            "WHERE payer_id != receiver_id GROUP BY payer_id, receiver_id")
+    if not _index_exists(conn, 'ix_ledger_balances_group_pair'):
+        op.create_index('ix_ledger_balances_group_pair', 'ledger_balances',
+                        ['group_id', 'debtor', 'creditor'])
+
+
+def downgrade():
+    conn = op.get_bind()
+    if _index_exists(conn, 'ix_ledger_balances_group_pair'):
+        op.drop_index('ix_ledger_balances_group_pair', table_name='ledger_balances')
+    if _table_exists(conn, 'ledger_balances'):
+        op.drop_table('ledger_balances')
@@ -0,0 +1,51 @@
+"""add revoked_tokens.expires_at
+
+When a revoked token would have expired anyway. The nightly purge in
+src/services/auth/revocation.py deletes rows past it; rows revoked before this
+column existed stay NULL and go once the longest token lifetime has passed. An
+instance that never runs Alembic gets the column and index from the boot-time
+schema reconcile.
+
+Revision ID: f3a8c6d2b9e4
+Revises: e2c7a9f4b1d6
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'f3a8c6d2b9e4'
+down_revision = 'e2c7a9f4b1d6'
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(conn, table, column):
+    r = conn.execute(sa.text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_name=:t AND column_name=:c"
+    ), {"t": table, "c": column})
+    return r.fetchone() is not None
+
+
+def _index_exists(conn, name):
+    r = conn.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname='public' AND indexname=:i"
+    ), {"i": name})
+    return r.fetchone() is not None
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not _column_exists(conn, 'revoked_tokens', 'expires_at'):
+        op.add_column('revoked_tokens', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    if not _index_exists(conn, 'ix_revoked_tokens_expires_at'):
+        op.create_index('ix_revoked_tokens_expires_at', 'revoked_tokens', ['expires_at'])
+
+
+def downgrade():
+    conn = op.get_bind()
+    if _index_exists(conn, 'ix_revoked_tokens_expires_at'):
+        op.drop_index('ix_revoked_tokens_expires_at', table_name='revoked_tokens')
+    if _column_exists(conn, 'revoked_tokens', 'expires_at'):
+        op.drop_column('revoked_tokens', 'expires_at')
@@ -1,5 +1,9 @@
 """Marshmallow schemas for serialization"""
-from marshmallow import Schema, fields, validate, post_load
+import logging
+
+from marshmallow import Schema, fields, validate, post_load, pre_dump
+
+logger = logging.getLogger(__name__)
 
 
 class UserSchema(Schema):
@@ -64,6 +68,28 @@ class TransactionSchema(Schema):
     account = fields.Nested('AccountSchema', dump_only=True)
     splits = fields.Method('get_splits', dump_only=True)
 
+    @pre_dump(pass_many=True)
+    def prime_users(self, data, many, **kwargs):
+        """Load every user the rows' splits name, in one query for the whole dump.
+
+        `calculate_splits` looks each payer and participant up on its own when it
+        is given no `users_map` — a query per name per row. The map is stored on
+        the row, like `BudgetSchema.prime_spend` stores spend, because this schema
+        is a shared singleton. A failure only loses the batching.
+        """
+        from src.models.transaction import Expense
+        from src.services.transaction.serialisation import users_map_for
+
+        rows = [row for row in (data if many else [data])
+                if isinstance(row, Expense)]
+        try:
+            users_map = users_map_for(rows)
+            for row in rows:
+                row._users_map = users_map
+        except Exception:
+            logger.exception('Could not batch transaction split users')
+        return data
+
     def get_category_splits(self, obj):
         """`{category_id: amount}`, and `{}` rather than null when there are none.
 
@@ -81,7 +107,9 @@ class TransactionSchema(Schema):
         one above. Two different questions that were one word apart, and the
         reason D-54 read as "the splits are already there".
         """
-        return obj.calculate_splits() if hasattr(obj, 'calculate_splits') else None
+        if not hasattr(obj, 'calculate_splits'):
+            return None
+        return obj.calculate_splits(users_map=getattr(obj, '_users_map', None))
 
 
 class CategorySchema(Schema):
@@ -163,6 +191,28 @@ class BudgetSchema(Schema):
     remaining = fields.Method('get_remaining', dump_only=True)
     percentage = fields.Method('get_percentage', dump_only=True)
 
+    @pre_dump(pass_many=True)
+    def prime_spend(self, data, many, **kwargs):
+        """Answer every budget being dumped in one `BudgetSpendCalculator` pass.
+
+        Without it each budget costs its own three queries, three times over — once
+        per method field below. Budgets a caller has already primed (the overview
+        does, for its totals) are left alone. A failure here only loses the
+        batching: the fields fall back to asking each budget.
+        """
+        from src.models.budget import Budget
+        from src.services.budget.spend import BudgetSpendCalculator, is_primed
+
+        budgets = data if many else [data]
+        try:
+            pending = [b for b in budgets
+                       if isinstance(b, Budget) and not is_primed(b)]
+            if pending:
+                BudgetSpendCalculator(pending).prime()
+        except Exception:
+            logger.exception('Could not batch budget spend')
+        return data
+
     def get_spent(self, obj):
         """Calculate spent amount"""
         try:
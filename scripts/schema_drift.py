@@ -68,7 +68,8 @@ def main():
 
     with app.app_context():
         from src.utils.schema_reconcile import (
-            auto_reconcile_enabled, detect_drift, statements_for,
+            auto_reconcile_enabled, detect_drift, index_statements_for,
+            missing_indexes, statements_for,
         )
 
         missing_tables, addable, unaddable, narrow = detect_drift(
@@ -78,10 +79,12 @@ def main():
         missing_columns = [(t, c, True) for t, c in addable] + \
                           [(t, c, False) for t, c in unaddable]
         narrow_columns = [(t, c.name, have, want) for t, c, have, want in narrow]
+        indexes, unique_indexes = missing_indexes(db.engine, db.metadata)
 
-        if not (missing_tables or missing_columns or narrow_columns):
-            print('No drift: every model table and column is present, and no column '
-                  'is narrower than its model.')
+        if not (missing_tables or missing_columns or narrow_columns
+                or indexes or unique_indexes):
+            print('No drift: every model table, column and index is present, and no '
+                  'column is narrower than its model.')
             if not auto_reconcile_enabled():
                 print('NOTE: SCHEMA_AUTO_RECONCILE is off on this instance, so nothing '
                       'will be repaired automatically on the next boot.')
@@ -126,6 +129,19 @@ def main():
                 print(f'    {table}.{col}: database {have}, model {want}')
             print()
 
+        if indexes or unique_indexes:
+            print(f'{len(indexes) + len(unique_indexes)} index(es) missing.')
+            if indexes:
+                print('  The boot-time reconcile WILL create the non-unique ones; this is '
+                      'the SQL:' if auto_reconcile_enabled() else
+                      '  SCHEMA_AUTO_RECONCILE is off. Apply:')
+                for statement in index_statements_for(db.engine, indexes):
+                    print(f'    {statement};')
+            for index in unique_indexes:
+                print(f'    /* UNIQUE {index.name} on {index.table.name}: not created '
+                      'automatically, existing duplicates would make it fail. */')
+            print()
+
         return 1
 
 
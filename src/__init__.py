@@ -17,7 +17,8 @@ from flask.json.provider import DefaultJSONProvider
 from sqlalchemy import text
 from werkzeug.middleware.proxy_fix import ProxyFix
 from src.config import get_config
-from src.extensions import db, login_manager, mail, migrate, scheduler, init_extensions
+from src.extensions import (db, login_manager, mail, migrate, scheduler,
+                            init_extensions, scheduler_enabled)
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 
@@ -176,10 +177,12 @@ def create_app(config_name=None):
     def revoked_token_response(jwt_header, jwt_payload):
         return {'message': 'Token has been revoked', 'error': 'token_revoked'}, 401
 
+    # Answered from this process's copy of the blocklist; see revocation.py.
+    from src.services.auth import revocation
+
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        from src.models.user import RevokedToken
-        return RevokedToken.is_revoked(jwt_payload['jti'])
+        return revocation.is_revoked(jwt_payload['jti'])
 
     # Configure CORS — origins read from CORS_ALLOWED_ORIGINS env var (see config.py)
     allowed_origins = app.config.get('CORS_ALLOWED_ORIGINS', ['http://localhost:5173'])
@@ -369,6 +372,9 @@ def create_app(config_name=None):
                 app.logger.warning(f"Module startup failed (non-fatal): {e}")
 
             _seed_reference_data(app)
+            _backfill_rollups(app)
+            _backfill_expense_shares(app)
+            _backfill_ledger_balances(app)
 
             if app.config.get('DEMO_MODE', False):
                 try:
@@ -413,6 +419,64 @@ def _seed_reference_data(app):
         app.logger.exception('Failed to seed default currencies')
 
 
+def _backfill_rollups(app):
+    """Fill `monthly_rollups` the first time an instance boots with it.
+
+    `create_all()` creates the table empty on an instance that already has years
+    of `expenses`, and nothing runs Alembic here, so without this every analytics
+    figure would read zero until someone ran `flask rebuild-rollups`. Cheap on
+    every later boot: `needs_backfill()` is two `LIMIT 1` reads.
+    """
+    try:
+        from src.services.analytics import rollups
+        if rollups.needs_backfill():
+            rollups.rebuild()
+            db.session.commit()
+            app.logger.info('Backfilled monthly rollups')
+    except Exception:
+        db.session.rollback()
+        app.logger.exception('Failed to backfill monthly rollups; '
+                             'run `flask rebuild-rollups`')
+
+
+def _backfill_expense_shares(app):
+    """Fill `expense_shares` the first time an instance boots with it.
+
+    `_backfill_rollups`' reason, for the IOU and share figures: without it every
+    existing split would owe nothing until someone ran `flask
+    rebuild-expense-shares`.
+    """
+    try:
+        from src.services.transaction import shares
+        if shares.needs_backfill():
+            shares.rebuild()
+            db.session.commit()
+            app.logger.info('Backfilled expense shares')
+    except Exception:
+        db.session.rollback()
+        app.logger.exception('Failed to backfill expense shares; '
+                             'run `flask rebuild-expense-shares`')
+
+
+def _backfill_ledger_balances(app):
+    """Fill `ledger_balances` the first time an instance boots with it.
+
+    After `_backfill_expense_shares`, because the ledger is summed from the
+    shares: without it every group would read as settled until someone ran
+    `flask rebuild-ledger-balances`.
+    """
+    try:
+        from src.services.group import ledger
+        if ledger.needs_backfill():
+            ledger.rebuild()
+            db.session.commit()
+            app.logger.info('Backfilled group ledger balances')
+    except Exception:
+        db.session.rollback()
+        app.logger.exception('Failed to backfill group ledger balances; '
+                             'run `flask rebuild-ledger-balances`')
+
+
 # Routes where two handlers still claim the same request today. Werkzeug resolves
 # duplicates to the first registered, so for each of these the older blueprint
 # wins and the flask-restx handler is dead code.
@@ -569,17 +633,51 @@ def setup_scheduled_tasks(app):
             except Exception as e:
                 app.logger.error(f"SimpleFin sync task failed: {e}")
 
+    @scheduler.task('cron', id='account_balance_snapshots', hour=23, minute=30)
+    def scheduled_balance_snapshots():
+        """Record every account's balance for the day. After the 11 PM SimpleFin
+        sync, so bridge balances are the ones recorded."""
+        with app.app_context():
+            try:
+                from src.services.account import snapshots
+                count = snapshots.take_daily()
+                db.session.commit()
+                app.logger.info(f"Balance snapshots recorded for {count} account(s)")
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Balance snapshot task failed")
+
+    @scheduler.task('cron', id='purge_revoked_tokens', hour=3, minute=15)
+    def scheduled_revoked_token_purge():
+        """Delete blocklist rows whose token has expired anyway."""
+        with app.app_context():
+            try:
+                from src.services.auth import revocation
+                count = revocation.purge()
+                db.session.commit()
+                app.logger.info(f"Revoked token purge removed {count} expired row(s)")
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Revoked token purge failed")
+
     @scheduler.task('interval', id='csv_folder_scan', minutes=5)
     def scheduled_csv_folder_scan():
+        """The fallback for folders the inotify watcher is not watching."""
         with app.app_context():
             try:
                 from src.models.import_source import ImportSource
-                from src.services.csv_import.scanner import scan_source
+                from src.services.csv_import import watcher
                 for source in ImportSource.query.filter_by(enabled=True).all():
-                    scan_source(source)
+                    if watcher.polled(source.id):
+                        watcher.scan(source)
             except Exception:
                 app.logger.exception('CSV folder scan failed')
 
+    # Only where the jobs run: the watcher is this process's, like the scheduler.
+    if scheduler_enabled():
+        from src.services.csv_import import watcher
+        watcher.start(app)
+
     # Module scheduled tasks (e.g. pointsPal nightly sync)
     try:
         from src.modules.registry import module_registry
@@ -589,23 +687,25 @@ def setup_scheduled_tasks(app):
 
     @scheduler.task('cron', id='update_investment_prices', hour=4, minute=0)
     def scheduled_investment_price_update():
-        """Update all investment prices from yfinance nightly at 4 AM."""
+        """Update all investment prices nightly at 4 AM, each symbol fetched once,
+        and store each held symbol's recent closes for the trends."""
         with app.app_context():
             try:
-                from src.models.investment import Portfolio
-                from src.services.investment.service import InvestmentService
-
-                service = InvestmentService()
-                user_ids = db.session.query(Portfolio.user_id).distinct().all()
-                total_updated = 0
-
-                for (uid,) in user_ids:
-                    results = service.update_all_user_prices(uid)
-                    total_updated += sum(1 for r in results if r['ok'])
-
-                app.logger.info(f"Investment price update complete: {len(user_ids)} user(s), {total_updated} portfolio(s) updated")
-            except Exception as e:
-                app.logger.error(f"Investment price update failed: {e}")
+                from src.services.investment import history, prices
+                result = prices.refresh()
+                db.session.commit()
+                app.logger.info(
+                    f"Investment price update complete: {result.symbols} symbol(s), "
+                    f"{result.updated} holding(s) updated, {len(result.failed)} unpriced"
+                )
+                # The closes the trends value past months at. Its own commit,
+                # so a history failure keeps tonight's prices.
+                closes = history.record()
+                db.session.commit()
+                app.logger.info(f"Investment price history: {closes} close(s) stored")
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Investment price update failed")
 
     @scheduler.task('cron', id='update_exchange_rates', hour=2, minute=0)
     def scheduled_exchange_rate_update():
@@ -138,6 +138,73 @@ def register_commands(app):
         else:
             click.echo('Cancelled.')
 
+    @app.cli.command('rebuild-rollups')
+    @with_appcontext
+    def rebuild_rollups_command():
+        """Recompute monthly_rollups from the expenses table"""
+        from src.services.analytics import rollups
+        rollups.rebuild()
+        db.session.commit()
+        click.echo('✅ Monthly rollups rebuilt')
+
+    @app.cli.command('rebuild-expense-shares')
+    @with_appcontext
+    def rebuild_expense_shares_command():
+        """Recompute expense_shares from the split rows in expenses"""
+        from src.services.transaction import shares
+        shares.rebuild()
+        db.session.commit()
+        click.echo('✅ Expense shares rebuilt')
+
+    @app.cli.command('rebuild-ledger-balances')
+    @with_appcontext
+    def rebuild_ledger_balances_command():
+        """Recompute ledger_balances from expense_shares and settlements"""
+        from src.services.group import ledger
+        ledger.rebuild()
+        db.session.commit()
+        click.echo('✅ Group ledger rebuilt')
+
+    @app.cli.command('backfill-balance-snapshots')
+    @with_appcontext
+    def backfill_balance_snapshots_command():
+        """Replay history for accounts without snapshots, and snapshot today"""
+        from src.services.account import snapshots
+        count = snapshots.take_daily()
+        db.session.commit()
+        click.echo(f'✅ Balance snapshots recorded for {count} accounts')
+
+    @app.cli.command('index-advisor')
+    @click.option('--verbose', is_flag=True, help='Print every plan, not only flagged ones')
+    @with_appcontext
+    def index_advisor_command(verbose):
+        """EXPLAIN the hot expense queries and flag full table scans"""
+        from src.utils.index_advisor import advise
+
+        try:
+            report = advise()
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        flagged = 0
+        for entry in report:
+            if entry['seq_scans']:
+                flagged += 1
+                click.echo(f'❌ {entry["name"]}: full scan of '
+                           f'{", ".join(entry["seq_scans"])}')
+            else:
+                click.echo(f'✅ {entry["name"]}')
+            if verbose or entry['seq_scans']:
+                for line in entry['plan']:
+                    click.echo(f'     {line}')
+
+        if flagged:
+            click.echo(f'\n{flagged} of {len(report)} queries scan a whole table. '
+                       'Compare the model indexes with the database '
+                       '(python scripts/schema_drift.py).')
+            raise SystemExit(1)
+        click.echo(f'\nAll {len(report)} queries use an index.')
+
     @app.cli.command('fresh-install')
     @click.option('--force', is_flag=True, help='Skip confirmation prompt')
     @with_appcontext
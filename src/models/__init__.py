@@ -13,11 +13,15 @@ from src.models.transaction_rule import TransactionRule
 from src.models.group import Group, Settlement
 from src.models.recurring import RecurringExpense, IgnoredRecurringPattern
 from src.models.budget import Budget
-from src.models.investment import Portfolio, Investment, InvestmentTransaction
+from src.models.investment import Portfolio, Investment, InvestmentTransaction, InvestmentPrice
 from src.models.invitation import Invitation
 from src.models.import_source import ImportSource, ImportProfile, ImportBatch
 from src.models.personal_access_token import PersonalAccessToken  # noqa: F401
 from src.models.agent_action import AgentAction  # noqa: F401
+from src.models.rollup import MonthlyRollup  # noqa: F401
+from src.models.balance_snapshot import AccountBalanceSnapshot  # noqa: F401
+from src.models.expense_share import ExpenseShare  # noqa: F401
+from src.models.ledger_balance import LedgerBalance  # noqa: F401
 
 # Module access control (always imported — table exists regardless of feature flags)
 from src.modules.access import UserModuleAccess  # noqa: F401
@@ -72,10 +76,15 @@ __all__ = [
     'Portfolio',
     'Investment',
     'InvestmentTransaction',
+    'InvestmentPrice',
     'Invitation',
     'ImportSource',
     'ImportProfile',
     'ImportBatch',
     'PersonalAccessToken',
     'AgentAction',
+    'MonthlyRollup',
+    'AccountBalanceSnapshot',
+    'ExpenseShare',
+    'LedgerBalance',
 ]
@@ -0,0 +1,66 @@
+"""An account's balance as it stood on a day.
+
+Per finpal_core/CLAUDE.md this must not import other model files. Writes and
+reads live in `src/services/account/snapshots.py`.
+"""
+from datetime import datetime
+
+from sqlalchemy import event as _sa_event
+
+from src.extensions import db
+
+
+class AccountBalanceSnapshot(db.Model):
+    """`Account.balance` on `day`, the last time it was recorded that day.
+
+    The net-worth and asset/debt trends read a range of these instead of replaying
+    every transaction backwards from today's balance. For a SimpleFin account they
+    are the only real history there is: its balance comes from the bridge, and a
+    replay of imported transactions can only approximate it.
+
+    `source` says how the figure was obtained — `'transaction'` (a balance move),
+    `'simplefin'` (the bridge), `'daily'` (the scheduled job) or `'backfill'` (a
+    replay, for the days before snapshots existed). Replayed figures are written
+    once and never overwrite an observed one.
+
+    No unique constraint on (account_id, day), for the reason `MonthlyRollup` has
+    none: two workers recording the same account on the same day would make the
+    second commit fail, taking the transaction that moved the balance with it.
+    Reads take the newest row of a day, so a duplicate costs a row, not a figure.
+    No foreign key either — this is history, and `AccountRepository.delete` drops
+    an account's rows with it.
+    """
+    __tablename__ = 'account_balance_snapshots'
+    __table_args__ = (
+        db.Index('ix_account_balance_snapshots_account_day', 'account_id', 'day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    balance = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+    source = db.Column(db.String(20), nullable=False, default='daily')
+    recorded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AccountBalanceSnapshot {self.account_id} {self.day} {self.balance}>'
+
+
+# ---------------------------------------------------------------------------
+# Snapshot hook — writes the balances `snapshots.record` noted during the
+# transaction, as part of its commit. Not swallowed, for the reason the rollup
+# hook in transaction.py gives: a missed snapshot is a wrong chart that says
+# nothing. See src/services/account/snapshots.py.
+# ---------------------------------------------------------------------------
+
+
+@_sa_event.listens_for(db.session, 'before_commit')
+def _write_recorded_snapshots(session):
+    from src.services.account.snapshots import write_recorded
+    write_recorded(session)
+
+
+@_sa_event.listens_for(db.session, 'after_rollback')
+def _forget_recorded_snapshots(session):
+    from src.services.account.snapshots import forget_recorded
+    forget_recorded(session)
@@ -4,7 +4,6 @@ Budget model
 
 from datetime import datetime, timedelta
 from src.extensions import db
-from sqlalchemy import or_
 
 class Budget(db.Model):
     __tablename__ = 'budgets'
@@ -53,32 +52,27 @@ class Budget(db.Model):
         return today, today.replace(hour=23, minute=59, second=59)
     
     def calculate_spent_amount(self, year=None, month=None):
-        """Calculate how much has been spent in this budget's category during the specified or current period"""
-        from src.models.transaction import Expense, CategorySplit
-        from src.models.category import Category
+        """Calculate how much has been spent in this budget's category during the specified or current period
+
+        The arithmetic lives in `BudgetSpendCalculator`, which answers a page of
+        budgets in three queries; this is the one-budget case of it. A figure the
+        calculator has already `prime()`d onto this instance is returned as is, which
+        is what makes `get_spent`, `get_remaining` and `get_percentage` — each of
+        which lands here — cost nothing after the first.
+        """
+        from src.services.budget.spend import (
+            BudgetSpendCalculator, month_period, primed_spend)
 
         # If year and month are provided, calculate dates for that specific month
         if year and month:
-            from datetime import datetime
-            from calendar import monthrange
-
-            start_date = datetime(year, month, 1)
-            last_day = monthrange(year, month)[1]
-            end_date = datetime(year, month, last_day, 23, 59, 59)
-        else:
-            start_date, end_date = self.get_current_period_dates()
-        
-        if self.include_subcategories:
-            subcategories = Category.query.filter_by(parent_id=self.category_id).all()
-            subcategory_ids = [subcat.id for subcat in subcategories]
-            
-            category_filter = or_(
-                Expense.category_id == self.category_id,
-                Expense.category_id.in_(subcategory_ids) if subcategory_ids else False
-            )
+            period = month_period(year, month)
         else:
-            category_filter = (Expense.category_id == self.category_id)
-        
+            period = self.get_current_period_dates()
+
+        spent = primed_spend(self, period)
+        if spent is not None:
+            return spent
+
         # *** A BUDGET IS THE HOUSEHOLD'S — owner decision 2026-08-06, recorded in
         # AUDIT D-20 ("budget, categories and rest is for household"). Categories
         # were converged onto it then; this arithmetic never was, and the two
@@ -121,48 +115,9 @@ class Budget(db.Model):
         # WHO IS ASKING, which is D-66's second half. A demo account's own budget
         # reported the real household's spending, and on an all-demo instance the
         # set was empty so every budget read $0.00 and "on track" forever.
-        from src.utils.household import current_viewer_ids
-
-        household = current_viewer_ids()
-
-        expenses = Expense.query.filter(
-            Expense.user_id.in_(household),
-            Expense.date >= start_date,
-            Expense.date <= end_date,
-            category_filter
-        ).all()
-
-        # D-58: a `Decimal` accumulator, because every amount added to it is now
-        # `Decimal` and `float += Decimal` raises rather than converting. Started
-        # as `0.0` before, which is what made this the loudest site in the suite.
-        from decimal import Decimal
-        total_spent = Decimal('0')
-
-        for expense in expenses:
-            # A row whose amount is carried by CategorySplit rows is counted
-            # below instead, or it would be counted twice.
-            if expense.has_category_splits:
-                continue
-            total_spent += expense.amount
-
-        if self.include_subcategories:
-            category_ids = [self.category_id] + subcategory_ids
-        else:
-            category_ids = [self.category_id]
-
-        category_splits = CategorySplit.query.join(
-            Expense, CategorySplit.expense_id == Expense.id
-        ).filter(
-            Expense.user_id.in_(household),
-            Expense.date >= start_date,
-            Expense.date <= end_date,
-            CategorySplit.category_id.in_(category_ids)
-        ).all()
-
-        for cat_split in category_splits:
-            total_spent += cat_split.amount
-
-        return total_spent
+        # The calculator's default scope is `current_viewer_ids()` for exactly this
+        # reason; it is the place the rule is enforced now.
+        return BudgetSpendCalculator([self], [period]).spent(self, period)
     
     def get_spent(self):
         """Alias for calculate_spent_amount() for schema compatibility"""
@@ -0,0 +1,47 @@
+"""One person's share of one split transaction.
+
+Per finpal_core/CLAUDE.md this must not import other model files. Maintenance and
+reads live in `src/services/transaction/shares.py`.
+"""
+from src.extensions import db
+
+
+class ExpenseShare(db.Model):
+    """What `user_id` owes of `expense_id`, as `Expense.calculate_splits` says.
+
+    Written for split rows only — `split_method != 'none'` with a `split_with`.
+    An unsplit row is its payer's in full, which `expenses` and `monthly_rollups`
+    already answer without a second table.
+
+    One row per person, the payer included, so "what is my share" is a SUM over
+    `user_id` and "who owes whom" is a SUM over the rows whose `user_id` is not
+    their `paid_by`. `paid_by` is the expense's, copied so both sides of a debt
+    are an index on this table rather than a scan of `expenses`.
+
+    `calculate_splits` lists a payer who is also named in `split_with` twice —
+    once as the payer, once as a participant — and the two are folded into one
+    share here.
+
+    No foreign key, for the reason `MonthlyRollup` has none: this is derived data,
+    and the bulk deletes of `expenses` (a user's data, an import batch) would have
+    to clear it first or fail on Postgres. Those sites call `shares.forget()`, and
+    the ORM removes a row's shares with it through `Expense.shares`.
+    """
+    __tablename__ = 'expense_shares'
+    __table_args__ = (
+        db.Index('ix_expense_shares_user_expense', 'user_id', 'expense_id'),
+        db.Index('ix_expense_shares_paid_by', 'paid_by'),
+        db.Index('ix_expense_shares_expense', 'expense_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    expense_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.String(120), nullable=False)
+    paid_by = db.Column(db.String(120), nullable=False)
+    # Base currency, like `Expense.amount`.
+    amount = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+    # The expense's own currency, like `Expense.original_amount`.
+    original_amount = db.Column(db.Numeric(18, 2), nullable=True)
+
+    def __repr__(self):
+        return f'<ExpenseShare {self.expense_id} {self.user_id}->{self.paid_by} {self.amount}>'
@@ -100,3 +100,26 @@ class InvestmentTransaction(db.Model):
     def transaction_value(self):
         """Calculate the total value of this transaction"""
         return self.shares * self.price + self.fees
+
+
+class InvestmentPrice(db.Model):
+    """A symbol's closing price on a day.
+
+    Filled nightly from the provider's price history by
+    `src/services/investment/history.py`, so the valuation of a portfolio on a
+    past day (`src/services/investment/valuation.py`) is read from here and never
+    asks the provider on a request. `symbol` is upper-cased, as holdings are
+    fetched.
+    """
+    __tablename__ = 'investment_prices'
+    __table_args__ = (
+        db.Index('ix_investment_prices_symbol_date', 'symbol', 'date', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(20), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    close = db.Column(db.Numeric(18, 4), nullable=False)
+
+    def __repr__(self):
+        return f"<InvestmentPrice {self.symbol} {self.date} {self.close}>"
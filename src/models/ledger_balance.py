@@ -0,0 +1,53 @@
+"""What one person owes another within a group, kept current as rows are written.
+
+Per finpal_core/CLAUDE.md this must not import other model files. Maintenance and
+reads live in `src/services/group/ledger.py`.
+"""
+from sqlalchemy import event as _sa_event
+
+from src.extensions import db
+
+
+class LedgerBalance(db.Model):
+    """A running sum of what `debtor` owes `creditor` in `group_id`.
+
+    Group balances read O(members²) of these instead of every group expense and
+    every settlement a group has ever had.
+
+    Expense rows add each participant's `ExpenseShare` to (debtor=participant,
+    creditor=payer). Settlements are stored with `group_id` NULL. A `Settlement`
+    names no group, and `calculate_group_balances` has always applied every
+    settlement between two members to each group they share. A settlement by A to
+    B is a negative amount on (A, B) — A owes B that much less.
+
+    Rows are directed and never netted against their reverse pair; reads SUM both
+    directions. There is no unique constraint, for `MonthlyRollup`'s reason: the
+    key is nullable and every read SUMs, so two racing workers cost a row, not a
+    wrong figure. There are no foreign keys either, because this is derived data.
+    """
+    __tablename__ = 'ledger_balances'
+    __table_args__ = (
+        db.Index('ix_ledger_balances_group_pair', 'group_id', 'debtor', 'creditor'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, nullable=True)
+    debtor = db.Column(db.String(120), nullable=False)
+    creditor = db.Column(db.String(120), nullable=False)
+    amount = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<LedgerBalance {self.group_id} {self.debtor}->{self.creditor} {self.amount}>'
+
+
+# ---------------------------------------------------------------------------
+# Ledger hook — folds every flush's group Expense and Settlement writes into
+# `ledger_balances`. Not swallowed, for the reason the rollup hook in
+# transaction.py gives. See src/services/group/ledger.py.
+# ---------------------------------------------------------------------------
+
+
+@_sa_event.listens_for(db.session, 'before_flush')
+def _post_ledger_writes(session, flush_context, instances):
+    from src.services.group.ledger import apply_pending
+    apply_pending(session)
@@ -0,0 +1,46 @@
+"""Monthly sums of `expenses`, kept current as rows are written.
+
+Per finpal_core/CLAUDE.md this must not import other model files. Maintenance and
+reads live in `src/services/analytics/rollups.py`.
+"""
+from src.extensions import db
+
+
+class MonthlyRollup(db.Model):
+    """SUM and COUNT of `expenses.amount` for one group of rows in one month.
+
+    The key is every column below except `total` and `count`. Analytics read
+    O(months × categories) of these instead of O(transactions) expense rows.
+
+    *** `user_id` IS WHO ENTERED THE ROWS, NOT WHO OWNS THEM. *** A row belongs to
+    whoever owns its ACCOUNT (D-18), and an account can be reassigned, so storing
+    the owner would go stale the moment one was. Reads join `accounts` and apply
+    the same predicate as `owner_scope_filter` instead — see `scope_rollups`.
+
+    `paid_by` and `is_split` are in the key because the cash-flow figures are the
+    caller's SHARE, not the household's total: an unsplit row is its payer's in
+    full, and only split rows need `Expense.calculate_splits`.
+
+    There is deliberately no unique constraint. Most key columns are nullable and
+    NULL never equals NULL in one, so it could not hold anyway; every read SUMs, so
+    a duplicate key written by two racing workers costs a row, not a wrong figure.
+    """
+    __tablename__ = 'monthly_rollups'
+    __table_args__ = (
+        db.Index('ix_monthly_rollups_user_month', 'user_id', 'month'),
+        db.Index('ix_monthly_rollups_account_month', 'account_id', 'month'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # No foreign keys, on purpose: this is derived data. With them, deleting an
+    # account or a category would have to rebuild its rollups FIRST or fail on
+    # Postgres, and the order of two statements is not worth an outage.
+    user_id = db.Column(db.String(120), nullable=False)
+    account_id = db.Column(db.Integer, nullable=True)
+    category_id = db.Column(db.Integer, nullable=True)
+    month = db.Column(db.String(7), nullable=False)  # 'YYYY-MM'
+    transaction_type = db.Column(db.String(20), nullable=True)
+    paid_by = db.Column(db.String(120), nullable=True)
+    is_split = db.Column(db.Boolean, nullable=False, default=False)
+    total = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
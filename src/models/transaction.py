@@ -9,6 +9,26 @@ from src.models.associations import expense_tags
 
 class Expense(db.Model):
     __tablename__ = 'expenses'
+    # Composites for the hot access paths: an equality column, then `date` for the
+    # range or ordering every one of them adds. Declared here rather than only in a
+    # migration because deployed instances never run Alembic — the boot reconcile
+    # creates whatever is declared and missing (src/utils/schema_reconcile.py), and
+    # `flask index-advisor` checks the canonical queries still use them.
+    # Migrations: a4c8e2f7b913_add_expense_dedup_indexes.py,
+    #             b7d2f4a9c6e1_add_expense_composite_indexes.py
+    __table_args__ = (
+        # Import duplicate checks — src/services/transaction/dedup.py.
+        db.Index('ix_expenses_account_external_id', 'account_id', 'external_id'),
+        # Orphan rows in `owner_scope_filter`, CSV dedup windows.
+        db.Index('ix_expenses_user_date', 'user_id', 'date'),
+        # An account's history; the owned-account half of `scope_query`.
+        db.Index('ix_expenses_account_date', 'account_id', 'date'),
+        # Budgets and the category breakdowns.
+        db.Index('ix_expenses_category_date', 'category_id', 'date'),
+        # Date-bounded scans whose scope is an OR the planner cannot index.
+        # Same name as f6a7b8c9d0e1's, so an Alembic-managed database has it already.
+        db.Index('ix_expenses_date', 'date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(200), nullable=False)
     amount = db.Column(db.Numeric(18, 2), nullable=False)
@@ -44,7 +64,11 @@ class Expense(db.Model):
     has_category_splits = db.Column(db.Boolean, default=False)
     
     # Relationships
-    tags = db.relationship('Tag', secondary=expense_tags, lazy='subquery',
+    # Loaded when read, not with every row: `subquery` re-ran the row's whole
+    # query as a second statement on each load of an expense, for a collection no
+    # list endpoint serialises. The one reader, `get_transaction_details`, has
+    # the row in its session.
+    tags = db.relationship('Tag', secondary=expense_tags, lazy='select',
                    backref=db.backref('expenses', lazy=True))
     currency = db.relationship('Currency', backref=db.backref('expenses', lazy=True))
     user = db.relationship('User', backref=db.backref('expenses', lazy=True))
@@ -52,6 +76,13 @@ class Expense(db.Model):
     destination_account = db.relationship('Account', foreign_keys=[destination_account_id], backref=db.backref('incoming_transfers', lazy=True))
     category = db.relationship('Category', backref=db.backref('expenses', lazy=True))
     group = db.relationship('Group', backref=db.backref('expenses', lazy=True))
+    # Who owes what of a split row, written by the shares hook at the bottom of
+    # this file. Joined without a foreign key — see `ExpenseShare` — so the
+    # condition is spelled out; the cascade removes a row's shares with it.
+    shares = db.relationship(
+        'ExpenseShare',
+        primaryjoin='Expense.id == foreign(ExpenseShare.expense_id)',
+        cascade='all, delete-orphan', lazy='select')
     
     @property
     def is_income(self):
@@ -275,7 +306,10 @@ class Expense(db.Model):
 class CategorySplit(db.Model):
     __tablename__ = 'category_splits'
     id = db.Column(db.Integer, primary_key=True)
-    expense_id = db.Column(db.Integer, db.ForeignKey('expenses.id'), nullable=False)
+    # Indexed because every read of a split arrives through its expense — the
+    # budget calculator joins on it. `flask index-advisor` found it scanned.
+    expense_id = db.Column(db.Integer, db.ForeignKey('expenses.id'), nullable=False,
+                           index=True)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
     amount = db.Column(db.Numeric(18, 2), nullable=False)
     description = db.Column(db.String(200), nullable=True)
@@ -286,18 +320,71 @@ class CategorySplit(db.Model):
 
 
 # ---------------------------------------------------------------------------
-# Module event hook — fires after every Expense INSERT.
-# Dispatches 'expense_created' to all registered modules via the registry.
+# Module event hook — notes every Expense INSERT on the session and, once the
+# transaction commits, dispatches 'expenses_created' with their ids to all
+# registered modules via the registry. After commit, not mid-flush: a module then
+# does one pass per batch of inserts, outside the caller's transaction.
 # A failing module never blocks the caller's transaction.
 # ---------------------------------------------------------------------------
 
 from sqlalchemy import event as _sa_event
+from sqlalchemy.orm import object_session as _object_session
+
+_CREATED_EXPENSES = 'created_expense_ids'
 
 
 @_sa_event.listens_for(Expense, 'after_insert')
 def _on_expense_insert(mapper, connection, target):
+    session = _object_session(target)
+    if session is not None:
+        session.info.setdefault(_CREATED_EXPENSES, set()).add(target.id)
+
+
+@_sa_event.listens_for(db.session, 'after_commit')
+def _dispatch_created_expenses(session):
+    # Also fires when a SAVEPOINT is released; only the outermost commit counts.
+    if session.in_nested_transaction():
+        return
+    expense_ids = session.info.pop(_CREATED_EXPENSES, None)
+    if not expense_ids:
+        return
     try:
         from src.modules.registry import module_registry
-        module_registry.dispatch_event('expense_created', connection=connection, expense=target)
+        module_registry.dispatch_event('expenses_created', expense_ids=sorted(expense_ids))
     except Exception:
         pass  # Never block the caller's transaction
+
+
+@_sa_event.listens_for(db.session, 'after_rollback')
+def _forget_created_expenses(session):
+    # A rolled-back SAVEPOINT keeps the outer transaction's ids; ids it inserted
+    # itself are no longer in the table, so the module pass finds nothing for them.
+    if not session.in_nested_transaction():
+        session.info.pop(_CREATED_EXPENSES, None)
+
+
+# ---------------------------------------------------------------------------
+# Rollup hook — folds every flush's Expense writes into `monthly_rollups`.
+# Unlike the module hook above this one is NOT swallowed: a rollup that silently
+# missed a write would report wrong totals with nothing to say so, and failing
+# the write is the honest outcome. See src/services/analytics/rollups.py.
+# ---------------------------------------------------------------------------
+
+
+@_sa_event.listens_for(db.session, 'before_flush')
+def _roll_up_expense_writes(session, flush_context, instances):
+    from src.services.analytics.rollups import apply_pending
+    apply_pending(session)
+
+
+# ---------------------------------------------------------------------------
+# Shares hook — rewrites `expense_shares` for every split row this flush writes
+# or re-splits. Not swallowed, for the rollup hook's reason: a missed share is a
+# wrong "who owes whom" that says nothing. See src/services/transaction/shares.py.
+# ---------------------------------------------------------------------------
+
+
+@_sa_event.listens_for(db.session, 'before_flush')
+def _share_expense_writes(session, flush_context, instances):
+    from src.services.transaction.shares import apply_pending
+    apply_pending(session)
@@ -124,35 +124,7 @@ class TransactionRule(db.Model):
         self.match_count = (self.match_count or 0) + 1
         self.last_matched = datetime.utcnow()
 
-        # Apply category
-        if self.auto_category_id:
-            transaction_data['category_id'] = self.auto_category_id
-
-        # Apply account
-        if self.auto_account_id:
-            transaction_data['account_id'] = self.auto_account_id
-
-        # Apply transaction type
-        if self.auto_transaction_type:
-            transaction_data['transaction_type'] = self.auto_transaction_type
-
-        # Apply tags
-        if self.auto_tags:
-            try:
-                tags = json.loads(self.auto_tags) if isinstance(self.auto_tags, str) else self.auto_tags
-                transaction_data['tags'] = tags
-            except:
-                pass
-
-        # Append notes
-        if self.auto_notes:
-            existing_notes = transaction_data.get('notes', '')
-            if existing_notes:
-                transaction_data['notes'] = f"{existing_notes}\n{self.auto_notes}"
-            else:
-                transaction_data['notes'] = self.auto_notes
-
-        return transaction_data
+        return apply_rule_actions(self, transaction_data)
 
     def to_dict(self):
         """Convert rule to dictionary for API responses"""
@@ -180,3 +152,41 @@ class TransactionRule(db.Model):
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
+
+
+def apply_rule_actions(rule, transaction_data):
+    """The action half of `TransactionRule.apply`, without the match counter.
+
+    Takes anything with the `auto_*` attributes, so the compiled rules the rule
+    engine caches (`src/services/transaction_rule/rule_set.py`) act exactly as a
+    loaded row does while never being an ORM instance.
+    """
+    # Apply category
+    if rule.auto_category_id:
+        transaction_data['category_id'] = rule.auto_category_id
+
+    # Apply account
+    if rule.auto_account_id:
+        transaction_data['account_id'] = rule.auto_account_id
+
+    # Apply transaction type
+    if rule.auto_transaction_type:
+        transaction_data['transaction_type'] = rule.auto_transaction_type
+
+    # Apply tags
+    if rule.auto_tags:
+        try:
+            tags = json.loads(rule.auto_tags) if isinstance(rule.auto_tags, str) else rule.auto_tags
+            transaction_data['tags'] = tags
+        except:
+            pass
+
+    # Append notes
+    if rule.auto_notes:
+        existing_notes = transaction_data.get('notes', '')
+        if existing_notes:
+            transaction_data['notes'] = f"{existing_notes}\n{rule.auto_notes}"
+        else:
+            transaction_data['notes'] = rule.auto_notes
+
+    return transaction_data
@@ -291,6 +291,11 @@ class RevokedToken(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     jti = db.Column(db.String(36), nullable=False, unique=True, index=True)
     revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # When the token would have expired anyway; the row can go after that.
+    # Null on rows revoked before this was recorded. See
+    # src/services/auth/revocation.py, which also answers `is_revoked` for
+    # requests — this classmethod is the writers' existence check.
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)
 
     @classmethod
     def is_revoked(cls, jti):
@@ -86,7 +86,8 @@ class ModuleBase:
         """
         React to named core events fired by the registry.
 
-        e.g. event_name='expense_created', kwargs={'connection': ..., 'expense': ...}
+        e.g. event_name='expenses_created', kwargs={'expense_ids': [...]}, sent
+        once the transaction that inserted those expenses has committed.
         """
         pass
 
@@ -48,9 +48,9 @@ class PointsPalModule(ModuleBase):
             )
 
     def on_event(self, event_name, **kwargs):
-        if event_name == 'expense_created':
-            from src.modules.pointspal.simplefin_bridge import handle_new_transaction
-            handle_new_transaction(kwargs['connection'], kwargs['expense'])
+        if event_name == 'expenses_created':
+            from src.modules.pointspal.simplefin_bridge import process_new_expenses
+            process_new_expenses(kwargs['expense_ids'])
 
     def on_background_sync(self, app, user_id):
         from src.modules.pointspal.models import PointsProgram
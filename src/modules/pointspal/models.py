@@ -192,6 +192,11 @@ class SimpleFinCardLink(db.Model):
 
 class SpendPeriodTotal(db.Model):
     __tablename__ = 'spend_period_totals'
+    # As the migration creates it; the bridge's upsert names these columns.
+    __table_args__ = (
+        db.UniqueConstraint('user_card_id', 'category', 'period_type', 'period_key',
+                            name='uq_spt_card_cat_period'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_card_id = db.Column(
@@ -215,6 +220,10 @@ class SpendPeriodTotal(db.Model):
 
 class OptimizerAlert(db.Model):
     __tablename__ = 'optimizer_alerts'
+    __table_args__ = (
+        db.UniqueConstraint('user_card_id', 'category', 'period_type', 'period_key',
+                            'alert_type', name='uq_oa_alert_unique'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(
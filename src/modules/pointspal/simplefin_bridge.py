@@ -1,23 +1,44 @@
 """
 pointsPal SimpleFin bridge.
 
-Called via a SQLAlchemy after_insert event on Expense. When a new expense is
-committed, this checks whether the associated account is linked to a user_card
-and, if so, updates the spend_period_totals for the relevant billing periods.
+Expenses inserted through the session are noted by an after_insert event on
+Expense and handed here, as ids, once the transaction that inserted them has
+committed (see the module hook in src/models/transaction.py). For every one on
+an account linked to a user_card, this adds the spend and the points it earned
+to spend_period_totals and raises a cap alert when a capped category crosses
+80 / 95 / 100 %.
 
 Design notes:
-- Uses the raw DBAPI connection passed by the event to avoid ORM session
-  re-entrancy issues during flush.
-- Wraps all work in a SAVEPOINT (begin_nested equivalent via raw SQL) so a
-  pointsPal failure never rolls back the user's transaction.
+- One pass per commit, not one per expense. A SimpleFin sync or a CSV import
+  inserting hundreds of rows used to run about ten statements per row inside
+  the flush. Here the expenses, their cards and categories are read in one
+  query, the earn rates once per (card, category), the current totals in one
+  query; the points are worked out in Python and written with one grouped
+  upsert and one alert insert.
+- Runs after commit, in its own transaction on its own connection, so a
+  pointsPal failure can neither roll back nor slow the user's transaction.
 - Only processes transaction_type='expense' records tied to a known account.
 """
 
+import json
 import logging
+from collections import defaultdict
 from datetime import datetime
 
+from sqlalchemy import DateTime, Numeric, bindparam, text
+
 logger = logging.getLogger(__name__)
 
+#: Expense ids per query; keeps the IN list well under driver limits.
+_CHUNK = 500
+
+#: Alert thresholds, highest first; only the highest one reached is raised.
+_THRESHOLDS = [
+    (100, "capped"),
+    (95,  "warning_95"),
+    (80,  "warning_80"),
+]
+
 
 def _period_keys(dt: datetime) -> dict:
     """Return the three period keys for a given datetime."""
@@ -29,90 +50,140 @@ def _period_keys(dt: datetime) -> dict:
     }
 
 
-def handle_new_transaction(connection, expense) -> None:
+def process_new_expenses(expense_ids, engine=None) -> int:
     """
-    Entry point called from the Expense after_insert event.
+    Fold newly committed expenses into spend_period_totals and optimizer_alerts.
 
     Parameters
     ----------
-    connection : sqlalchemy.engine.Connection
-        The raw connection mid-flush. Use execute() only — no ORM session ops.
-    expense : Expense
-        The newly inserted Expense ORM instance.
+    expense_ids : iterable of int
+        Ids of Expense rows inserted by a transaction that has committed.
+    engine : sqlalchemy.engine.Engine, optional
+        Defaults to the app's engine.
+
+    Returns the number of expenses counted. Never raises.
     """
-    if expense.transaction_type != 'expense':
-        return
-    if not expense.account_id:
-        return
+    expense_ids = sorted(set(expense_ids))
+    if not expense_ids:
+        return 0
+    if engine is None:
+        from src.extensions import db
+        engine = db.engine
 
     try:
-        from sqlalchemy import text
-
-        # 1. Find a SimpleFin card link for this account
-        row = connection.execute(text("""
-            SELECT scl.user_card_id
-            FROM simplefin_card_links scl
-            JOIN accounts a ON a.external_id = scl.simplefin_account_id
-            WHERE a.id = :account_id
-              AND scl.user_card_id IS NOT NULL
-            LIMIT 1
-        """), {"account_id": expense.account_id}).fetchone()
-
-        if not row:
-            return
-
-        user_card_id = row[0]
+        with engine.begin() as connection:
+            return _process(connection, expense_ids)
+    except Exception:
+        logger.exception("pointsPal bridge error (non-fatal)")
+        return 0
+
+
+def _process(connection, expense_ids) -> int:
+    from src.modules.pointspal.category_map import finpal_category_to_slug
+
+    expenses = _linked_expenses(connection, expense_ids)
+    if not expenses:
+        return 0
+
+    # 1. Earn rates once per card + category
+    rates = {}
+    for expense in expenses:
+        expense["slug"] = finpal_category_to_slug(expense["category_name"])
+        group = (expense["user_card_id"], expense["slug"])
+        if group not in rates:
+            rates[group] = _get_earn_rates(connection, *group)
+
+    # 2. What each affected period row already holds
+    for expense in expenses:
+        expense["periods"] = _period_keys(expense["date"] or datetime.utcnow())
+    spent = _current_totals(connection, expenses)
+
+    # 3. Points per expense, in date order, so a cap crossed part-way through the
+    #    batch applies to the expenses after it as it would have one at a time.
+    deltas = defaultdict(lambda: [0.0, 0.0, 0.0])
+    for expense in sorted(expenses, key=lambda e: (e["date"] or datetime.min, e["id"])):
+        multiplier, multiplier_fallback, cap_amount, cap_period, _ = \
+            rates[(expense["user_card_id"], expense["slug"])]
+        amount = expense["amount"]
+        for period_type, period_key in expense["periods"].items():
+            row = (expense["user_card_id"], expense["slug"], period_type, period_key)
+            pts_earned, pts_missed = _compute_pts(
+                multiplier, multiplier_fallback, cap_amount, cap_period,
+                period_type, spent[row], amount,
+            )
+            spent[row] += amount
+            delta = deltas[row]
+            delta[0] += amount
+            delta[1] += pts_earned
+            delta[2] += pts_missed
 
-        # 2. Resolve finPal category name → pointsPal slug
-        category_name = None
-        if expense.category_id:
-            cat_row = connection.execute(
-                text("SELECT name FROM categories WHERE id = :cid"),
-                {"cid": expense.category_id}
-            ).fetchone()
-            if cat_row:
-                category_name = cat_row[0]
+    # 4. One grouped upsert for every period row touched
+    _upsert_spend(connection, deltas)
 
-        from src.modules.pointspal.category_map import finpal_category_to_slug
-        slug = finpal_category_to_slug(category_name)
+    # 5. One cap check per card + category + cap period
+    _check_cap_alerts(connection, expenses, spent)
+    return len(expenses)
 
-        # 3. Look up effective earn rates for this card + category
-        multiplier, multiplier_fallback, cap_amount, cap_period, tpg_cpp = \
-            _get_earn_rates(connection, user_card_id, slug)
 
-        # 4. Upsert spend_period_totals for monthly / quarterly / annual
-        now = expense.date if expense.date else datetime.utcnow()
-        periods = _period_keys(now)
+def _linked_expenses(connection, expense_ids):
+    """
+    The expenses among `expense_ids` on an account linked to a user_card, with
+    that card and their category name. One row per expense.
+    """
+    query = text("""
+        SELECT e.id, e.user_id, e.date, e.amount, scl.user_card_id, c.name
+        FROM expenses e
+        JOIN accounts a ON a.id = e.account_id
+        JOIN simplefin_card_links scl ON scl.simplefin_account_id = a.external_id
+        LEFT JOIN categories c ON c.id = e.category_id
+        WHERE e.id IN :ids
+          AND e.transaction_type = 'expense'
+          AND scl.user_card_id IS NOT NULL
+        ORDER BY e.id, scl.id
+    """).bindparams(bindparam("ids", expanding=True)).columns(
+        date=DateTime, amount=Numeric(18, 2))
+
+    expenses = {}
+    for start in range(0, len(expense_ids), _CHUNK):
+        rows = connection.execute(query, {"ids": expense_ids[start:start + _CHUNK]})
+        for expense_id, user_id, date, amount, user_card_id, category_name in rows:
+            # An account linked to several cards counts against the first link.
+            expenses.setdefault(expense_id, {
+                "id": expense_id,
+                "user_id": user_id,
+                "date": date,
+                # spend_period_totals is Float; points are worked out in float.
+                "amount": float(amount or 0),
+                "user_card_id": user_card_id,
+                "category_name": category_name,
+            })
+    return list(expenses.values())
 
-        for period_type, period_key in periods.items():
-            # Determine if capped for this period (use cap_period for cap check)
-            pts_earned, pts_missed = _compute_pts(
-                connection, user_card_id, slug,
-                multiplier, multiplier_fallback, cap_amount, cap_period,
-                period_type, period_key, expense.amount,
-            )
-            _upsert_spend(
-                connection, user_card_id, slug,
-                period_type, period_key, expense.amount,
-                pts_earned, pts_missed,
-            )
 
-        # 5. Check caps and fire alerts
-        _check_cap_alerts(connection, user_card_id, slug, expense.user_id, periods)
+def _current_totals(connection, expenses):
+    """`{(card, category, period_type, period_key): total_spent}`, 0.0 when absent."""
+    cards = sorted({e["user_card_id"] for e in expenses})
+    keys = sorted({key for e in expenses for key in e["periods"].values()})
+    rows = connection.execute(text("""
+        SELECT user_card_id, category, period_type, period_key, total_spent
+        FROM spend_period_totals
+        WHERE user_card_id IN :cards
+          AND period_key IN :keys
+    """).bindparams(bindparam("cards", expanding=True),
+                    bindparam("keys", expanding=True)),
+        {"cards": cards, "keys": keys})
 
-    except Exception as e:
-        logger.warning(f"pointsPal bridge error (non-fatal): {e}")
+    spent = defaultdict(float)
+    for user_card_id, category, period_type, period_key, total_spent in rows:
+        spent[(user_card_id, category, period_type, period_key)] = float(total_spent or 0)
+    return spent
 
 
 def _get_earn_rates(connection, user_card_id, category):
     """
     Return (multiplier, multiplier_fallback, cap_amount, cap_period, tpg_cpp) for a card+category.
     Priority: earn_override JSON > points_earn_categories > defaults (1.0 / 0.0).
-    Safe to call during a flush — uses raw SQL only.
     """
-    import json
-    from sqlalchemy import text
-
     card_row = connection.execute(text("""
         SELECT uc.earn_override, uc.program_id, pp.tpg_cpp
         FROM user_cards uc
@@ -165,15 +236,14 @@ def _get_earn_rates(connection, user_card_id, category):
     return 1.0, 1.0, None, None, tpg_cpp
 
 
-def _compute_pts(connection, user_card_id, category,
-                 multiplier, multiplier_fallback, cap_amount, cap_period,
-                 period_type, period_key, amount):
+def _compute_pts(multiplier, multiplier_fallback, cap_amount, cap_period,
+                 period_type, pre_spend, amount):
     """
-    Return (pts_earned, pts_missed) for this transaction on a given period row.
+    Return (pts_earned, pts_missed) for one transaction on a given period row.
 
     - If there is no cap defined, earn at full multiplier, miss nothing.
-    - If there is a cap and the pre-existing spend for the cap period is already
-      at or above the cap, earn at fallback rate; missed = (multiplier - fallback) * amount.
+    - If there is a cap and the spend already on the row (`pre_spend`) is at or
+      above it, earn at fallback rate; missed = (multiplier - fallback) * amount.
     - Otherwise earn at full rate, miss nothing.
 
     pts_earned / pts_missed are stored as raw points (multiplier × amount),
@@ -183,23 +253,7 @@ def _compute_pts(connection, user_card_id, category,
         # No cap applicable to this period row
         return round(multiplier * amount, 4), 0.0
 
-    from sqlalchemy import text
-    spend_row = connection.execute(text("""
-        SELECT total_spent FROM spend_period_totals
-        WHERE user_card_id = :user_card_id
-          AND category     = :category
-          AND period_type  = :period_type
-          AND period_key   = :period_key
-    """), {
-        "user_card_id": user_card_id,
-        "category":     category,
-        "period_type":  cap_period,
-        "period_key":   period_key,
-    }).fetchone()
-
-    pre_spend = float(spend_row[0] or 0) if spend_row else 0.0
-
-    if pre_spend >= cap_amount:
+    if pre_spend >= float(cap_amount):
         # Already capped — everything earns at fallback
         pts_earned = round(multiplier_fallback * amount, 4)
         pts_missed = round((multiplier - multiplier_fallback) * amount, 4)
@@ -211,116 +265,102 @@ def _compute_pts(connection, user_card_id, category,
     return pts_earned, pts_missed
 
 
-def _upsert_spend(connection, user_card_id, category,
-                  period_type, period_key, amount,
-                  pts_earned=0.0, pts_missed=0.0) -> None:
-    from sqlalchemy import text
-
+def _upsert_spend(connection, deltas) -> None:
+    """Add each `{(card, category, period_type, period_key): [spent, earned, missed]}`."""
+    if not deltas:
+        return
     connection.execute(text("""
         INSERT INTO spend_period_totals
             (user_card_id, category, period_type, period_key,
              total_spent, total_pts_earned, total_pts_missed, updated_at)
         VALUES
             (:user_card_id, :category, :period_type, :period_key,
-             :amount, :pts_earned, :pts_missed, NOW())
+             :amount, :pts_earned, :pts_missed, CURRENT_TIMESTAMP)
         ON CONFLICT (user_card_id, category, period_type, period_key)
         DO UPDATE SET
-            total_spent      = spend_period_totals.total_spent      + :amount,
-            total_pts_earned = spend_period_totals.total_pts_earned + :pts_earned,
-            total_pts_missed = spend_period_totals.total_pts_missed + :pts_missed,
-            updated_at       = NOW()
-    """), {
-        "user_card_id": user_card_id,
-        "category":     category,
-        "period_type":  period_type,
-        "period_key":   period_key,
-        "amount":       amount,
-        "pts_earned":   pts_earned,
-        "pts_missed":   pts_missed,
-    })
-
-
-def _check_cap_alerts(connection, user_card_id, category, user_id, periods) -> None:
+            total_spent      = spend_period_totals.total_spent      + excluded.total_spent,
+            total_pts_earned = spend_period_totals.total_pts_earned + excluded.total_pts_earned,
+            total_pts_missed = spend_period_totals.total_pts_missed + excluded.total_pts_missed,
+            updated_at       = CURRENT_TIMESTAMP
+    """), [
+        {
+            "user_card_id": user_card_id,
+            "category":     category,
+            "period_type":  period_type,
+            "period_key":   period_key,
+            "amount":       round(amount, 2),
+            "pts_earned":   round(pts_earned, 4),
+            "pts_missed":   round(pts_missed, 4),
+        }
+        for (user_card_id, category, period_type, period_key), (amount, pts_earned, pts_missed)
+        in sorted(deltas.items())
+    ])
+
+
+def _check_cap_alerts(connection, expenses, spent) -> None:
     """
-    For each period, check whether spending has crossed 80 / 95 / 100 % of the
-    cap defined in points_earn_categories. Insert optimizer_alerts where needed,
-    ignoring conflicts on the unique constraint.
+    For each card + category + period of the cap defined in points_earn_categories,
+    raise the highest of 80 / 95 / 100 % that the spend now reaches. Inserts into
+    optimizer_alerts, ignoring conflicts on the unique constraint.
     """
-    from sqlalchemy import text
-
-    # Look up program_id for this user_card and find the earn_category cap
-    card_row = connection.execute(text("""
-        SELECT uc.program_id
-        FROM user_cards uc
-        WHERE uc.id = :user_card_id
-    """), {"user_card_id": user_card_id}).fetchone()
-
-    if not card_row or not card_row[0]:
-        return
-
-    program_id = card_row[0]
-
-    cap_row = connection.execute(text("""
-        SELECT cap_amount, cap_period
-        FROM points_earn_categories
-        WHERE program_id = :program_id AND category = :category
-        LIMIT 1
-    """), {"program_id": program_id, "category": category}).fetchone()
-
-    if not cap_row or not cap_row[0]:
-        return  # No cap defined
-
-    cap_amount = cap_row[0]
-    cap_period = cap_row[1]  # 'monthly', 'quarterly', 'annual'
-
-    if cap_period not in periods:
+    caps = _program_caps(connection, {e["user_card_id"] for e in expenses})
+
+    checks = {}
+    for expense in expenses:
+        cap = caps.get((expense["user_card_id"], expense["slug"]))
+        if not cap or cap[1] not in expense["periods"]:
+            continue
+        cap_amount, cap_period = cap
+        row = (expense["user_card_id"], expense["slug"], cap_period,
+               expense["periods"][cap_period])
+        checks.setdefault(row, (expense["user_id"], cap_amount))
+
+    alerts = []
+    for row, (user_id, cap_amount) in sorted(checks.items()):
+        user_card_id, category, period_type, period_key = row
+        pct = (spent[row] / float(cap_amount)) * 100
+        for threshold, alert_type in _THRESHOLDS:
+            if pct >= threshold:
+                alerts.append({
+                    "user_id": user_id,
+                    "user_card_id": user_card_id,
+                    "category": category,
+                    "period_type": period_type,
+                    "period_key": period_key,
+                    "alert_type": alert_type,
+                    "pct_used": round(pct, 2),
+                    "dismissed": False,
+                })
+                break
+
+    if not alerts:
         return
+    connection.execute(text("""
+        INSERT INTO optimizer_alerts
+            (user_id, user_card_id, category, period_type, period_key,
+             alert_type, pct_used, dismissed, created_at)
+        VALUES
+            (:user_id, :user_card_id, :category, :period_type, :period_key,
+             :alert_type, :pct_used, :dismissed, CURRENT_TIMESTAMP)
+        ON CONFLICT (user_card_id, category, period_type, period_key, alert_type)
+        DO NOTHING
+    """), alerts)
 
-    period_key = periods[cap_period]
-
-    spend_row = connection.execute(text("""
-        SELECT total_spent FROM spend_period_totals
-        WHERE user_card_id = :user_card_id
-          AND category = :category
-          AND period_type = :period_type
-          AND period_key  = :period_key
-    """), {
-        "user_card_id": user_card_id,
-        "category": category,
-        "period_type": cap_period,
-        "period_key": period_key,
-    }).fetchone()
-
-    if not spend_row:
-        return
 
-    total_spent = spend_row[0] or 0
-    pct = (total_spent / cap_amount) * 100
-
-    thresholds = [
-        (100, "capped"),
-        (95,  "warning_95"),
-        (80,  "warning_80"),
-    ]
-
-    for threshold, alert_type in thresholds:
-        if pct >= threshold:
-            connection.execute(text("""
-                INSERT INTO optimizer_alerts
-                    (user_id, user_card_id, category, period_type, period_key,
-                     alert_type, pct_used, dismissed, created_at)
-                VALUES
-                    (:user_id, :user_card_id, :category, :period_type, :period_key,
-                     :alert_type, :pct_used, false, NOW())
-                ON CONFLICT (user_card_id, category, period_type, period_key, alert_type)
-                DO NOTHING
-            """), {
-                "user_id": user_id,
-                "user_card_id": user_card_id,
-                "category": category,
-                "period_type": cap_period,
-                "period_key": period_key,
-                "alert_type": alert_type,
-                "pct_used": round(pct, 2),
-            })
-            break  # Only fire the highest applicable threshold per transaction
+def _program_caps(connection, user_card_ids):
+    """`{(card, category): (cap_amount, cap_period)}` from each card's program."""
+    rows = connection.execute(text("""
+        SELECT uc.id, pec.category, pec.cap_amount, pec.cap_period
+        FROM user_cards uc
+        JOIN points_earn_categories pec ON pec.program_id = uc.program_id
+        WHERE uc.id IN :cards
+          AND pec.cap_amount IS NOT NULL
+        ORDER BY pec.id
+    """).bindparams(bindparam("cards", expanding=True)),
+        {"cards": sorted(user_card_ids)})
+
+    caps = {}
+    for user_card_id, category, cap_amount, cap_period in rows:
+        if cap_amount:
+            caps.setdefault((user_card_id, category), (cap_amount, cap_period))
+    return caps
@@ -94,9 +94,14 @@ class AccountRepository:
 
     def delete(self, account: Account) -> None:
         """Delete account (caller must clear FK references first)."""
+        from src.services.account import snapshots
+        snapshots.delete_for(account.id)
         db.session.delete(account)
         db.session.commit()
 
     def nullify_account_on_transactions(self, account_id) -> None:
         """Set account_id = NULL on all transactions before deletion."""
+        from src.services.analytics import rollups
+        touched = rollups.users_with(Expense.account_id == account_id)
         Expense.query.filter_by(account_id=account_id).update({'account_id': None})
+        rollups.rebuild(touched)
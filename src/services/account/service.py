@@ -17,12 +17,18 @@ from src.utils.currency_converter import convert_currency, get_base_currency
 from src.utils.helpers import auto_categorize_transaction
 from src.utils.household import visible_user_ids, can_manage_owned
 from src.repositories.account import AccountRepository
+from src.services.transaction.dedup import external_ids_for
+from src.services.account import snapshots
 
 
-def categorize_imported_transaction(description, user_id, amount=None,
-                                    transaction_type=None):
+def categorize_imported_transactions(rows, user_id):
     """
-    Pick a category for a transaction arriving from an import (CSV or SimpleFin).
+    Pick a category for each transaction arriving from an import (CSV or SimpleFin).
+
+    `rows` is a list of `(description, amount, transaction_type)`; the result is the
+    category id (or None) for each, in order. One call per import, not per row: the
+    rule set is loaded once and the match counters are written once, in the
+    importer's own transaction — see `apply_transaction_rules_bulk`.
 
     *** THE USER'S TRANSACTION RULES COME FIRST, AND THAT IS THE FIX. ***
     finPal has two categorisers. `apply_transaction_rules` reads `transaction_rules`,
@@ -40,22 +46,30 @@ def categorize_imported_transaction(description, user_id, amount=None,
     The legacy categoriser stays as a fallback rather than being deleted: it is inert
     while its table is empty, and still correct for any install that has rows in it.
     """
-    from src.utils.rule_engine import apply_transaction_rules
+    from src.utils.rule_engine import apply_transaction_rules_bulk
+
+    if not rows:
+        return []
 
-    payload = {'description': description or ''}
-    if amount is not None:
-        payload['amount'] = amount
-    if transaction_type:
-        payload['transaction_type'] = transaction_type
+    payloads = []
+    for description, amount, transaction_type in rows:
+        payload = {'description': description or ''}
+        if amount is not None:
+            payload['amount'] = amount
+        if transaction_type:
+            payload['transaction_type'] = transaction_type
+        payloads.append(payload)
 
     try:
-        matched = apply_transaction_rules(payload, user_id) or {}
+        matched = apply_transaction_rules_bulk(payloads, user_id)
     except Exception:
         # A bad user-authored pattern must not abort an import mid-file.
         current_app.logger.exception('Rule engine failed while importing; falling back')
-        matched = {}
+        matched = [{}] * len(rows)
 
-    return matched.get('category_id') or auto_categorize_transaction(description, user_id)
+    return [(result or {}).get('category_id')
+            or auto_categorize_transaction(description, user_id)
+            for (description, _, _), result in zip(rows, matched)]
 
 
 class AccountService:
@@ -283,7 +297,7 @@ class AccountService:
             # Parse CSV
             csv_reader = csv.DictReader(io.StringIO(file_content), delimiter=delimiter)
 
-            imported_count = 0
+            transactions = []
             skipped_count = 0
 
             for row in csv_reader:
@@ -292,8 +306,7 @@ class AccountService:
                     success, transaction = self._parse_csv_row(user_id, row, account_id)
 
                     if success and transaction:
-                        db.session.add(transaction)
-                        imported_count += 1
+                        transactions.append(transaction)
                     else:
                         skipped_count += 1
 
@@ -301,6 +314,19 @@ class AccountService:
                     current_app.logger.error(f"Error processing CSV row: {str(row_error)}")
                     skipped_count += 1
 
+            # Auto-categorize if no category and not a transfer. A category named in
+            # the CSV still wins — this only fills a blank, exactly as transaction
+            # creation applies rules only when `category_id` is absent. One call for
+            # the whole file, before anything is added to the session.
+            blank = [t for t in transactions
+                     if not t.category_id and t.transaction_type != 'transfer']
+            categories = categorize_imported_transactions(
+                [(t.description, t.amount, t.transaction_type) for t in blank], user_id)
+            for transaction, category_id in zip(blank, categories):
+                transaction.category_id = category_id
+
+            db.session.add_all(transactions)
+            imported_count = len(transactions)
             db.session.commit()
             return True, f'Imported {imported_count} transactions ({skipped_count} skipped)', imported_count, skipped_count
 
@@ -367,13 +393,8 @@ class AccountService:
             if category:
                 category_id = category.id
 
-        # Auto-categorize if no category and not a transfer. A category named in the
-        # CSV still wins — this only fills a blank, exactly as transaction creation
-        # applies rules only when `category_id` is absent.
-        if not category_id and transaction_type != 'transfer':
-            category_id = categorize_imported_transaction(
-                description, user_id, amount=amount,
-                transaction_type=transaction_type)
+        # Left blank here when the CSV names no category; `import_csv` fills the
+        # blanks from the user's rules for the whole file at once.
 
         # Get currency
         user = db.session.get(User, user_id)
@@ -653,8 +674,6 @@ class SimpleFinService:
         them to the expenses table.
         Returns (success, message, synced_count)
         """
-        from integrations.simplefin.client import SimpleFin as SimpleFinClient
-
         account = self.repo.get_by_id(account_id)
         if not account:
             return False, 'Account not found', 0
@@ -673,116 +692,14 @@ class SimpleFinService:
         if not settings or not settings.access_url:
             return False, 'SimpleFin not connected', 0
 
-        # How far back to fetch — buffer of 2 days beyond last sync
-        if account.last_sync:
-            days_since = (datetime.utcnow() - account.last_sync).days
-            days_back = max(days_since + 2, 3)
-        else:
-            days_back = 30
-
-        try:
-            sf_client = SimpleFinClient(current_app)
-            raw_data = sf_client.get_accounts_with_transactions(
-                settings.access_url, days_back=days_back
-            )
-            if not raw_data:
-                return False, 'Failed to fetch data from SimpleFin', 0
-
-            # Find this specific account in the response by external_id
-            account_raw = next(
-                (a for a in raw_data.get('accounts', [])
-                 if a.get('id') == account.external_id),
-                None
-            )
-            if not account_raw:
-                return False, 'Account not found in SimpleFin response', 0
-
-            # `process_raw_accounts` takes the whole SimpleFin response and reads
-            # `raw_data['accounts']`. This passed a bare `[account_raw]`, and its guard
-            # — `'accounts' not in raw_data` — then asked whether the *string*
-            # `'accounts'` was an *element* of that list, which it never is. So it
-            # returned `[]` for every account on every sync since 2026-04-12, and the
-            # branch below called that success. Wrap the account back up the way the
-            # method is documented to receive it.
-            processed_list = sf_client.process_raw_accounts({'accounts': [account_raw]})
-            if not processed_list:
-                # Not success. The account was found in the response immediately above,
-                # so an empty result here means the response could not be read — and
-                # reporting that as `True` is what hid this for four months.
-                return False, 'Could not read the SimpleFin data for this account', 0
-
-            account_data = processed_list[0]
-            imported_count = 0
-
-            for trans in account_data.get('transactions', []):
-                external_id = trans.get('external_id')
-                if not external_id:
-                    continue
-
-                # Skip duplicates — scoped to THIS account, not to the whole user.
-                #
-                # A SimpleFin transaction id is unique within an account; nothing in the
-                # protocol makes it unique across them. Without `account_id` here, two
-                # accounts that happen to share ids collapse into one: the first to sync
-                # wins and the second silently imports nothing. Bridge's own demo data
-                # does exactly this — its Savings and Checking accounts share all 58
-                # transaction ids for transactions with different amounts — and on the
-                # live deploy that produced "Synced 57 total transaction(s)" with
-                # Checking contributing zero, which reads as a healthy sync unless you
-                # look at the per-account breakdown.
-                if Expense.query.filter_by(
-                    user_id=user_id,
-                    account_id=account_id,
-                    external_id=external_id,
-                    import_source='simplefin'
-                ).first():
-                    continue
-
-                # The user's transaction rules first, then the legacy categoriser.
-                category_id = categorize_imported_transaction(
-                    trans.get('description', ''), user_id,
-                    amount=trans.get('amount'),
-                    transaction_type=trans.get('transaction_type', 'expense'),
-                )
-
-                expense = Expense(
-                    description=trans.get('description', 'SimpleFin Transaction'),
-                    amount=trans['amount'],
-                    original_amount=trans['amount'],
-                    currency_code=account.currency_code or 'USD',
-                    date=trans['date'],
-                    card_used=account.name,
-                    transaction_type=trans.get('transaction_type', 'expense'),
-                    split_method='equal',
-                    split_value=0,
-                    paid_by=user_id,
-                    user_id=user_id,
-                    account_id=account_id,
-                    external_id=external_id,
-                    import_source='simplefin',
-                    category_id=category_id,
-                )
-                db.session.add(expense)
-                imported_count += 1
-
-            # Update balance from latest SimpleFin data
-            if account_data.get('balance') is not None:
-                account.balance = account_data['balance']
-            account.last_sync = datetime.utcnow()
-
-            db.session.commit()
-            return True, f'Synced {imported_count} new transaction(s)', imported_count
-
-        except Exception:
-            db.session.rollback()
-            current_app.logger.exception(
-                'SimpleFin sync error for account %s', account_id)
-            return False, 'Could not sync transactions for this account', 0
+        return self._sync_accounts([account], settings, user_id)[0]
 
     def sync_all_accounts(self, user_id):
         """
         Sync all SimpleFin accounts for a user.
         Returns (success, message, list_of_per_account_results)
+
+        One bridge download for all of them — see `_sync_accounts`.
         """
         sf_accounts = self.repo.get_by_import_source(
             visible_user_ids(user_id), 'simplefin')
@@ -790,11 +707,16 @@ class SimpleFinService:
         if not sf_accounts:
             return True, 'No SimpleFin accounts to sync', []
 
+        settings = SimpleFin.query.filter_by(user_id=user_id).first()
+        if not settings or not settings.access_url:
+            outcomes = [(False, 'SimpleFin not connected', 0)] * len(sf_accounts)
+        else:
+            outcomes = self._sync_accounts(sf_accounts, settings, user_id)
+
         total_imported = 0
         results = []
 
-        for account in sf_accounts:
-            success, message, count = self.sync_account(account.id, user_id)
+        for account, (success, message, count) in zip(sf_accounts, outcomes):
             total_imported += count
             results.append({
                 'account_id': account.id,
@@ -815,6 +737,187 @@ class SimpleFinService:
 
         return True, f'Synced {total_imported} total transaction(s)', results
 
+    @staticmethod
+    def _days_back(account):
+        """How far back to fetch for `account` — buffer of 2 days beyond last sync."""
+        if account.last_sync:
+            days_since = (datetime.utcnow() - account.last_sync).days
+            return max(days_since + 2, 3)
+        return 30
+
+    def _sync_accounts(self, accounts, settings, user_id):
+        """
+        Sync `accounts` from ONE download of the connection in `settings`.
+
+        Bridge's `/accounts` returns every account on the connection whichever one is
+        asked about, and this used to be called once per account — so a user with
+        eight linked accounts downloaded the same payload eight times over a slow
+        link, every night. Now it is fetched once, over the widest window any of the
+        accounts needs, and fanned out by `external_id`. The wider window is safe for
+        an account that needed less: what it already has is deduped below.
+
+        Two phases, so a failure stays with its own account. Each account is first
+        READ — found in the response, deduped, categorised — into unsaved rows, and
+        one that cannot be is reported on its own and contributes nothing. Then every
+        account that could be read is written and committed together: one
+        transaction for the whole sync instead of one per account.
+
+        Returns a (success, message, synced_count) per account, in order.
+        """
+        from integrations.simplefin.client import SimpleFin as SimpleFinClient
+
+        outcomes = [None] * len(accounts)
+        for i, account in enumerate(accounts):
+            if not account.external_id:
+                outcomes[i] = (False, 'Account has no SimpleFin ID', 0)
+        pending = [i for i, outcome in enumerate(outcomes) if outcome is None]
+        if not pending:
+            return outcomes
+
+        try:
+            sf_client = SimpleFinClient(current_app)
+            raw_data = sf_client.get_accounts_with_transactions(
+                settings.access_url,
+                days_back=max(self._days_back(accounts[i]) for i in pending)
+            )
+        except Exception:
+            current_app.logger.exception(
+                'SimpleFin fetch failed for user %s', user_id)
+            raw_data = None
+            failure = 'Could not sync transactions for this account'
+        else:
+            failure = 'Failed to fetch data from SimpleFin'
+        if not raw_data:
+            for i in pending:
+                outcomes[i] = (False, failure, 0)
+            return outcomes
+
+        raw_by_id = {}
+        for account_raw in raw_data.get('accounts', []):
+            raw_by_id.setdefault(account_raw.get('id'), account_raw)
+
+        staged = []
+        for i in pending:
+            account = accounts[i]
+            try:
+                outcome, expenses, balance = self._read_account(
+                    sf_client, account, raw_by_id.get(account.external_id), user_id)
+            except Exception:
+                current_app.logger.exception(
+                    'SimpleFin sync error for account %s', account.id)
+                outcome = (False, 'Could not sync transactions for this account', 0)
+            outcomes[i] = outcome
+            if outcome[0]:
+                staged.append((account, expenses, balance))
+
+        if not staged:
+            return outcomes
+
+        try:
+            now = datetime.utcnow()
+            for account, expenses, balance in staged:
+                db.session.add_all(expenses)
+                # Update balance from latest SimpleFin data
+                if balance is not None:
+                    account.balance = balance
+                    snapshots.record(account, 'simplefin')
+                account.last_sync = now
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception(
+                'SimpleFin sync could not be saved for user %s', user_id)
+            for i, outcome in enumerate(outcomes):
+                if outcome[0]:
+                    outcomes[i] = (False, 'Could not sync transactions for this account', 0)
+        return outcomes
+
+    def _read_account(self, sf_client, account, account_raw, user_id):
+        """
+        One account's new transactions, as unsaved `Expense` rows.
+
+        Returns ((success, message, count), expenses, balance). Adds nothing to
+        the session — only the rule match counters are written, and they commit or
+        roll back with the rest — which is what lets a failure here leave the other
+        accounts' sync intact.
+        """
+        if not account_raw:
+            return (False, 'Account not found in SimpleFin response', 0), [], None
+
+        # `process_raw_accounts` takes the whole SimpleFin response and reads
+        # `raw_data['accounts']`. This passed a bare `[account_raw]`, and its guard
+        # — `'accounts' not in raw_data` — then asked whether the *string*
+        # `'accounts'` was an *element* of that list, which it never is. So it
+        # returned `[]` for every account on every sync since 2026-04-12, and the
+        # branch below called that success. Wrap the account back up the way the
+        # method is documented to receive it.
+        processed_list = sf_client.process_raw_accounts({'accounts': [account_raw]})
+        if not processed_list:
+            # Not success. The account was found in the response immediately above,
+            # so an empty result here means the response could not be read — and
+            # reporting that as `True` is what hid this for four months.
+            return (False, 'Could not read the SimpleFin data for this account', 0), [], None
+
+        account_data = processed_list[0]
+        new_transactions = []
+        seen = external_ids_for(user_id, account.id, 'simplefin')
+
+        for trans in account_data.get('transactions', []):
+            external_id = trans.get('external_id')
+            if not external_id:
+                continue
+
+            # Skip duplicates — scoped to THIS account, not to the whole user.
+            #
+            # A SimpleFin transaction id is unique within an account; nothing in the
+            # protocol makes it unique across them. Without `account_id` here, two
+            # accounts that happen to share ids collapse into one: the first to sync
+            # wins and the second silently imports nothing. Bridge's own demo data
+            # does exactly this — its Savings and Checking accounts share all 58
+            # transaction ids for transactions with different amounts — and on the
+            # live deploy that produced "Synced 57 total transaction(s)" with
+            # Checking contributing zero, which reads as a healthy sync unless you
+            # look at the per-account breakdown.
+            #
+            # `seen` starts as every id this account already has, loaded in one
+            # query, and takes each id as it is accepted — which also covers a
+            # repeat within this response.
+            if external_id in seen:
+                continue
+            seen.add(external_id)
+            new_transactions.append(trans)
+
+        # The user's transaction rules first, then the legacy categoriser — for
+        # the whole batch at once.
+        categories = categorize_imported_transactions(
+            [(trans.get('description', ''), trans.get('amount'),
+              trans.get('transaction_type', 'expense'))
+             for trans in new_transactions], user_id)
+
+        expenses = [
+            Expense(
+                description=trans.get('description', 'SimpleFin Transaction'),
+                amount=trans['amount'],
+                original_amount=trans['amount'],
+                currency_code=account.currency_code or 'USD',
+                date=trans['date'],
+                card_used=account.name,
+                transaction_type=trans.get('transaction_type', 'expense'),
+                split_method='equal',
+                split_value=0,
+                paid_by=user_id,
+                user_id=user_id,
+                account_id=account.id,
+                external_id=trans['external_id'],
+                import_source='simplefin',
+                category_id=category_id,
+            )
+            for trans, category_id in zip(new_transactions, categories)
+        ]
+        imported_count = len(expenses)
+        return ((True, f'Synced {imported_count} new transaction(s)', imported_count),
+                expenses, account_data.get('balance'))
+
     def disconnect_account(self, account_id, user_id):
         """
         Disconnect a SimpleFin account
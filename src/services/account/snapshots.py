@@ -0,0 +1,290 @@
+"""`account_balance_snapshots`: what each account held, day by day.
+
+The asset/debt trends used to rebuild twelve months of every account's balance on
+each dashboard load, by walking its transactions backwards from today's balance —
+a cost of accounts × transactions, paid again by `/analytics/networth` and
+`/analytics/health`. They now read month-end figures from this table in one range
+query (`month_end_balances`), and replay only an account that has no snapshots.
+
+── WHERE SNAPSHOTS ARE WRITTEN ────────────────────────────────────────────────
+
+  * `balances._move`, whenever a transaction moves an account's balance —
+    `source='transaction'`;
+  * SimpleFin sync, when the bridge reports a balance — `'simplefin'`. Real
+    history for those accounts, which no replay of imported rows can give;
+  * the nightly `account_balance_snapshots` job, for every account — `'daily'`.
+    Accounts whose balance nothing moved still get a point per day;
+  * `flask backfill-balance-snapshots`, on demand.
+
+Nothing here commits, and a balance move does not write its snapshot on the spot:
+`record` notes the account on the session, and `write_recorded` — a
+`before_commit` hook, see src/models/balance_snapshot.py — writes one row per
+noted account when the caller commits. A rollback discards the notes with
+everything else.
+
+── HISTORY BEFORE THE FIRST SNAPSHOT ──────────────────────────────────────────
+
+An account's first snapshot is always preceded by its history: `ensure_history`
+replays its transactions (the walk the trends used to do per request) and writes
+one `'backfill'` row per past month, once. The replay starts from the stored
+balance and the stored rows, so it is only right when the two agree — which is
+why it runs at commit, after the final flush, and not beside a move that may be
+half-applied: a new expense flushed by some autoflush while its balance move is
+still pending would be counted twice.
+"""
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, or_, select
+
+from src.extensions import db
+from src.models.account import Account
+from src.models.balance_snapshot import AccountBalanceSnapshot
+from src.models.transaction import Expense
+from src.utils.money import money_or_zero
+
+#: How far back `ensure_history` replays — what the trends have always shown.
+HISTORY_DAYS = 365
+
+
+def _month_end(month_key):
+    year, month = (int(part) for part in month_key.split('-'))
+    return date(year, month, monthrange(year, month)[1])
+
+
+def replay_month_ends(account, since=None):
+    """`{'YYYY-MM': closing balance}` for `account`, walked back from today's balance.
+
+    The balance at the end of month M is today's balance minus the net effect of
+    every transaction after M, so the walk goes newest-to-oldest, undoing one
+    month at a time. Only months with activity get an entry, plus the current
+    month, which is today's balance. Figures are in the account's currency.
+
+    Every row in the account counts, whoever entered it: the account's owner is
+    who the money belongs to (D-18). Transfers INTO the account count too, the
+    way `balances._move` credits them.
+    """
+    from src.utils.currency_converter import rate_table
+
+    if since is None:
+        since = datetime.now() - timedelta(days=HISTORY_DAYS)
+    account_currency = account.currency_code
+
+    # Columns rather than entities: an `Expense` already in the identity map comes
+    # back with whatever unflushed edits it carries, and this wants the stored row.
+    with db.session.no_autoflush:
+        rows = db.session.query(
+            Expense.date, Expense.amount, Expense.transaction_type,
+            Expense.currency_code, Expense.account_id,
+        ).filter(
+            or_(Expense.account_id == account.id,
+                and_(Expense.destination_account_id == account.id,
+                     Expense.transaction_type == 'transfer')),
+            Expense.date >= since,
+        ).all()
+
+    table = rate_table() if any(
+        r.currency_code and r.currency_code != account_currency for r in rows) else None
+
+    by_month = {}
+    for row in rows:
+        amount = money_or_zero(row.amount)
+        if table is not None and row.currency_code and account_currency \
+                and row.currency_code != account_currency:
+            amount = table.convert(amount, row.currency_code, account_currency)
+
+        # Signed effect on the balance, so undoing it is a subtraction.
+        if row.account_id != account.id:
+            effect = amount            # a transfer arriving from another account
+        elif row.transaction_type == 'income':
+            effect = amount
+        elif row.transaction_type in ('expense', 'transfer'):
+            effect = -amount
+        else:
+            continue
+        key = row.date.strftime('%Y-%m')
+        by_month[key] = by_month.get(key, 0) + effect
+
+    running = money_or_zero(account.balance)
+    history = {datetime.now().strftime('%Y-%m'): running}
+    for month_key in sorted(by_month, reverse=True):
+        # `running` is this month's closing balance before its activity is undone.
+        history[month_key] = running
+        running -= by_month[month_key]
+    return history
+
+
+def _pending():
+    return [row for row in db.session.new if isinstance(row, AccountBalanceSnapshot)]
+
+
+def _accounts_with_snapshots(account_ids):
+    if not account_ids:
+        return set()
+    with db.session.no_autoflush:
+        known = {account_id for (account_id,) in db.session.query(
+            AccountBalanceSnapshot.account_id).filter(
+            AccountBalanceSnapshot.account_id.in_(account_ids)).distinct()}
+    # And rows added earlier in this session, which an unflushed read cannot see.
+    known.update(row.account_id for row in _pending()
+                 if row.account_id in account_ids)
+    return known
+
+
+def _write_history(account):
+    this_month = datetime.now().strftime('%Y-%m')
+    written = 0
+    for month_key, balance in replay_month_ends(account).items():
+        if month_key == this_month:
+            continue      # today's point is an observed one, written by the caller
+        db.session.add(AccountBalanceSnapshot(
+            account_id=account.id, day=_month_end(month_key),
+            balance=balance, source='backfill'))
+        written += 1
+    return written
+
+
+def ensure_history(account, known=None):
+    """Backfill `account`'s past months if it has no snapshots yet.
+
+    `known` is a set of account ids already known to have some, so a caller
+    walking many accounts can skip the per-account check. Returns the number of
+    rows written.
+    """
+    if account is None or account.id is None:
+        return 0
+    if known is None:
+        known = _accounts_with_snapshots([account.id])
+    if account.id in known:
+        return 0
+    written = _write_history(account)
+    known.add(account.id)
+    return written
+
+
+def _write(account, day, source, existing=None):
+    if existing is None:
+        db.session.add(AccountBalanceSnapshot(
+            account_id=account.id, day=day,
+            balance=money_or_zero(account.balance), source=source))
+    else:
+        existing.balance = money_or_zero(account.balance)
+        existing.source = source
+        existing.recorded_at = datetime.utcnow()
+
+
+def _rows_on(account_ids, day):
+    """The newest snapshot row of `day` for each of `account_ids`."""
+    rows = {}
+    with db.session.no_autoflush:
+        for row in AccountBalanceSnapshot.query.filter(
+                AccountBalanceSnapshot.account_id.in_(account_ids),
+                AccountBalanceSnapshot.day == day).order_by(AccountBalanceSnapshot.id):
+            rows[row.account_id] = row
+    # Rows added earlier in this same session (several moves in one request).
+    for row in _pending():
+        if row.day == day and row.account_id in account_ids:
+            rows[row.account_id] = row
+    return rows
+
+
+_RECORDED = 'balance_snapshots'
+
+
+def record(account, source):
+    """Note that `account`'s balance moved; its snapshot is written at commit.
+
+    Noted on the session rather than written here, so several moves in one
+    transaction — an update reverses, then re-applies — leave one row, holding
+    the balance they end at.
+    """
+    if account is not None:
+        db.session.info.setdefault(_RECORDED, {})[account] = source
+
+
+def write_recorded(session):
+    """Write today's snapshot for every account `record` noted in this transaction."""
+    recorded = session.info.pop(_RECORDED, None)
+    if not recorded:
+        return
+    # Everything the caller changed, in the database, so the replay in
+    # `ensure_history` reads rows and balances that agree.
+    session.flush()
+    accounts = [a for a in recorded if a.id is not None and a in session]
+    if not accounts:
+        return
+    day = date.today()
+    ids = [a.id for a in accounts]
+    known = _accounts_with_snapshots(ids)
+    today = _rows_on(ids, day)
+    for account in accounts:
+        ensure_history(account, known)
+        _write(account, day, recorded[account], today.get(account.id))
+
+
+def forget_recorded(session):
+    """Drop the notes of a transaction that rolled back."""
+    session.info.pop(_RECORDED, None)
+
+
+def take_daily(accounts=None, day=None):
+    """Snapshot every account (or `accounts`) for `day`; returns how many.
+
+    Backfills any account seen for the first time, so the first night after an
+    upgrade fills the history the trends read.
+    """
+    from src.models.account import Account
+
+    accounts = Account.query.all() if accounts is None else list(accounts)
+    day = day or date.today()
+    ids = [a.id for a in accounts]
+    known = _accounts_with_snapshots(ids)
+    today = _rows_on(ids, day)
+    for account in accounts:
+        ensure_history(account, known)
+        _write(account, day, 'daily', today.get(account.id))
+    return len(accounts)
+
+
+def month_end_balances(account_ids, since):
+    """`{account_id: {'YYYY-MM': balance}}` from the snapshots on or after `since`.
+
+    One range query. Each month's figure is its latest snapshot — the closing
+    balance, or the newest one so far for the current month. Accounts with no
+    snapshot in the range are absent, for the caller to replay.
+    """
+    if not account_ids:
+        return {}
+    if isinstance(since, datetime):
+        since = since.date()
+    history = {}
+    rows = db.session.query(
+        AccountBalanceSnapshot.account_id, AccountBalanceSnapshot.day,
+        AccountBalanceSnapshot.balance,
+    ).filter(
+        AccountBalanceSnapshot.account_id.in_(account_ids),
+        AccountBalanceSnapshot.day >= since,
+    ).order_by(AccountBalanceSnapshot.day, AccountBalanceSnapshot.id)
+    for account_id, day, balance in rows:
+        history.setdefault(account_id, {})[day.strftime('%Y-%m')] = balance
+    return history
+
+
+def delete_for(account_id):
+    """Drop an account's snapshots, with the account."""
+    AccountBalanceSnapshot.query.filter_by(account_id=account_id).delete(
+        synchronize_session=False)
+
+
+def forget(*criteria):
+    """Drop the snapshots of the `accounts` rows matching `criteria`.
+
+    For the bulk deletes, which `delete_for` never sees: called BEFORE the
+    statement that removes the accounts, with the same criteria. The column has
+    no foreign key, and on SQLite a new account can be given a deleted one's id
+    and would inherit its history.
+    """
+    (db.session.query(AccountBalanceSnapshot)
+     .filter(AccountBalanceSnapshot.account_id.in_(
+         select(Account.id).where(*criteria)))
+     .delete(synchronize_session=False))
@@ -0,0 +1,258 @@
+"""Dashboard figures, summed by the database.
+
+`AnalyticsService.get_dashboard_data` used to load every household row since last
+December and walk it five times in Python — monthly totals, income and transfer
+totals, current-month figures, IOUs and the category breakdown. On a household
+with ~40k rows that was most of `/analytics/dashboard`'s latency and most of a
+worker's memory, all of it spent adding numbers a database adds for free.
+
+Everything here is a `GROUP BY` over `scope_query`, so it carries the same
+attribution rule (the ACCOUNT's owner, D-18) as the transactions list and cannot
+drift from it. The only rows that still become ORM objects are the ones a split
+actually touches: a share of a split is decided by `Expense.calculate_splits`,
+which parses `split_with` and `split_details`, and re-deriving that arithmetic in
+SQL would be a second copy of it. Unsplit rows — the overwhelming majority — are
+paid in full by `paid_by`, and that is a `SUM`.
+
+Shared with `spending_summary.py`, which owns the month expression below.
+"""
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, exists, func, or_
+
+from src.extensions import db
+from src.models.account import Account
+from src.models.category import Category
+from src.models.transaction import CategorySplit, Expense
+from src.utils.money import money_or_zero
+
+UNCATEGORISED = 'Uncategorised'
+
+
+def month_key():
+    """`Expense.date` as 'YYYY-MM', on SQLite and Postgres alike.
+
+    There is no portable month-truncation function: strftime is SQLite-only,
+    to_char is Postgres-only. func.cast is special-cased by SQLAlchemy into a real
+    CAST construct, so this compiles to substr(CAST(date AS VARCHAR), 1, 7) on both
+    dialects and yields 'YYYY-MM' from the ISO datetime text. (Postgres renders
+    timestamps ISO-first under its default DateStyle.)
+    """
+    return func.substr(func.cast(Expense.date, db.String), 1, 7)
+
+
+def split_rows_filter():
+    """Rows whose shares `calculate_splits` has to work out.
+
+    The complement — `split_method == 'none'` or no `split_with` — is exactly the
+    case `calculate_splits` answers with "the payer paid all of it", which is what
+    lets those rows be summed instead of loaded.
+    """
+    return and_(Expense.split_method != 'none',
+                Expense.split_with.isnot(None),
+                Expense.split_with != '')
+
+
+def _unsplit_filter():
+    return or_(Expense.split_method == 'none',
+               Expense.split_with.is_(None),
+               Expense.split_with == '')
+
+
+def _empty_month():
+    # `Decimal('0')`, not `0.0`: these receive `Expense.amount`, which is
+    # `Decimal` since D-58, and `float += Decimal` raises.
+    return {'total': Decimal('0'), 'by_card': {}, 'contributors': {},
+            'by_account': {}}
+
+
+def _add(bucket, key, amount):
+    bucket[key] = bucket.get(key, Decimal('0')) + amount
+
+
+def scope_query_since(scope_ids, start):
+    """`scope_query` over rows dated on or after `start`."""
+    from src.utils.household import scope_query
+
+    return scope_query(scope_ids).filter(Expense.date >= start)
+
+
+def dashboard_totals(scope_ids, start, now, users_map=None):
+    """Every summed figure on the dashboard, for rows dated on or after `start`.
+
+    Returns a dict of the fields `get_dashboard_data` used to derive in its loops,
+    under the same names, plus `split_rows` and `expense_splits` — the split rows
+    and their shares, for the IOU figures, which are the one thing here that is
+    not a sum.
+
+    One grouped query answers the month/type/account/card figures, one more the
+    contributor totals for unsplit rows. Current-month and current-year figures
+    are read off the month groups, which is why `start` must not reach back more
+    than a year before `now`'s year — the dashboard passes the December before it.
+    """
+    base = scope_query_since(scope_ids, start)
+    month = month_key()
+    this_month = now.strftime('%Y-%m')
+    this_year = now.strftime('%Y')
+
+    monthly_totals = {}
+    total_expenses = Decimal('0')
+    current_month_total = Decimal('0')
+    total_income = Decimal('0')
+    current_month_income = Decimal('0')
+    total_transfers = Decimal('0')
+    unique_cards = set()
+
+    rows = (base.with_entities(
+                month.label('month'),
+                Expense.transaction_type.label('transaction_type'),
+                Account.name.label('account_name'),
+                Expense.card_used.label('card_used'),
+                func.sum(Expense.amount).label('total'))
+            .group_by(month, Expense.transaction_type, Account.name,
+                      Expense.card_used)
+            .all())
+
+    for row in rows:
+        amount = money_or_zero(row.total)
+        bucket = monthly_totals.setdefault(row.month, _empty_month())
+
+        if row.transaction_type == 'income':
+            total_income += amount
+            if row.month == this_month:
+                current_month_income += amount
+        elif row.transaction_type == 'transfer':
+            total_transfers += amount
+        elif row.transaction_type == 'expense':
+            bucket['total'] += amount
+            _add(bucket['by_card'], row.card_used, amount)
+            if row.account_name is not None:
+                _add(bucket['by_account'], row.account_name, amount)
+
+            if row.month.startswith(this_year):
+                total_expenses += amount
+                if row.month == this_month:
+                    current_month_total += amount
+                if row.card_used:
+                    unique_cards.add(row.card_used)
+
+    # Unsplit rows: the payer carries the whole amount. `amount > 0` mirrors the
+    # `if splits['payer']['amount'] > 0` the Python loop applied to every row, so
+    # a refund does not show up as a negative contributor.
+    payers = (base.filter(Expense.transaction_type == 'expense',
+                          _unsplit_filter(),
+                          Expense.amount > 0)
+              .with_entities(month.label('month'),
+                             Expense.paid_by.label('paid_by'),
+                             func.sum(Expense.amount).label('total'))
+              .group_by(month, Expense.paid_by)
+              .all())
+    for row in payers:
+        bucket = monthly_totals.setdefault(row.month, _empty_month())
+        _add(bucket['contributors'], row.paid_by, money_or_zero(row.total))
+
+    # Split rows: few, and the only ones whose shares need `calculate_splits`.
+    split_rows = base.filter(split_rows_filter()).all()
+    expense_splits = {}
+    for expense in split_rows:
+        splits = expense.calculate_splits(users_map=users_map)
+        expense_splits[expense.id] = splits
+        if expense.transaction_type != 'expense':
+            continue
+
+        contributors = monthly_totals.setdefault(
+            expense.date.strftime('%Y-%m'), _empty_month())['contributors']
+        if splits['payer']['amount'] > 0:
+            _add(contributors, splits['payer']['email'], splits['payer']['amount'])
+        for split in splits['splits']:
+            _add(contributors, split['email'], split['amount'])
+
+    return {
+        'monthly_totals': monthly_totals,
+        'total_expenses': total_expenses,
+        'current_month_total': current_month_total,
+        'total_income': total_income,
+        'current_month_income': current_month_income,
+        'total_transfers': total_transfers,
+        'unique_cards': unique_cards,
+        'split_rows': split_rows,
+        'expense_splits': expense_splits,
+    }
+
+
+def category_spending(scope_ids, start=None, end=None, limit=6,
+                      transaction_type='expense'):
+    """Total per category over an inclusive window, highest first.
+
+    Omitting both `start` and `end` reports the current calendar month, up to
+    now — what /analytics/categories/top has always answered when the client
+    sends no dates.
+
+    A row with category splits counts once per split, under the split's category;
+    a row without counts once under its own. Both halves are summed in SQL and
+    merged here by category NAME, which is what the Python version keyed on —
+    two categories sharing a name are one slice of the pie.
+
+    A split or row with no category still spent money, and lands under
+    `UNCATEGORISED` rather than being dropped: dropping it made the slices sum to
+    less than the reported total with no indication anything was missing.
+    """
+    from src.utils.household import scope_query
+
+    if start is None and end is None:
+        now = datetime.now()
+        start = datetime(now.year, now.month, 1)
+        end = now
+
+    def windowed(query):
+        query = query.filter(Expense.transaction_type == transaction_type)
+        if start is not None:
+            query = query.filter(Expense.date >= start)
+        if end is not None:
+            query = query.filter(Expense.date <= end)
+        return query
+
+    has_splits = exists().where(CategorySplit.expense_id == Expense.id)
+
+    whole = (windowed(scope_query(scope_ids))
+             .filter(~has_splits)
+             .outerjoin(Category, Expense.category_id == Category.id)
+             .with_entities(Category.name.label('name'),
+                            Category.color.label('color'),
+                            Category.icon.label('icon'),
+                            func.sum(Expense.amount).label('total'))
+             .group_by(Category.id, Category.name, Category.color,
+                       Category.icon)
+             .all())
+
+    parts = (windowed(scope_query(scope_ids))
+             .join(CategorySplit, CategorySplit.expense_id == Expense.id)
+             .outerjoin(Category, CategorySplit.category_id == Category.id)
+             .with_entities(Category.name.label('name'),
+                            Category.color.label('color'),
+                            Category.icon.label('icon'),
+                            func.sum(CategorySplit.amount).label('total'))
+             .group_by(Category.id, Category.name, Category.color,
+                       Category.icon)
+             .all())
+
+    totals = {}
+    for row in list(whole) + list(parts):
+        if row.name is None:
+            name, color, icon = UNCATEGORISED, None, None
+        else:
+            name, color, icon = row.name, row.color, row.icon
+        bucket = totals.setdefault(
+            name, {'amount': Decimal('0'), 'color': color, 'icon': icon})
+        bucket['amount'] += money_or_zero(row.total)
+
+    categories = sorted(
+        [{'name': name,
+          'amount': round(data['amount'], 2),
+          'color': data['color'],
+          'icon': data['icon']}
+         for name, data in totals.items()],
+        key=lambda c: c['amount'], reverse=True)
+
+    return categories[:limit] if limit else categories
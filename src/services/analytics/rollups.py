@@ -0,0 +1,280 @@
+"""`monthly_rollups`: maintained on every Expense write, read by analytics.
+
+Every analytics endpoint used to rescan raw `expenses` rows per request, so a
+dashboard got slower with every month of history. `MonthlyRollup` holds SUM and
+COUNT per (user, account, category, month, type, payer, split) instead, and
+reads touch O(months × categories) rows however long the history is.
+
+── WHERE IT IS MAINTAINED ─────────────────────────────────────────────────────
+
+`balances.py` centralises the points a transaction moves money: add, the reverse
+half of an update, delete. A rollup needs those same three points — and more,
+because rows are also written by paths that must NOT move a balance: the CSV
+importer, SimpleFin sync (whose balance comes from the bridge), rule
+re-categorisation. A call at each of those sites is how `balances` came apart
+once (PR #42, #45), so the hook sits one level lower, at the session's flush:
+`apply_pending` runs in `before_flush` and sees every ORM insert, update and
+delete of an `Expense`, whichever path produced it, in the same transaction as
+the row. A rollback takes both.
+
+*** A BULK `Query.update()` / `.delete()` BYPASSES THE FLUSH. *** Those sites —
+deleting an account, a category, a user's data, an import batch — call
+`rebuild()` for the users they touched after the statement. `flask
+rebuild-rollups` rebuilds everything from scratch.
+"""
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, case, func, insert, or_, select
+
+from src.extensions import db
+from src.models.account import Account
+from src.models.rollup import MonthlyRollup
+from src.models.transaction import Expense
+from src.services.analytics.aggregates import month_key, split_rows_filter
+from src.utils.money import money_or_zero
+
+#: The Expense columns a rollup key or total is built from. A change to any other
+#: column — notes, tags, description — cannot move a rollup, so it costs nothing.
+_TRACKED = ('user_id', 'account_id', 'category_id', 'date', 'transaction_type',
+            'paid_by', 'split_method', 'split_with', 'amount')
+
+
+def is_split(split_method, split_with):
+    """Python twin of `aggregates.split_rows_filter`."""
+    return split_method != 'none' and bool(split_with)
+
+
+def _key(values):
+    date = values['date'] or datetime.utcnow()
+    return (values['user_id'],
+            values['account_id'],
+            values['category_id'],
+            date.strftime('%Y-%m'),
+            # `server_default='expense'`: a pending row with no type becomes one.
+            values['transaction_type'] or 'expense',
+            values['paid_by'],
+            is_split(values['split_method'], values['split_with']))
+
+
+def _values(expense):
+    return {name: getattr(expense, name) for name in _TRACKED}
+
+
+def _stored_values(session, ids):
+    """The tracked columns of `ids` as the DATABASE holds them.
+
+    Read in `before_flush`, so this is still the pre-write row: an update's old
+    values and a delete's only values. Asking the instance instead would depend on
+    whether the attribute happened to be loaded before it was assigned — an
+    expired attribute set without being read has no history to reverse.
+    """
+    if not ids:
+        return {}
+    columns = [getattr(Expense, name) for name in _TRACKED]
+    rows = session.execute(
+        select(Expense.id, *columns).where(Expense.id.in_(ids))).all()
+    return {row[0]: dict(zip(_TRACKED, row[1:])) for row in rows}
+
+
+def apply_pending(session):
+    """Fold this flush's Expense writes into `monthly_rollups`.
+
+    Deltas are grouped by key first, so an import of 5,000 rows into 40 keys costs
+    one SELECT and at most 40 row writes, not 5,000.
+    """
+    new = [o for o in session.new if isinstance(o, Expense)]
+    dirty = [o for o in session.dirty if isinstance(o, Expense)
+             and o.id is not None and session.is_modified(o)]
+    deleted = [o for o in session.deleted if isinstance(o, Expense)
+               and o.id is not None]
+    if not (new or dirty or deleted):
+        return
+
+    deltas = {}
+
+    def add(values, direction):
+        bucket = deltas.setdefault(_key(values), [Decimal('0'), 0])
+        bucket[0] += money_or_zero(values['amount']) * direction
+        bucket[1] += direction
+
+    stored = _stored_values(session, [o.id for o in dirty + deleted])
+    for expense in new:
+        add(_values(expense), 1)
+    for expense in dirty:
+        before = stored.get(expense.id)
+        if before is None:
+            continue
+        after = _values(expense)
+        if _key(before) == _key(after) and \
+                money_or_zero(before['amount']) == money_or_zero(after['amount']):
+            continue
+        add(before, -1)
+        add(after, 1)
+    for expense in deleted:
+        if expense.id in stored:
+            add(stored[expense.id], -1)
+
+    deltas = {k: v for k, v in deltas.items() if v[0] or v[1]}
+    if deltas:
+        _apply(session, deltas)
+
+
+def _apply(session, deltas):
+    user_ids = {key[0] for key in deltas}
+    months = {key[3] for key in deltas}
+    existing = {}
+    for row in session.execute(
+            select(MonthlyRollup)
+            .where(MonthlyRollup.user_id.in_(user_ids),
+                   MonthlyRollup.month.in_(months))).scalars():
+        existing.setdefault(_row_key(row), row)
+
+    for key, (total, count) in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            session.add(MonthlyRollup(
+                user_id=key[0], account_id=key[1], category_id=key[2],
+                month=key[3], transaction_type=key[4], paid_by=key[5],
+                is_split=key[6], total=total, count=count))
+        else:
+            # Expressions, not Python arithmetic on the loaded value, so two
+            # workers updating the same key both land: the UPDATE reads
+            # `total = total + :delta`.
+            row.total = MonthlyRollup.total + total
+            row.count = MonthlyRollup.count + count
+
+
+def _row_key(row):
+    return (row.user_id, row.account_id, row.category_id, row.month,
+            row.transaction_type, row.paid_by, bool(row.is_split))
+
+
+def rebuild(user_ids=None):
+    """Recompute rollups from `expenses`, for `user_ids` or for everyone.
+
+    One DELETE and one INSERT … SELECT … GROUP BY, so the database does the
+    summing. Does not commit: the bulk statements that call this own the
+    transaction, and a rebuild has to land in the same commit as the change that
+    made it necessary.
+    """
+    month = month_key()
+    split = split_rows_filter()
+
+    deleted = db.session.query(MonthlyRollup)
+    source = db.session.query(
+        Expense.user_id, Expense.account_id, Expense.category_id, month,
+        func.coalesce(Expense.transaction_type, 'expense'), Expense.paid_by,
+        # `and_(...)` is NULL-safe here: `split_rows_filter` tests `IS NOT NULL`
+        # before it compares, so the CASE never sees an unknown.
+        case((split, True), else_=False),
+        func.sum(Expense.amount), func.count(Expense.id))
+    if user_ids is not None:
+        deleted = deleted.filter(MonthlyRollup.user_id.in_(user_ids))
+        source = source.filter(Expense.user_id.in_(user_ids))
+    source = source.group_by(
+        Expense.user_id, Expense.account_id, Expense.category_id, month,
+        func.coalesce(Expense.transaction_type, 'expense'), Expense.paid_by,
+        case((split, True), else_=False))
+
+    deleted.delete(synchronize_session=False)
+    db.session.execute(
+        insert(MonthlyRollup).from_select(
+            ['user_id', 'account_id', 'category_id', 'month',
+             'transaction_type', 'paid_by', 'is_split', 'total', 'count'],
+            source.statement))
+
+
+def users_with(*criteria):
+    """Who entered the `expenses` rows matching `criteria`.
+
+    For the bulk sites: read BEFORE the statement that moves the rows, then passed
+    to `rebuild()` after it, so only those users' rollups are recomputed.
+    """
+    return [row[0] for row in
+            db.session.query(Expense.user_id).filter(*criteria).distinct()]
+
+
+def needs_backfill():
+    """True when `expenses` has rows and `monthly_rollups` has none.
+
+    The state of every instance the first time it boots with this table:
+    `create_all()` creates it empty, and there is no Alembic run to backfill it.
+    """
+    return (db.session.query(MonthlyRollup.id).first() is None
+            and db.session.query(Expense.id).first() is not None)
+
+
+# --- Reads -------------------------------------------------------------------
+
+
+def scope_rollups(user_ids):
+    """Rollups attributed to any of `user_ids` — `scope_query`'s predicate.
+
+    Joined to `accounts` on every read rather than storing the owner, so an
+    account reassigned to another member moves its history with it, exactly as
+    the transactions list does. The orphan clause is `owner_scope_filter`'s: a
+    row with no account belongs to whoever entered it.
+    """
+    return (db.session.query(MonthlyRollup)
+            .outerjoin(Account, MonthlyRollup.account_id == Account.id)
+            .filter(or_(
+                Account.user_id.in_(user_ids),
+                and_(MonthlyRollup.account_id.is_(None),
+                     MonthlyRollup.user_id.in_(user_ids)))))
+
+
+def totals_by_month(user_ids, months):
+    """{'YYYY-MM': total} over every transaction type, for `months`."""
+    rows = (scope_rollups(user_ids)
+            .filter(MonthlyRollup.month.in_(months))
+            .with_entities(MonthlyRollup.month,
+                           func.sum(MonthlyRollup.total).label('total'))
+            .group_by(MonthlyRollup.month)
+            .all())
+    return {row.month: money_or_zero(row.total) for row in rows}
+
+
+def shares_by_month(user_id, scope_ids, months=None):
+    """{'YYYY-MM': {'income': x, 'expense': y}}: `user_id`'s SHARE of each month.
+
+    What `get_cashflow_data` and `get_stats_data` computed by calling
+    `calculate_splits()` on every household row ever written. An unsplit row is
+    its payer's in full, which the rollups answer; a split row's share is stored
+    in `expense_shares`, which a second grouped query answers.
+
+    `months=None` covers all history.
+    """
+    result = {}
+
+    def add(month, transaction_type, amount):
+        if transaction_type not in ('income', 'expense'):
+            return
+        bucket = result.setdefault(
+            month, {'income': Decimal('0'), 'expense': Decimal('0')})
+        bucket[transaction_type] += money_or_zero(amount)
+
+    query = (scope_rollups(scope_ids)
+             .filter(MonthlyRollup.is_split.is_(False),
+                     MonthlyRollup.paid_by == user_id))
+    if months is not None:
+        query = query.filter(MonthlyRollup.month.in_(months))
+    for row in (query.with_entities(MonthlyRollup.month,
+                                    MonthlyRollup.transaction_type,
+                                    func.sum(MonthlyRollup.total).label('total'))
+                .group_by(MonthlyRollup.month, MonthlyRollup.transaction_type)
+                .all()):
+        add(row.month, row.transaction_type, row.total)
+
+    # Split rows: `user_id`'s share of each, summed from `expense_shares`.
+    from src.services.transaction import shares
+
+    since = None
+    if months is not None:
+        since = datetime.strptime(min(months), '%Y-%m')
+    for row in shares.monthly_shares(user_id, scope_ids, since):
+        if months is not None and row.month not in months:
+            continue
+        add(row.month, row.transaction_type, row.total)
+
+    return result
@@ -2,6 +2,7 @@
 from decimal import Decimal
 from datetime import datetime, timedelta
 from sqlalchemy import or_
+from sqlalchemy.orm import selectinload
 from src.models.transaction import Expense
 from src.models.budget import Budget
 from src.models.group import Group
@@ -16,11 +17,20 @@ class AnalyticsService:
     def __init__(self):
         pass
 
-    def get_dashboard_data(self, user_id, scope_ids=None):
-        """Get dashboard overview data"""
+    def get_dashboard_data(self, user_id, scope_ids=None, with_rows=True):
+        """Get dashboard overview data.
+
+        Every figure is summed in SQL by `aggregates.dashboard_totals`; the only
+        rows loaded are the ones `expenses` hands to the client, and callers that
+        discard that list (`/analytics/health`, `/networth`, `/summary`) pass
+        `with_rows=False` and load none at all. The key is still present, empty,
+        so the payload keeps its shape either way.
+        """
         from src.utils.helpers import get_base_currency, sync_investments_with_accounts, calculate_asset_debt_trends
-        from src.utils.household import read_scope, scope_query
+        from src.utils.household import read_scope
         from src.models.user import User
+        from src.services.analytics.aggregates import (
+            category_spending, dashboard_totals, scope_query_since)
 
         now = datetime.now()
         current_user = db.session.get(User, user_id)
@@ -52,9 +62,15 @@ class AnalyticsService:
         # same rows. `scope_query` is the transactions list's own predicate,
         # promoted to `src/utils/household.py` so there is exactly one of it.
         dashboard_start = datetime(now.year, 1, 1) - timedelta(days=31)
-        expenses = (scope_query(scope_ids)
-                    .filter(Expense.date >= dashboard_start)
-                    .order_by(Expense.date.desc()).all())
+        expenses = []
+        if with_rows:
+            # The client draws its cash-flow chart from this list
+            # (`Dashboard.tsx`), so it is loaded for display — never summed here.
+            # Category and account are what `_serialize_expense` reads per row.
+            expenses = (scope_query_since(scope_ids, dashboard_start)
+                        .options(selectinload(Expense.category),
+                                 selectinload(Expense.account))
+                        .order_by(Expense.date.desc()).all())
 
         users = User.query.all()
         groups = Group.query.join(group_users).filter(group_users.c.user_id == user_id).all()
@@ -68,121 +84,42 @@ class AnalyticsService:
         # Build a users map once to avoid N+1 inside calculate_splits
         users_map = {u.id: u for u in users}
 
-        # Pre-calculate expense splits
-        expense_splits = {}
-        for expense in expenses:
-            expense_splits[expense.id] = expense.calculate_splits(users_map=users_map)
-
-        # Calculate monthly totals with contributors
-        monthly_totals = {}
-        if expenses:
-            for expense in expenses:
-                month_key = expense.date.strftime('%Y-%m')
-                if month_key not in monthly_totals:
-                    monthly_totals[month_key] = {
-                        # `Decimal('0')`, not `0.0`: this receives `expense.amount`,
-                        # which is `Decimal` since D-58, and `float += Decimal` raises.
-                        'total': Decimal('0'),
-                        'by_card': {},
-                        'contributors': {},
-                        'by_account': {}
-                    }
-
-                # Add to total - only add expenses, not income or transfers
-                if not hasattr(expense, 'transaction_type') or expense.transaction_type == 'expense':
-                    monthly_totals[month_key]['total'] += expense.amount
-
-                    # Add to card totals
-                    if expense.card_used not in monthly_totals[month_key]['by_card']:
-                        monthly_totals[month_key]['by_card'][expense.card_used] = 0
-                    monthly_totals[month_key]['by_card'][expense.card_used] += expense.amount
-
-                    # Add to account totals if available
-                    if hasattr(expense, 'account') and expense.account:
-                        account_name = expense.account.name
-                        if account_name not in monthly_totals[month_key]['by_account']:
-                            monthly_totals[month_key]['by_account'][account_name] = 0
-                        monthly_totals[month_key]['by_account'][account_name] += expense.amount
-
-                    # Calculate splits and add to contributors
-                    splits = expense_splits[expense.id]
-
-                    # Add payer's portion
-                    if splits['payer']['amount'] > 0:
-                        payer_email = splits['payer']['email']
-                        if payer_email not in monthly_totals[month_key]['contributors']:
-                            monthly_totals[month_key]['contributors'][payer_email] = 0
-                        monthly_totals[month_key]['contributors'][payer_email] += splits['payer']['amount']
-
-                    # Add other contributors' portions
-                    for split in splits['splits']:
-                        if split['email'] not in monthly_totals[month_key]['contributors']:
-                            monthly_totals[month_key]['contributors'][split['email']] = 0
-                        monthly_totals[month_key]['contributors'][split['email']] += split['amount']
-
-        # Calculate total expenses for current user (only their portions for the current year)
-        current_year = now.year
-        total_expenses = 0
-        total_expenses_only = 0
-        total_income = 0
-        total_transfers = 0
-        monthly_labels = []
-        monthly_amounts = []
+        # **THE D-18 FIX** still holds inside these sums. `total_expenses` used to
+        # be the caller's SHARE of each split, while income summed whole amounts
+        # over the household — so `net_cash_flow` subtracted a caller-scoped
+        # figure from a household-scoped one and a member who had entered nothing
+        # saw a 100% savings rate. Attribution is the account's owner now, the
+        # query is scoped to exactly those rows, and the two terms describe the
+        # same people. Split shares are still computed, for the contributors and
+        # `_calculate_iou_data` — settling up is a different question from whose
+        # money it is.
+        totals = dashboard_totals(scope_ids, dashboard_start, now,
+                                  users_map=users_map)
+        monthly_totals = totals['monthly_totals']
+        expense_splits = totals['expense_splits']
+        total_expenses = totals['total_expenses']
+        total_expenses_only = totals['total_expenses']
+        current_month_total = totals['current_month_total']
+        current_month_expenses_only = totals['current_month_total']
+        # current_month_income is the counterpart to current_month_expenses_only.
+        # Without it the Dashboard had no monthly income figure available and its
+        # "Monthly Income" card was displaying total_income — a year-to-date
+        # number under a monthly label.
+        current_month_income = totals['current_month_income']
+        total_income = totals['total_income']
+        total_transfers = totals['total_transfers']
 
         # Sort monthly totals to ensure chronological order
-        sorted_monthly_totals = sorted(monthly_totals.items(), key=lambda x: x[0])
-
-        for month, data in sorted_monthly_totals:
+        monthly_labels = []
+        monthly_amounts = []
+        for month, data in sorted(monthly_totals.items(), key=lambda x: x[0]):
             monthly_labels.append(month)
             monthly_amounts.append(data['total'])
 
-        # Calculate totals for each transaction type.
-        #
-        # current_month_income is the counterpart to current_month_expenses_only
-        # below, which already existed. Without it the Dashboard had no monthly
-        # income figure available and its "Monthly Income" card was displaying
-        # total_income — a year-to-date number under a monthly label.
-        current_month_income = 0
-        for expense in expenses:
-            if hasattr(expense, 'transaction_type'):
-                if expense.transaction_type == 'income':
-                    total_income += expense.amount
-                    if expense.date.month == now.month and expense.date.year == now.year:
-                        current_month_income += expense.amount
-                elif expense.transaction_type == 'transfer':
-                    total_transfers += expense.amount
-
-        # Calculate user's share from expense splits
-        current_month_total = 0
-        current_month_expenses_only = 0
-        unique_cards = set()
-
-        for expense in expenses:
-            if expense.date.year != current_year:
-                continue
-
-            # **THE D-18 FIX.** This used to be the caller's SHARE of each split,
-            # while the income loop above summed whole amounts over the household
-            # — so `net_cash_flow` subtracted a caller-scoped figure from a
-            # household-scoped one and a member who had entered nothing saw a
-            # 100% savings rate. Attribution is the account's owner now, the query
-            # above is already scoped to exactly those rows, and the two terms
-            # finally describe the same people. The split shares are still
-            # computed and still used, by `_calculate_iou_data` — settling up is a
-            # different question from whose money it is.
-            if not hasattr(expense, 'transaction_type') or expense.transaction_type == 'expense':
-                total_expenses += expense.amount
-                total_expenses_only += expense.amount
-
-                if expense.date.month == now.month and expense.date.year == now.year:
-                    current_month_total += expense.amount
-                    current_month_expenses_only += expense.amount
-
-                if expense.card_used:
-                    unique_cards.add(expense.card_used)
-
-        # Calculate IOU data
-        iou_data = self._calculate_iou_data(user_id, expenses, expense_splits)
+        # Calculate IOU data. Only split rows can owe anyone anything.
+        iou_data = self._calculate_iou_data(
+            user_id, [expense.id for expense in totals['split_rows']],
+            users_map=users_map)
 
         # Calculate budget summary
         budget_summary = self._calculate_budget_summary(user_id, now, household_ids)
@@ -213,14 +150,16 @@ class AnalyticsService:
         return {
             'expenses': expenses,
             'expense_splits': expense_splits,
-            'top_categories': self._get_category_spending(expenses, expense_splits),
+            # The current calendar month, up to now.
+            'top_categories': category_spending(
+                scope_ids, start=datetime(now.year, now.month, 1), end=now),
             'monthly_totals': monthly_totals,
             'total_expenses': total_expenses,
             'total_expenses_only': total_expenses_only,
             'current_month_total': current_month_total,
             'current_month_expenses_only': current_month_expenses_only,
             'current_month_income': current_month_income,
-            'unique_cards': list(unique_cards),
+            'unique_cards': list(totals['unique_cards']),
             'users': users,
             'groups': groups,
             'iou_data': iou_data,
@@ -244,39 +183,33 @@ class AnalyticsService:
             'now': now
         }
 
-    def _calculate_iou_data(self, user_id, expenses, expense_splits):
-        """Calculate IOU balances between users"""
+    def _calculate_iou_data(self, user_id, expense_ids, users_map=None):
+        """Calculate IOU balances between users, over the split rows `expense_ids`.
+
+        Summed per counterpart from `expense_shares` instead of walking each
+        row's `calculate_splits()` result.
+        """
         from types import SimpleNamespace
+        from src.models.expense_share import ExpenseShare
+        from src.services.transaction import shares
 
         owes_me = {}  # People who owe current user
         i_owe = {}    # People current user owes
 
-        for expense in expenses:
-            splits = expense_splits[expense.id]
-            payer_id = splits['payer']['id']
-
-            # If current user is the payer
-            if payer_id == user_id:
-                # Track what others owe current user
-                for split in splits['splits']:
-                    split_user_id = split['id']
-                    user_name = split['name']
-                    amount = split['amount']
-
-                    if split_user_id not in owes_me:
-                        owes_me[split_user_id] = {'name': user_name, 'amount': 0}
-                    owes_me[split_user_id]['amount'] += amount
-
-            # If current user is in the splits (but not the payer)
-            elif user_id in [split['id'] for split in splits['splits']]:
-                payer = User.query.filter_by(id=payer_id).first()
-
-                # Find current user's split amount
-                current_user_split = next((split['amount'] for split in splits['splits'] if split['id'] == user_id), 0)
-
-                if payer_id not in i_owe:
-                    i_owe[payer_id] = {'name': payer.name if payer else 'Unknown', 'amount': 0}
-                i_owe[payer_id]['amount'] += current_user_split
+        def _name(uid):
+            if users_map is not None:
+                person = users_map.get(uid)
+            else:
+                person = User.query.filter_by(id=uid).first()
+            return person.name if person else 'Unknown'
+
+        rows = shares.debts_of(user_id, ExpenseShare.expense_id.in_(expense_ids)) \
+            if expense_ids else []
+        for row in rows:
+            if row.creditor == user_id:
+                owes_me[row.debtor] = {'name': _name(row.debtor), 'amount': row.total}
+            else:
+                i_owe[row.creditor] = {'name': _name(row.creditor), 'amount': row.total}
 
         # Calculate net balance
         total_owed = sum(data['amount'] for data in owes_me.values())
@@ -356,75 +289,6 @@ class AnalyticsService:
             budgets=budget_items
         )
 
-    UNCATEGORISED_LABEL = 'Uncategorised'
-
-    def _get_category_spending(self, expenses, expense_splits, start=None,
-                               end=None, limit=6, transaction_type='expense'):
-        """Total spending per category over a window, highest first.
-
-        `start`/`end` are inclusive datetime bounds; omitting both keeps the
-        historical behaviour of reporting the current calendar month. They were
-        added because /analytics/categories/top accepts start_date and end_date
-        from the client and had no way to honour them — the Week/Month/Year
-        selector on the Analytics page silently returned current-month figures
-        for all three.
-
-        `transaction_type` selects the direction, so the same aggregation backs
-        the income breakdown as well as the spending one.
-        """
-        if start is None and end is None:
-            now = datetime.now()
-            start = datetime(now.year, now.month, 1)
-            end = now
-
-        category_totals = {}
-
-        def add(name, amount, color, icon):
-            bucket = category_totals.setdefault(
-                name, {'amount': 0, 'color': color, 'icon': icon})
-            bucket['amount'] += amount
-
-        for expense in expenses:
-            if getattr(expense, 'transaction_type', 'expense') != transaction_type:
-                continue
-
-            if start is not None and expense.date < start:
-                continue
-            if end is not None and expense.date > end:
-                continue
-
-            if expense.category_splits:
-                for split in expense.category_splits:
-                    if split.category:
-                        add(split.category.name, split.amount,
-                            split.category.color, split.category.icon)
-                    else:
-                        # A split with no category still spent money. Dropping it
-                        # made the pie's slices sum to less than the reported
-                        # total with no indication anything was missing.
-                        add(self.UNCATEGORISED_LABEL, split.amount, None, None)
-            elif expense.category:
-                add(expense.category.name, expense.amount,
-                    expense.category.color, expense.category.icon)
-            else:
-                add(self.UNCATEGORISED_LABEL, expense.amount, None, None)
-
-        sorted_categories = sorted(
-            [
-                {
-                    'name': name,
-                    'amount': round(data['amount'], 2),
-                    'color': data['color'],
-                    'icon': data['icon']
-                }
-                for name, data in category_totals.items()
-            ],
-            key=lambda x: x['amount'],
-            reverse=True
-        )
-
-        return sorted_categories[:limit] if limit else sorted_categories
-
     def get_top_categories(self, user_id, limit=8, start=None, end=None,
                            transaction_type='expense', scope_ids=None):
         """Category totals for one date window, without the dashboard payload.
@@ -434,96 +298,44 @@ class AnalyticsService:
         build twenty other fields the caller discards. This queries the window
         the caller actually asked for.
         """
-        from src.utils.household import read_scope, scope_query
+        from src.services.analytics.aggregates import category_spending
+        from src.utils.household import read_scope
 
         household_ids = scope_ids or read_scope(user_id)
 
         # Attribution is the ACCOUNT's owner (owner decision 2026-08-06), so this
         # is the transactions list's own predicate rather than a second one.
         # `split_with` no longer answers "whose row is this" anywhere.
-        query = scope_query(household_ids).filter(
-            Expense.transaction_type == transaction_type)
-        if start is not None:
-            query = query.filter(Expense.date >= start)
-        if end is not None:
-            query = query.filter(Expense.date <= end)
-
-        return self._get_category_spending(
-            query.all(), {}, start=start, end=end, limit=limit,
-            transaction_type=transaction_type)
+        return category_spending(household_ids, start=start, end=end,
+                                 limit=limit, transaction_type=transaction_type)
 
     def get_spending_trends(self, user_id, months=6, scope_ids=None):
         """Get spending trends over time"""
-        from src.utils.household import read_scope, scope_query
+        from src.services.analytics.rollups import totals_by_month
+        from src.utils.household import read_scope
         household_ids = scope_ids or read_scope(user_id)
-        trends = []
-        for i in range(months):
-            month_date = datetime.now() - timedelta(days=30*i)
-            expenses = scope_query(household_ids).filter(
-                Expense.date >= datetime(month_date.year, month_date.month, 1),
-                Expense.date < datetime(month_date.year, month_date.month + 1, 1) if month_date.month < 12
-                    else datetime(month_date.year + 1, 1, 1)
-            ).all()
-            total = sum(e.amount for e in expenses)
-            trends.append({'month': month_date.strftime('%Y-%m'), 'total': total})
-        return trends
+        keys = [(datetime.now() - timedelta(days=30*i)).strftime('%Y-%m')
+                for i in range(months)]
+        totals = totals_by_month(household_ids, set(keys))
+        return [{'month': key, 'total': totals.get(key, 0)} for key in keys]
 
     def get_stats_data(self, user_id, scope_ids=None):
         """Get detailed statistics data"""
         # Get base dashboard data
         data = self.get_dashboard_data(user_id, scope_ids=scope_ids)
 
-        # Add monthly_income for stats page
-        from src.models.transaction import Expense
-        from src.utils.household import read_scope, scope_query
-        from sqlalchemy import or_
+        # Add monthly_income for stats page. The caller's SHARE of each month's
+        # income — see rollups.shares_by_month, which reads the split rows only.
+        from src.services.analytics.rollups import shares_by_month
+        from src.utils.household import read_scope
 
         household_ids = scope_ids or read_scope(user_id)
+        labels = data.get('monthly_labels', [])
+        shares = shares_by_month(user_id, household_ids,
+                                 months=set(labels)) if labels else {}
 
-        # Get all expenses for the household
-        # Attribution is the ACCOUNT's owner (owner decision 2026-08-06), so this
-        # is the transactions list's own predicate rather than a second one.
-        # `split_with` no longer answers "whose row is this" anywhere.
-        expenses = scope_query(household_ids).all()
-
-        # Pre-calculate splits
-        expense_splits = {}
-        for expense in expenses:
-            expense_splits[expense.id] = expense.calculate_splits()
-
-        # Track monthly income
-        monthly_income_dict = {}
-
-        for expense in expenses:
-            # Only process income transactions
-            if hasattr(expense, 'transaction_type') and expense.transaction_type == 'income':
-                month_key = expense.date.strftime('%Y-%m')
-
-                if month_key not in monthly_income_dict:
-                    monthly_income_dict[month_key] = 0
-
-                # Calculate user's portion of the income
-                splits = expense_splits[expense.id]
-                user_portion = 0
-
-                if splits['payer']['id'] == user_id:
-                    user_portion = splits['payer']['amount']
-                else:
-                    for split in splits['splits']:
-                        if split['id'] == user_id:
-                            user_portion = split['amount']
-                            break
-
-                monthly_income_dict[month_key] += user_portion
-
-        # Create monthly_income array in same order as monthly_labels
-        monthly_income = []
-        for label in data.get('monthly_labels', []):
-            # Convert label back to month_key format (YYYY-MM)
-            # If monthly_labels are already in YYYY-MM format, use directly
-            # Otherwise parse the format from the dashboard
-            month_key = label
-            monthly_income.append(monthly_income_dict.get(month_key, 0))
+        # monthly_labels are already in YYYY-MM format
+        monthly_income = [shares.get(label, {}).get('income', 0) for label in labels]
 
         # Add to data dictionary
         data['monthly_income'] = monthly_income
@@ -561,66 +373,24 @@ class AnalyticsService:
 
     def get_cashflow_data(self, user_id, months=6, scope_ids=None):
         """Get cash flow data for the last N months"""
-        from sqlalchemy import or_
-        from datetime import datetime, timedelta
         from calendar import month_abbr
-        from src.utils.household import read_scope, scope_query
+        from src.services.analytics.rollups import shares_by_month
+        from src.utils.household import read_scope
 
         household_ids = scope_ids or read_scope(user_id)
 
-        # Get all transactions for the household
-        # Attribution is the ACCOUNT's owner (owner decision 2026-08-06), so this
-        # is the transactions list's own predicate rather than a second one.
-        # `split_with` no longer answers "whose row is this" anywhere.
-        expenses = scope_query(household_ids).all()
-
-        # Pre-calculate splits
-        expense_splits = {}
-        for expense in expenses:
-            expense_splits[expense.id] = expense.calculate_splits()
-
-        # Calculate last N months
+        # Attribution is the ACCOUNT's owner (owner decision 2026-08-06); the
+        # rollups are read through `scope_query`'s own predicate.
         now = datetime.now()
-        monthly_data = []
-
-        for i in range(months - 1, -1, -1):
-            # Calculate month
-            target_date = now - timedelta(days=30*i)
-            month_start = datetime(target_date.year, target_date.month, 1)
-
-            if target_date.month < 12:
-                month_end = datetime(target_date.year, target_date.month + 1, 1)
-            else:
-                month_end = datetime(target_date.year + 1, 1, 1)
-
-            # Calculate totals for this month
-            income = 0
-            expense_total = 0
-
-            for expense in expenses:
-                if expense.date >= month_start and expense.date < month_end:
-                    splits = expense_splits[expense.id]
-                    user_share = 0
-
-                    # Find user's share
-                    if splits['payer']['id'] == user_id:
-                        user_share = splits['payer']['amount']
-                    else:
-                        for split in splits['splits']:
-                            if split['id'] == user_id:
-                                user_share = split['amount']
-                                break
-
-                    # Categorize by transaction type
-                    if hasattr(expense, 'transaction_type'):
-                        if expense.transaction_type == 'income':
-                            income += user_share
-                        elif expense.transaction_type == 'expense':
-                            expense_total += user_share
-                    else:
-                        # Default to expense if no type
-                        expense_total += user_share
+        targets = [now - timedelta(days=30*i) for i in range(months - 1, -1, -1)]
+        shares = shares_by_month(user_id, household_ids,
+                                 months={t.strftime('%Y-%m') for t in targets})
 
+        monthly_data = []
+        for target_date in targets:
+            month = shares.get(target_date.strftime('%Y-%m'), {})
+            income = month.get('income', 0)
+            expense_total = month.get('expense', 0)
             savings = income - expense_total
 
             monthly_data.append({
@@ -692,7 +462,8 @@ class AnalyticsService:
         from datetime import datetime
 
         # Get dashboard data for base calculations
-        dashboard_data = self.get_dashboard_data(user_id, scope_ids=scope_ids)
+        dashboard_data = self.get_dashboard_data(user_id, scope_ids=scope_ids,
+                                                 with_rows=False)
 
         total_income = dashboard_data.get('total_income', 0)
         total_expenses = dashboard_data.get('total_expenses_only', 0)
@@ -799,7 +570,8 @@ class AnalyticsService:
         of the payload reports. An empty list is a valid answer; the caller shows
         an empty state.
         """
-        dashboard_data = self.get_dashboard_data(user_id, scope_ids=scope_ids)
+        dashboard_data = self.get_dashboard_data(user_id, scope_ids=scope_ids,
+                                                 with_rows=False)
 
         current_assets = dashboard_data.get('total_assets', 0) or 0
         current_liabilities = dashboard_data.get('total_debts', 0) or 0
@@ -1,19 +1,19 @@
 """Date-scoped spending aggregation, computed in SQL.
 
-Deliberately not part of AnalyticsService: that class loads rows and sums them in
-Python loops (five sites in service.py), which is precisely what this exists to
-avoid. An MCP client asking "what did I spend last year" must not pull thousands
-of rows into a model's context, and a database can add numbers.
+Deliberately not part of AnalyticsService, whose dashboard used to load rows and
+sum them in Python loops — it now sums through `aggregates.py`, which this shares.
+An MCP client asking "what did I spend last year" must not pull thousands of rows
+into a model's context, and a database can add numbers.
 """
 from datetime import datetime
 
 from sqlalchemy import func
 
-from src.extensions import db
 from src.models.account import Account
 from src.models.category import Category
 from src.models.transaction import Expense
 from src.models.user import User
+from src.services.analytics.aggregates import UNCATEGORISED, month_key
 
 GROUP_CATEGORY = 'category'
 GROUP_MERCHANT = 'merchant'
@@ -21,8 +21,6 @@ GROUP_MONTH = 'month'
 GROUP_OWNER = 'owner'
 VALID_GROUPINGS = (GROUP_CATEGORY, GROUP_MERCHANT, GROUP_MONTH, GROUP_OWNER)
 
-UNCATEGORISED = 'Uncategorised'
-
 
 class InvalidSummaryRequest(Exception):
     """The caller's parameters cannot be honoured. Message is client-safe."""
@@ -135,12 +133,7 @@ def spending_summary(user_id, start_date, end_date, group_by=GROUP_CATEGORY):
                     func.count(Expense.id).label('count'))
                 .group_by(owner_key, User.name).all())
     else:
-        # There is no portable month-truncation function: strftime is SQLite-only,
-        # to_char is Postgres-only. func.cast is special-cased by SQLAlchemy into a
-        # real CAST construct, so this compiles to substr(CAST(date AS VARCHAR), 1, 7)
-        # on both dialects and yields 'YYYY-MM' from the ISO datetime text. (Postgres
-        # renders timestamps ISO-first under its default DateStyle.)
-        month = func.substr(func.cast(Expense.date, db.String), 1, 7)
+        month = month_key()
         rows = (base.with_entities(
                     month.label('key'),
                     month.label('label'),
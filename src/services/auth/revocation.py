@@ -0,0 +1,234 @@
+"""The JWT blocklist, answered from memory.
+
+`check_if_token_revoked` runs on every request that carries a JWT, and used to
+ask the database whether that token's `jti` was in `revoked_tokens` — a round
+trip per request to learn, almost always, that it was not. Nothing ever deleted
+a row, so the table it asked only grew.
+
+Each process now keeps the live revocations in a set, and every other check is
+a set lookup. At most every REFRESH_SECONDS it reads the rows above the highest
+`revoked_tokens.id` it has seen, and every FULL_REFRESH_SECONDS it reads the
+whole live set again in place of what it had. A revocation committed in this
+process is added at that commit, so logging out takes effect at once here;
+another worker usually sees it within REFRESH_SECONDS, and always within
+FULL_REFRESH_SECONDS.
+
+The full read is what makes "always" true. Ids are handed out when a row is
+inserted, not when it commits, so a row can become visible after a higher id
+already has and the read by id would step over it. Each of those reads goes
+back _SLACK ids below the highest seen, which catches the usual case sooner,
+but no window of ids bounds how late a transaction commits; the full read
+does not depend on one.
+
+── EXPIRY ─────────────────────────────────────────────────────────────────────
+
+A revoked token only needs its row until the token would have expired anyway;
+past that, flask-jwt-extended rejects it before the blocklist is asked. Rows
+record that moment in `expires_at` (the token's `exp` at logout; the longest
+lifetime any token can have when only the jti is known). `purge` deletes the
+ones that have passed and runs nightly from the scheduler, and each process
+drops them from its set on the same terms.
+
+A plain set rather than a Bloom filter in front of one: the exact set is small
+(revocations younger than the longest token lifetime) and its lookup is already
+a single hash probe, which is what a filter would have saved. The same size is
+why reading all of it once a minute is cheap.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+
+from flask import current_app
+from sqlalchemy import and_, event, or_, select
+from sqlalchemy.orm import object_session
+
+from src.extensions import db
+from src.models.user import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+#: How long a process answers from its set before reading new revocations.
+REFRESH_SECONDS = 5
+
+#: How often the whole live set is read again, which is the longest a logout in
+#: another worker can take to land here. It also drops expired entries.
+FULL_REFRESH_SECONDS = 60
+
+#: Ids below the watermark read again by the reads in between; see the module
+#: docstring. A shortcut only: correctness rests on the full read.
+_SLACK = 64
+
+
+def longest_lifetime():
+    """The longest any token this app issues can live, or None if one never expires."""
+    lives = []
+    for key in ('JWT_ACCESS_TOKEN_EXPIRES', 'JWT_REFRESH_TOKEN_EXPIRES'):
+        value = current_app.config.get(key)
+        if value is False or value is None:
+            return None
+        lives.append(value if isinstance(value, timedelta) else timedelta(seconds=value))
+    return max(lives)
+
+
+def token_expiry(claims):
+    """The `exp` of decoded JWT claims as a naive UTC datetime, or None."""
+    exp = claims.get('exp')
+    if exp is None:
+        return None
+    return datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+
+
+class _Blocklist:
+    """The revoked jtis this process knows of, and the id it has read up to."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything; the next check reads the live rows afresh."""
+        self._revoked = {}  # jti → when it can be forgotten (None: never)
+        self._watermark = None
+        self._next_refresh = 0.0
+        self._next_full = 0.0
+
+    def __contains__(self, jti):
+        return jti in self._revoked
+
+    def add(self, jti, forget_at):
+        with self._lock:
+            self._revoked[jti] = forget_at
+
+    def refresh_if_due(self):
+        if monotonic() < self._next_refresh:
+            return
+        with self._lock:
+            now = monotonic()
+            if now < self._next_refresh:
+                return  # another thread refreshed while this one waited
+            if now >= self._next_full:
+                self._revoked = self._read(full=True)
+                self._next_full = now + FULL_REFRESH_SECONDS
+            else:
+                self._revoked.update(self._read(full=False))
+            self._next_refresh = now + REFRESH_SECONDS
+
+    def _read(self, full):
+        """`{jti: forget_at}` of the live rows, all of them or those past the watermark."""
+        now = datetime.utcnow()
+        query = select(RevokedToken.id, RevokedToken.jti,
+                       RevokedToken.expires_at, RevokedToken.revoked_at).where(
+            or_(RevokedToken.expires_at.is_(None), RevokedToken.expires_at > now))
+        if not full:
+            query = query.where(RevokedToken.id > self._watermark - _SLACK)
+        lifetime = longest_lifetime()
+        watermark = self._watermark or 0
+        revoked = {}
+        for row_id, jti, expires_at, revoked_at in db.session.execute(query):
+            watermark = max(watermark, row_id)
+            forget_at = _forget_at(expires_at, revoked_at, lifetime)
+            if forget_at is None or forget_at > now:
+                revoked[jti] = forget_at
+        self._watermark = watermark
+        return revoked
+
+
+def _forget_at(expires_at, revoked_at, lifetime):
+    if expires_at is not None:
+        return expires_at
+    # Rows from before `expires_at` existed.
+    if lifetime is None or revoked_at is None:
+        return None
+    return revoked_at + lifetime
+
+
+_blocklist = _Blocklist()
+
+
+def is_revoked(jti):
+    """Whether `jti` has been revoked. A set lookup between refreshes."""
+    _blocklist.refresh_if_due()
+    return jti in _blocklist
+
+
+def revoke(jti, expires_at=None):
+    """Add `jti` to the blocklist unless it is already there. The caller commits.
+
+    `expires_at` is when the token would expire anyway; without it the row is
+    kept for the longest lifetime a token can have. Returns whether a row was
+    added.
+    """
+    if RevokedToken.is_revoked(jti):
+        return False
+    if expires_at is None:
+        lifetime = longest_lifetime()
+        expires_at = datetime.utcnow() + lifetime if lifetime else None
+    db.session.add(RevokedToken(jti=jti, expires_at=expires_at))
+    return True
+
+
+def purge(now=None):
+    """Delete the rows whose token has expired. Returns how many went.
+
+    A row with no `expires_at` predates the column and goes once the longest
+    token lifetime has passed since it was revoked. The caller commits.
+    """
+    now = now or datetime.utcnow()
+    expired = and_(RevokedToken.expires_at.isnot(None), RevokedToken.expires_at <= now)
+    lifetime = longest_lifetime()
+    if lifetime is not None:
+        expired = or_(expired, and_(RevokedToken.expires_at.is_(None),
+                                    RevokedToken.revoked_at <= now - lifetime))
+    return RevokedToken.query.filter(expired).delete(synchronize_session=False)
+
+
+def reset():
+    """Drop this process's set, so the next check reads the table again."""
+    with _blocklist._lock:
+        _blocklist.reset()
+
+
+# ---------------------------------------------------------------------------
+# A revocation made in this process is known here at the commit that writes
+# it, without waiting for the next refresh. Noted at the insert and added only
+# once the outermost transaction commits: a token whose revocation rolled back
+# is not revoked.
+# ---------------------------------------------------------------------------
+
+_REVOKED_HERE = 'revoked_jtis'
+
+
+@event.listens_for(RevokedToken, 'after_insert')
+def _note_revocation(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        transaction = session.get_nested_transaction() or session.get_transaction()
+        session.info.setdefault(_REVOKED_HERE, []).append(
+            (transaction, target.jti, target.expires_at))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _revoked_here(session):
+    # Also fires when a SAVEPOINT is released; only the outermost commit counts.
+    if session.in_nested_transaction():
+        return
+    for _, jti, expires_at in session.info.pop(_REVOKED_HERE, ()):
+        _blocklist.add(jti, expires_at)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _not_revoked_after_all(session, previous_transaction):
+    # Drops what the rolled-back transaction, or a SAVEPOINT inside it, inserted.
+    noted = session.info.get(_REVOKED_HERE)
+    if noted:
+        noted[:] = [note for note in noted
+                    if not _within(note[0], previous_transaction)]
+
+
+def _within(transaction, outer):
+    while transaction is not None:
+        if transaction is outer:
+            return True
+        transaction = transaction.parent
+    return False
@@ -189,6 +189,10 @@ class AuthService:
             from src.models.group import Settlement, Group
             from src.models.category import CategoryMapping, Tag, Category
             from src.models.account import SimpleFin, Account
+            from src.services.account import snapshots
+            from src.services.analytics import rollups
+            from src.services.transaction import shares
+            from src.services.group import ledger
             from sqlalchemy import or_
 
             # Delete all related data in the correct order
@@ -202,13 +206,18 @@ class AuthService:
 
             # 3. Delete expenses
             current_app.logger.info("Deleting expenses...")
+            groups = ledger.groups_with(Expense.user_id == user_id)
+            shares.forget(Expense.user_id == user_id)
             Expense.query.filter_by(user_id=user_id).delete()
+            rollups.rebuild([user_id])
+            ledger.rebuild(groups)
 
             # 4. Delete settlements
             current_app.logger.info("Deleting settlements...")
             Settlement.query.filter(
                 or_(Settlement.payer_id == user_id, Settlement.receiver_id == user_id)
             ).delete(synchronize_session=False)
+            ledger.rebuild_settlements()
 
             # 5. Delete category mappings
             current_app.logger.info("Deleting category mappings...")
@@ -224,6 +233,7 @@ class AuthService:
 
             # 8. Handle user's accounts
             current_app.logger.info("Deleting accounts...")
+            snapshots.forget(Account.user_id == user_id)
             Account.query.filter_by(user_id=user_id).delete()
 
             # 9. Handle tags - first remove from association table
@@ -0,0 +1,8 @@
+"""
+Backup Service Module
+Handles Settings → "Export my data" and the restore that reads it back
+
+The file format is `schema_version` 1.0, and the export writes it table by table
+as it reads rows, and the restore reads it back a row at a time and inserts it
+in chunks, so a worker never holds a user's whole history at once.
+"""
@@ -0,0 +1,137 @@
+"""`GET /users/export`, written as it is read.
+
+The handler used to load every account, transaction, budget and category into
+lists, build one dict, `json.dumps(..., indent=2)` it into a string and copy that
+into a `BytesIO` — three whole copies of a user's history alive at once. With ten
+years of transactions that peaked at several hundred MB per worker, and a
+gunicorn worker that size is one the OOM killer picks.
+
+`export_chunks` yields the same document in pieces instead. Each table is read
+with `yield_per`, as plain column rows rather than ORM objects, and each row is
+encoded and handed to the response before the next batch is fetched. Memory is
+one batch plus one output buffer, however long the history.
+
+*** THE FORMAT DOES NOT CHANGE. *** The keys, their order of tables and the
+`schema_version` are what `_import_user_data` reads (1.0). Only the whitespace is
+different: one row per line instead of `indent=2`, which a JSON reader ignores.
+"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from src.extensions import db
+from src.models.account import Account
+from src.models.budget import Budget
+from src.models.category import Category
+from src.models.transaction import Expense
+from src.models.user import User
+
+SCHEMA_VERSION = '1.0'
+
+#: Rows fetched per round trip.
+_BATCH = 500
+
+#: Bytes of encoded output gathered before a chunk is handed to the response.
+#: One `yield` per row would cost a WSGI write per transaction.
+_CHUNK = 64 * 1024
+
+# Each section is (key, statement, row -> dict). Columns only: an ORM object per
+# row would bring its identity-map entry and relationship state with it, and
+# the identity map is exactly what grew without bound.
+_SECTIONS = (
+    ('categories',
+     lambda user_id: select(Category.id, Category.name, Category.icon,
+                            Category.color, Category.parent_id, Category.is_system)
+     .where(Category.user_id == user_id)
+     # Subcategories after parents, so the import can rebuild the tree.
+     .order_by(Category.parent_id.nullsfirst()),
+     lambda r: {'exported_id': r.id, 'name': r.name, 'icon': r.icon,
+                'color': r.color, 'parent_exported_id': r.parent_id,
+                'is_system': r.is_system}),
+    ('accounts',
+     lambda user_id: select(Account.name, Account.type, Account.institution,
+                            Account.balance, Account.currency_code, Account.color,
+                            Account.import_source)
+     .where(Account.user_id == user_id),
+     lambda r: {'name': r.name, 'type': r.type, 'institution': r.institution,
+                'balance': r.balance, 'currency_code': r.currency_code,
+                'color': r.color, 'import_source': r.import_source}),
+    ('transactions',
+     lambda user_id: select(Expense.description, Expense.amount, Expense.date,
+                            Expense.transaction_type, Expense.category_id,
+                            Expense.card_used, Expense.split_method,
+                            Expense.paid_by, Expense.currency_code,
+                            Expense.original_amount, Expense.import_source,
+                            Expense.external_id)
+     .where(Expense.user_id == user_id)
+     .order_by(Expense.date.desc()),
+     lambda r: {'description': r.description, 'amount': r.amount,
+                'date': r.date.isoformat() if r.date else None,
+                'transaction_type': r.transaction_type,
+                'category_exported_id': r.category_id,
+                'card_used': r.card_used, 'split_method': r.split_method,
+                'paid_by': r.paid_by, 'currency_code': r.currency_code,
+                'original_amount': r.original_amount,
+                'import_source': r.import_source, 'external_id': r.external_id}),
+    ('budgets',
+     lambda user_id: select(Budget.name, Budget.amount, Budget.period,
+                            Budget.category_id, Budget.include_subcategories,
+                            Budget.is_recurring, Budget.active, Budget.rollover)
+     .where(Budget.user_id == user_id),
+     lambda r: {'name': r.name, 'amount': r.amount, 'period': r.period,
+                'category_exported_id': r.category_id,
+                'include_subcategories': r.include_subcategories,
+                'is_recurring': r.is_recurring, 'active': r.active,
+                'rollover': r.rollover}),
+)
+
+
+def export_filename(now=None):
+    return f'finpal_export_{(now or datetime.now()).strftime("%Y%m%d")}.json'
+
+
+def export_chunks(user_id):
+    """The export document for `user_id`, as a sequence of `str` chunks.
+
+    The caller checks the user exists first: once the first chunk is sent the
+    status line has gone, and an error can no longer become a 404.
+    """
+    # D-73: the app's encoder, or the first `Decimal` or `datetime` raises.
+    from src import _DecimalJSONEncoder
+    encoder = _DecimalJSONEncoder()
+
+    user = db.session.get(User, user_id)
+    buffer = []
+    size = 0
+
+    def emit(text):
+        nonlocal size
+        buffer.append(text)
+        size += len(text)
+
+    emit('{\n')
+    emit('"schema_version": %s,\n' % encoder.encode(SCHEMA_VERSION))
+    emit('"exported_at": %s,\n' % encoder.encode(datetime.utcnow().isoformat()))
+    emit('"user": %s' % encoder.encode({
+        'email': user.id,
+        'name': user.name,
+        'default_currency_code': user.default_currency_code,
+        'timezone': user.timezone,
+        'created_at': user.created_at.isoformat() if user.created_at else None,
+    }))
+
+    for key, statement, to_dict in _SECTIONS:
+        emit(',\n%s: [' % encoder.encode(key))
+        separator = '\n'
+        rows = db.session.execute(
+            statement(user_id).execution_options(yield_per=_BATCH))
+        for row in rows:
+            emit(separator + encoder.encode(to_dict(row)))
+            separator = ',\n'
+            if size >= _CHUNK:
+                yield ''.join(buffer)
+                buffer, size = [], 0
+        emit('\n]')
+
+    emit('\n}\n')
+    yield ''.join(buffer)
@@ -0,0 +1,359 @@
+"""`POST /users/import`: an export read back in pieces and written in chunks.
+
+The handler used to `json.load` the upload — the whole history as one tree of
+dicts — then add every category, account, transaction and budget as an ORM
+object, flushing after each category and account to learn its id. Ten years of
+transactions meant the document, plus a Python object per row in the identity
+map, plus a round trip per parent row.
+
+`read_backup` walks the top-level object of the file instead, yielding the
+small members whole and the four tables as iterators that decode one row at a
+time. `restore` consumes them in chunks of `_CHUNK` rows, one `INSERT` per chunk.
+Exported category ids are translated through a dict filled from each chunk's
+`RETURNING`, which is all the old per-row flush was for.
+
+── ALL OR NOTHING ─────────────────────────────────────────────────────────────
+
+Nothing is committed until the last row has been read. A file that turns out to
+be malformed half way through raises, and the caller rolls back every chunk
+already inserted — exactly what happened when `json.load` failed up front.
+
+── WHAT THE BULK INSERTS SKIP ─────────────────────────────────────────────────
+
+Core inserts do not flush, so the session hooks never see the restored rows.
+`monthly_rollups` is rebuilt for the user before the commit. `expense_shares`
+and `ledger_balances` need nothing: the format carries no `split_with`, so a
+restored row is never split. The `expenses_created` module dispatch is not sent;
+a restore is history being put back, not spending happening now.
+"""
+import codecs
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from src.extensions import db
+from src.models.account import Account
+from src.models.budget import Budget
+from src.models.category import Category
+from src.models.transaction import Expense
+from src.services.analytics import rollups
+from src.utils.money import to_money
+
+logger = logging.getLogger(__name__)
+
+#: The members that are read a row at a time, in the order the export writes them.
+TABLES = ('categories', 'accounts', 'transactions', 'budgets')
+
+#: Rows per INSERT.
+_CHUNK = 500
+
+#: Bytes read from the upload at a time.
+_READ = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class BackupUnreadable(ValueError):
+    """The upload is not a JSON object, or stops being one part way through.
+
+    `lineno` and `colno` point at the problem in the user's own file, which is
+    what they need to fix it; both are None when the bytes are not UTF-8.
+    Deliberately no message quoting the file (CONTRIBUTING: no transaction data
+    in errors).
+    """
+
+    def __init__(self, lineno=None, colno=None):
+        super().__init__('unreadable backup')
+        self.lineno = lineno
+        self.colno = colno
+
+
+class _Reader:
+    """A window over the upload, refilled as values are decoded out of it.
+
+    `raw_decode` on a buffer that ends part way through a value fails; the
+    reader then appends the next block and tries again, so a row is never
+    split across reads. Only the text after the last decoded value is kept.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._decode = codecs.getincrementaldecoder('utf-8-sig')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        # Where `_buffer[0]` sits in the file, for error positions.
+        self._line = 1
+        self._col = 1
+
+    def _fill(self):
+        if self._eof:
+            return False
+        block = self._stream.read(_READ)
+        try:
+            text = self._decode.decode(block or b'', final=not block)
+        except UnicodeDecodeError:
+            raise BackupUnreadable() from None
+        if not block:
+            self._eof = True
+        # Drop what has been consumed, keeping the position bookkeeping.
+        consumed = self._buffer[:self._pos]
+        newlines = consumed.count('\n')
+        if newlines:
+            self._line += newlines
+            self._col = len(consumed) - consumed.rfind('\n')
+        else:
+            self._col += len(consumed)
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return True
+
+    def error(self, pos=None):
+        prefix = self._buffer[:self._pos if pos is None else pos]
+        newlines = prefix.count('\n')
+        if newlines:
+            return BackupUnreadable(self._line + newlines,
+                                    len(prefix) - prefix.rfind('\n'))
+        return BackupUnreadable(self._line, self._col + len(prefix))
+
+    def peek(self):
+        """The next non-whitespace character, not consumed; '' at the end."""
+        while True:
+            while (self._pos < len(self._buffer)
+                   and self._buffer[self._pos] in _WHITESPACE):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def take(self, expected):
+        char = self.peek()
+        if char not in expected or not char:
+            raise self.error()
+        self._pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise self.error(e.pos) from None
+            # A number or literal that ends with the buffer may be the start
+            # of a longer one: `12` of `1234`.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def items(self):
+        self.take('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.take(',]') == ']':
+                return
+
+    def finish(self):
+        if self.peek():
+            raise self.error()
+
+
+def read_backup(stream):
+    """Yield `(key, value)` for each member of the export object in `stream`.
+
+    `stream` is a binary file. For the keys in `TABLES` the value is an
+    iterator over the rows, decoded as it is advanced; it has to be consumed
+    (or abandoned) before the next member is asked for, as the file is only read
+    forwards. Raises `BackupUnreadable` where the file stops making sense.
+    """
+    reader = _Reader(stream)
+    reader.take('{')
+    if reader.peek() == '}':
+        reader.take('}')
+        reader.finish()
+        return
+    while True:
+        if reader.peek() != '"':
+            raise reader.error()
+        key = reader.value()
+        reader.take(':')
+        if key in TABLES and reader.peek() == '[':
+            rows = reader.items()
+            yield key, rows
+            for _ in rows:
+                pass
+        else:
+            yield key, reader.value()
+        if reader.take(',}') == '}':
+            break
+    reader.finish()
+
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= _CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _date(raw):
+    try:
+        return datetime.fromisoformat(raw) if raw else datetime.utcnow()
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+
+
+class _Restore:
+    """The state of one restore: the id map, the counts, the progress report."""
+
+    def __init__(self, user_id, progress):
+        self.user_id = user_id
+        self.progress = progress
+        self.category_ids = {}  # exported id → new id
+        self.stats = {table: 0 for table in TABLES}
+
+    def _report(self, table, count):
+        self.stats[table] += count
+        # Counts only; never a row (CONTRIBUTING).
+        logger.info('Restoring a backup for %s: %d %s', self.user_id,
+                    self.stats[table], table)
+        if self.progress:
+            self.progress(table, self.stats[table])
+
+    def _category(self, exported_id):
+        return self.category_ids.get(exported_id) if exported_id else None
+
+    def categories(self, rows):
+        # The export writes parents first, so a parent is normally already in
+        # the map, or in the chunk being gathered. In the second case the chunk
+        # is written early: its RETURNING is the only way to learn the id.
+        pending, waiting = [], set()
+        for data in rows:
+            parent = data.get('parent_exported_id')
+            if parent is not None and parent in waiting:
+                self._insert_categories(pending)
+                pending, waiting = [], set()
+            pending.append(data)
+            waiting.add(data.get('exported_id'))
+            if len(pending) >= _CHUNK:
+                self._insert_categories(pending)
+                pending, waiting = [], set()
+        if pending:
+            self._insert_categories(pending)
+
+    def _insert_categories(self, chunk):
+        ids = db.session.execute(
+            insert(Category).returning(Category.id, sort_by_parameter_order=True),
+            [{'name': data.get('name', 'Unnamed'),
+              'icon': data.get('icon', '🏷️'),
+              'color': data.get('color', '#6c757d'),
+              'parent_id': self._category(data.get('parent_exported_id')),
+              'user_id': self.user_id,
+              'is_system': data.get('is_system', False)}
+             for data in chunk]).scalars().all()
+        for data, new_id in zip(chunk, ids):
+            exported_id = data.get('exported_id')
+            if exported_id is not None:
+                self.category_ids[exported_id] = new_id
+        self._report('categories', len(chunk))
+
+    def accounts(self, rows):
+        for chunk in _chunks(rows):
+            db.session.execute(insert(Account), [
+                {'name': data.get('name', 'Unnamed Account'),
+                 'type': data.get('type', 'checking'),
+                 'institution': data.get('institution'),
+                 'balance': to_money(data.get('balance', 0)),
+                 'currency_code': data.get('currency_code'),
+                 'color': data.get('color'),
+                 'import_source': data.get('import_source'),
+                 'user_id': self.user_id}
+                for data in chunk])
+            self._report('accounts', len(chunk))
+
+    def transactions(self, rows):
+        for chunk in _chunks(rows):
+            db.session.execute(insert(Expense), [
+                {'description': data.get('description', ''),
+                 'amount': to_money(data.get('amount', 0)),
+                 'date': _date(data.get('date')),
+                 'transaction_type': data.get('transaction_type', 'expense'),
+                 'category_id': self._category(data.get('category_exported_id')),
+                 'card_used': data.get('card_used', ''),
+                 'split_method': data.get('split_method', 'none'),
+                 'paid_by': data.get('paid_by', self.user_id),
+                 'user_id': self.user_id,
+                 'currency_code': data.get('currency_code'),
+                 'original_amount': to_money(data.get('original_amount')),
+                 'import_source': data.get('import_source', 'import'),
+                 'external_id': data.get('external_id')}
+                for data in chunk])
+            self._report('transactions', len(chunk))
+
+    def budgets(self, rows):
+        # A budget needs a category; one whose category did not come across is
+        # dropped, as it always was.
+        kept = (data for data in rows
+                if self._category(data.get('category_exported_id')))
+        for chunk in _chunks(kept):
+            db.session.execute(insert(Budget), [
+                {'name': data.get('name'),
+                 'amount': to_money(data.get('amount', 0)),
+                 'period': data.get('period', 'monthly'),
+                 'category_id': self._category(data.get('category_exported_id')),
+                 'include_subcategories': data.get('include_subcategories', True),
+                 'is_recurring': data.get('is_recurring', True),
+                 'active': data.get('active', True),
+                 'rollover': data.get('rollover', False),
+                 'user_id': self.user_id}
+                for data in chunk])
+            self._report('budgets', len(chunk))
+
+
+def restore(user_id, members, progress=None):
+    """Write the `(key, value)` pairs of an export into `user_id`'s data.
+
+    `members` is `read_backup(stream)`, or the `.items()` of an export already
+    in memory. `progress(table, rows_so_far)` is called after every chunk.
+    Commits once, at the end; on any exception the caller rolls back and
+    nothing is changed. Returns the row counts per table.
+    """
+    state = _Restore(user_id, progress)
+    # Transactions and budgets refer to categories. A file that lists them
+    # first (the export never does) has them held until the map exists.
+    held = {}
+    seen_categories = False
+    for key, value in members:
+        if key not in TABLES:
+            continue
+        if key in ('transactions', 'budgets') and not seen_categories:
+            held[key] = list(value)
+            continue
+        getattr(state, key)(value)
+        if key == 'categories':
+            seen_categories = True
+            for held_key in ('transactions', 'budgets'):
+                if held_key in held:
+                    getattr(state, held_key)(held.pop(held_key))
+    for held_key in ('transactions', 'budgets'):
+        if held_key in held:
+            getattr(state, held_key)(held.pop(held_key))
+
+    # The bulk inserts never flushed, so the rollup hook has not seen them.
+    rollups.rebuild([user_id])
+    db.session.commit()
+    return state.stats
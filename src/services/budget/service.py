@@ -8,6 +8,7 @@ from flask import current_app
 from src.extensions import db
 from src.models.budget import Budget
 from src.models.category import Category
+from src.services.budget.spend import BudgetSpendCalculator, month_period
 from src.utils.currency_converter import get_base_currency
 
 
@@ -32,13 +33,16 @@ class BudgetService:
 
         budgets = Budget.query.filter(Budget.user_id.in_(get_all_user_ids())).order_by(Budget.created_at.desc()).all()
 
+        period = month_period(year, month)
+        calculator = BudgetSpendCalculator(budgets, [period])
+
         budget_data = []
         total_month_budget = 0
         total_month_spent = 0
 
         for budget in budgets:
             # Calculate spent for the specified month
-            spent = budget.calculate_spent_amount(year=year, month=month)
+            spent = calculator.spent(budget, period)
             remaining = budget.amount - spent
             percentage = (spent / budget.amount * 100) if budget.amount > 0 else 0
 
@@ -368,14 +372,17 @@ class BudgetService:
         budgets = Budget.query.filter(Budget.user_id.in_(get_all_user_ids()), Budget.active == True).all()
 
         today = datetime.utcnow()
+        # i=5 is 5 months ago, i=0 is current month
+        months = [today - relativedelta(months=i) for i in range(5, -1, -1)]
+        periods = [month_period(d.year, d.month) for d in months]
+        # Six months of every budget in one pass, not six per budget.
+        calculator = BudgetSpendCalculator(budgets, periods)
 
         trends_data = []
         for budget in budgets:
             historical_data = []
-            for i in range(5, -1, -1):
-                # i=5 is 5 months ago, i=0 is current month
-                period_date = today - relativedelta(months=i)
-                spent = budget.calculate_spent_amount(year=period_date.year, month=period_date.month)
+            for period_date, period in zip(months, periods):
+                spent = calculator.spent(budget, period)
                 historical_data.append({
                     'period': period_date.strftime('%Y-%m'),
                     'spent': spent,
@@ -401,6 +408,7 @@ class BudgetService:
         total_spent = 0
         on_track_count = 0
         over_budget_count = 0
+        BudgetSpendCalculator(budgets).prime()
 
         for budget in budgets:
             if budget.period == 'monthly':
@@ -0,0 +1,168 @@
+"""What a set of budgets has spent, answered in a fixed number of queries.
+
+`Budget.calculate_spent_amount` is three queries — the category's children, its
+expenses, its category splits — and `BudgetSchema` reaches it three times per
+budget, through `get_spent`, `get_remaining` and `get_percentage`. Listing twenty
+budgets was ~180 round trips, and `BudgetService.get_trends_data` did it again for
+each of six months.
+
+A `BudgetSpendCalculator` takes every budget and every period a page needs and
+answers all of them with:
+
+  * one query for the children of the budgets' categories;
+  * one `GROUP BY category_id` over `expenses`, with a `SUM(CASE ...)` column per
+    period — periods overlap (a weekly and a monthly budget both contain today), so
+    a single bucketing expression cannot place each row in exactly one;
+  * the same over `category_splits`, joined to its expense for date and scope.
+
+A budget's figure is then the sum of its categories' cells, in Python.
+
+*** THIS IS NOW THE ONLY COPY OF THE ARITHMETIC. *** `calculate_spent_amount`
+builds a one-budget calculator rather than keeping its own queries, so the list,
+the overview and a single budget's progress cannot disagree.
+
+`prime()` stores each answer on the budget itself, keyed by period and by the
+category fields it was computed from, and `calculate_spent_amount` returns a
+primed figure without querying. On the instance rather than on the schema because
+`budgets_schema` is a module-level singleton shared across requests (see
+`current_viewer_ids`); an instance lives in one request's session.
+"""
+from calendar import monthrange
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, case, func, or_
+
+from src.extensions import db
+from src.models.category import Category
+from src.models.transaction import CategorySplit, Expense
+from src.utils.money import money_or_zero
+
+_PRIMED = '_primed_spend'
+
+
+def month_period(year, month):
+    """The (start, end) of a calendar month, as `calculate_spent_amount` bounds it."""
+    last_day = monthrange(year, month)[1]
+    return datetime(year, month, 1), datetime(year, month, last_day, 23, 59, 59)
+
+
+def _prime_key(budget, period):
+    # The category fields are part of the key so an edit in the same request —
+    # PUT then dump — is never answered with the old category's figure.
+    return (period, budget.category_id, bool(budget.include_subcategories))
+
+
+def primed_spend(budget, period):
+    """A figure `prime()` stored for `budget` over `period`, or None."""
+    return getattr(budget, _PRIMED, {}).get(_prime_key(budget, period))
+
+
+def is_primed(budget):
+    """Whether `budget`'s current period has already been answered."""
+    return primed_spend(budget, budget.get_current_period_dates()) is not None
+
+
+class BudgetSpendCalculator:
+    """Spend for many budgets over many periods, in three queries.
+
+    Args:
+        budgets: The `Budget` rows to answer for
+        periods: (start, end) pairs asked of every budget; None asks each budget
+            for its own current period, which differs by weekly/monthly/yearly
+        viewer_ids: Whose transactions count; defaults to `current_viewer_ids()`,
+            the scope `calculate_spent_amount` has always used (D-20, D-66)
+    """
+
+    def __init__(self, budgets, periods=None, viewer_ids=None):
+        from src.utils.household import current_viewer_ids
+
+        self.budgets = list(budgets)
+        if periods is None:
+            self._periods = {b.id: [b.get_current_period_dates()]
+                             for b in self.budgets}
+        else:
+            periods = list(dict.fromkeys(periods))
+            self._periods = {b.id: periods for b in self.budgets}
+        self.viewer_ids = (current_viewer_ids() if viewer_ids is None
+                           else list(viewer_ids))
+        self._categories = {}
+        self._totals = {}
+        self._computed = False
+
+    def _compute(self):
+        self._computed = True
+        if not self.budgets:
+            return
+
+        roots = {b.category_id for b in self.budgets}
+        wanted = {b.category_id for b in self.budgets if b.include_subcategories}
+        children = {}
+        if wanted:
+            for child_id, parent_id in db.session.query(
+                    Category.id, Category.parent_id).filter(
+                    Category.parent_id.in_(wanted)):
+                children.setdefault(parent_id, []).append(child_id)
+        for budget in self.budgets:
+            ids = [budget.category_id]
+            if budget.include_subcategories:
+                ids += children.get(budget.category_id, [])
+            self._categories[budget.id] = ids
+        category_ids = roots.union(*children.values())
+
+        windows = sorted({p for ps in self._periods.values() for p in ps})
+        earliest = min(start for start, _ in windows)
+        latest = max(end for _, end in windows)
+
+        def sums(amount):
+            return [func.sum(case((and_(Expense.date >= start, Expense.date <= end),
+                                   amount), else_=0))
+                    for start, end in windows]
+
+        in_scope = and_(Expense.user_id.in_(self.viewer_ids),
+                        Expense.date >= earliest, Expense.date <= latest)
+
+        # A row whose amount is carried by CategorySplit rows is counted by the
+        # second query instead, or it would be counted twice.
+        whole = db.session.query(Expense.category_id, *sums(Expense.amount)).filter(
+            in_scope,
+            Expense.category_id.in_(category_ids),
+            or_(Expense.has_category_splits.is_(None),
+                Expense.has_category_splits == False),  # noqa: E712
+        ).group_by(Expense.category_id)
+
+        split = db.session.query(
+            CategorySplit.category_id, *sums(CategorySplit.amount)
+        ).join(Expense, CategorySplit.expense_id == Expense.id).filter(
+            in_scope,
+            CategorySplit.category_id.in_(category_ids),
+        ).group_by(CategorySplit.category_id)
+
+        for query in (whole, split):
+            for category_id, *cells in query:
+                for window, cell in zip(windows, cells):
+                    key = (category_id, window)
+                    self._totals[key] = (self._totals.get(key, Decimal('0'))
+                                         + money_or_zero(cell))
+
+    def spent(self, budget, period=None):
+        """`budget`'s spend over `period`, or over its current period if None."""
+        if not self._computed:
+            self._compute()
+        if period is None:
+            period = self._periods[budget.id][0]
+        total = Decimal('0')
+        for category_id in self._categories.get(budget.id, ()):
+            total += self._totals.get((category_id, period), Decimal('0'))
+        return total
+
+    def prime(self):
+        """Store every answer on its budget for `calculate_spent_amount` to return."""
+        for budget in self.budgets:
+            primed = getattr(budget, _PRIMED, None)
+            if primed is None:
+                primed = {}
+                setattr(budget, _PRIMED, primed)
+            for period in self._periods[budget.id]:
+                primed[_prime_key(budget, period)] = self.spent(budget, period)
+        return self
@@ -10,6 +10,7 @@ from src.models.category import Category, CategoryMapping
 from src.models.transaction import Expense
 from src.models.recurring import RecurringExpense
 from src.models.budget import Budget
+from src.services.analytics import rollups
 from src.utils.helpers import auto_categorize_transaction
 
 class CategoryService:
@@ -197,6 +198,11 @@ class CategoryService:
                 Category.user_id.in_(self.household_user_ids()),
             ).first()
 
+            # The reassignments below are bulk UPDATEs, which the rollup flush
+            # hook never sees.
+            touched = rollups.users_with(Expense.category_id.in_(
+                [category_id] + [sub.id for sub in category.subcategories]))
+
             if category.subcategories:
                 for subcategory in category.subcategories:
                     Expense.query.filter_by(category_id=subcategory.id).update({
@@ -218,6 +224,7 @@ class CategoryService:
                 'category_id': other_category.id if other_category else None
             })
             CategoryMapping.query.filter_by(category_id=category_id).delete()
+            rollups.rebuild(touched)
 
             db.session.delete(category)
             db.session.commit()
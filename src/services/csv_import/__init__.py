@@ -1,10 +1,11 @@
 """Shared CSV import logic used by both manual upload and folder-watch."""
 from src.services.csv_import.mapper import (
-    Mapping, MapperConfig, MapperResult, RowResult,
+    ImportLookups, Mapping, MapperConfig, MapperResult, RowResult,
     map_row, import_rows, parse_amount,
 )
+from src.services.csv_import.reader import read_csv
 
 __all__ = [
-    'Mapping', 'MapperConfig', 'MapperResult', 'RowResult',
-    'map_row', 'import_rows', 'parse_amount',
+    'ImportLookups', 'Mapping', 'MapperConfig', 'MapperResult', 'RowResult',
+    'map_row', 'import_rows', 'parse_amount', 'read_csv',
 ]
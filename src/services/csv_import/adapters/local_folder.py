@@ -1,7 +1,7 @@
 """Local folder import source.
 
 Only the filesystem specifics live here — a cloud adapter implements the same
-four methods and needs no changes elsewhere.
+methods and needs no changes elsewhere.
 """
 from __future__ import annotations
 
@@ -21,6 +21,18 @@ SKIP_SUFFIXES = ('.part', '.crdownload', '.tmp', '.swp')
 DEFAULT_MAX_BYTES = 10 * 1024 * 1024
 
 
+def is_candidate_name(name: str) -> bool:
+    """Whether a file called `name` is one the folder would import.
+
+    The name half of `list_candidates`' filter, for the watcher, which hears
+    about a file by name before anything has looked at it.
+    """
+    lowered = name.lower()
+    if name.startswith('.') or name.startswith('~$'):
+        return False
+    return lowered.endswith('.csv') and not lowered.endswith(SKIP_SUFFIXES)
+
+
 @dataclass
 class Handle:
     name: str
@@ -46,11 +58,7 @@ class LocalFolderAdapter:
             return []
 
         for name in sorted(entries):
-            if name.startswith('.') or name.startswith('~$'):
-                continue
-            if name.lower().endswith(SKIP_SUFFIXES):
-                continue
-            if not name.lower().endswith('.csv'):
+            if not is_candidate_name(name):
                 continue
 
             full = os.path.join(self.path, name)
@@ -71,6 +79,10 @@ class LocalFolderAdapter:
         with open(handle.locator, 'rb') as fh:
             return fh.read()
 
+    def open(self, handle: Handle):
+        """The file as a binary stream, for reading it a block at a time."""
+        return open(handle.locator, 'rb')
+
     def _move(self, handle: Handle, subdir: str) -> str | None:
         dest_dir = os.path.join(self.path, subdir)
         try:
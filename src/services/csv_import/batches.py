@@ -9,6 +9,9 @@ from datetime import datetime
 from src.extensions import db
 from src.models.import_source import ImportBatch
 from src.models.transaction import Expense
+from src.services.analytics import rollups
+from src.services.group import ledger
+from src.services.transaction import shares
 from src.services.csv_import.fingerprint import save_profile
 from src.services.csv_import.mapper import Mapping, MapperConfig, import_rows
 
@@ -30,8 +33,13 @@ def revert_batch(batch_id: int, user_id: str) -> int:
     if batch.status == 'reverted':
         raise ValueError('Import batch has already been reverted')
 
+    groups = ledger.groups_with(Expense.import_batch_id == batch.id,
+                                Expense.user_id == user_id)
+    shares.forget(Expense.import_batch_id == batch.id, Expense.user_id == user_id)
     deleted = Expense.query.filter_by(
         import_batch_id=batch.id, user_id=user_id).delete(synchronize_session=False)
+    rollups.rebuild([user_id])
+    ledger.rebuild(groups)
     batch.status = 'reverted'
     batch.reverted_at = datetime.utcnow()
     db.session.commit()
@@ -49,8 +57,13 @@ def remap_batch(batch_id: int, user_id: str, mapping: dict, date_format: str,
     batch = _owned_batch(batch_id, user_id)
 
     if batch.status != 'reverted':
+        groups = ledger.groups_with(Expense.import_batch_id == batch.id,
+                                    Expense.user_id == user_id)
+        shares.forget(Expense.import_batch_id == batch.id, Expense.user_id == user_id)
         Expense.query.filter_by(import_batch_id=batch.id,
                                 user_id=user_id).delete(synchronize_session=False)
+        rollups.rebuild([user_id])
+        ledger.rebuild(groups)
 
     reader = csv.DictReader(io.StringIO(raw_csv, newline=None))
     headers = list(reader.fieldnames or [])
@@ -15,11 +15,18 @@ from src.extensions import db
 from src.models.category import Category
 from src.models.transaction import Expense
 from src.repositories.account import AccountRepository
+from src.services.transaction.dedup import CsvDuplicates
 
 logger = logging.getLogger(__name__)
 
 _accounts = AccountRepository()
 
+#: Rows mapped per duplicate-check window, and flushed together, by `import_rows`.
+IMPORT_CHUNK = 1000
+
+#: Row errors `import_rows` describes; past this they are only counted.
+MAX_ERROR_DETAILS = 100
+
 
 @dataclass
 class Mapping:
@@ -88,33 +95,67 @@ def parse_amount(raw: str) -> float:
     return -value if negative else value
 
 
-def _resolve_account(row, mapping, config, user_id):
+class ImportLookups:
+    """A user's category and account ids by name, for the length of one import.
+
+    `map_row` used to ask the database for the category and the account of every
+    row — two queries per line, for a file that names the same dozen of each
+    thousands of times. Here each distinct name is looked up once, and a
+    category the import has to create is remembered with the rest.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._categories = {}
+        self._accounts = {}
+
+    def category_id(self, name):
+        if name not in self._categories:
+            found = db.session.query(Category.id).filter_by(
+                name=name, user_id=self.user_id).first()
+            if found is None:
+                category = Category(name=name, user_id=self.user_id)
+                db.session.add(category)
+                db.session.flush()
+                self._categories[name] = category.id
+            else:
+                self._categories[name] = found.id
+        return self._categories[name]
+
+    def account_id(self, name):
+        if name not in self._accounts:
+            account = _accounts.get_by_name_and_user(name, self.user_id)
+            self._accounts[name] = account.id if account else None
+        return self._accounts[name]
+
+
+def _resolve_account(row, mapping, config, lookups):
     if not mapping.account:
         return config.account_id
     name = (row.get(mapping.account) or '').strip()
     if not name:
         return config.account_id
-    account = _accounts.get_by_name_and_user(name, user_id)
-    return account.id if account else config.account_id
+    return lookups.account_id(name) or config.account_id
 
 
-def _resolve_category(row, mapping, user_id):
+def _resolve_category(row, mapping, lookups):
     if not mapping.category:
         return None
     name = (row.get(mapping.category) or '').strip()
     if not name:
         return None
-    category = Category.query.filter_by(name=name, user_id=user_id).first()
-    if category:
-        return category.id
-    category = Category(name=name, user_id=user_id)
-    db.session.add(category)
-    db.session.flush()
-    return category.id
+    return lookups.category_id(name)
+
 
+def map_row(row, mapping, config, user_id, batch_id=None,
+            duplicates: CsvDuplicates | None = None,
+            lookups: ImportLookups | None = None) -> RowResult:
+    """Map one CSV row to an unsaved Expense, or report why it could not be.
 
-def map_row(row, mapping, config, user_id, batch_id=None) -> RowResult:
-    """Map one CSV row to an unsaved Expense, or report why it could not be."""
+    `duplicates` is the import's `CsvDuplicates` and `lookups` its
+    `ImportLookups`; without them, this row's duplicate check and name lookups
+    are queries of their own.
+    """
     date_str = (row.get(mapping.date) or '').strip()
     description = (row.get(mapping.description) or '').strip()
     amount_str = (row.get(mapping.amount) or '').strip()
@@ -133,22 +174,23 @@ def map_row(row, mapping, config, user_id, batch_id=None) -> RowResult:
     transaction_type = 'expense' if amount < 0 else 'income'
 
     if config.skip_duplicates:
-        exists = Expense.query.filter_by(
-            user_id=user_id, description=description,
-            amount=abs_amount, date=transaction_date,
-        ).first()
-        if exists:
+        if duplicates is None:
+            duplicates = CsvDuplicates(user_id)
+        if duplicates.seen(description, abs_amount, transaction_date):
             return RowResult(duplicate=True)
+        duplicates.add(description, abs_amount, transaction_date)
 
     notes = (row.get(mapping.notes) or '').strip() if mapping.notes else ''
+    if lookups is None:
+        lookups = ImportLookups(user_id)
 
     expense = Expense(
         description=description,
         amount=abs_amount,
         date=transaction_date,
         transaction_type=transaction_type,
-        account_id=_resolve_account(row, mapping, config, user_id),
-        category_id=_resolve_category(row, mapping, user_id),
+        account_id=_resolve_account(row, mapping, config, lookups),
+        category_id=_resolve_category(row, mapping, lookups),
         notes=notes,
         user_id=user_id,
         paid_by=user_id,
@@ -162,31 +204,78 @@ def map_row(row, mapping, config, user_id, batch_id=None) -> RowResult:
     return RowResult(expense=expense)
 
 
-def import_rows(rows: Iterable[dict], mapping, config, user_id,
-                batch_id=None, max_rows: int | None = None) -> MapperResult:
-    """Map and persist rows. Commits once at the end."""
-    result = MapperResult()
-    for row_num, row in enumerate(rows, start=2):  # row 1 is the header
-        if max_rows is not None and row_num - 2 >= max_rows:
-            result.error_details.append(
-                f'Import limited to {max_rows} rows — remaining rows skipped')
-            break
+def _row_date(row, mapping, config):
+    try:
+        return datetime.strptime((row.get(mapping.date) or '').strip(),
+                                 config.date_format)
+    except (ValueError, TypeError):
+        return None
+
+
+def _error(result, detail):
+    result.errors += 1
+    # Counted always, described up to a point: a 100k-row file in the wrong
+    # date format would otherwise hold 100k messages nobody is shown.
+    if len(result.error_details) < MAX_ERROR_DETAILS:
+        result.error_details.append(detail)
+
+
+def _map_chunk(result, chunk, mapping, config, user_id, batch_id, duplicates,
+               lookups):
+    """Map `(row_num, row)` pairs, record each outcome on `result`, and flush."""
+    if config.skip_duplicates and chunk:
+        duplicates.prime(_row_date(row, mapping, config) for _, row in chunk)
+
+    for row_num, row in chunk:
         try:
-            outcome = map_row(row, mapping, config, user_id, batch_id)
+            outcome = map_row(row, mapping, config, user_id, batch_id, duplicates,
+                              lookups)
         except Exception:
             logger.exception('Unexpected error mapping CSV row %s', row_num)
-            result.errors += 1
-            result.error_details.append(f'Row {row_num}: could not be processed')
+            _error(result, f'Row {row_num}: could not be processed')
             continue
 
         if outcome.duplicate:
             result.skipped += 1
         elif outcome.error:
-            result.errors += 1
-            result.error_details.append(f'Row {row_num}: {outcome.error}')
+            _error(result, f'Row {row_num}: {outcome.error}')
         else:
             db.session.add(outcome.expense)
             result.imported += 1
 
+    # Written now rather than at the commit: the session holds a new object
+    # strongly until it is flushed, and only weakly after, so this is what keeps
+    # a long file from accumulating in memory.
+    db.session.flush()
+
+
+def import_rows(rows: Iterable[dict], mapping, config, user_id,
+                batch_id=None, max_rows: int | None = None) -> MapperResult:
+    """Map and persist rows. Commits once at the end.
+
+    Rows are mapped `IMPORT_CHUNK` at a time so the duplicate check loads the
+    existing keys for each chunk's date window in one query — see
+    `src/services/transaction/dedup.py` — and each chunk is flushed as one
+    batched INSERT. `rows` is read once, as it is iterated; pass `read_csv` and
+    a file of any length is held a chunk at a time. `max_rows` is for callers
+    that want a cap; neither import path sets one.
+    """
+    result = MapperResult()
+    duplicates = CsvDuplicates(user_id)
+    lookups = ImportLookups(user_id)
+    chunk = []
+    for row_num, row in enumerate(rows, start=2):  # row 1 is the header
+        if max_rows is not None and row_num - 2 >= max_rows:
+            _map_chunk(result, chunk, mapping, config, user_id, batch_id, duplicates, lookups)
+            chunk = []
+            result.error_details.append(
+                f'Import limited to {max_rows} rows — remaining rows skipped')
+            break
+        chunk.append((row_num, row))
+        if len(chunk) == IMPORT_CHUNK:
+            _map_chunk(result, chunk, mapping, config, user_id, batch_id, duplicates, lookups)
+            chunk = []
+    _map_chunk(result, chunk, mapping, config, user_id, batch_id, duplicates, lookups)
+
     db.session.commit()
     return result
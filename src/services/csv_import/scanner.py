@@ -1,9 +1,8 @@
 """Folder-watch scan: find candidates, resolve a mapping, import as a batch."""
 from __future__ import annotations
 
-import csv
 import hashlib
-import io
+import itertools
 import logging
 from datetime import datetime
 
@@ -18,27 +17,43 @@ from src.services.csv_import.adapters.local_folder import LocalFolderAdapter
 from src.services.csv_import.fingerprint import find_profile, save_profile
 from src.services.csv_import.heuristics import detect
 from src.services.csv_import.mapper import Mapping, MapperConfig, import_rows
+from src.services.csv_import.reader import read_csv
 
 logger = logging.getLogger(__name__)
 
-CSV_MAX_ROWS = 10_000
+#: Rows `detect()` looks at to guess a mapping for an unknown format.
+_SAMPLE_ROWS = 50
+
+
+#: Bytes hashed per read.
+_HASH_BLOCK = 64 * 1024
 
 
 def hash_bytes(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
+def hash_stream(stream) -> str:
+    """`hash_bytes` of a binary stream, read a block at a time."""
+    digest = hashlib.sha256()
+    for block in iter(lambda: stream.read(_HASH_BLOCK), b''):
+        digest.update(block)
+    return digest.hexdigest()
+
+
 def _adapter_for(source):
     if source.kind == 'local_folder':
         return LocalFolderAdapter(source.config['path'])
     raise ValueError(f'Unknown import source kind: {source.kind}')
 
 
-def stable_candidates(adapter, source):
+def stable_candidates(adapter, source, ready=()):
     """Return candidates whose size and mtime are unchanged since last scan.
 
     A file mid-copy parses as truncated, and would then be hash-blocked from
     ever being retried — so defer anything that changed since we last looked.
+    Names in `ready` are taken on first sight: the watcher only reports a file
+    once its writer has closed it or it has been renamed into the folder.
     """
     config = dict(source.config or {})
     seen = config.get('seen', {})
@@ -47,7 +62,7 @@ def stable_candidates(adapter, source):
     for handle in adapter.list_candidates():
         signature = [handle.size, handle.mtime]
         next_seen[handle.name] = signature
-        if seen.get(handle.name) == signature:
+        if handle.name in ready or seen.get(handle.name) == signature:
             stable.append(handle)
 
     config['seen'] = next_seen
@@ -56,8 +71,11 @@ def stable_candidates(adapter, source):
     return stable
 
 
-def scan_source(source) -> list[ImportBatch]:
-    """Scan one source. Returns the batches created this pass."""
+def scan_source(source, ready=()) -> list[ImportBatch]:
+    """Scan one source. Returns the batches created this pass.
+
+    `ready` names files known to be complete; see `stable_candidates`.
+    """
     batches = []
     try:
         adapter = _adapter_for(source)
@@ -65,7 +83,7 @@ def scan_source(source) -> list[ImportBatch]:
         logger.exception('Cannot build adapter for import source %s', source.id)
         return []
 
-    for handle in stable_candidates(adapter, source):
+    for handle in stable_candidates(adapter, source, ready):
         try:
             batch = _process(adapter, source, handle)
             if batch is not None:
@@ -81,15 +99,34 @@ def scan_source(source) -> list[ImportBatch]:
 
 
 def _process(adapter, source, handle) -> ImportBatch | None:
-    data = adapter.read(handle)
-    file_hash = hash_bytes(data)
+    # Read twice, a block at a time, rather than held: once to hash, and again
+    # only if the hash is new.
+    with adapter.open(handle) as fh:
+        file_hash = hash_stream(fh)
 
     if ImportBatch.query.filter_by(file_hash=file_hash).first():
         adapter.mark_done(handle)
         return None
 
-    text = data.decode('utf-8-sig', errors='replace')
-    reader = csv.DictReader(io.StringIO(text, newline=None))
+    with adapter.open(handle) as fh:
+        batch = _import(adapter, source, handle, file_hash, fh)
+    if batch is None:
+        return None
+
+    # Log identifiers only — never file contents.
+    logger.info('Imported %s: %s rows from %s (hash %s)',
+                batch.id, batch.imported_count, handle.name, file_hash[:12])
+    _notify_if_review_needed(batch)
+    adapter.mark_done(handle)
+    return batch
+
+
+def _import(adapter, source, handle, file_hash, fh) -> ImportBatch | None:
+    """Import the open file `fh` as a batch; None if it was refused."""
+    # One reader for the whole file: the sample `detect()` needs is taken from
+    # its head and put back in front of the rest, rather than parsing again.
+    reader = read_csv(fh, errors='replace')
+    rows = reader
     headers = list(reader.fieldnames or [])
     if not headers:
         _fail(adapter, source, handle, file_hash, 'File has no header row')
@@ -98,8 +135,8 @@ def _process(adapter, source, handle) -> ImportBatch | None:
     profile = find_profile(headers, source.user_id)
     heuristic = None
     if profile is None:
-        # Re-read: DictReader is a one-shot iterator and detect() needs rows.
-        sample = list(csv.DictReader(io.StringIO(text, newline=None)))[:50]
+        sample = list(itertools.islice(reader, _SAMPLE_ROWS))
+        rows = itertools.chain(sample, reader)
         heuristic = detect(headers, sample)
         if heuristic is None:
             _fail(adapter, source, handle, file_hash,
@@ -112,8 +149,6 @@ def _process(adapter, source, handle) -> ImportBatch | None:
             sign_convention=heuristic.sign_convention,
             origin='heuristic', confidence=heuristic.confidence,
         )
-        # The reader was consumed building the sample — start over.
-        reader = csv.DictReader(io.StringIO(text, newline=None))
 
     batch = ImportBatch(
         source_id=source.id, profile_id=profile.id, filename=handle.name,
@@ -125,7 +160,7 @@ def _process(adapter, source, handle) -> ImportBatch | None:
     db.session.flush()
 
     outcome = import_rows(
-        reader,
+        rows,
         Mapping(date=profile.mapping['date'],
                 description=profile.mapping['description'],
                 amount=profile.mapping['amount'],
@@ -135,7 +170,7 @@ def _process(adapter, source, handle) -> ImportBatch | None:
         MapperConfig(date_format=profile.date_format,
                      amount_multiplier=-1.0
                      if profile.sign_convention == 'positive_is_expense' else 1.0),
-        source.user_id, batch_id=batch.id, max_rows=CSV_MAX_ROWS,
+        source.user_id, batch_id=batch.id,
     )
 
     batch.imported_count = outcome.imported
@@ -149,12 +184,6 @@ def _process(adapter, source, handle) -> ImportBatch | None:
         batch.status = 'partial'
     profile.times_used = (profile.times_used or 0) + 1
     db.session.commit()
-
-    # Log identifiers only — never file contents.
-    logger.info('Imported %s: %s rows from %s (hash %s)',
-                batch.id, outcome.imported, handle.name, file_hash[:12])
-    _notify_if_review_needed(batch)
-    adapter.mark_done(handle)
     return batch
 
 
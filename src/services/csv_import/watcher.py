@@ -0,0 +1,317 @@
+"""Folder-watch imports driven by inotify, with the 5-minute scan as fallback.
+
+The `csv_folder_scan` job lists every watched folder every five minutes, and
+`stable_candidates` wants a file unchanged across two of those scans before it
+is trusted — so a statement dropped in the folder waited up to ten minutes, and
+an idle folder was listed 288 times a day for nothing.
+
+On Linux the scheduler process now asks the kernel instead. `FolderWatcher`
+holds an inotify watch on each enabled source's folder for `IN_CLOSE_WRITE` (a
+writer closed the file) and `IN_MOVED_TO` (a file was renamed in — how rsync,
+browsers and most sync clients finish a download). Either means the file is
+complete, so the scan it triggers takes it on first sight. Events are gathered
+for `settle` seconds so a drop of several files costs one scan.
+
+── WHAT STILL POLLS ────────────────────────────────────────────────────────────
+
+The scheduled scan still runs, and skips only the sources this process has a
+live watch on: a folder that cannot be watched (missing, outside the root, a
+kernel without inotify, `CSV_IMPORT_WATCH=poll`) is polled exactly as before.
+Network mounts (NFS, SMB) do not report writes made by another host, so a
+folder on one should set `CSV_IMPORT_WATCH=poll`.
+
+A new watch — at start, or when a source is added — and a kernel queue
+overflow each trigger a full scan, and another `recheck` seconds later so files
+that were already sitting there pass the size/mtime check without waiting for
+the next five minutes.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from src.services.csv_import.adapters.local_folder import is_candidate_name
+from src.services.csv_import.paths import PathOutsideRootError, resolve_within_root
+
+logger = logging.getLogger(__name__)
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+_MASK = IN_CLOSE_WRITE | IN_MOVED_TO
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len — then `len` bytes of name
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None and sys.platform.startswith('linux'):
+        try:
+            _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                                use_errno=True)
+        except OSError:
+            _libc = False
+    return _libc or None
+
+
+def available() -> bool:
+    """Whether this process can use inotify."""
+    libc = _load_libc()
+    return bool(libc) and hasattr(libc, 'inotify_init1')
+
+
+def watch_mode() -> str:
+    """`'inotify'` or `'poll'`, from CSV_IMPORT_WATCH (`auto` by default)."""
+    configured = (os.getenv('CSV_IMPORT_WATCH') or 'auto').strip().lower()
+    if configured == 'poll':
+        return 'poll'
+    return 'inotify' if available() else 'poll'
+
+
+class Inotify:
+    """The three inotify calls, made through libc. Linux only: see `available()`."""
+
+    def __init__(self):
+        self._libc = _load_libc()
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def remove(self, wd: int) -> None:
+        # Fails harmlessly if the kernel already dropped it (folder deleted).
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self) -> list[tuple[int, int, str]]:
+        """`(wd, mask, name)` for every event queued; empty if there are none."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """A thread that turns inotify events into `on_ready(source_id, names)`.
+
+    `sources()` returns `{source_id: folder}` for the sources to watch and is
+    re-read every `resync` seconds, so a source added, moved or disabled in
+    Settings is picked up without a restart. `names` is the set of files known
+    to be complete; it is empty for a full scan. `on_ready` runs on this thread,
+    one call at a time, and an exception from it is logged, not fatal.
+    """
+
+    def __init__(self, sources, on_ready, settle=2.0, recheck=30.0, resync=60.0):
+        self._sources = sources
+        self._on_ready = on_ready
+        self.settle = settle
+        self.recheck = recheck
+        self.resync = resync
+        self._inotify = None
+        self._watches = {}     # wd → source_id
+        self._folders = {}     # source_id → (wd, folder)
+        self._pending = {}     # source_id → (deadline, names)
+        self._rescans = {}     # source_id → deadline
+        self._refused = set()  # source_ids already reported unwatchable
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watching(self, source_id) -> bool:
+        """Whether `source_id` has a live watch, so polling it can be skipped."""
+        return source_id in self._folders
+
+    def start(self):
+        self._inotify = Inotify()
+        self._thread = threading.Thread(target=self._run, name='csv-folder-watch',
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        next_sync = 0.0
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if now >= next_sync:
+                    self._sync()
+                    next_sync = now + self.resync
+                self._dispatch_due(now)
+
+                deadlines = [next_sync, now + 1.0]  # 1s: stay responsive to stop()
+                deadlines += [when for when, _ in self._pending.values()]
+                deadlines += list(self._rescans.values())
+                timeout = max(0.0, min(deadlines) - time.monotonic())
+                readable, _, _ = select.select([self._inotify.fd], [], [], timeout)
+                if readable:
+                    self._receive(self._inotify.read())
+        except Exception:
+            logger.exception('CSV folder watcher stopped; scheduled scans continue')
+        finally:
+            self._folders.clear()
+            self._watches.clear()
+            self._inotify.close()
+
+    def _sync(self):
+        try:
+            wanted = dict(self._sources())
+        except Exception:
+            logger.exception('Could not read import sources to watch')
+            return
+
+        for source_id, (wd, folder) in list(self._folders.items()):
+            if wanted.get(source_id) != folder:
+                self._unwatch(source_id)
+        for source_id, folder in wanted.items():
+            if source_id not in self._folders:
+                self._watch(source_id, folder)
+
+    def _watch(self, source_id, folder):
+        try:
+            path = resolve_within_root(folder)
+            wd = self._inotify.add(path)
+        except (OSError, PathOutsideRootError):
+            # Left to the scheduled scan. Said once, not at every resync.
+            if source_id not in self._refused:
+                self._refused.add(source_id)
+                logger.warning('Cannot watch import source %s; it will be polled',
+                               source_id)
+            return
+        self._refused.discard(source_id)
+        self._watches[wd] = source_id
+        self._folders[source_id] = (wd, folder)
+        self._rescan(source_id)
+        logger.info('Watching import source %s', source_id)
+
+    def _unwatch(self, source_id):
+        wd, _ = self._folders.pop(source_id)
+        self._watches.pop(wd, None)
+        self._pending.pop(source_id, None)
+        self._rescans.pop(source_id, None)
+        self._inotify.remove(wd)
+
+    def _rescan(self, source_id):
+        self._dispatch(source_id, set())
+        self._rescans[source_id] = time.monotonic() + self.recheck
+
+    def _receive(self, events):
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # The kernel dropped events; only a full look is safe.
+                logger.warning('CSV folder watch queue overflowed; rescanning')
+                for source_id in list(self._folders):
+                    self._rescan(source_id)
+                continue
+            source_id = self._watches.get(wd)
+            if source_id is None:
+                continue
+            if mask & IN_IGNORED:
+                # The folder went away. Polling takes over until it is back.
+                self._watches.pop(wd, None)
+                self._folders.pop(source_id, None)
+                continue
+            if is_candidate_name(name):
+                _, names = self._pending.get(source_id, (None, set()))
+                names.add(name)
+                self._pending[source_id] = (time.monotonic() + self.settle, names)
+
+    def _dispatch_due(self, now):
+        for source_id, when in list(self._rescans.items()):
+            if when <= now:
+                del self._rescans[source_id]
+                self._dispatch(source_id, set())
+        for source_id, (when, names) in list(self._pending.items()):
+            if when <= now:
+                del self._pending[source_id]
+                self._dispatch(source_id, names)
+
+    def _dispatch(self, source_id, names):
+        try:
+            self._on_ready(source_id, names)
+        except Exception:
+            logger.exception('Import scan failed for source %s', source_id)
+
+
+# ---------------------------------------------------------------------------
+# The scheduler process's watcher, and the lock both scan paths take so the
+# watcher and the scheduled job never scan the same folder at once.
+# ---------------------------------------------------------------------------
+
+_watcher = None
+_scan_lock = threading.Lock()
+
+
+def scan(source, ready=()):
+    """`scan_source`, serialised against the other scan path in this process."""
+    from src.services.csv_import.scanner import scan_source
+    with _scan_lock:
+        return scan_source(source, ready)
+
+
+def polled(source_id) -> bool:
+    """Whether the scheduled scan should look at `source_id` itself."""
+    return _watcher is None or not _watcher.watching(source_id)
+
+
+def start(app):
+    """Start this process's watcher, unless polling is configured or forced."""
+    global _watcher
+    if _watcher is not None:
+        return _watcher
+    if watch_mode() != 'inotify':
+        app.logger.info('CSV folder import: polling every 5 minutes')
+        return None
+
+    def sources():
+        from src.models.import_source import ImportSource
+        with app.app_context():
+            found = ImportSource.query.filter_by(enabled=True, kind='local_folder')
+            return {s.id: s.config['path'] for s in found
+                    if (s.config or {}).get('path')}
+
+    def on_ready(source_id, names):
+        from src.extensions import db
+        from src.models.import_source import ImportSource
+        with app.app_context():
+            source = db.session.get(ImportSource, source_id)
+            if source is not None and source.enabled:
+                scan(source, names)
+
+    try:
+        _watcher = FolderWatcher(sources, on_ready).start()
+    except OSError:
+        app.logger.exception('Cannot start the CSV folder watcher; polling instead')
+        return None
+    app.logger.info('CSV folder import: watching with inotify')
+    return _watcher
@@ -88,8 +88,12 @@ class CurrencyService:
                 # Setting as base, unset all others
                 for curr in Currency.query.filter_by(is_base=True).all():
                     curr.is_base = False
+                    curr.last_updated = datetime.utcnow()
             currency.is_base = is_base
         
+        # Also the version stamp of the converter's rate table — see
+        # src/utils/currency_converter.py. A write that skips it is not seen by
+        # the other workers until something else moves it.
         currency.last_updated = datetime.utcnow()
         
         try:
@@ -137,10 +141,13 @@ class CurrencyService:
             current_base_currency = self.get_base_currency()
             if current_base_currency:
                 current_base_currency.is_base = False
+                current_base_currency.last_updated = datetime.utcnow()
             
-            # Set new base currency
+            # Set new base currency. `last_updated` is the version stamp the
+            # converter's rate table is checked against, in every process.
             new_base_currency.is_base = True
             new_base_currency.rate_to_base = 1.0
+            new_base_currency.last_updated = datetime.utcnow()
             
             # Update rates for other currencies
             self.update_exchange_rates()
@@ -14,6 +14,10 @@ from src.models.category import Category
 from src.models.group import Group
 from src.models.investment import Portfolio, Investment
 from src.data.seed_defaults import seed_user_defaults
+from src.services.account import snapshots
+from src.services.analytics import rollups
+from src.services.group import ledger
+from src.services.transaction import shares
 try:
     from src.modules.pointspal.models import (
         PointsProgram, PointsEarnCategory, UserCard,
@@ -875,8 +879,13 @@ class DemoService:
 
         try:
             # Delete existing data
+            groups = ledger.groups_with(Expense.user_id == user_id)
+            shares.forget(Expense.user_id == user_id)
             Expense.query.filter_by(user_id=user_id).delete()
+            rollups.rebuild([user_id])
+            ledger.rebuild(groups)
             Budget.query.filter_by(user_id=user_id).delete()
+            snapshots.forget(Account.user_id == user_id)
             Account.query.filter_by(user_id=user_id).delete()
             Category.query.filter_by(user_id=user_id).delete()
             Portfolio.query.filter_by(user_id=user_id).delete()
@@ -0,0 +1,214 @@
+"""`ledger_balances`: who owes whom in each group, maintained on every write.
+
+`GroupService.calculate_group_balances` re-read every expense a group had ever
+had and every settlement between its members on each `/groups/<id>/balances`
+call, re-split each expense, and looked up a `User` per line of the simplified
+debts. `LedgerBalance` keeps the pairwise sums instead, so a read is one grouped
+query over at most members² rows however many years of history the group has.
+
+── WHERE IT IS MAINTAINED ─────────────────────────────────────────────────────
+
+At the session's flush, as `monthly_rollups` and `expense_shares` are, and in the
+same transaction as the row that moved it. `apply_pending` turns this flush's
+Expense and Settlement writes into deltas:
+
+  * an update or delete first reverses what the DATABASE holds — the stored
+    `group_id` and `expense_shares` rows, or the stored settlement — because in
+    `before_flush` those are still the pre-write values;
+  * a new or updated group row then adds its shares as `shares.shares_of`
+    computes them from the instance. It does not read `Expense.shares`, so the
+    result does not depend on which of the two hooks runs first.
+
+*** A BULK `Query.update()` / `.delete()` BYPASSES THE FLUSH. *** Those sites read
+`groups_with()` before the statement and call `rebuild()` after it; deleting a
+user's settlements calls `rebuild_settlements()`. `flask rebuild-ledger-balances`
+recomputes everything.
+"""
+from decimal import Decimal
+
+from sqlalchemy import and_, func, insert, or_, select
+
+from src.extensions import db
+from src.models.expense_share import ExpenseShare
+from src.models.group import Settlement
+from src.models.ledger_balance import LedgerBalance
+from src.models.transaction import Expense
+from src.models.user import User
+from src.services.analytics.rollups import is_split
+from src.services.transaction import shares
+from src.services.transaction.serialisation import users_map_for
+from src.utils.money import money_or_zero
+
+
+def apply_pending(session):
+    """Fold this flush's group Expense and Settlement writes into the ledger."""
+    deltas = {}
+
+    def add(group_id, debtor, creditor, amount):
+        if debtor == creditor:
+            return
+        key = (group_id, debtor, creditor)
+        deltas[key] = deltas.get(key, Decimal('0')) + money_or_zero(amount)
+
+    _expense_deltas(session, add)
+    _settlement_deltas(session, add)
+
+    deltas = {k: v for k, v in deltas.items() if v}
+    if deltas:
+        _apply(session, deltas)
+
+
+def _expense_deltas(session, add):
+    new = [o for o in session.new if isinstance(o, Expense)
+           and o.group_id is not None and is_split(o.split_method, o.split_with)]
+    dirty = [o for o in session.dirty if isinstance(o, Expense)
+             and o.id is not None and shares.changed_inputs(o, ('group_id',))]
+    deleted = [o for o in session.deleted if isinstance(o, Expense)
+               and o.id is not None]
+    if not (new or dirty or deleted):
+        return
+
+    stored_groups = dict(session.execute(
+        select(Expense.id, Expense.group_id)
+        .where(Expense.id.in_([o.id for o in dirty + deleted]),
+               Expense.group_id.isnot(None))).all()) if dirty or deleted else {}
+    if stored_groups:
+        for row in session.execute(
+                select(ExpenseShare.expense_id, ExpenseShare.user_id,
+                       ExpenseShare.paid_by, ExpenseShare.amount)
+                .where(ExpenseShare.expense_id.in_(list(stored_groups)))).all():
+            add(stored_groups[row.expense_id], row.user_id, row.paid_by, -row.amount)
+
+    grouped = [o for o in new + dirty if o.group_id is not None]
+    if not grouped:
+        return
+    users_map = users_map_for(grouped)
+    users_map.update({o.id: o for o in session.new if isinstance(o, User)})
+    for expense in grouped:
+        for user_id, (amount, _) in shares.shares_of(expense, users_map).items():
+            add(expense.group_id, user_id, expense.paid_by, amount)
+
+
+def _settlement_deltas(session, add):
+    new = [o for o in session.new if isinstance(o, Settlement)]
+    dirty = [o for o in session.dirty if isinstance(o, Settlement)
+             and o.id is not None and session.is_modified(o)]
+    deleted = [o for o in session.deleted if isinstance(o, Settlement)
+               and o.id is not None]
+
+    if dirty or deleted:
+        for row in session.execute(
+                select(Settlement.payer_id, Settlement.receiver_id, Settlement.amount)
+                .where(Settlement.id.in_([o.id for o in dirty + deleted]))).all():
+            add(None, row.payer_id, row.receiver_id, row.amount)
+    # A settlement from A to B is A owing B that much less.
+    for settlement in new + dirty:
+        add(None, settlement.payer_id, settlement.receiver_id,
+            -money_or_zero(settlement.amount))
+
+
+def _apply(session, deltas):
+    group_ids = {key[0] for key in deltas if key[0] is not None}
+    scope = [LedgerBalance.group_id.in_(group_ids)] if group_ids else []
+    if any(key[0] is None for key in deltas):
+        scope.append(LedgerBalance.group_id.is_(None))
+    existing = {}
+    for row in session.execute(
+            select(LedgerBalance)
+            .where(or_(*scope),
+                   LedgerBalance.debtor.in_(list({key[1] for key in deltas})))).scalars():
+        existing.setdefault((row.group_id, row.debtor, row.creditor), row)
+
+    for key, amount in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            session.add(LedgerBalance(group_id=key[0], debtor=key[1],
+                                      creditor=key[2], amount=amount))
+        else:
+            # An expression, as in `rollups._apply`, so two workers both land.
+            row.amount = LedgerBalance.amount + amount
+
+
+def rebuild(group_ids=None):
+    """Recompute the ledger from `expense_shares` and `settlements`.
+
+    With `group_ids` only those groups' expense rows are recomputed; with none
+    everything is, settlements included. One DELETE and one INSERT … SELECT …
+    GROUP BY each. Does not commit, like `rollups.rebuild()`.
+    """
+    deleted = db.session.query(LedgerBalance).filter(LedgerBalance.group_id.isnot(None))
+    source = (db.session.query(Expense.group_id, ExpenseShare.user_id,
+                               ExpenseShare.paid_by, func.sum(ExpenseShare.amount))
+              .join(Expense, Expense.id == ExpenseShare.expense_id)
+              .filter(Expense.group_id.isnot(None),
+                      ExpenseShare.user_id != ExpenseShare.paid_by))
+    if group_ids is not None:
+        deleted = deleted.filter(LedgerBalance.group_id.in_(group_ids))
+        source = source.filter(Expense.group_id.in_(group_ids))
+    source = source.group_by(Expense.group_id, ExpenseShare.user_id,
+                             ExpenseShare.paid_by)
+
+    deleted.delete(synchronize_session=False)
+    db.session.execute(
+        insert(LedgerBalance).from_select(
+            ['group_id', 'debtor', 'creditor', 'amount'], source.statement))
+    if group_ids is None:
+        rebuild_settlements()
+
+
+def rebuild_settlements():
+    """Recompute the settlement rows (`group_id` NULL) from `settlements`."""
+    (db.session.query(LedgerBalance).filter(LedgerBalance.group_id.is_(None))
+     .delete(synchronize_session=False))
+    source = (db.session.query(Settlement.payer_id, Settlement.receiver_id,
+                               -func.sum(Settlement.amount))
+              .filter(Settlement.payer_id != Settlement.receiver_id)
+              .group_by(Settlement.payer_id, Settlement.receiver_id))
+    db.session.execute(
+        insert(LedgerBalance).from_select(
+            ['debtor', 'creditor', 'amount'], source.statement))
+
+
+def groups_with(*criteria):
+    """The groups of the `expenses` rows matching `criteria`.
+
+    For the bulk sites: read BEFORE the statement, passed to `rebuild()` after.
+    """
+    return [row[0] for row in
+            db.session.query(Expense.group_id)
+            .filter(Expense.group_id.isnot(None), *criteria).distinct()]
+
+
+def needs_backfill():
+    """True when the ledger is empty and there is anything to put in it.
+
+    The first boot with this table, as `rollups.needs_backfill()` describes.
+    """
+    if db.session.query(LedgerBalance.id).first() is not None:
+        return False
+    return (db.session.query(Settlement.id).first() is not None
+            or db.session.query(ExpenseShare.id)
+            .join(Expense, Expense.id == ExpenseShare.expense_id)
+            .filter(Expense.group_id.isnot(None)).first() is not None)
+
+
+# --- Reads -------------------------------------------------------------------
+
+
+def pair_totals(group_id, member_ids):
+    """`[(debtor, creditor, total)]` between `member_ids` in `group_id`.
+
+    The group's own expense rows plus every settlement between two of its
+    members. A payer or participant who has left the group is not counted.
+    """
+    if not member_ids:
+        return []
+    return (db.session.query(LedgerBalance.debtor.label('debtor'),
+                             LedgerBalance.creditor.label('creditor'),
+                             func.sum(LedgerBalance.amount).label('total'))
+            .filter(or_(LedgerBalance.group_id == group_id,
+                        LedgerBalance.group_id.is_(None)),
+                    and_(LedgerBalance.debtor.in_(member_ids),
+                         LedgerBalance.creditor.in_(member_ids)))
+            .group_by(LedgerBalance.debtor, LedgerBalance.creditor)
+            .all())
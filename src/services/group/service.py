@@ -10,6 +10,7 @@ from src.models.group import Group, Settlement
 from src.models.user import User
 from src.models.transaction import Expense
 from src.models.associations import group_users
+from src.services.group import ledger
 from src.utils.helpers import calculate_balances
 from src.utils.household import on_the_same_side
 
@@ -205,6 +206,7 @@ class GroupService:
             # rather than delete: these are real financial records that happen to
             # have been shared.
             Expense.query.filter_by(group_id=group_id).update({'group_id': None})
+            ledger.rebuild([group_id])
 
             # Delete the group
             db.session.delete(group)
@@ -324,54 +326,26 @@ class GroupService:
         return Expense.query.filter_by(group_id=group_id).order_by(Expense.date.desc()).all()
 
     def calculate_group_balances(self, group_id):
-        """Calculate balances between group members"""
-        expenses = self.get_group_expenses(group_id)
+        """Calculate balances between group members
+
+        Read from `ledger_balances` — at most one row per ordered pair of
+        members, whatever the group's history — rather than re-splitting every
+        group expense and re-reading every settlement.
+        """
         group = db.session.get(Group, group_id)
 
         if not group:
             return {'member_balances': {}, 'simplified_debts': []}
 
         # Calculate what each member owes/is owed
-        member_balances = {}
-        member_ids = [member.id for member in group.members]
-
-        # Initialize balances for all members
-        for member_id in member_ids:
-            member_balances[member_id] = 0
-
-        # Process each expense
-        for expense in expenses:
-            if not expense.paid_by or expense.paid_by not in member_ids:
-                continue
+        members = {member.id: member for member in group.members}
+        member_balances = {member_id: 0 for member_id in members}
 
-            # Get the splits for this expense
-            splits = expense.calculate_splits() if hasattr(expense, 'calculate_splits') else {'splits': []}
-
-            # The payer paid the full amount
-            for split in splits.get('splits', []):
-                split_user = split.get('email')
-                split_amount = split.get('amount', 0)
-
-                if split_user in member_ids:
-                    if split_user == expense.paid_by:
-                        # Payer's own share - they don't owe themselves
-                        pass
-                    else:
-                        # This member owes the payer
-                        member_balances[split_user] -= split_amount
-                        member_balances[expense.paid_by] += split_amount
-
-        # Get settlements and adjust balances
-        settlements = Settlement.query.filter(
-            Settlement.payer_id.in_(member_ids),
-            Settlement.receiver_id.in_(member_ids)
-        ).all()
-
-        for settlement in settlements:
-            if settlement.payer_id in member_balances and settlement.receiver_id in member_balances:
-                # Payer settled their debt
-                member_balances[settlement.payer_id] += settlement.amount
-                member_balances[settlement.receiver_id] -= settlement.amount
+        # What each member owes each other member: their shares of the group's
+        # expenses, less every settlement between the two.
+        for row in ledger.pair_totals(group_id, list(members)):
+            member_balances[row.debtor] -= row.total
+            member_balances[row.creditor] += row.total
 
         # Simplify debts (who owes whom)
         simplified_debts = []
@@ -386,12 +360,12 @@ class GroupService:
 
                 amount_to_settle = min(debt, credit)
                 if amount_to_settle > 0.01:
-                    debtor = db.session.get(User, debtor_id)
-                    creditor = db.session.get(User, creditor_id)
+                    debtor = members.get(debtor_id)
+                    creditor = members.get(creditor_id)
 
                     simplified_debts.append({
-                        'from': debtor.name if debtor and hasattr(debtor, 'name') else debtor_id,
-                        'to': creditor.name if creditor and hasattr(creditor, 'name') else creditor_id,
+                        'from': debtor.name if debtor and debtor.name else debtor_id,
+                        'to': creditor.name if creditor and creditor.name else creditor_id,
                         'amount': round(amount_to_settle, 2)
                     })
 
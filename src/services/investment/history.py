@@ -0,0 +1,87 @@
+"""`investment_prices`: each held symbol's closing price, day by day.
+
+The trends had no investment history at all — `calculate_asset_debt_trends`
+added today's portfolio value to every past month. The nightly
+`update_investment_prices` job now also calls `record`, which asks the
+provider's history (`YFinanceCache.get_ticker_history`, the path the history
+endpoint uses) for every distinct held symbol and stores the closes here. A
+symbol seen for the first time gets HISTORY_PERIOD; one already stored gets
+TOP_UP_PERIOD, which overlaps the last run so a missed night heals itself.
+
+Nothing on a request path calls this. Valuations read the table only; see
+valuation.py.
+"""
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import delete, func, insert, select
+
+from src.extensions import db
+from src.models.investment import Investment, InvestmentPrice
+from src.utils.money import to_money
+
+logger = logging.getLogger(__name__)
+
+#: A year, what the trends show.
+HISTORY_PERIOD = '1y'
+
+#: For a symbol whose newest stored close is at most TOP_UP_DAYS old.
+TOP_UP_PERIOD = '1mo'
+TOP_UP_DAYS = 25
+
+_CLOSE = Decimal('0.0001')
+
+
+def held_symbols():
+    """Every distinct symbol in any portfolio, upper-cased."""
+    rows = db.session.execute(select(Investment.symbol).distinct())
+    return sorted({(symbol or '').strip().upper() for (symbol,) in rows} - {''})
+
+
+def record(symbols=None, today=None):
+    """Store the closing prices of `symbols` (every held one by default).
+
+    Existing closes for the days fetched are replaced, so a corrected close wins.
+    The caller commits. Returns the number of rows written.
+    """
+    from integrations.investments.yfinance import shared_cache
+
+    symbols = held_symbols() if symbols is None else sorted({s.upper() for s in symbols})
+    if not symbols:
+        return 0
+    today = today or date.today()
+    newest = dict(db.session.execute(
+        select(InvestmentPrice.symbol, func.max(InvestmentPrice.date))
+        .where(InvestmentPrice.symbol.in_(symbols))
+        .group_by(InvestmentPrice.symbol)).all())
+
+    cache = shared_cache()
+    written = 0
+    for symbol in symbols:
+        last = newest.get(symbol)
+        recent = last is not None and today - last <= timedelta(days=TOP_UP_DAYS)
+        history = cache.get_ticker_history(
+            symbol, period=TOP_UP_PERIOD if recent else HISTORY_PERIOD) or []
+
+        closes = {}
+        for point in history:
+            try:
+                day = date.fromisoformat(point['date'])
+                close = to_money(point.get('close'), _CLOSE)
+            except (KeyError, TypeError, ValueError, ArithmeticError):
+                continue
+            if close is not None and close > 0:
+                closes[day] = close
+        if not closes:
+            logger.warning('No price history for %s', symbol)
+            continue
+
+        db.session.execute(delete(InvestmentPrice).where(
+            InvestmentPrice.symbol == symbol,
+            InvestmentPrice.date.in_(list(closes))))
+        db.session.execute(insert(InvestmentPrice), [
+            {'symbol': symbol, 'date': day, 'close': close}
+            for day, close in sorted(closes.items())])
+        written += len(closes)
+    return written
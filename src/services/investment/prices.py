@@ -0,0 +1,64 @@
+"""Holding prices refreshed once per symbol, however many portfolios hold it.
+
+`update_prices` used to walk a portfolio's holdings and fetch each one through
+`get_stock_data_with_fallback`, and the nightly job called it for every
+portfolio of every user — so a symbol held in ten portfolios was fetched ten
+times, one after another, and the job's length grew with holdings × users.
+
+`refresh` reads the holdings in scope, fetches their distinct symbols in
+batches (`get_prices_with_fallback`: Yahoo downloads, then FMP for whatever
+Yahoo missed) and writes `current_price` back with one executemany UPDATE. The
+caller commits.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import bindparam, select, update
+
+from src.extensions import db
+from src.models.investment import Investment, Portfolio
+from src.utils.money import to_money
+
+
+@dataclass
+class RefreshResult:
+    symbols: int = 0  # distinct symbols asked for
+    updated: int = 0  # holdings given a new price
+    failed: List[str] = field(default_factory=list)  # symbols nobody priced
+
+
+def refresh(portfolio_ids=None, user_ids=None):
+    """Fetch and store the current price of every holding in scope.
+
+    With neither argument, every holding in the database — the nightly job.
+    """
+    from integrations.investments.yfinance import get_prices_with_fallback
+
+    query = select(Investment.id, Investment.symbol)
+    if portfolio_ids is not None:
+        query = query.where(Investment.portfolio_id.in_(portfolio_ids))
+    if user_ids is not None:
+        query = query.join(Portfolio).where(Portfolio.user_id.in_(user_ids))
+    holdings = [(row_id, (symbol or '').strip().upper())
+                for row_id, symbol in db.session.execute(query)]
+
+    symbols = sorted({symbol for _, symbol in holdings if symbol})
+    result = RefreshResult(symbols=len(symbols))
+    if not symbols:
+        return result
+
+    prices = get_prices_with_fallback(symbols)
+    result.failed = [symbol for symbol in symbols if symbol not in prices]
+
+    now = datetime.utcnow()
+    params = [{'_id': row_id, '_price': to_money(prices[symbol]), '_now': now}
+              for row_id, symbol in holdings if symbol in prices]
+    if params:
+        table = Investment.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('_id'))
+            .values(current_price=bindparam('_price'), last_update=bindparam('_now')),
+            params)
+    result.updated = len(params)
+    return result
@@ -1,5 +1,4 @@
 """Investment Service - Portfolio and investment tracking"""
-from datetime import datetime
 from flask import current_app
 from src.extensions import db
 from src.models.investment import Portfolio, Investment, InvestmentTransaction
@@ -37,45 +36,32 @@ class InvestmentService:
             return False, 'Could not add the investment', None
 
     def update_prices(self, portfolio_id):
-        """Fetch current prices from yfinance for every investment in the portfolio."""
-        from integrations.investments.yfinance import get_stock_data_with_fallback
-
-        portfolio = db.session.get(Portfolio, portfolio_id)
-        if not portfolio:
+        """Fetch current prices for every investment in the portfolio."""
+        if not db.session.get(Portfolio, portfolio_id):
             return False, 'Portfolio not found'
+        return self._refresh(portfolio_ids=[portfolio_id])
 
-        updated = 0
-        failed = []
+    def update_all_user_prices(self, user_id):
+        """Update prices for all portfolios belonging to a user, in one refresh."""
+        portfolio_ids = [pid for (pid,) in
+                         db.session.query(Portfolio.id).filter_by(user_id=user_id)]
+        if not portfolio_ids:
+            return []
+        ok, msg = self._refresh(portfolio_ids=portfolio_ids)
+        return [{'portfolio_id': pid, 'ok': ok, 'message': msg} for pid in portfolio_ids]
 
-        for inv in portfolio.investments:
-            try:
-                data = get_stock_data_with_fallback(inv.symbol)
-                if data and data.get('price'):
-                    inv.current_price = float(data['price'])
-                    inv.last_update = datetime.utcnow()
-                    updated += 1
-                else:
-                    failed.append(inv.symbol)
-            except Exception as e:
-                failed.append(inv.symbol)
+    def _refresh(self, **scope):
+        from src.services.investment import prices
 
         try:
+            result = prices.refresh(**scope)
             db.session.commit()
         except Exception:
             db.session.rollback()
             current_app.logger.exception('Error saving updated prices')
             return False, 'Could not save the updated prices'
 
-        msg = f'Updated {updated} price(s)'
-        if failed:
-            msg += f'; failed: {", ".join(failed)}'
+        msg = f'Updated {result.updated} price(s)'
+        if result.failed:
+            msg += f'; failed: {", ".join(result.failed)}'
         return True, msg
-
-    def update_all_user_prices(self, user_id):
-        """Update prices for all portfolios belonging to a user. Used by scheduler."""
-        portfolios = Portfolio.query.filter_by(user_id=user_id).all()
-        results = []
-        for portfolio in portfolios:
-            ok, msg = self.update_prices(portfolio.id)
-            results.append({'portfolio_id': portfolio.id, 'ok': ok, 'message': msg})
-        return results
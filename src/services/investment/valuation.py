@@ -0,0 +1,104 @@
+"""What portfolios were worth: today from the holdings, in the past from `investment_prices`.
+
+`Portfolio.calculate_total_value` walks its holdings in Python, loading each,
+and the trends called it per portfolio per request. `current_values` is one
+grouped SUM over the same columns.
+
+`values_on` prices every holding on every asked-for day in one pass. It reads
+the stored closes for the held symbols once, lays them out as a grid of
+days × symbols, carrying each close forward to the days after it, and then sums
+shares × price per portfolio. A holding counts from its `purchase_date`. A
+symbol with no stored closes yet is valued at its `current_price` throughout,
+which is what every month showed before there was a history. Before a symbol's
+first stored close, that first close is used.
+
+No provider is called from here; history.py fills the table nightly.
+"""
+from bisect import bisect_right
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from src.extensions import db
+from src.models.investment import Investment, InvestmentPrice
+from src.utils.money import PRECISE, money_or_zero, to_money
+
+#: How far before the first asked-for day a close is still carried forward.
+_LOOKBACK = timedelta(days=31)
+
+
+def current_values(portfolio_ids):
+    """`{portfolio_id: value}` at current prices, in one query."""
+    if not portfolio_ids:
+        return {}
+    rows = db.session.execute(
+        select(Investment.portfolio_id,
+               func.sum(Investment.shares * Investment.current_price))
+        .where(Investment.portfolio_id.in_(list(portfolio_ids)))
+        .group_by(Investment.portfolio_id))
+    return {pid: money_or_zero(value) for pid, value in rows}
+
+
+def _price_grid(symbols, days):
+    """`{symbol: [close on or before each of days]}`, for symbols with any close."""
+    rows = db.session.execute(
+        select(InvestmentPrice.symbol, InvestmentPrice.date, InvestmentPrice.close)
+        .where(InvestmentPrice.symbol.in_(symbols),
+               InvestmentPrice.date >= days[0] - _LOOKBACK,
+               InvestmentPrice.date <= days[-1])
+        .order_by(InvestmentPrice.symbol, InvestmentPrice.date))
+    series = defaultdict(lambda: ([], []))
+    for symbol, day, close in rows:
+        series[symbol][0].append(day)
+        series[symbol][1].append(close)
+
+    grid = {}
+    for symbol, (dates, closes) in series.items():
+        # The close of the last trading day on or before each day; the first
+        # close for days before it.
+        grid[symbol] = [closes[max(bisect_right(dates, day) - 1, 0)] for day in days]
+    return grid
+
+
+def values_on(portfolio_ids, days):
+    """`{portfolio_id: [value on each of days]}`, `days` sorted ascending."""
+    days = list(days)
+    if not portfolio_ids or not days:
+        return {}
+    holdings = db.session.execute(
+        select(Investment.portfolio_id, Investment.symbol, Investment.shares,
+               Investment.current_price, Investment.purchase_date)
+        .where(Investment.portfolio_id.in_(list(portfolio_ids)))).all()
+    symbols = sorted({(h.symbol or '').strip().upper() for h in holdings})
+    grid = _price_grid(symbols, days) if symbols else {}
+
+    values = {pid: [Decimal('0')] * len(days) for pid in portfolio_ids}
+    for pid, symbol, shares, current_price, purchased in holdings:
+        shares = money_or_zero(shares, PRECISE)
+        prices = grid.get((symbol or '').strip().upper())
+        held_from = purchased.date() if purchased else None
+        row = values[pid]
+        for i, day in enumerate(days):
+            if held_from is not None and day < held_from:
+                continue
+            price = prices[i] if prices else current_price
+            row[i] += shares * money_or_zero(price, PRECISE)
+    return {pid: [to_money(value) for value in row] for pid, row in values.items()}
+
+
+def month_end_values(portfolio_ids, months, today=None):
+    """`{'YYYY-MM': total value}` across `portfolio_ids` at the end of each month.
+
+    The current month is valued at today's stored prices, not its last day.
+    """
+    today = today or date.today()
+    days = []
+    for key in months:
+        year, month = (int(part) for part in key.split('-'))
+        days.append(min(date(year, month, monthrange(year, month)[1]), today))
+    per_portfolio = values_on(portfolio_ids, days)
+    totals = [sum(column, Decimal('0')) for column in zip(*per_portfolio.values())]
+    return dict(zip(months, totals)) if totals else {}
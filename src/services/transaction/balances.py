@@ -16,9 +16,14 @@ there is exactly one implementation.
 
 Nothing here commits. The caller owns the transaction boundary, so a balance move
 lands in the same commit as the row that caused it and a rollback takes both.
+
+Every move also notes each account it touched, and the day's balance snapshot is
+written when the caller commits (`src/services/account/snapshots.py`) — what the
+net-worth trends read.
 """
 from src.extensions import db
 from src.models.account import Account
+from src.services.account import snapshots
 from src.utils.money import money_or_zero
 
 
@@ -73,6 +78,11 @@ def _move(account_id, destination_account_id, transaction_type, amount, directio
         destination = db.session.get(Account, destination_account_id)
         if destination:
             destination.balance += delta
+            snapshots.record(destination, 'transaction')
+    else:
+        return
+
+    snapshots.record(account, 'transaction')
 
 
 def apply_on_add(expense):
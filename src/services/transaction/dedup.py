@@ -0,0 +1,86 @@
+"""Which incoming rows an import already has, answered from memory.
+
+Both import paths used to ask the database once per incoming row: SimpleFin sync
+ran a `filter_by(..., external_id=...).first()` for every transaction in the
+response, and `map_row` a `filter_by(description, amount, date).first()` for every
+CSV line — ten thousand round trips for a ten-thousand-row file, each one also
+autoflushing whatever the import had added so far. Here the existing keys are
+loaded in one query and every row is checked against a set.
+
+Two shapes, because the two sources identify a transaction differently:
+
+  * SimpleFin sends an id, unique within an ACCOUNT (see the note in
+    `SimpleFinService._read_account`), so `external_ids_for` loads an account's
+    ids. Not windowed by date: Bridge re-dates a pending transaction when it
+    posts, and a date window would let that through as new.
+  * A CSV carries no id, so `CsvDuplicates` keys on (description, amount, date) —
+    the fingerprint `map_row` has always used — and loads it for the date window
+    of the rows about to be checked. `import_rows` primes it a chunk at a time, so
+    a file costs one query per chunk rather than one per row.
+
+Both are served by the composite indexes declared on `Expense`:
+`(account_id, external_id)` and `(user_id, date)`.
+"""
+from src.extensions import db
+from src.models.transaction import Expense
+from src.utils.money import to_money
+
+
+def external_ids_for(user_id, account_id, import_source):
+    """Every `external_id` already imported into `account_id` from `import_source`."""
+    return {external_id for (external_id,) in db.session.query(Expense.external_id)
+            .filter(Expense.account_id == account_id,
+                    Expense.user_id == user_id,
+                    Expense.import_source == import_source,
+                    Expense.external_id.isnot(None))}
+
+
+def _key(description, amount, date):
+    # `to_money` on both sides: the database hands back Decimal('12.50') and the
+    # parser a float 12.5, which are the same money and not the same set member.
+    return description, to_money(amount), date
+
+
+class CsvDuplicates:
+    """A user's existing (description, amount, date) keys, loaded by date window.
+
+    `prime(dates)` loads the window those dates span in one query. `seen` loads a
+    single day on its own if asked about one no window covers, so a caller that
+    never primes is still correct, just back to a query per new day.
+
+    `add` records a row this import is about to write. The per-row query saw
+    those too — they were already in the session and autoflush wrote them before
+    it ran — so two identical lines in one file have always imported once.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._keys = set()
+        self._windows = []
+
+    def _covered(self, date):
+        return any(start <= date <= end for start, end in self._windows)
+
+    def _load(self, start, end):
+        rows = db.session.query(Expense.description, Expense.amount, Expense.date).filter(
+            Expense.user_id == self.user_id,
+            Expense.date >= start,
+            Expense.date <= end,
+        )
+        self._keys.update(_key(*row) for row in rows)
+        self._windows.append((start, end))
+
+    def prime(self, dates):
+        """Load the keys for the window `dates` spans, unless one already covers it."""
+        dates = [d for d in dates if d is not None and not self._covered(d)]
+        if dates:
+            self._load(min(dates), max(dates))
+
+    def seen(self, description, amount, date):
+        """Whether this row is already in the database, or earlier in this import."""
+        if not self._covered(date):
+            self._load(date, date)
+        return _key(description, amount, date) in self._keys
+
+    def add(self, description, amount, date):
+        self._keys.add(_key(description, amount, date))
@@ -0,0 +1,60 @@
+"""What a page of transactions needs loaded before `transactions_schema` dumps it.
+
+`TransactionSchema` reaches well past the `expenses` row: the nested `category`
+(and, through `CategorySchema`, its `subcategories`), the nested `account` and its
+owning `user` for `owner`, the `category_splits` rows, and `get_splits`, which
+calls `Expense.calculate_splits()` — one `User` lookup for the payer and one per
+name in `split_with`. Every one of those was a lazy load per row, so a 50-row page
+cost well over a hundred queries and grew with `per_page`.
+
+Two halves, because they are fixed in two places:
+
+  * `with_serialised_relations(query)` adds `selectinload` options to a list
+    query, so each relationship is one `IN (...)` query for the whole page;
+  * `users_map_for(expenses)` loads every user the page's splits name in one
+    query. `TransactionSchema.prime_users` calls it before a dump and hands the
+    map to `calculate_splits`, as the dashboard already does (see
+    `src/services/analytics/service.py`).
+
+A page then costs a fixed number of queries whatever its size —
+`tests/integration/test_transactions_list_queries.py` pins the number.
+"""
+from sqlalchemy.orm import selectinload
+
+from src.models.account import Account
+from src.models.category import Category
+from src.models.transaction import Expense
+from src.models.user import User
+
+
+def with_serialised_relations(query):
+    """`query` with everything `TransactionSchema` dumps loaded up front."""
+    return query.options(
+        # `CategorySchema.subcategories` nests itself, so a leaf category still
+        # asks for its (empty) children; `recursion_depth` keeps following the
+        # self-referential collection until a level comes back empty.
+        selectinload(Expense.category).selectinload(
+            Category.subcategories, recursion_depth=-1),
+        selectinload(Expense.account).selectinload(Account.user),
+        selectinload(Expense.category_splits),
+    )
+
+
+def split_user_ids(expense):
+    """Every user id `calculate_splits` will look up for `expense`."""
+    ids = {expense.paid_by}
+    if expense.split_with:
+        ids.update(uid.strip() for uid in expense.split_with.split(','))
+    ids.discard(None)
+    ids.discard('')
+    return ids
+
+
+def users_map_for(expenses):
+    """`{user_id: User}` for every payer and participant across `expenses`."""
+    ids = set()
+    for expense in expenses:
+        ids |= split_user_ids(expense)
+    if not ids:
+        return {}
+    return {user.id: user for user in User.query.filter(User.id.in_(ids))}
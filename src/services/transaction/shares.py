@@ -0,0 +1,235 @@
+"""`expense_shares`: each person's share of a split row, kept current on write.
+
+"What is my share" and "who owes whom" were answered by calling
+`Expense.calculate_splits()` on every candidate row — parsing the comma-separated
+`split_with` and the JSON `split_details` each time — after finding the rows with
+`split_with_filter`, four `LIKE` patterns no index can serve. The cash-flow and
+stats shares, the dashboard IOUs, `calculate_balances` and group balances all did
+it, and all of them got slower with every split ever entered.
+
+`ExpenseShare` stores the answer instead: one row per person per split row,
+written from `calculate_splits` itself, so there is still exactly one copy of the
+split arithmetic. The readers below are `SUM ... GROUP BY` over an index.
+
+── WHERE IT IS MAINTAINED ─────────────────────────────────────────────────────
+
+At the session's flush, like `monthly_rollups` and for the same reason: rows are
+created and re-split by the API, the CSV importer, SimpleFin sync and the demo
+seeder, and a call at each site is how `balances` came apart once.
+`apply_pending` runs in `before_flush` and rewrites `Expense.shares` for every new
+split row and every row whose split inputs changed; the relationship's cascade
+removes the old ones, and the ORM fills in `expense_id` for a row that has none
+yet. A deleted row takes its shares with it through the same cascade.
+
+*** A BULK `Query.delete()` BYPASSES ALL OF THAT. *** Those sites call
+`forget()` with the same criteria BEFORE the statement, while the rows can still
+be found. `flask rebuild-expense-shares` recomputes everything.
+"""
+from decimal import Decimal
+
+from sqlalchemy import func, insert, inspect as sa_inspect, or_, select
+
+from src.extensions import db
+from src.models.expense_share import ExpenseShare
+from src.models.transaction import Expense
+from src.models.user import User
+from src.services.analytics.aggregates import month_key, split_rows_filter
+from src.services.analytics.rollups import is_split
+from src.services.transaction.serialisation import users_map_for
+from src.utils.money import PRECISE, money_or_zero, to_money
+
+#: The Expense columns `calculate_splits` reads. A change to any other column
+#: cannot move a share, so it costs nothing.
+_TRACKED = ('paid_by', 'split_method', 'split_with', 'split_details',
+            'split_value', 'amount', 'original_amount')
+
+#: Rows per INSERT when rebuilding.
+_BATCH = 500
+
+
+def shares_of(expense, users_map=None):
+    """`{user_id: (amount, original_amount)}` for `expense`; empty if unsplit.
+
+    Worked out by `calculate_splits` on a transient copy whose amounts are
+    already money: a row that has just arrived from a JSON payload still holds
+    `float`s, and `calculate_splits` multiplies them by `Decimal` percentages,
+    which raises (D-58).
+    """
+    if not is_split(expense.split_method, expense.split_with):
+        return {}
+
+    amount = money_or_zero(expense.amount)
+    original = to_money(expense.original_amount)
+    splits = Expense(
+        paid_by=expense.paid_by,
+        split_method=expense.split_method,
+        split_with=expense.split_with,
+        split_details=expense.split_details,
+        split_value=to_money(expense.split_value, PRECISE),
+        amount=amount,
+        original_amount=original,
+        currency_code=expense.currency_code,
+    ).calculate_splits(users_map=users_map)
+
+    # `calculate_splits` gives the payer the WHOLE original amount rather than
+    # their share of it, so the payer's is scaled from their base share.
+    if amount:
+        ratio = (original if original is not None else amount) / amount
+    else:
+        ratio = Decimal('0')
+
+    folded = {}
+
+    def add(user_id, share, share_original):
+        total, total_original = folded.get(user_id, (Decimal('0'), Decimal('0')))
+        folded[user_id] = (total + money_or_zero(share, PRECISE),
+                           total_original + money_or_zero(share_original, PRECISE))
+
+    for split in splits['splits']:
+        add(split['id'], split['amount'], split['original_amount'])
+    payer = splits['payer']
+    # A payer named in `split_with` is listed with 0 as the payer and their real
+    # share as a participant; the 0 adds nothing.
+    if payer['amount'] or payer['id'] not in folded:
+        payer_amount = money_or_zero(payer['amount'], PRECISE)
+        add(payer['id'], payer_amount, payer_amount * ratio)
+
+    return {user_id: (money_or_zero(total), money_or_zero(total_original))
+            for user_id, (total, total_original) in folded.items()}
+
+
+def changed_inputs(expense, extra=()):
+    """The split inputs of `expense` — and any `extra` columns — set since load."""
+    state = sa_inspect(expense)
+    return {name for name in _TRACKED + tuple(extra)
+            if state.attrs[name].history.has_changes()}
+
+
+def _resplit(expense):
+    """True when a persistent row's shares have to be written again."""
+    changed = changed_inputs(expense)
+    if not changed:
+        return False
+    # An unsplit row has no shares; it needs rewriting only if it just stopped
+    # being split, and only then could its split columns have changed.
+    return (is_split(expense.split_method, expense.split_with)
+            or bool(changed & {'split_method', 'split_with'}))
+
+
+def apply_pending(session):
+    """Rewrite the shares of this flush's new and re-split Expense rows.
+
+    Every user the rows name is loaded in one query, so an import of 5,000 split
+    rows costs one SELECT here, not 5,000 lookups.
+    """
+    pending = [o for o in session.new if isinstance(o, Expense)
+               and is_split(o.split_method, o.split_with)]
+    pending += [o for o in session.dirty if isinstance(o, Expense)
+                and o.id is not None and _resplit(o)]
+    if not pending:
+        return
+
+    users_map = users_map_for(pending)
+    # A participant created in this same flush is not in the database yet.
+    users_map.update({o.id: o for o in session.new if isinstance(o, User)})
+
+    for expense in pending:
+        expense.shares = [
+            ExpenseShare(user_id=user_id, paid_by=expense.paid_by,
+                         amount=amount, original_amount=original)
+            for user_id, (amount, original)
+            in shares_of(expense, users_map).items()]
+
+
+def forget(*criteria):
+    """Delete the shares of the `expenses` rows matching `criteria`.
+
+    For the bulk deletes: called BEFORE the statement that removes the rows,
+    with the same criteria. Without it their shares would outlive them, and on
+    SQLite a later row can be given a deleted row's id and inherit its debts.
+    """
+    (db.session.query(ExpenseShare)
+     .filter(ExpenseShare.expense_id.in_(select(Expense.id).where(*criteria)))
+     .delete(synchronize_session=False))
+
+
+def rebuild():
+    """Recompute every share from `expenses`.
+
+    In id order, a batch at a time, so a large history is never loaded whole.
+    Does not commit, like `rollups.rebuild()`.
+    """
+    db.session.query(ExpenseShare).delete(synchronize_session=False)
+    users_map = {user.id: user for user in User.query.all()}
+
+    last_id = 0
+    while True:
+        batch = (Expense.query.filter(split_rows_filter(), Expense.id > last_id)
+                 .order_by(Expense.id).limit(_BATCH).all())
+        if not batch:
+            return
+        rows = [{'expense_id': expense.id, 'user_id': user_id,
+                 'paid_by': expense.paid_by, 'amount': amount,
+                 'original_amount': original}
+                for expense in batch
+                for user_id, (amount, original)
+                in shares_of(expense, users_map).items()]
+        if rows:
+            db.session.execute(insert(ExpenseShare), rows)
+        last_id = batch[-1].id
+
+
+def needs_backfill():
+    """True when there are split rows and `expense_shares` is empty.
+
+    The state of every instance the first time it boots with this table, as
+    `rollups.needs_backfill()` describes.
+    """
+    return (db.session.query(ExpenseShare.id).first() is None
+            and db.session.query(Expense.id).filter(split_rows_filter())
+            .first() is not None)
+
+
+# --- Reads -------------------------------------------------------------------
+
+
+def monthly_shares(user_id, scope_ids, since=None):
+    """`[(month, transaction_type, total)]`: `user_id`'s share of split rows.
+
+    Over the rows `scope_query(scope_ids)` covers, dated on or after `since`.
+    """
+    from src.utils.household import scope_query
+
+    month = month_key()
+    query = (scope_query(scope_ids)
+             .join(ExpenseShare, ExpenseShare.expense_id == Expense.id)
+             .filter(ExpenseShare.user_id == user_id))
+    if since is not None:
+        query = query.filter(Expense.date >= since)
+    return (query.with_entities(month.label('month'),
+                                Expense.transaction_type.label('transaction_type'),
+                                func.sum(ExpenseShare.amount).label('total'))
+            .group_by(month, Expense.transaction_type)
+            .all())
+
+
+def debts(*criteria):
+    """`[(debtor, creditor, total)]`: what each person owes each payer.
+
+    A share whose `user_id` is not its `paid_by` is owed to the payer; the
+    payer's own share is owed to no one. `criteria` may filter on `ExpenseShare`
+    or `Expense` — the join is on the primary key.
+    """
+    return (db.session.query(ExpenseShare.user_id.label('debtor'),
+                             ExpenseShare.paid_by.label('creditor'),
+                             func.sum(ExpenseShare.amount).label('total'))
+            .join(Expense, Expense.id == ExpenseShare.expense_id)
+            .filter(ExpenseShare.user_id != ExpenseShare.paid_by, *criteria)
+            .group_by(ExpenseShare.user_id, ExpenseShare.paid_by)
+            .all())
+
+
+def debts_of(user_id, *criteria):
+    """`debts()` with `user_id` on one side or the other."""
+    return debts(or_(ExpenseShare.user_id == user_id,
+                     ExpenseShare.paid_by == user_id), *criteria)
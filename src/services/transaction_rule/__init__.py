@@ -4,5 +4,6 @@ Handles transaction rule management and auto-categorization
 
 The API routes that used to live here are flask-restx resources in
 api/v1/transaction_rules.py, so they carry swagger annotations. What remains in
-this package is the request-shape validation they share.
+this package is the request-shape validation they share, and the compiled,
+cached rule sets the rule engine matches with (`rule_set.py`).
 """
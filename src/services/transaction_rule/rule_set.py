@@ -0,0 +1,263 @@
+"""A user's active transaction rules, compiled once and cached.
+
+`apply_transaction_rules` runs once per imported row, and it used to re-query
+`transaction_rules` and walk `TransactionRule.matches` for every rule each time —
+lowercasing every pattern and recompiling every regex, N times per sync. A
+`RuleSet` does that work once:
+
+  * substring rules sharing a field and case mode are merged into one
+    Aho-Corasick automaton, so a description is scanned once however many
+    patterns there are (the seeded defaults alone are 52 per user);
+  * regexes are compiled up front, and one that cannot compile is recorded as
+    never matching — what `matches` did by catching `re.error` on every call;
+  * rules are pre-bucketed by `transaction_type_filter`, so a row only visits the
+    rules that can apply to its type.
+
+*** `RuleSet.matching` MUST AGREE WITH `TransactionRule.matches`. *** The preview
+(`POST /transaction-rules/test`) still asks the model, so any divergence is a
+preview that lies about what an import will do. The tests compare the two.
+
+── INVALIDATION ───────────────────────────────────────────────────────────────
+
+The cache is per process and keyed by user, and each entry carries the VERSION it
+was built at: `(count, max id, max updated_at)` of the user's rules. Every write
+the rules API makes moves it — a create adds a row, an update moves `updated_at`
+through its `onupdate`, a delete drops the count — and so does every write outside
+it (the defaults seeder, the category reset, user deletion). It is read from the
+database rather than bumped in memory because gunicorn runs three workers and the
+scheduler is a fourth process: a counter bumped by the worker that served the edit
+would leave the other three categorising with the old rules.
+
+Recording a match must therefore NOT move `updated_at`, or every matched row would
+invalidate the set it matched against — see `rule_engine._count_matches`.
+"""
+import re
+from collections import deque
+
+from sqlalchemy import func
+
+from src.extensions import db
+from src.models.transaction_rule import TransactionRule, apply_rule_actions
+
+_cache = {}
+
+
+class _Automaton:
+    """Aho-Corasick over a fixed set of non-empty strings."""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] = self._out[state] + (pattern,)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """Every pattern occurring anywhere in `text`, in one pass."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class CompiledRule:
+    """The columns of one `TransactionRule` that matching and acting read.
+
+    Plain attributes rather than the ORM row, so a cached set outlives the session
+    it was loaded in. `apply` is the row's action half only; match counting is the
+    engine's, done in one statement per call.
+    """
+    __slots__ = ('id', 'name', 'priority', 'position', 'field', 'case_sensitive', 'pattern',
+                 'regex', 'broken', 'amount_min', 'amount_max',
+                 'auto_category_id', 'auto_account_id', 'auto_transaction_type',
+                 'auto_tags', 'auto_notes')
+
+    def __init__(self, rule, position):
+        self.id = rule.id
+        self.name = rule.name
+        self.priority = rule.priority
+        self.position = position  # in the set's priority order
+        self.field = rule.pattern_field
+        self.case_sensitive = bool(rule.case_sensitive)
+        # Lowered exactly as `matches` lowers it — for a regex too, which changes
+        # what `\D` means; matching a preview is the point, not improving on it.
+        self.pattern = rule.pattern if self.case_sensitive else rule.pattern.lower()
+        self.regex = None
+        self.broken = False
+        if rule.is_regex:
+            try:
+                self.regex = re.compile(self.pattern)
+            except re.error:
+                self.broken = True
+        self.amount_min = rule.amount_min
+        self.amount_max = rule.amount_max
+        self.auto_category_id = rule.auto_category_id
+        self.auto_account_id = rule.auto_account_id
+        self.auto_transaction_type = rule.auto_transaction_type
+        self.auto_tags = rule.auto_tags
+        self.auto_notes = rule.auto_notes
+
+    def apply(self, transaction_data):
+        return apply_rule_actions(self, transaction_data)
+
+
+_NO_AMOUNT = object()
+
+
+def _absolute_amount(transaction_data):
+    """`matches`' amount: `abs()` as a float, or None where that raises."""
+    try:
+        return float(abs(transaction_data.get('amount', 0)))
+    except (ValueError, TypeError):
+        return None
+
+
+class RuleSet:
+    """One user's active rules, highest priority first, ready to match."""
+
+    def __init__(self, rules):
+        self.rules = [CompiledRule(rule, i) for i, rule in enumerate(rules)]
+
+        patterns = {}
+        for rule in self.rules:
+            if rule.regex is None and not rule.broken and rule.pattern:
+                patterns.setdefault((rule.field, rule.case_sensitive),
+                                    set()).add(rule.pattern)
+        self._automata = {key: _Automaton(sorted(values))
+                          for key, values in patterns.items()}
+
+        # A rule with no type filter applies to every type, so it sits in every
+        # bucket; the order within a bucket stays priority order.
+        self._untyped = []
+        self._by_type = {}
+        filters = {rule.transaction_type_filter for rule in rules
+                   if rule.transaction_type_filter}
+        for rule, compiled in zip(rules, self.rules):
+            wanted = rule.transaction_type_filter
+            if not wanted:
+                self._untyped.append(compiled)
+            for type_ in filters:
+                if not wanted or wanted == type_:
+                    self._by_type.setdefault(type_, []).append(compiled)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _candidates(self, transaction_type):
+        return self._by_type.get(transaction_type, self._untyped)
+
+    def matching(self, transaction_data):
+        """The rules that match `transaction_data`, in priority order.
+
+        A generator, so a caller that wants only the first match stops there —
+        and one that APPLIES each match before asking for the next (the engine's
+        loop) has later rules judged against the data as it is by then, exactly
+        as the old loop's one `matches()` per rule did. A rule that sets
+        `transaction_type` to 'income' lets a lower-priority income-only rule
+        match; a rule's note is visible to a rule matching on `notes`.
+        """
+        transaction_type = transaction_data.get('transaction_type', '')
+        candidates = self._candidates(transaction_type)
+        amount = _NO_AMOUNT
+        # (field, case_sensitive) -> [raw value, normalised text, automaton hits]
+        texts = {}
+
+        i = 0
+        while i < len(candidates):
+            rule = candidates[i]
+            i += 1
+            if rule.broken:
+                continue
+
+            if rule.amount_min is not None or rule.amount_max is not None:
+                if amount is _NO_AMOUNT:
+                    amount = _absolute_amount(transaction_data)
+                if amount is None:
+                    continue
+                if rule.amount_min is not None and amount < rule.amount_min:
+                    continue
+                if rule.amount_max is not None and amount > rule.amount_max:
+                    continue
+
+            key = (rule.field, rule.case_sensitive)
+            value = transaction_data.get(rule.field, '')
+            entry = texts.get(key)
+            if entry is None or entry[0] is not value:
+                entry = texts[key] = [value, None if not value else (
+                    str(value) if rule.case_sensitive else str(value).lower()), None]
+            text = entry[1]
+            if text is None:
+                continue
+
+            if rule.regex is not None:
+                matched = rule.regex.search(text) is not None
+            elif not rule.pattern:
+                matched = True
+            else:
+                if entry[2] is None:
+                    entry[2] = self._automata[key].find(text)
+                matched = rule.pattern in entry[2]
+            if not matched:
+                continue
+
+            yield rule
+
+            # The caller may have applied `rule` in between. A new type means a
+            # different bucket, resumed just below `rule`'s priority.
+            now = transaction_data.get('transaction_type', '')
+            if now != transaction_type:
+                transaction_type = now
+                candidates = [r for r in self._candidates(now)
+                              if r.position > rule.position]
+                i = 0
+
+
+def _version(user_id):
+    return tuple(db.session.query(
+        func.count(TransactionRule.id),
+        func.max(TransactionRule.id),
+        func.max(TransactionRule.updated_at),
+    ).filter(TransactionRule.user_id == user_id).one())
+
+
+def rule_set_for(user_id):
+    """`user_id`'s compiled rules, rebuilt only when their version has moved."""
+    version = _version(user_id)
+    cached = _cache.get(user_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    rules = TransactionRule.query.filter_by(
+        user_id=user_id,
+        active=True
+    ).order_by(TransactionRule.priority.desc()).all()
+    rule_set = RuleSet(rules)
+    _cache[user_id] = (version, rule_set)
+    return rule_set
@@ -3,12 +3,13 @@ Utility functions package
 """
 
 from src.utils.decorators import demo_restricted
-from src.utils.currency_converter import convert_currency
+from src.utils.currency_converter import convert_currency, convert_many
 from src.utils.helpers import calculate_balances, auto_categorize_transaction
 
 __all__ = [
     'demo_restricted',
     'convert_currency',
+    'convert_many',
     'calculate_balances',
     'auto_categorize_transaction',
 ]
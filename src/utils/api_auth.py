@@ -4,28 +4,109 @@ A token-authenticated request is made to look exactly like a session request to
 everything downstream, so the ~70 existing `get_jwt_identity()` call sites need
 no changes. The alternative — introducing a new identity helper and editing every
 site — fails silently if one is missed, attributing data to the wrong user.
+
+A resolved token is cached by its hash for CACHE_TTL_SECONDS. An MCP agent makes
+hundreds of small reads, and each one used to look the token up, mint a JWT and
+decode it again just to install the identity. A cache hit does none of that.
+Revoking or editing a token drops its entry in the process that wrote it at once
+(the mapper events at the bottom); other workers notice within the TTL.
 """
 import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from functools import wraps
+from time import monotonic
+from typing import Optional
 
 from flask import g, request
 from flask_jwt_extended import create_access_token, decode_token, verify_jwt_in_request
+from sqlalchemy import event
 
 from src.extensions import db
 from src.models.personal_access_token import (
     SCOPE_READ,
     TOKEN_PREFIX,
     PersonalAccessToken,
+    hash_token,
 )
 
 logger = logging.getLogger(__name__)
 
 LAST_USED_THROTTLE_SECONDS = 300
 
+#: How long a worker trusts a resolved token without asking the database. This
+#: is also how long a revocation made in another worker can take to land.
+CACHE_TTL_SECONDS = 30
+
+#: Tokens cached per process; the least recently used goes first.
+CACHE_MAX_ENTRIES = 1024
+
+
+@dataclass(frozen=True)
+class ResolvedToken:
+    """What a request needs of a PersonalAccessToken, detached from any session.
+
+    A cached row would be bound to the session that loaded it, and that session
+    is gone after the request. The checks are the model's own.
+    """
+    id: int
+    user_id: str
+    scopes: str
+    expires_at: datetime
+    revoked_at: Optional[datetime]
+
+    is_expired = PersonalAccessToken.is_expired
+    is_revoked = PersonalAccessToken.is_revoked
+    has_scope = PersonalAccessToken.has_scope
+
+
+class _Entry:
+    __slots__ = ('token', 'claims', 'last_used_at', 'deadline')
+
+    def __init__(self, token, claims, last_used_at, deadline):
+        self.token = token
+        self.claims = claims
+        self.last_used_at = last_used_at
+        self.deadline = deadline
+
+
+_cache = OrderedDict()  # token hash → _Entry
+_cache_lock = threading.Lock()
+
+
+def _cached(token_hash):
+    with _cache_lock:
+        entry = _cache.get(token_hash)
+        if entry is None:
+            return None
+        if entry.deadline <= monotonic():
+            del _cache[token_hash]
+            return None
+        _cache.move_to_end(token_hash)
+        return entry
+
+
+def _remember(token_hash, entry):
+    with _cache_lock:
+        _cache[token_hash] = entry
+        _cache.move_to_end(token_hash)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def invalidate(token_hash=None):
+    """Forget one token, or every token, in this process."""
+    with _cache_lock:
+        if token_hash is None:
+            _cache.clear()
+        else:
+            _cache.pop(token_hash, None)
+
 
 def current_pat():
-    """The PersonalAccessToken behind this request, or None for a human."""
+    """The token behind this request as a `ResolvedToken`, or None for a human."""
     return getattr(g, 'pat', None)
 
 
@@ -42,7 +123,40 @@ def _presented_token():
     return None
 
 
-def _install_identity(user_id, token):
+def _claims_for(token):
+    """The decoded claims of an access token for `token`'s user.
+
+    Minted and decoded once per cache entry rather than per request, so the
+    claims are exactly what flask-jwt-extended would produce. Their `exp` is the
+    access-token lifetime from minting, far longer than CACHE_TTL_SECONDS.
+    """
+    minted = create_access_token(
+        identity=token.user_id,
+        additional_claims={'pat_id': token.id, 'scopes': token.scopes},
+    )
+    return decode_token(minted)
+
+
+def _resolve(presented):
+    """The cache entry for a presented token, or None if there is no such token."""
+    token_hash = hash_token(presented)
+    entry = _cached(token_hash)
+    if entry is not None:
+        return entry
+
+    row = PersonalAccessToken.find_by_plaintext(presented)
+    if row is None:
+        # Not cached: a guesser must not be able to fill the cache.
+        return None
+    token = ResolvedToken(id=row.id, user_id=row.user_id, scopes=row.scopes,
+                          expires_at=row.expires_at, revoked_at=row.revoked_at)
+    entry = _Entry(token, _claims_for(token) if not row.is_revoked else None,
+                   row.last_used_at, monotonic() + CACHE_TTL_SECONDS)
+    _remember(token_hash, entry)
+    return entry
+
+
+def _install_identity(claims):
     """Make flask-jwt-extended believe a valid access token was presented.
 
     Uses the same request-context attributes verify_jwt_in_request() sets. This
@@ -54,27 +168,29 @@ def _install_identity(user_id, token):
     it today, but spelling it correctly means `current_user` returns None rather
     than raising KeyError the day someone does.
     """
-    minted = create_access_token(
-        identity=user_id,
-        additional_claims={'pat_id': token.id, 'scopes': token.scopes},
-    )
-    decoded = decode_token(minted)
-    g._jwt_extended_jwt = decoded
+    # A copy: the cached claims are shared by every request the entry serves.
+    g._jwt_extended_jwt = dict(claims)
     g._jwt_extended_jwt_header = {}
     g._jwt_extended_jwt_user = {'loaded_user': None}
     g._jwt_extended_jwt_location = 'headers'
 
 
-def _touch(token):
-    """Record use, at most once per LAST_USED_THROTTLE_SECONDS."""
+def _touch(entry):
+    """Record use, at most once per LAST_USED_THROTTLE_SECONDS.
+
+    An UPDATE by id rather than a loaded row, so a cache hit stays a hit. The
+    mapper events below do not see it, and the entry stays cached.
+    """
     now = datetime.utcnow()
-    if (token.last_used_at is not None
-            and now - token.last_used_at < timedelta(
+    if (entry.last_used_at is not None
+            and now - entry.last_used_at < timedelta(
                 seconds=LAST_USED_THROTTLE_SECONDS)):
         return
     try:
-        token.last_used_at = now
+        PersonalAccessToken.query.filter_by(id=entry.token.id).update(
+            {'last_used_at': now}, synchronize_session=False)
         db.session.commit()
+        entry.last_used_at = now
     except Exception:
         db.session.rollback()
         logger.exception('Failed to record token last_used_at')
@@ -101,9 +217,10 @@ def api_auth_required(scope=SCOPE_READ):
                 g.pat = None
                 return fn(*args, **kwargs)
 
-            token = PersonalAccessToken.find_by_plaintext(presented)
-            if token is None:
+            entry = _resolve(presented)
+            if entry is None:
                 return {'error': 'invalid_token'}, 401
+            token = entry.token
             if token.is_revoked:
                 return {'error': 'token_revoked'}, 401
             if token.is_expired:
@@ -111,9 +228,21 @@ def api_auth_required(scope=SCOPE_READ):
             if not token.has_scope(scope):
                 return {'error': 'insufficient_scope'}, 403
 
-            _install_identity(token.user_id, token)
+            _install_identity(entry.claims)
             g.pat = token
-            _touch(token)
+            _touch(entry)
             return fn(*args, **kwargs)
         return wrapper
     return decorator
+
+
+# ---------------------------------------------------------------------------
+# A revoked, re-scoped or deleted token leaves this process's cache at the flush
+# that writes it. `_touch`'s bulk UPDATE is not an ORM update and does not fire.
+# ---------------------------------------------------------------------------
+
+
+@event.listens_for(PersonalAccessToken, 'after_update')
+@event.listens_for(PersonalAccessToken, 'after_delete')
+def _token_written(mapper, connection, target):
+    invalidate(target.token_hash)
@@ -1,41 +1,126 @@
 """
 Currency conversion utilities
+
+Conversion is arithmetic over an in-process RATE TABLE, not a lookup per call.
+`convert_currency` used to run three `Currency` queries (from, to, base) every
+time it was asked, and `calculate_asset_debt_trends` asks per account and per
+transaction — thousands of identical lookups per dashboard load in a
+multi-currency household.
+
+`rate_table()` loads every rate once into an immutable `FxRates` and keeps it for
+the process. Each table carries the VERSION it was built at, `(count, max
+last_updated)` of `currencies`, and a table whose version has moved is rebuilt.
+Every write that changes a rate stamps `last_updated` — `CurrencyService`'s
+add/update/set-base and the nightly `update_exchange_rates` job — and an insert or
+delete moves the count. Read from the database rather than bumped in memory for
+the reason `rule_set.py` gives: three gunicorn workers and a scheduler process
+would otherwise keep converting at yesterday's rates in every process but the
+one that ran the job.
+
+The version is checked once per app context, so a request or a scheduled job pays
+one small aggregate however many conversions it makes. A write in THIS process
+drops the table at once (`invalidate`, wired to the `Currency` mapper events
+below), so a request that edits a rate and then converts sees the new one.
 """
+from collections import namedtuple
+from types import MappingProxyType
 
+from flask import g, has_app_context
+from sqlalchemy import event, func
+
+from src.extensions import db
 from src.models.currency import Currency
 
+_G_KEY = '_fx_rate_table'
+_table = None
+
+
+class FxRates(namedtuple('FxRates', 'version base rates')):
+    """`rates` maps code → `rate_to_base` (Decimal); `base` is the base code or None."""
+
+    __slots__ = ()
+
+    def convert(self, amount, from_code, to_code):
+        """`amount` in `to_code` — the original amount if either code or the base is unknown."""
+        if from_code == to_code:
+            return amount
+        rates = self.rates
+        if from_code not in rates or to_code not in rates or self.base is None:
+            return amount
+        amount_in_base = amount if from_code == self.base else amount * rates[from_code]
+        if to_code == self.base:
+            return amount_in_base
+        return amount_in_base / rates[to_code]
+
+
+def _version():
+    return tuple(db.session.query(
+        func.count(Currency.code), func.max(Currency.last_updated)).one())
+
+
+def _load(version):
+    rates = {}
+    base = None
+    for code, rate, is_base in db.session.query(
+            Currency.code, Currency.rate_to_base, Currency.is_base):
+        rates[code] = rate
+        if is_base and base is None:
+            base = code
+    return FxRates(version, base, MappingProxyType(rates))
+
+
+def rate_table():
+    """The current `FxRates`, rebuilt only when the currencies' version has moved."""
+    global _table
+    if has_app_context():
+        table = g.get(_G_KEY)
+        if table is not None:
+            return table
+    version = _version()
+    table = _table
+    if table is None or table.version != version:
+        table = _table = _load(version)
+    if has_app_context():
+        setattr(g, _G_KEY, table)
+    return table
+
+
+def invalidate():
+    """Forget the table, so the next conversion in this process reloads it."""
+    global _table
+    _table = None
+    if has_app_context():
+        g.pop(_G_KEY, None)
+
+
+@event.listens_for(Currency, 'after_insert')
+@event.listens_for(Currency, 'after_update')
+@event.listens_for(Currency, 'after_delete')
+def _currency_written(mapper, connection, target):
+    invalidate()
+
+
 def get_base_currency():
     """Get the base currency"""
     return Currency.query.filter_by(is_base=True).first()
 
+
 def convert_currency(amount, from_code, to_code):
     """Convert an amount from one currency to another"""
     if from_code == to_code:
         return amount
-    
-    from_currency = Currency.query.filter_by(code=from_code).first()
-    to_currency = Currency.query.filter_by(code=to_code).first()
-    
-    if not from_currency or not to_currency:
-        return amount  # Return original if either currency not found
-    
-    # Get base currency for reference
-    base_currency = Currency.query.filter_by(is_base=True).first()
-    if not base_currency:
-        return amount  # Cannot convert without a base currency
-    
-    # First convert amount to base currency
-    if from_code == base_currency.code:
-        # Amount is already in base currency
-        amount_in_base = amount
-    else:
-        # Convert from source currency to base currency
-        amount_in_base = amount * from_currency.rate_to_base
-    
-    # Then convert from base currency to target currency
-    if to_code == base_currency.code:
-        # Target is base currency, so we're done
-        return amount_in_base
-    else:
-        # Convert from base currency to target currency
-        return amount_in_base / to_currency.rate_to_base
+    return rate_table().convert(amount, from_code, to_code)
+
+
+def convert_many(amounts, from_codes, to_code):
+    """Convert each of `amounts` to `to_code`, against one rate table.
+
+    `from_codes` is a code per amount, or a single code for all of them. Returns a
+    list in the same order, each converted as `convert_currency` would.
+    """
+    amounts = list(amounts)
+    if isinstance(from_codes, str):
+        from_codes = [from_codes] * len(amounts)
+    table = rate_table()
+    return [table.convert(amount, code, to_code)
+            for amount, code in zip(amounts, from_codes)]
@@ -9,7 +9,6 @@ from src.models.category import CategoryMapping
 from src.models.group import Settlement
 from src.models.user import User
 from src.extensions import db
-from src.utils.split_with import split_with_filter
 
 def auto_categorize_transaction(description, user_id):
     """
@@ -78,55 +77,32 @@ def calculate_balances(user_id):
     """Calculate balances between the current user and all other users"""
     balances = {}
     
-    # Step 1: Calculate balances from expenses
-    expenses = Expense.query.filter(
-        or_(
-            Expense.paid_by == user_id,
-            split_with_filter(Expense.split_with, user_id)
-        )
-    ).all()
-    
-    for expense in expenses:
-        splits = expense.calculate_splits()
-        
-        # If current user paid for the expense
-        if expense.paid_by == user_id:
-            # Add what others owe to current user
-            for split in splits['splits']:
-                other_user_id = split['email']
-                if other_user_id != user_id:
-                    if other_user_id not in balances:
-                        other_user = User.query.filter_by(id=other_user_id).first()
-                        balances[other_user_id] = {
-                            'user_id': other_user_id,
-                            'name': other_user.name if other_user else 'Unknown',
-                            'email': other_user_id,
-                            'amount': 0
-                        }
-                    balances[other_user_id]['amount'] += split['amount']
+    # Step 1: Calculate balances from expenses — what each counterpart owes the
+    # user, or is owed, summed from `expense_shares` rather than re-splitting
+    # every row `split_with_filter` could find.
+    from src.services.transaction import shares
+
+    owed = shares.debts_of(user_id)
+    counterparts = {row.creditor if row.debtor == user_id else row.debtor
+                    for row in owed}
+    names = {u.id: u.name for u in
+             User.query.filter(User.id.in_(counterparts))} if counterparts else {}
+
+    for row in owed:
+        if row.creditor == user_id:
+            # Someone owes the current user
+            other_user_id, amount = row.debtor, row.total
         else:
-            # If someone else paid and current user owes them
-            payer_id = expense.paid_by
-            
-            # Find current user's portion
-            current_user_portion = 0
-            
-            # Check if current user is in the splits
-            for split in splits['splits']:
-                if split['email'] == user_id:
-                    current_user_portion = split['amount']
-                    break
-            
-            if current_user_portion > 0:
-                if payer_id not in balances:
-                    payer = User.query.filter_by(id=payer_id).first()
-                    balances[payer_id] = {
-                        'user_id': payer_id,
-                        'name': payer.name if payer else 'Unknown',
-                        'email': payer_id,
-                        'amount': 0
-                    }
-                balances[payer_id]['amount'] -= current_user_portion
+            # The current user owes someone else
+            other_user_id, amount = row.creditor, -row.total
+        if other_user_id not in balances:
+            balances[other_user_id] = {
+                'user_id': other_user_id,
+                'name': names.get(other_user_id, 'Unknown'),
+                'email': other_user_id,
+                'amount': 0
+            }
+        balances[other_user_id]['amount'] += amount
     
     # Step 2: Adjust balances based on settlements
     settlements = Settlement.query.filter(
@@ -196,6 +172,7 @@ def sync_investments_with_accounts(user_id):
     from flask import current_app
     from src.models.investment import Portfolio
     from src.models.account import Account
+    from src.services.investment import valuation
 
     try:
         # Get all portfolios for the user that are linked to accounts
@@ -207,6 +184,8 @@ def sync_investments_with_accounts(user_id):
         if not portfolios:
             return  # No linked portfolios, nothing to sync
 
+        values = valuation.current_values([p.id for p in portfolios])
+
         for portfolio in portfolios:
             # Skip if no linked account
             if not portfolio.account_id:
@@ -220,11 +199,8 @@ def sync_investments_with_accounts(user_id):
             if account.import_source == 'simplefin':
                 continue
 
-            # Calculate current portfolio value
-            portfolio_value = portfolio.calculate_total_value()
-
             # Update the account balance to match the portfolio value
-            account.balance = portfolio_value
+            account.balance = values.get(portfolio.id, 0)
 
         # Save all changes
         db.session.commit()
@@ -234,6 +210,16 @@ def sync_investments_with_accounts(user_id):
         db.session.rollback()  # Rollback on error
 
 
+def _months_from(first, last):
+    """Every 'YYYY-MM' from `first` to `last`, inclusive."""
+    year, month = (int(part) for part in first.split('-'))
+    months = []
+    while '%04d-%02d' % (year, month) <= last:
+        months.append('%04d-%02d' % (year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
 def calculate_asset_debt_trends(current_user, user_ids=None):
     """Asset and debt trends for a set of members' accounts, including investments.
 
@@ -247,7 +233,9 @@ def calculate_asset_debt_trends(current_user, user_ids=None):
     from datetime import datetime, timedelta
     from src.models.account import Account
     from src.models.investment import Portfolio
-    from src.utils.currency_converter import convert_currency
+    from src.services.account import snapshots
+    from src.services.investment import valuation
+    from src.utils.currency_converter import convert_currency, convert_many
 
     # Initialize tracking
     monthly_assets = {}
@@ -290,8 +278,10 @@ def calculate_asset_debt_trends(current_user, user_ids=None):
     account_linked_portfolios = []
 
     # Calculate investment total
+    portfolio_values = valuation.current_values([p.id for p in portfolios])
+    unlinked_ids = []
     for portfolio in portfolios:
-        portfolio_value = portfolio.calculate_total_value()
+        portfolio_value = portfolio_values.get(portfolio.id, 0)
 
         # Check if this portfolio is linked to an account
         if portfolio.account_id:
@@ -303,11 +293,20 @@ def calculate_asset_debt_trends(current_user, user_ids=None):
         else:
             # If not linked to an account, add directly to assets
             investment_total += portfolio_value
+            unlinked_ids.append(portfolio.id)
 
     # Add investment total to assets - only those not linked to accounts
     direct_total_assets += investment_total
 
-    # Process each account for historical trends
+    # Process each account for historical trends. Each month's figure is read
+    # from `account_balance_snapshots` — one range query for every account — and
+    # an account with none yet is replayed backwards from today's balance, the
+    # walk this used to do for every account on every load. See
+    # src/services/account/snapshots.py.
+    snapshot_history = snapshots.month_end_balances(
+        [account.id for account in accounts], twelve_months_ago)
+    this_month = today.strftime('%Y-%m')
+
     for account in accounts:
         # Get account's currency code, default to user's preferred currency
         account_currency_code = account.currency_code or user_currency_code
@@ -320,63 +319,23 @@ def calculate_asset_debt_trends(current_user, user_ids=None):
         if abs(account.balance or 0) < 0.01:
             continue
 
-        # Get monthly transactions for this account
-        transactions = Expense.query.filter(
-            Expense.account_id == account.id,
-            Expense.user_id == current_user.id,
-            Expense.date >= twelve_months_ago
-        ).order_by(Expense.date).all()
-
-        # Reconstruct each month's closing balance by working *backwards* from the
-        # balance we know: today's.
-        #
-        # This used to seed `current_balance` with today's balance and then walk
-        # transactions oldest-to-newest applying `+= income` / `-= expense`, which
-        # treats the present balance as the starting balance and replays a year of
-        # activity on top of it. The resulting "history" was the current balance
-        # plus a forward sum — not a balance at any point in time — and it pushed
-        # the whole net-worth trend the wrong way.
-        #
-        # The balance at the end of month M is:
-        #     today's balance − (net effect of every transaction after M)
-        # so the walk has to go newest-to-oldest, undoing one month at a time.
-        by_month = {}
-        for transaction in transactions:
-            amount = transaction.amount
-            if transaction.currency_code and transaction.currency_code != account_currency_code:
-                amount = convert_currency(
-                    amount, transaction.currency_code, account_currency_code)
-
-            # Signed effect on the balance, so undoing it is a subtraction.
-            if transaction.transaction_type == 'income':
-                effect = amount
-            elif transaction.transaction_type in ('expense', 'transfer'):
-                effect = -amount
-            else:
-                continue
-
-            by_month.setdefault(transaction.date.strftime('%Y-%m'), 0)
-            by_month[transaction.date.strftime('%Y-%m')] += effect
-
-        balance_history = {}
-        running = account.balance or 0
-
-        # No activity since the newest transaction, so the current month closes at
-        # today's balance. Set explicitly for the case where the newest transaction
-        # predates this month.
-        balance_history[today.strftime('%Y-%m')] = running
-
-        for month_key in sorted(by_month, reverse=True):
-            # `running` is this month's closing balance before we undo its activity.
-            balance_history[month_key] = running
-            # Having removed this month's transactions, `running` is now the closing
-            # balance of the month before it.
-            running -= by_month[month_key]
+        recorded = snapshot_history.get(account.id)
+        if recorded is None:
+            balance_history = snapshots.replay_month_ends(account, twelve_months_ago)
+        else:
+            # A month with no snapshot closed where the one before it did.
+            balance_history = {}
+            running = None
+            for month_key in _months_from(min(recorded), this_month):
+                running = recorded.get(month_key, running)
+                balance_history[month_key] = running
+        # The newest point is the balance we actually know, whatever was recorded.
+        balance_history[this_month] = account.balance or 0
 
         # Convert balance history to user currency if needed
         if account_currency_code != user_currency_code:
-            for month, balance in balance_history.items():
-                balance_history[month] = convert_currency(balance, account_currency_code, user_currency_code)
+            balance_history = dict(zip(balance_history, convert_many(
+                balance_history.values(), account_currency_code, user_currency_code)))
 
         # Categorize and store balances
         for month, balance in balance_history.items():
@@ -387,11 +346,17 @@ def calculate_asset_debt_trends(current_user, user_ids=None):
                 # For debt accounts or negative balances, add the absolute value to the debt total
                 monthly_debts[month] = monthly_debts.get(month, 0) + abs(balance)
 
-    # Add investment values to monthly trends
-    # This is a simplification - we don't have historical investment data
-    # so we'll just use the current value for all months
-    for month in monthly_assets.keys():
-        monthly_assets[month] += investment_total
+    # Add investment values to monthly trends, each month valued at its own
+    # month-end closes from `investment_prices` (src/services/investment/
+    # valuation.py). A linked portfolio is already in its account's balance.
+    # This month is today's total, as for the accounts.
+    trend_months = sorted(set(_months_from(twelve_months_ago.strftime('%Y-%m'), this_month))
+                          | set(monthly_assets) | set(monthly_debts))
+    investment_history = valuation.month_end_values(unlinked_ids, trend_months)
+    investment_history[this_month] = investment_total
+    for month, value in investment_history.items():
+        if value or month in monthly_assets or month in monthly_debts:
+            monthly_assets[month] = monthly_assets.get(month, 0) + value
 
     # Ensure consistent months across both series
     all_months = sorted(set(list(monthly_assets.keys()) + list(monthly_debts.keys())))
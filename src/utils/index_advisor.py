@@ -0,0 +1,149 @@
+"""Does each hot query over `expenses` still use an index? Reads only.
+
+`flask index-advisor` runs EXPLAIN over the CANONICAL QUERIES below — the
+statements the transactions list, budgets, account pages and imports actually
+send — and flags every full scan of a watched table. An index dropped, renamed, or
+made useless by a changed filter shows up here, in CI or on a staging copy,
+instead of as a slow page in production.
+
+Scoped reads are built from the application's own `scope_query` and
+`scope_rollups`, so a scope that changes shape is re-checked as it now is. The
+rest restate the filters of `BudgetSpendCalculator` and
+`src/services/transaction/dedup.py`; a change to either belongs here too.
+
+Two dialects, because they are asked differently:
+
+  * SQLite: `EXPLAIN QUERY PLAN`. A line `SCAN expenses` with no index is a full
+    scan; `SEARCH ... USING INDEX` and `SCAN ... USING INDEX` are not.
+  * Postgres: `EXPLAIN (FORMAT JSON)`, inside a transaction that is rolled back,
+    with `enable_seqscan` off. On a small table the planner rightly prefers a
+    sequential scan, which would flag everything on a test database; with it
+    discouraged, a `Seq Scan` that survives means NO index can serve the query —
+    the thing this exists to catch.
+
+Anything else is reported as unsupported rather than guessed at.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from src.extensions import db
+
+#: Tables whose full scans are flagged: the ones that grow with every transaction.
+#: Reference tables (categories, accounts, users) are scanned legitimately, and so
+#: is `monthly_rollups` — a row per account, category and month, small by design,
+#: read through the same OR scope no index can serve. Its plan is still printed.
+WATCHED_TABLES = ('expenses', 'category_splits')
+
+_USER = 'index-advisor@example.invalid'
+
+
+def canonical_queries():
+    """(name, statement) for each hot read, with representative parameters."""
+    from src.models.transaction import CategorySplit, Expense
+    from src.services.analytics import rollups
+    from src.utils.household import scope_query
+
+    now = datetime(2026, 1, 31)
+    month_ago = now - timedelta(days=31)
+    users = [_USER]
+
+    return [
+        ('transactions list',
+         scope_query(users).filter(Expense.date >= month_ago)
+         .order_by(Expense.date.desc()).limit(50).statement),
+        ('account history',
+         Expense.query.filter(Expense.account_id == 1, Expense.date >= month_ago)
+         .order_by(Expense.date.desc()).statement),
+        ('budget spend',
+         db.session.query(Expense.category_id, db.func.sum(Expense.amount))
+         .filter(Expense.user_id.in_(users), Expense.category_id.in_([1, 2]),
+                 Expense.date >= month_ago, Expense.date <= now)
+         .group_by(Expense.category_id).statement),
+        ('budget spend, split rows',
+         db.session.query(CategorySplit.category_id, db.func.sum(CategorySplit.amount))
+         .join(Expense, CategorySplit.expense_id == Expense.id)
+         .filter(Expense.user_id.in_(users), CategorySplit.category_id.in_([1, 2]),
+                 Expense.date >= month_ago, Expense.date <= now)
+         .group_by(CategorySplit.category_id).statement),
+        ('SimpleFin duplicate check',
+         db.session.query(Expense.external_id)
+         .filter(Expense.account_id == 1, Expense.user_id == _USER,
+                 Expense.import_source == 'simplefin',
+                 Expense.external_id.isnot(None)).statement),
+        ('CSV duplicate check',
+         db.session.query(Expense.description, Expense.amount, Expense.date)
+         .filter(Expense.user_id == _USER, Expense.date >= month_ago,
+                 Expense.date <= now).statement),
+        ('monthly rollups',
+         rollups.scope_rollups(users).statement),
+    ]
+
+
+def _driver_sql(connection, statement):
+    compiled = statement.compile(dialect=connection.dialect,
+                                 compile_kwargs={'render_postcompile': True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    return compiled.string, params
+
+
+def _sqlite_plan(connection, statement):
+    sql, params = _driver_sql(connection, statement)
+    lines = [row[-1] for row in
+             connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params)]
+    scans = []
+    for line in lines:
+        words = line.split()
+        if len(words) >= 2 and words[0] == 'SCAN' and 'USING' not in words:
+            if words[1] in WATCHED_TABLES:
+                scans.append(words[1])
+    return lines, scans
+
+
+def _postgres_nodes(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _postgres_nodes(child)
+
+
+def _postgres_plan(connection, statement):
+    sql, params = _driver_sql(connection, statement)
+    transaction = connection.begin()
+    try:
+        connection.execute(text('SET LOCAL enable_seqscan = off'))
+        (plan,), = connection.exec_driver_sql(
+            'EXPLAIN (FORMAT JSON) ' + sql, params).fetchone()
+    finally:
+        transaction.rollback()
+    lines = []
+    scans = []
+    for node in _postgres_nodes(plan['Plan']):
+        relation = node.get('Relation Name')
+        lines.append(' '.join(filter(None, (
+            node['Node Type'], relation and 'on ' + relation,
+            node.get('Index Name') and 'using ' + node['Index Name']))))
+        if node['Node Type'] == 'Seq Scan' and relation in WATCHED_TABLES:
+            scans.append(relation)
+    return lines, scans
+
+
+def advise(engine=None):
+    """EXPLAIN every canonical query.
+
+    Returns a list of dicts — `name`, `plan` (lines), `seq_scans` (watched tables
+    fully scanned) — or raises ValueError for a dialect it cannot read.
+    """
+    engine = engine or db.engine
+    planner = {'sqlite': _sqlite_plan, 'postgresql': _postgres_plan}.get(
+        engine.dialect.name)
+    if planner is None:
+        raise ValueError(f'No index advice for the {engine.dialect.name} dialect')
+
+    report = []
+    with engine.connect() as connection:
+        for name, statement in canonical_queries():
+            plan, scans = planner(connection, statement)
+            report.append({'name': name, 'plan': plan, 'seq_scans': scans})
+    return report
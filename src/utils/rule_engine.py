@@ -3,8 +3,14 @@ Transaction Rule Engine
 Applies transaction rules for auto-categorization and automation
 """
 
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import bindparam, func
+
 from src.models.transaction_rule import TransactionRule
 from src.extensions import db
+from src.services.transaction_rule.rule_set import rule_set_for
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,15 +27,63 @@ def apply_transaction_rules(transaction_data, user_id):
     Returns:
         dict: Updated transaction data with rules applied
     """
-    # Get all active rules for user, ordered by priority (highest first)
-    rules = TransactionRule.query.filter_by(
-        user_id=user_id,
-        active=True
-    ).order_by(TransactionRule.priority.desc()).all()
+    # All active rules for the user, highest priority first, compiled once and
+    # cached until one of them is written — see rule_set.py.
+    rule_set = rule_set_for(user_id)
+
+    logger.info(f"Applying {len(rule_set)} rules for user {user_id}")
+
+    counts = Counter()
+    transaction_data, matched_rules = _apply_rule_set(
+        rule_set, transaction_data, counts)
+
+    if matched_rules:
+        logger.info(f"Matched rules: {', '.join(matched_rules)}")
+    else:
+        logger.debug(f"No rules matched for transaction: {transaction_data.get('description', '')}")
+
+    # Commit rule match count updates
+    try:
+        _count_matches(counts)
+        db.session.commit()
+    except Exception as e:
+        logger.error(f"Failed to commit rule match counts: {str(e)}")
+        db.session.rollback()
+
+    return transaction_data
+
+
+def apply_transaction_rules_bulk(rows, user_id):
+    """
+    Apply all active transaction rules to a batch of transactions
+
+    The import paths' entry point. `apply_transaction_rules` commits after every
+    call to persist its match counters, which inside an import is one commit per
+    row — and a commit of whatever the importer had added so far, so a file that
+    failed halfway left its first half behind. This loads the rule set once,
+    gathers the counters and writes them as one UPDATE per matched rule, and does
+    NOT commit: they land in the caller's transaction, with the rows they counted.
+
+    Args:
+        rows: Iterable of transaction-data dicts, as `apply_transaction_rules` takes
+        user_id: User ID to get rules for
+
+    Returns:
+        list: The updated dict for each row, in order
+    """
+    rule_set = rule_set_for(user_id)
+    counts = Counter()
+    results = [_apply_rule_set(rule_set, row, counts)[0] for row in rows]
+
+    logger.info(f"Applied {len(rule_set)} rules to {len(results)} transactions "
+                f"for user {user_id}; {sum(counts.values())} matches")
+
+    _count_matches(counts)
+    return results
 
-    logger.info(f"Applying {len(rules)} rules for user {user_id}")
 
-    # Track which rules matched for logging
+def _apply_rule_set(rule_set, transaction_data, counts):
+    """Run one row through `rule_set`. Returns (data, names of matched rules)."""
     matched_rules = []
 
     # Fields where the highest-priority match wins and later matches must not
@@ -47,44 +101,56 @@ def apply_transaction_rules(transaction_data, user_id):
     precedence_fields = ('category_id', 'account_id')
     claimed = {}
 
-    # Apply each rule
-    for rule in rules:
-        if rule.matches(transaction_data):
-            logger.debug(f"Rule matched: {rule.name}")
-            matched_rules.append(rule.name)
-
-            # Apply the rule's actions
-            transaction_data = rule.apply(transaction_data)
-
-            # Rules arrive in descending priority, so the first to set one of these
-            # claims it and a later, lower-priority write is put back. Without this
-            # the **lowest** priority match won, inverting the feature: a specific
-            # high-priority rule written to override a general one lost to it. The
-            # intent was already recorded in the comment below; only the code
-            # disagreed with it.
-            for field in precedence_fields:
-                if field in claimed:
-                    transaction_data[field] = claimed[field]
-                elif transaction_data.get(field):
-                    claimed[field] = transaction_data[field]
-
-            # All matching rules are applied, in priority order, rather than stopping
-            # at the first. The highest priority rule sets the category (above), and
-            # lower priority rules can still add tags, notes, etc.
-
-    if matched_rules:
-        logger.info(f"Matched rules: {', '.join(matched_rules)}")
-    else:
-        logger.debug(f"No rules matched for transaction: {transaction_data.get('description', '')}")
-
-    # Commit rule match count updates
-    try:
-        db.session.commit()
-    except Exception as e:
-        logger.error(f"Failed to commit rule match counts: {str(e)}")
-        db.session.rollback()
-
-    return transaction_data
+    # Apply each matching rule
+    for rule in rule_set.matching(transaction_data):
+        logger.debug(f"Rule matched: {rule.name}")
+        matched_rules.append(rule.name)
+        counts[rule.id] += 1
+
+        # Apply the rule's actions
+        transaction_data = rule.apply(transaction_data)
+
+        # Rules arrive in descending priority, so the first to set one of these
+        # claims it and a later, lower-priority write is put back. Without this
+        # the **lowest** priority match won, inverting the feature: a specific
+        # high-priority rule written to override a general one lost to it. The
+        # intent was already recorded in the comment below; only the code
+        # disagreed with it.
+        for field in precedence_fields:
+            if field in claimed:
+                transaction_data[field] = claimed[field]
+            elif transaction_data.get(field):
+                claimed[field] = transaction_data[field]
+
+        # All matching rules are applied, in priority order, rather than stopping
+        # at the first. The highest priority rule sets the category (above), and
+        # lower priority rules can still add tags, notes, etc.
+
+    return transaction_data, matched_rules
+
+
+def _count_matches(counts):
+    """Add `counts` ({rule_id: n}) to `match_count` and stamp `last_matched`.
+
+    One statement, executed once per rule: `SET match_count = match_count + :n`,
+    so a batch that matched one rule 5,000 times writes that row once, and two
+    workers counting the same rule both land.
+
+    `updated_at` is written back unchanged on purpose: its `onupdate` would
+    otherwise fire, and `updated_at` is part of the rule set's cache version — so
+    every match would throw away the compiled rules it was matched against.
+    A match is not an edit.
+    """
+    if not counts:
+        return
+    table = TransactionRule.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.id == bindparam('rule_id'))
+        .values(match_count=func.coalesce(table.c.match_count, 0) + bindparam('n'),
+                last_matched=datetime.utcnow(),
+                updated_at=table.c.updated_at),
+        [{'rule_id': rule_id, 'n': n} for rule_id, n in counts.items()])
 
 
 def get_matching_rule(transaction_data, user_id):
@@ -98,14 +164,8 @@ def get_matching_rule(transaction_data, user_id):
     Returns:
         TransactionRule: First matching rule or None
     """
-    rules = TransactionRule.query.filter_by(
-        user_id=user_id,
-        active=True
-    ).order_by(TransactionRule.priority.desc()).all()
-
-    for rule in rules:
-        if rule.matches(transaction_data):
-            return rule
+    for rule in rule_set_for(user_id).matching(transaction_data):
+        return db.session.get(TransactionRule, rule.id)
 
     return None
 
@@ -177,66 +237,112 @@ def suggest_rule_from_edit(transaction, new_category_id, user_id):
     }
 
 
-def bulk_apply_rules(user_id, rule_ids=None):
+#: Rows read per round trip, and changed categories written per statement, by
+#: `bulk_apply_rules`. Bounds its memory whatever the size of the history.
+BULK_APPLY_CHUNK = 1000
+
+
+def bulk_apply_rules(user_id, rule_ids=None, dry_run=False, progress=None):
     """
     Apply rules to all existing transactions for a user
     Useful for re-categorizing after creating new rules
 
+    Streams instead of loading: `(id, description, amount, transaction_type,
+    category_id)` tuples are read `BULK_APPLY_CHUNK` at a time with `yield_per`,
+    never as ORM rows, and changed categories are written back in chunks as one
+    executemany UPDATE each. This used to load every `Expense` the user had and
+    mutate them one by one, which timed out behind gunicorn on a long history.
+
+    *** THE UPDATES BYPASS THE SESSION. *** So `monthly_rollups` — keyed by
+    category — is rebuilt for the user afterwards, in the same commit.
+
     Args:
         user_id: User ID
         rule_ids: Optional list of specific rule IDs to apply (None = all rules)
+        dry_run: Count what would change, and write nothing
+        progress: Optional callable(processed, updated), called after each chunk
 
     Returns:
         dict: Summary of changes made
     """
     from src.models.transaction import Expense
-
-    # Get transactions
-    transactions = Expense.query.filter_by(user_id=user_id).all()
+    from src.services.analytics import rollups
+    from src.services.transaction_rule.rule_set import RuleSet
 
     # Get rules to apply
     if rule_ids:
-        rules = TransactionRule.query.filter(
+        rule_set = RuleSet(TransactionRule.query.filter(
             TransactionRule.id.in_(rule_ids),
             TransactionRule.user_id == user_id,
             TransactionRule.active == True
-        ).order_by(TransactionRule.priority.desc()).all()
+        ).order_by(TransactionRule.priority.desc()).all())
     else:
-        rules = TransactionRule.query.filter_by(
-            user_id=user_id,
-            active=True
-        ).order_by(TransactionRule.priority.desc()).all()
+        rule_set = rule_set_for(user_id)
 
-    updated_count = 0
+    expenses = Expense.__table__
+    write = (expenses.update()
+             .where(expenses.c.id == bindparam('expense_id'))
+             .values(category_id=bindparam('new_category_id')))
 
-    for transaction in transactions:
-        transaction_data = {
-            'description': transaction.description,
-            'amount': transaction.amount,
-            'transaction_type': transaction.transaction_type,
-            'category_id': transaction.category_id
-        }
-
-        # Track if category was changed
-        original_category = transaction.category_id
+    processed = 0
+    updated_count = 0
+    counts = Counter()
+    pending = []
+
+    def flush():
+        if pending and not dry_run:
+            db.session.execute(write, pending)
+        pending.clear()
+        if progress is not None:
+            progress(processed, updated_count)
+        logger.info(f"Bulk rule application: {processed} processed, "
+                    f"{updated_count} to update")
 
-        # Apply rules
-        for rule in rules:
-            if rule.matches(transaction_data):
+    try:
+        rows = (db.session.query(Expense.id, Expense.description, Expense.amount,
+                                 Expense.transaction_type, Expense.category_id)
+                .filter(Expense.user_id == user_id)
+                .order_by(Expense.id)
+                .yield_per(BULK_APPLY_CHUNK))
+
+        for expense_id, description, amount, transaction_type, category_id in rows:
+            processed += 1
+            transaction_data = {
+                'description': description,
+                'amount': amount,
+                'transaction_type': transaction_type,
+                'category_id': category_id
+            }
+
+            # Only the first matching rule applies here
+            rule = next(rule_set.matching(transaction_data), None)
+            if rule is not None:
+                counts[rule.id] += 1
                 transaction_data = rule.apply(transaction_data)
-                break  # Only apply first matching rule
 
-        # Update transaction if category changed
-        if transaction_data.get('category_id') != original_category:
-            transaction.category_id = transaction_data['category_id']
-            updated_count += 1
-
-    try:
-        db.session.commit()
-        logger.info(f"Bulk rule application: {updated_count} transactions updated")
+                # Update transaction if category changed
+                if transaction_data.get('category_id') != category_id:
+                    pending.append({'expense_id': expense_id,
+                                    'new_category_id': transaction_data['category_id']})
+                    updated_count += 1
+
+            if processed % BULK_APPLY_CHUNK == 0:
+                flush()
+        flush()
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            _count_matches(counts)
+            if updated_count:
+                rollups.rebuild([user_id])
+            db.session.commit()
+        logger.info(f"Bulk rule application: {updated_count} transactions "
+                    f"{'would be ' if dry_run else ''}updated")
         return {
             'success': True,
-            'transactions_processed': len(transactions),
+            'dry_run': bool(dry_run),
+            'transactions_processed': processed,
             'transactions_updated': updated_count
         }
     except Exception:
@@ -24,6 +24,9 @@ Owner decision, 2026-08-21: reconcile at boot rather than refuse to boot.
     rows, so that case is REPORTED and left alone rather than attempted and failed.
   * WIDENS a column the database has narrower than the model declares. `expenses.paid_by`
     was VARCHAR(50) against a model wanting 120, found on both production stacks.
+  * CREATES a declared non-unique index the table does not have. The composite indexes
+    on `expenses` are what the hot queries are planned around, and an instance installed
+    before they were declared would otherwise never get them.
   * Never drops, never renames, never narrows, never changes a type. There is no
     destructive statement in this module, which is the property that makes it safe to run
     unattended against somebody else's data.
@@ -100,6 +103,41 @@ def detect_drift(engine, metadata):
     return missing_tables, addable_columns, unaddable_columns, narrow_columns
 
 
+def missing_indexes(engine, metadata):
+    """Indexes the models declare on existing tables that the database lacks. Reads only.
+
+    The same gap as a column, one level down: `create_all()` creates a table's indexes
+    with the table and never afterwards, and Alembic never runs on a deployed instance —
+    so an index added to a model after install reached nobody. Compared by name, which
+    is how Alembic and `create_all()` both identify them.
+
+    Returns (creatable, unique). A UNIQUE index is returned apart and never attempted:
+    on a table that already holds duplicates it fails, and which row to keep is not a
+    decision to make unattended — the NOT NULL column rule again.
+    """
+    inspector = inspect(engine)
+    live_tables = set(inspector.get_table_names())
+
+    creatable = []
+    unique = []
+    for name, table in sorted(metadata.tables.items()):
+        if name not in live_tables:
+            continue
+        live = {index['name'] for index in inspector.get_indexes(name)}
+        for index in sorted(table.indexes, key=lambda i: i.name or ''):
+            if index.name and index.name not in live:
+                (unique if index.unique else creatable).append(index)
+    return creatable, unique
+
+
+def index_statements_for(engine, indexes):
+    """`CREATE INDEX` for each of `indexes`, as SQL that can be run by hand identically."""
+    from sqlalchemy.schema import CreateIndex
+
+    return [str(CreateIndex(index).compile(dialect=engine.dialect)).strip()
+            for index in indexes]
+
+
 def statements_for(engine, addable_columns, narrow_columns):
     """The exact SQL, so it can be logged, printed, or run by hand identically."""
     dialect = engine.dialect
@@ -130,7 +168,9 @@ def reconcile_schema(app, db):
 
     if not auto_reconcile_enabled(app):
         _, addable, unaddable, narrow = detect_drift(db.engine, db.metadata)
-        pending = statements_for(db.engine, addable, narrow)
+        indexes, _ = missing_indexes(db.engine, db.metadata)
+        pending = (statements_for(db.engine, addable, narrow)
+                   + index_statements_for(db.engine, indexes))
         if pending or unaddable:
             log.warning(
                 'SCHEMA_AUTO_RECONCILE is off and this database is behind the models. '
@@ -141,6 +181,7 @@ def reconcile_schema(app, db):
 
     try:
         _, addable, unaddable, narrow = detect_drift(db.engine, db.metadata)
+        indexes, unique_indexes = missing_indexes(db.engine, db.metadata)
     except Exception:
         log.exception('Could not inspect the schema; skipping reconcile')
         return []
@@ -154,7 +195,15 @@ def reconcile_schema(app, db):
                 'automatically to a table that already has rows. It needs a manual '
                 'migration with a backfill.', table, column.name)
 
-    statements = statements_for(db.engine, addable, narrow)
+    for index in unique_indexes:
+        log.error(
+            'Unique index %s on %s is missing and is not created automatically: '
+            'existing duplicate rows would make it fail. It needs a manual migration.',
+            index.name, index.table.name)
+
+    # Columns first: an index can only be built over columns that exist.
+    statements = (statements_for(db.engine, addable, narrow)
+                  + index_statements_for(db.engine, indexes))
     if not statements:
         return []
 
@@ -116,11 +116,31 @@ def app():
     return application
 
 
+@pytest.fixture(autouse=True)
+def quote_cache_file(tmp_path, monkeypatch):
+    """Each test's quote cache is its own file under tmp_path.
+
+    The cache is a SQLite file, and a test run must not leave one in the
+    checkout — nor read quotes an earlier test cached.
+    """
+    from integrations.investments import quote_cache
+    monkeypatch.setenv('QUOTE_CACHE_PATH', str(tmp_path / 'quotes.sqlite3'))
+    monkeypatch.setattr(quote_cache, '_shared', None)
+
+
 @pytest.fixture(scope='function')
-def db(app):
+def db(app, monkeypatch):
     """Create all tables before each test, drop all after. Function-scoped for isolation."""
+    from src.services.auth import revocation
     with app.app_context():
         _db.create_all()
+        # The JWT blocklist is process state read from these tables, and its
+        # refresh runs on a timer in whichever request is due — inside a request
+        # a test is counting statements for, if the timing says so. Read it once
+        # here and stop its clock; tests of the refresh itself move their own.
+        monkeypatch.setattr(revocation, 'monotonic', lambda: 0.0)
+        revocation.reset()
+        revocation.is_revoked(None)
         yield _db
         _db.session.remove()
         _db.drop_all()
@@ -54,6 +54,23 @@ def test_date_range_excludes_spending_outside_the_window(client, auth_headers, u
     assert _totals(resp) == {'Groceries': 25.0}
 
 
+def test_no_dates_means_the_current_month(client, auth_headers, user):
+    """The web UI's first load sends no range; it has always meant this month."""
+    groceries = CategoryFactory(name='Groceries', user_id=user.id)
+    now = datetime.now()
+
+    # The first of this month, so the row is in it whatever the time is.
+    ExpenseFactory(user_id=user.id, category_id=groceries.id,
+                   amount=25.0, date=datetime(now.year, now.month, 1))
+    # Before the first of this month, whatever today is.
+    ExpenseFactory(user_id=user.id, category_id=groceries.id,
+                   amount=900.0, date=now - timedelta(days=40))
+
+    resp = client.get(ENDPOINT, headers=auth_headers(user, password='secret'))
+
+    assert _totals(resp) == {'Groceries': 25.0}
+
+
 def test_widening_the_range_changes_the_total(client, auth_headers, user):
     """Week and Year returned the same numbers before; they must now differ."""
     groceries = CategoryFactory(name='Groceries', user_id=user.id)
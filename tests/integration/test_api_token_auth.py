@@ -182,3 +182,71 @@ def test_a_plain_jwt_required_endpoint_rejects_a_token(client, db):
                       headers={'Authorization': 'Bearer ' + plaintext})
     assert resp.status_code >= 400
     assert resp.status_code != 200
+
+
+def test_a_repeat_call_is_served_from_the_cache(client, db, app, monkeypatch):
+    """No token lookup and no JWT minted once the token has been resolved."""
+    from sqlalchemy import event
+
+    from src.utils import api_auth
+
+    _probe_route(app)
+    user = UserFactory()
+    _, plaintext = _token(user)
+    client.get('/__probe/whoami', headers={'X-API-Key': plaintext})
+
+    minted = []
+    monkeypatch.setattr(api_auth, 'create_access_token',
+                        lambda **kw: minted.append(kw))
+    statements = []
+
+    def _record(conn, cursor, statement, params, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        resp = client.get('/__probe/whoami', headers={'X-API-Key': plaintext})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+    assert resp.get_json()['identity'] == user.id
+    assert not [s for s in statements if 'personal_access_tokens' in s], statements
+    assert minted == []
+
+
+def test_revoking_a_token_drops_it_from_the_cache(client, db, app, auth_headers):
+    _probe_route(app)
+    user = UserFactory(password_plain='secret')
+    token, plaintext = _token(user)
+    assert client.get('/__probe/whoami',
+                      headers={'X-API-Key': plaintext}).status_code == 200
+
+    revoked = client.delete('/api/v1/access-tokens/%d' % token.id,
+                            headers=auth_headers(user, 'secret'))
+    assert revoked.status_code == 200
+
+    resp = client.get('/__probe/whoami', headers={'X-API-Key': plaintext})
+    assert resp.status_code == 401
+    assert resp.get_json()['error'] == 'token_revoked'
+
+
+def test_a_cached_token_is_looked_up_again_after_the_ttl(client, db, app, monkeypatch):
+    """The TTL bounds how long another worker's revocation can go unseen."""
+    from src.utils import api_auth
+
+    _probe_route(app)
+    user = UserFactory()
+    token, plaintext = _token(user)
+    client.get('/__probe/whoami', headers={'X-API-Key': plaintext})
+
+    # Revoked behind the cache's back, as a different process would.
+    PersonalAccessToken.query.filter_by(id=token.id).update(
+        {'revoked_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    assert client.get('/__probe/whoami',
+                      headers={'X-API-Key': plaintext}).status_code == 200
+
+    later = api_auth.monotonic() + api_auth.CACHE_TTL_SECONDS + 1
+    monkeypatch.setattr(api_auth, 'monotonic', lambda: later)
+    resp = client.get('/__probe/whoami', headers={'X-API-Key': plaintext})
+    assert resp.get_json()['error'] == 'token_revoked'
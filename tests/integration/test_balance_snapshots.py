@@ -0,0 +1,105 @@
+"""Net-worth history is read from `account_balance_snapshots`.
+
+`calculate_asset_debt_trends` replayed every account's transactions backwards
+from today's balance on each load. It now reads month-end snapshots in one range
+query. These tests pin where snapshots come from — a balance move, the nightly
+job — that a first snapshot is preceded by the same history the replay gave, and
+that the trends stop reading `expenses` once snapshots exist.
+"""
+from datetime import date, datetime
+
+import pytest
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import event
+
+from src.models.balance_snapshot import AccountBalanceSnapshot
+from src.services.account import snapshots
+from src.utils.helpers import calculate_asset_debt_trends
+from tests.factories import AccountFactory, ExpenseFactory, UserFactory
+
+
+def _key(moment):
+    return moment.strftime('%Y-%m')
+
+
+@pytest.fixture
+def spent_last_month(db):
+    """$100 spent mid last month, balance now $900: last month closed at $900,
+    the month before it at $1000."""
+    user = UserFactory(password_plain='secret')
+    account = AccountFactory(user_id=user.id, type='checking', balance=900,
+                             currency_code='USD')
+    last_month = datetime.now().replace(day=15, hour=12) - relativedelta(months=1)
+    ExpenseFactory(user_id=user.id, account_id=account.id, amount=100,
+                   date=last_month, transaction_type='expense')
+    return user, account, last_month
+
+
+def _rows(account):
+    return {(r.day, r.source): float(r.balance) for r in
+            AccountBalanceSnapshot.query.filter_by(account_id=account.id)}
+
+
+def test_a_balance_move_records_today_after_the_replayed_history(
+        client, db, auth_headers, spent_last_month):
+    user, account, last_month = spent_last_month
+
+    resp = client.post('/api/v1/transactions/', headers=auth_headers(user, 'secret'),
+                       json={'description': 'Coffee', 'amount': 4, 'account_id': account.id,
+                             'date': datetime.now().strftime('%Y-%m-%d'),
+                             'transaction_type': 'expense'})
+    assert resp.status_code in (200, 201), resp.get_json()
+
+    rows = _rows(account)
+    # The history is what the replay gives from the balance BEFORE the move.
+    end_of_last_month = snapshots._month_end(_key(last_month))
+    assert rows[(end_of_last_month, 'backfill')] == 900
+    assert rows[(date.today(), 'transaction')] == 896
+    assert len(rows) == 2
+
+
+def test_the_nightly_job_snapshots_every_account_once_a_day(db, spent_last_month):
+    _, account, _ = spent_last_month
+    other = AccountFactory(user_id=account.user_id, balance=50)
+
+    snapshots.take_daily()
+    db.session.commit()
+    account.balance = 850
+    snapshots.take_daily()
+    db.session.commit()
+
+    today = AccountBalanceSnapshot.query.filter_by(day=date.today()).all()
+    assert sorted(float(r.balance) for r in today) == [50, 850]
+    assert {r.account_id for r in today} == {account.id, other.id}
+
+
+def test_trends_read_snapshots_instead_of_expenses(client, db, spent_last_month):
+    user, account, last_month = spent_last_month
+    snapshots.take_daily()
+    db.session.commit()
+
+    statements = []
+
+    def _record(conn, cursor, statement, params, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        result = calculate_asset_debt_trends(user)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+    assert not [s for s in statements if 'FROM expenses' in s], statements
+    assets = dict(zip(result['months'], result['assets']))
+    assert assets[_key(last_month)] == pytest.approx(900)
+    assert assets[_key(datetime.now())] == pytest.approx(900)
+
+
+def test_an_account_without_snapshots_is_still_replayed(client, db, spent_last_month):
+    user, account, last_month = spent_last_month
+
+    assets = dict(zip(*(lambda r: (r['months'], r['assets']))(
+        calculate_asset_debt_trends(user))))
+
+    assert assets[_key(last_month)] == pytest.approx(900)
+    assert AccountBalanceSnapshot.query.count() == 0
@@ -0,0 +1,100 @@
+"""Budget spend is answered for a whole page at once.
+
+`BudgetSchema` asked each budget for its spend three times, and each ask was three
+queries, so the list cost ~9 queries per budget and the trends another six months
+of that. `BudgetSpendCalculator` answers every budget and period in one grouped
+query over `expenses` and one over `category_splits`. These tests pin the figures
+— subcategories, split rows, overlapping periods — and the query count.
+"""
+from datetime import datetime
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import event
+
+from src.models.budget import Budget
+from src.models.category import Category
+from src.models.transaction import CategorySplit
+from src.services.budget.service import BudgetService
+from tests.factories import CategoryFactory, ExpenseFactory, UserFactory
+
+
+def _household(db):
+    user = UserFactory()
+    food = CategoryFactory(name='Food', user_id=user.id)
+    takeaway = Category(name='Takeaway', user_id=user.id, parent_id=food.id)
+    fuel = CategoryFactory(name='Fuel', user_id=user.id)
+    db.session.add(takeaway)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    ExpenseFactory(user_id=user.id, amount=10, category_id=food.id, date=now)
+    ExpenseFactory(user_id=user.id, amount=5, category_id=takeaway.id, date=now)
+    ExpenseFactory(user_id=user.id, amount=7, category_id=fuel.id, date=now)
+    ExpenseFactory(user_id=user.id, amount=40, category_id=food.id,
+                   date=now - relativedelta(months=3))
+    # Carried by its splits: the row's own 30 must not count as well.
+    split = ExpenseFactory(user_id=user.id, amount=30, category_id=food.id,
+                           date=now, has_category_splits=True)
+    db.session.add_all([
+        CategorySplit(expense_id=split.id, category_id=food.id, amount=20),
+        CategorySplit(expense_id=split.id, category_id=fuel.id, amount=10),
+    ])
+
+    def budget(category, period, include_subcategories=True):
+        b = Budget(user_id=user.id, category_id=category.id, amount=100,
+                   period=period, include_subcategories=include_subcategories,
+                   start_date=now, active=True)
+        db.session.add(b)
+        return b
+
+    budgets = {
+        'food': budget(food, 'monthly'),
+        'food_only_this_week': budget(food, 'weekly', False),
+        'fuel': budget(fuel, 'yearly'),
+    }
+    db.session.commit()
+    return user, budgets
+
+
+def test_the_list_is_answered_in_a_fixed_number_of_queries(
+        client, db, auth_headers):
+    user, budgets = _household(db)
+    for _ in range(12):
+        db.session.add(Budget(user_id=user.id, amount=1, period='monthly',
+                              category_id=budgets['fuel'].category_id,
+                              start_date=datetime.utcnow(), active=True))
+    db.session.commit()
+
+    selects = []
+
+    def _record(conn, cursor, statement, params, context, executemany):
+        lowered = statement.lower()
+        if lowered.lstrip().startswith('select') and (
+                'expenses' in lowered or 'category_splits' in lowered):
+            selects.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        resp = client.get('/api/v1/budgets/', headers=auth_headers(user))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+    assert resp.status_code == 200
+    assert len(selects) == 2, '\n'.join(selects)
+
+    spent = {row['id']: float(row['spent']) for row in resp.get_json()['budgets']}
+    assert spent[budgets['food'].id] == 35.0
+    assert spent[budgets['food_only_this_week'].id] == 30.0
+    assert spent[budgets['fuel'].id] == 17.0
+
+
+def test_trends_read_every_month_from_one_pass(client, db):
+    user, budgets = _household(db)
+
+    trends = {t['budget'].id: [float(m['spent']) for m in t['historical_data']]
+              for t in BudgetService().get_trends_data(user.id)}
+
+    assert trends[budgets['food'].id] == [0, 0, 40, 0, 0, 35]
+    assert trends[budgets['fuel'].id][-1] == 17
+    # And the one-budget path, unprimed, agrees with the batch.
+    assert budgets['food'].calculate_spent_amount() == 35
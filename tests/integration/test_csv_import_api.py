@@ -129,3 +129,40 @@ def test_oversized_upload_is_rejected_before_it_is_read(client, db, auth_headers
             f'expected 413 for an oversized upload, got {resp.status_code}')
     finally:
         app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024
+
+
+def test_import_has_no_row_cap(client, db, auth_headers, monkeypatch):
+    """The upload is read as it is imported, so the 10,000-row cap is gone."""
+    from src.models.transaction import Expense
+    from src.services.csv_import import mapper, reader
+
+    monkeypatch.setattr(mapper, 'IMPORT_CHUNK', 500)
+    monkeypatch.setattr(reader, '_BLOCK', 1024)
+    user = UserFactory()
+    # Excel's byte-order mark must not become part of the first header.
+    lines = ['\ufeffDate,Description,Amount']
+    lines += ['2026-03-%02d,Row %d,-1.00' % (1 + i % 28, i) for i in range(10_050)]
+    resp = post_csv(client, auth_headers(user), '\r\n'.join(lines) + '\r\n',
+                    BASIC_MAPPING, {'date_format': '%Y-%m-%d'})
+
+    assert resp.status_code == 200
+    assert resp.get_json()['imported'] == 10_050
+    assert resp.get_json()['error_details'] == []
+    assert Expense.query.filter_by(user_id=user.id).count() == 10_050
+
+
+def test_preview_counts_every_row(client, db, auth_headers):
+    """The preview counted up to the cap and said `truncated`; it now counts all."""
+    user = UserFactory()
+    body = 'Date,Description,Amount\n' + ''.join(
+        '2026-03-01,Row %d,-1.00\n' % i for i in range(10_050))
+    resp = client.post(
+        '/api/v1/csv-import/preview',
+        data={'file': (io.BytesIO(body.encode()), 'test.csv')},
+        content_type='multipart/form-data',
+        headers=auth_headers(user))
+
+    assert resp.status_code == 200
+    preview = resp.get_json()['preview']
+    assert (preview['total_rows'], preview['truncated']) == (10_050, False)
+    assert len(preview['sample_rows']) == 5
@@ -124,3 +124,19 @@ def test_unmappable_file_fails_without_touching_the_ledger(source, tmp_path):
     batch = ImportBatch.query.filter_by(filename='junk.csv').one()
     assert batch.status == 'failed'
     assert (tmp_path / 'failed' / 'junk.csv').exists()
+
+
+def test_a_file_the_watcher_reports_is_imported_on_first_sight(source, tmp_path):
+    """The watcher names a file only once it is closed or renamed in, so the
+    two-scan stability wait is not needed for it."""
+    save_profile(['Date', 'Description', 'Amount'],
+                 {'date': 'Date', 'description': 'Description', 'amount': 'Amount'},
+                 source.user_id, name='Chase', date_format='%Y-%m-%d',
+                 sign_convention='negative_is_expense', origin='manual')
+    drop(tmp_path)
+    drop(tmp_path, name='other.csv', body=CSV.replace('Coffee', 'Tea'))
+
+    batches = scan_source(source, ready={'chase.csv'})
+
+    assert [b.filename for b in batches] == ['chase.csv']
+    assert (tmp_path / 'other.csv').exists()
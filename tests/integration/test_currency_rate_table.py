@@ -0,0 +1,90 @@
+"""Conversion is arithmetic over one in-process rate table.
+
+`convert_currency` ran three `Currency` queries per call. It now reads a table
+loaded once, re-checked against the currencies' version once per app context.
+These tests pin the arithmetic, the query count, and both ways a rate change must
+reach the table: a write in this process, and one made by another process that
+only the version stamp reveals.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import g
+from sqlalchemy import event, text
+
+from src.models.currency import Currency
+from src.services.currency.service import CurrencyService
+from src.utils import currency_converter
+from src.utils.currency_converter import convert_currency, convert_many
+
+
+def _currencies(db):
+    # `merge`: the app may already have seeded USD.
+    for currency in (
+            Currency(code='USD', name='US Dollar', symbol='$', rate_to_base=1, is_base=True),
+            Currency(code='EUR', name='Euro', symbol='€', rate_to_base=Decimal('1.1')),
+            Currency(code='GBP', name='Pound', symbol='£', rate_to_base=Decimal('1.25'))):
+        db.session.merge(currency)
+    db.session.commit()
+
+
+def _count_queries(db, fn):
+    statements = []
+
+    def _record(conn, cursor, statement, params, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+    return result, statements
+
+
+def test_conversions_agree_with_the_rates(db):
+    _currencies(db)
+
+    assert convert_currency(Decimal('10'), 'EUR', 'USD') == Decimal('11.0')
+    assert convert_currency(Decimal('11'), 'USD', 'EUR') == Decimal('10')
+    assert convert_currency(Decimal('11'), 'EUR', 'GBP') == Decimal('9.68')
+    # Unknown codes leave the amount alone, as they always have.
+    assert convert_currency(Decimal('5'), 'XXX', 'USD') == Decimal('5')
+    assert convert_many([Decimal('10'), Decimal('11')], ['EUR', 'USD'], 'USD') == [
+        Decimal('11.0'), Decimal('11')]
+
+
+def test_many_conversions_cost_one_load(db):
+    _currencies(db)
+    currency_converter.invalidate()
+
+    _, statements = _count_queries(db, lambda: [
+        convert_currency(Decimal(i), 'EUR', 'GBP') for i in range(200)])
+
+    assert len(statements) == 2, statements   # the version, then the table
+
+
+def test_a_rate_edited_here_is_used_at_once(db):
+    _currencies(db)
+    assert convert_currency(Decimal('10'), 'EUR', 'USD') == Decimal('11.0')
+
+    CurrencyService().update_currency('EUR', rate_to_base=Decimal('1.2'))
+
+    assert convert_currency(Decimal('10'), 'EUR', 'USD') == Decimal('12.0')
+
+
+def test_a_rate_edited_by_another_process_is_seen_through_the_stamp(db):
+    _currencies(db)
+    assert convert_currency(Decimal('10'), 'EUR', 'USD') == Decimal('11.0')
+
+    # What the nightly job in the scheduler process does, out of sight of this
+    # process's mapper events.
+    db.session.execute(text(
+        "UPDATE currencies SET rate_to_base = 1.3, last_updated = :stamp "
+        "WHERE code = 'EUR'"), {'stamp': datetime.utcnow() + timedelta(seconds=1)})
+    db.session.commit()
+    assert convert_currency(Decimal('10'), 'EUR', 'USD') == Decimal('11.0')
+
+    g.pop('_fx_rate_table', None)   # the next request's app context
+
+    assert convert_currency(Decimal('10'), 'EUR', 'USD') == Decimal('13.0')
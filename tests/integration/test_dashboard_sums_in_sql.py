@@ -0,0 +1,126 @@
+"""The dashboard's figures are summed by the database, and still add up.
+
+`get_dashboard_data` used to load every household row since last December and walk
+it five times. `aggregates.dashboard_totals` replaced the walks with grouped
+queries; these tests pin the figures the walks produced — including the two that
+are not plain sums, split contributors and category splits — and assert that a
+the aggregation hydrates only the rows a split touches. (The asset/debt trend
+beside it still replays account history; that is a separate cost.)
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from src.models.transaction import CategorySplit, Expense
+from src.services.analytics.aggregates import category_spending, dashboard_totals
+from src.services.analytics.service import AnalyticsService
+from tests.factories import (AccountFactory, CategoryFactory, ExpenseFactory,
+                             UserFactory)
+
+
+@pytest.fixture
+def household(db):
+    alice = UserFactory(name='Alice')
+    bob = UserFactory(name='Bob')
+    card = AccountFactory(user_id=alice.id, name='Alice Visa')
+    return alice, bob, card
+
+
+def _this_month():
+    return datetime.now().replace(day=1, hour=12, minute=0, second=0,
+                                  microsecond=0)
+
+
+def _seed(db, alice, bob, card):
+    when = _this_month()
+    food = CategoryFactory(name='Food', user_id=alice.id)
+    travel = CategoryFactory(name='Travel', user_id=alice.id)
+
+    ExpenseFactory(user_id=alice.id, account_id=card.id, amount=40.0,
+                   date=when, category_id=food.id, card_used='Visa')
+    ExpenseFactory(user_id=alice.id, account_id=card.id, amount=100.0,
+                   date=when, category_id=food.id, card_used='Visa',
+                   split_method='equal', split_with=bob.id)
+    mixed = ExpenseFactory(user_id=alice.id, account_id=card.id, amount=60.0,
+                           date=when, card_used='Amex')
+    db.session.add_all([
+        CategorySplit(expense_id=mixed.id, category_id=food.id, amount=20.0),
+        CategorySplit(expense_id=mixed.id, category_id=travel.id, amount=40.0),
+    ])
+    ExpenseFactory(user_id=alice.id, account_id=card.id, amount=3000.0,
+                   date=when, transaction_type='income')
+    ExpenseFactory(user_id=alice.id, account_id=card.id, amount=500.0,
+                   date=when, transaction_type='transfer')
+    db.session.commit()
+    return when
+
+
+def test_a_caller_that_discards_the_rows_gets_none(db, household):
+    alice, bob, card = household
+    _seed(db, alice, bob, card)
+
+    data = AnalyticsService().get_dashboard_data(alice.id, with_rows=False)
+
+    assert data['expenses'] == []
+    assert data['total_expenses_only'] == pytest.approx(200.0)
+
+
+def test_the_figures_match_what_the_loops_produced(db, household):
+    alice, bob, card = household
+    when = _seed(db, alice, bob, card)
+    month = when.strftime('%Y-%m')
+
+    data = AnalyticsService().get_dashboard_data(alice.id)
+
+    assert data['total_expenses_only'] == pytest.approx(200.0)
+    assert data['current_month_expenses_only'] == pytest.approx(200.0)
+    assert data['total_income'] == pytest.approx(3000.0)
+    assert data['current_month_income'] == pytest.approx(3000.0)
+    assert data['total_transfers'] == pytest.approx(500.0)
+    assert sorted(data['unique_cards']) == ['Amex', 'Visa']
+
+    bucket = data['monthly_totals'][month]
+    assert bucket['total'] == pytest.approx(200.0)
+    assert bucket['by_card'] == {'Visa': pytest.approx(140.0),
+                                 'Amex': pytest.approx(60.0)}
+    assert bucket['by_account'] == {'Alice Visa': pytest.approx(200.0)}
+    # The split row is shared equally; the others are Alice's in full.
+    assert bucket['contributors'] == {alice.id: pytest.approx(150.0),
+                                      bob.id: pytest.approx(50.0)}
+
+    assert data['iou_data'].owes_me[bob.id]['amount'] == pytest.approx(50.0)
+
+    # The category-split row counts under its splits, not its own category.
+    top = {c['name']: c['amount'] for c in data['top_categories']}
+    assert top == {'Food': pytest.approx(160.0), 'Travel': pytest.approx(40.0)}
+
+
+def test_only_split_rows_are_hydrated(db, household):
+    alice, bob, card = household
+    _seed(db, alice, bob, card)
+    db.session.add_all([
+        Expense(description='Bulk %d' % i, amount=1, date=_this_month(),
+                card_used='Visa', split_method='none', paid_by=alice.id,
+                user_id=alice.id, account_id=card.id,
+                transaction_type='expense', currency_code='USD')
+        for i in range(200)])
+    db.session.commit()
+    alice_id = alice.id
+    db.session.expunge_all()
+
+    loaded = []
+
+    def _record(target, context):
+        loaded.append(target.id)
+
+    event.listen(Expense, 'load', _record)
+    try:
+        totals = dashboard_totals([alice_id], datetime(2000, 1, 1), datetime.now())
+        category_spending([alice_id], start=datetime(2000, 1, 1))
+    finally:
+        event.remove(Expense, 'load', _record)
+
+    assert totals['total_expenses'] == pytest.approx(400.0)
+    assert len(loaded) == 1, 'expected only the split row to be hydrated'
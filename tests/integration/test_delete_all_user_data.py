@@ -0,0 +1,74 @@
+"""`POST /users/delete-all-data` leaves nothing derived from the data behind.
+
+The expenses go in one bulk DELETE, which the flush hooks never see, so the rows
+derived from them have to be dropped by hand. These tests pin that a split
+row's shares go with it — on SQLite a later expense can be given a deleted one's
+id and would inherit its debts — and that its group's ledger is recomputed.
+The accounts go the same way, and their balance snapshots with them.
+"""
+from datetime import date
+
+from src.models.balance_snapshot import AccountBalanceSnapshot
+from src.models.expense_share import ExpenseShare
+from src.models.group import Group
+from src.models.ledger_balance import LedgerBalance
+from src.services.account import snapshots
+from src.services.group.service import GroupService
+from src.services.transaction import shares
+from tests.factories import AccountFactory, ExpenseFactory, UserFactory
+
+
+def _delete_all(client, auth_headers, user):
+    resp = client.post('/api/v1/users/delete-all-data',
+                       headers=auth_headers(user, 'secret'),
+                       json={'password': 'secret'})
+    assert resp.status_code == 200, resp.get_json()
+
+
+def test_the_shares_go_with_the_expenses(client, db, auth_headers):
+    alice = UserFactory(name='Alice', password_plain='secret')
+    bob = UserFactory(name='Bob')
+    dinner_id = ExpenseFactory(user_id=alice.id, amount=30.0, split_method='equal',
+                               split_with=bob.id).id
+    assert len(shares.debts_of(bob.id)) == 1
+
+    _delete_all(client, auth_headers, alice)
+    assert ExpenseShare.query.count() == 0
+
+    coffee = ExpenseFactory(user_id=bob.id, amount=5.0)
+    assert coffee.id == dinner_id
+    assert shares.debts_of(bob.id) == []
+
+
+def test_the_group_ledger_forgets_the_expenses(client, db, auth_headers):
+    alice = UserFactory(name='Alice', password_plain='secret')
+    bob = UserFactory(name='Bob')
+    group = Group(name='Flat', created_by=alice.id)
+    group.members.extend([alice, bob])
+    db.session.add(group)
+    db.session.commit()
+    ExpenseFactory(user_id=alice.id, amount=30.0, split_method='equal',
+                   split_with=bob.id, group_id=group.id)
+
+    _delete_all(client, auth_headers, alice)
+
+    assert [r for r in LedgerBalance.query.filter_by(group_id=group.id)
+            if r.amount] == []
+    balances = GroupService().calculate_group_balances(group.id)['member_balances']
+    assert {k: float(v) for k, v in balances.items()} == {bob.id: 0.0}
+
+
+def test_the_snapshots_go_with_the_accounts(client, db, auth_headers):
+    alice = UserFactory(name='Alice', password_plain='secret')
+    bob = UserFactory(name='Bob')
+    savings_id = AccountFactory(user_id=alice.id, balance=9999).id
+    db.session.add(AccountBalanceSnapshot(account_id=savings_id, day=date(2020, 1, 31),
+                                          balance=9999, source='daily'))
+    db.session.commit()
+
+    _delete_all(client, auth_headers, alice)
+    assert AccountBalanceSnapshot.query.count() == 0
+
+    checking = AccountFactory(user_id=bob.id, balance=10)
+    assert checking.id == savings_id
+    assert snapshots.month_end_balances([checking.id], date(2020, 1, 1)) == {}
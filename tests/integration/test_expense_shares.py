@@ -0,0 +1,139 @@
+"""Who owes what of a split row is stored in `expense_shares`.
+
+The cash-flow shares, the dashboard IOUs, `calculate_balances` and group balances
+each re-split every candidate row with `Expense.calculate_splits()`. They now SUM
+`expense_shares`, written by a flush hook. These tests pin that the hook keeps the
+table in step with create, re-split and delete; that the readers no longer split
+anything; and that the migration's frozen backfill agrees with the hook.
+"""
+import importlib.util
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from src.models.expense_share import ExpenseShare
+from src.models.group import Group
+from src.models.transaction import Expense
+from src.services.group.service import GroupService
+from src.services.transaction import shares
+from src.utils.helpers import calculate_balances
+from tests.factories import ExpenseFactory, UserFactory
+
+_MIGRATION = (Path(__file__).resolve().parents[2] / 'migrations' / 'versions'
+              / 'd8b4f2a6e3c9_add_expense_shares.py')
+
+
+@pytest.fixture
+def trio(db):
+    return (UserFactory(name='Alice'), UserFactory(name='Bob'),
+            UserFactory(name='Carol'))
+
+
+def _shares(expense_id):
+    return {row.user_id: float(row.amount) for row in
+            ExpenseShare.query.filter_by(expense_id=expense_id)}
+
+
+def test_a_split_row_writes_one_share_per_person(db, trio):
+    alice, bob, carol = trio
+    split = ExpenseFactory(user_id=alice.id, amount=90.0, split_method='equal',
+                           split_with='%s,%s' % (bob.id, carol.id))
+    unsplit = ExpenseFactory(user_id=alice.id, amount=12.0)
+
+    assert _shares(split.id) == {alice.id: 30, bob.id: 30, carol.id: 30}
+    assert {r.paid_by for r in ExpenseShare.query} == {alice.id}
+    assert _shares(unsplit.id) == {}
+
+
+def test_re_splitting_rewrites_the_shares_and_deleting_removes_them(db, trio):
+    alice, bob, _ = trio
+    expense = ExpenseFactory(user_id=alice.id, amount=90.0, split_method='equal',
+                             split_with=bob.id)
+    assert _shares(expense.id) == {alice.id: 45, bob.id: 45}
+
+    expense.split_method = 'custom'
+    expense.split_details = json.dumps(
+        {'type': 'amount', 'values': {alice.id: 20, bob.id: 70}})
+    db.session.commit()
+    assert _shares(expense.id) == {alice.id: 20, bob.id: 70}
+
+    expense.split_method = 'none'
+    db.session.commit()
+    assert _shares(expense.id) == {}
+
+    expense.split_method = 'equal'
+    db.session.commit()
+    expense_id = expense.id
+    db.session.delete(expense)
+    db.session.commit()
+    assert ExpenseShare.query.filter_by(expense_id=expense_id).count() == 0
+
+
+def test_balances_are_summed_without_splitting_a_row(db, trio, monkeypatch):
+    alice, bob, carol = trio
+    group = Group(name='Flat', created_by=alice.id)
+    group.members.extend([alice, bob, carol])
+    db.session.add(group)
+    db.session.commit()
+    ExpenseFactory(user_id=alice.id, amount=90.0, split_method='equal',
+                   split_with='%s,%s' % (bob.id, carol.id), group_id=group.id)
+    ExpenseFactory(user_id=bob.id, amount=20.0, split_method='equal',
+                   split_with=alice.id, group_id=group.id)
+
+    def _refuse(self, users_map=None):
+        raise AssertionError('calculate_splits called on read')
+
+    monkeypatch.setattr(Expense, 'calculate_splits', _refuse)
+
+    mine = {b['user_id']: float(b['amount']) for b in calculate_balances(alice.id)}
+    assert mine == {bob.id: 20.0, carol.id: 30.0}
+
+    group_balances = GroupService().calculate_group_balances(group.id)
+    assert {k: float(v) for k, v in group_balances['member_balances'].items()} == {
+        alice.id: 50.0, bob.id: -20.0, carol.id: -30.0}
+
+
+def _load_migration():
+    spec = importlib.util.spec_from_file_location('expense_shares_migration',
+                                                  _MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize('method,details,value,payer_in', [
+    ('equal', None, None, False),
+    ('equal', None, None, True),
+    ('percentage', {'type': 'percentage', 'values': {'a': 50, 'b': 30, 'c': 20}},
+     None, False),
+    ('percentage', None, 40, False),
+    ('custom', {'type': 'amount', 'values': {'a': 10, 'b': 40, 'c': 50}},
+     None, False),
+    ('custom', None, 25, False),
+])
+def test_the_migration_backfill_matches_the_hook(db, trio, method, details,
+                                                 value, payer_in):
+    alice, bob, carol = trio
+    ids = {'a': alice.id, 'b': bob.id, 'c': carol.id}
+    if details:
+        details = dict(details, values={ids[k]: v
+                                         for k, v in details['values'].items()})
+    participants = [bob.id, carol.id] + ([alice.id] if payer_in else [])
+    expense = ExpenseFactory(
+        user_id=alice.id, amount=100.0, original_amount=80.0,
+        split_method=method, split_with=','.join(participants),
+        split_details=json.dumps(details) if details else None,
+        split_value=value)
+
+    row = SimpleNamespace(
+        id=expense.id, amount=expense.amount,
+        original_amount=expense.original_amount, paid_by=expense.paid_by,
+        split_method=expense.split_method, split_with=expense.split_with,
+        split_details=expense.split_details, split_value=expense.split_value)
+    frozen = _load_migration()._shares(row, set(ids.values()))
+
+    assert frozen == shares.shares_of(expense)
+    assert frozen == {r.user_id: (r.amount, r.original_amount)
+                      for r in ExpenseShare.query.filter_by(expense_id=expense.id)}
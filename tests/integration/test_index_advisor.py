@@ -0,0 +1,43 @@
+"""`flask index-advisor` passes on the declared schema and notices a lost index.
+
+The advisor is only worth running if it is quiet when nothing is wrong — a report
+that always flags something gets ignored — and loud when something is. Both are
+asserted against the schema the models build.
+"""
+import pytest
+from sqlalchemy import text
+
+from src.utils.index_advisor import advise
+
+
+@pytest.fixture
+def cli(app):
+    """The commands are registered by app.py, which the test app never runs."""
+    from src.cli import register_commands
+    if 'index-advisor' not in app.cli.commands:
+        register_commands(app)
+    return app.test_cli_runner()
+
+
+def test_every_canonical_query_uses_an_index(cli, db):
+    report = advise()
+
+    assert report, 'no canonical queries were explained'
+    flagged = {entry['name']: entry['plan'] for entry in report if entry['seq_scans']}
+    assert not flagged, flagged
+
+    result = cli.invoke(args=['index-advisor'])
+    assert result.exit_code == 0, result.output
+
+
+def test_a_missing_index_is_flagged(cli, db):
+    with db.engine.begin() as connection:
+        connection.execute(text('DROP INDEX ix_category_splits_expense_id'))
+
+    flagged = {entry['name']: entry['seq_scans'] for entry in advise()
+               if entry['seq_scans']}
+    assert flagged == {'budget spend, split rows': ['category_splits']}, flagged
+
+    result = cli.invoke(args=['index-advisor'])
+    assert result.exit_code == 1, result.output
+    assert 'full scan of category_splits' in result.output
@@ -0,0 +1,102 @@
+"""Group balances are read from `ledger_balances`.
+
+`calculate_group_balances` re-split every group expense and re-read every
+settlement on each call. It now sums a pairwise ledger kept current by a flush
+hook. These tests pin that the hook follows creates, edits, moves between groups
+and deletes of expenses and settlements. They also check that `rebuild()` agrees
+with what the hook wrote, and that a read touches neither `expenses` nor
+`settlements`.
+"""
+import pytest
+from sqlalchemy import event
+
+from src.models.group import Group, Settlement
+from src.models.ledger_balance import LedgerBalance
+from src.services.group import ledger
+from src.services.group.service import GroupService
+from tests.factories import ExpenseFactory, UserFactory
+
+
+@pytest.fixture
+def flat(db):
+    alice, bob, carol = (UserFactory(name='Alice'), UserFactory(name='Bob'),
+                         UserFactory(name='Carol'))
+    group = Group(name='Flat', created_by=alice.id)
+    group.members.extend([alice, bob, carol])
+    db.session.add(group)
+    db.session.commit()
+    return group, alice, bob, carol
+
+
+def _balances(group):
+    result = GroupService().calculate_group_balances(group.id)
+    return {k: float(v) for k, v in result['member_balances'].items()}
+
+
+def _ledger():
+    return sorted((r.group_id or 0, r.debtor, r.creditor, float(r.amount))
+                  for r in LedgerBalance.query if r.amount)
+
+
+def test_expenses_and_settlements_move_the_ledger(db, flat):
+    group, alice, bob, carol = flat
+    rent = ExpenseFactory(user_id=alice.id, amount=90.0, split_method='equal',
+                          split_with='%s,%s' % (bob.id, carol.id), group_id=group.id)
+    assert _balances(group) == {alice.id: 60.0, bob.id: -30.0, carol.id: -30.0}
+
+    db.session.add(Settlement(payer_id=bob.id, receiver_id=alice.id, amount=30))
+    db.session.commit()
+    assert _balances(group) == {alice.id: 30.0, bob.id: 0.0, carol.id: -30.0}
+
+    rent.amount = 150
+    db.session.commit()
+    assert _balances(group) == {alice.id: 70.0, bob.id: -20.0, carol.id: -50.0}
+
+    rent.group_id = None
+    db.session.commit()
+    assert _balances(group) == {alice.id: -30.0, bob.id: 30.0, carol.id: 0.0}
+
+    rent.group_id = group.id
+    db.session.commit()
+    db.session.delete(rent)
+    db.session.commit()
+    assert _balances(group) == {alice.id: -30.0, bob.id: 30.0, carol.id: 0.0}
+
+
+def test_rebuild_agrees_with_the_hook(db, flat):
+    group, alice, bob, carol = flat
+    ExpenseFactory(user_id=alice.id, amount=90.0, split_method='equal',
+                   split_with='%s,%s' % (bob.id, carol.id), group_id=group.id)
+    ExpenseFactory(user_id=bob.id, amount=40.0, split_method='equal',
+                   split_with=alice.id, group_id=group.id)
+    db.session.add(Settlement(payer_id=carol.id, receiver_id=alice.id, amount=10))
+    db.session.commit()
+    written = _ledger()
+
+    ledger.rebuild()
+    db.session.commit()
+
+    assert _ledger() == written
+
+
+def test_a_read_sums_the_ledger_and_nothing_else(db, flat):
+    group, alice, bob, carol = flat
+    for _ in range(5):
+        ExpenseFactory(user_id=alice.id, amount=30.0, split_method='equal',
+                       split_with=bob.id, group_id=group.id)
+
+    statements = []
+
+    def _record(conn, cursor, statement, params, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        result = GroupService().calculate_group_balances(group.id)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+    assert not [s for s in statements
+                if 'FROM expenses' in s or 'FROM settlements' in s], statements
+    assert result['simplified_debts'] == [
+        {'from': 'Bob', 'to': 'Alice', 'amount': pytest.approx(75.0)}]
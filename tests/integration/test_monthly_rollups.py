@@ -0,0 +1,101 @@
+"""`monthly_rollups` stays equal to a rebuild from `expenses`, whatever wrote them.
+
+The flush hook in `rollups.apply_pending` is only trustworthy if every kind of
+write lands in it — insert, an update that moves a row between keys, delete — and
+the bulk statements that bypass a flush rebuild after themselves. Each test
+compares the maintained rows with what `rebuild()` computes from scratch.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from src.models.rollup import MonthlyRollup
+from src.services.analytics import rollups
+from src.services.analytics.service import AnalyticsService
+from src.services.account.service import AccountService
+from tests.factories import (AccountFactory, CategoryFactory, ExpenseFactory,
+                             UserFactory)
+
+
+def _snapshot(db):
+    """{key: (total, count)} with zero rows dropped and duplicate keys summed."""
+    result = {}
+    for row in db.session.query(MonthlyRollup).all():
+        total, count = result.get(rollups._row_key(row), (0, 0))
+        result[rollups._row_key(row)] = (total + row.total, count + row.count)
+    return {k: v for k, v in result.items() if v != (0, 0)}
+
+
+def _assert_matches_rebuild(db):
+    maintained = _snapshot(db)
+    rollups.rebuild()
+    db.session.commit()
+    assert maintained == _snapshot(db)
+
+
+@pytest.fixture
+def household(db):
+    alice = UserFactory(name='Alice')
+    bob = UserFactory(name='Bob')
+    card = AccountFactory(user_id=alice.id, name='Alice Visa')
+    return alice, bob, card
+
+
+def test_add_update_and_delete_keep_the_rollups_exact(db, household):
+    alice, bob, card = household
+    food = CategoryFactory(name='Food', user_id=alice.id)
+    march = datetime(2026, 3, 10, 12)
+
+    lunch = ExpenseFactory(user_id=alice.id, account_id=card.id, amount=12.5,
+                           date=march, category_id=food.id)
+    shop = ExpenseFactory(user_id=alice.id, account_id=card.id, amount=80.0,
+                          date=march, split_method='equal', split_with=bob.id)
+    db.session.commit()
+    _assert_matches_rebuild(db)
+
+    # Moves between three key columns at once, and changes the amount.
+    lunch.date = datetime(2026, 4, 2, 12)
+    lunch.category_id = None
+    lunch.amount = 15
+    db.session.commit()
+    _assert_matches_rebuild(db)
+
+    db.session.delete(shop)
+    db.session.commit()
+    _assert_matches_rebuild(db)
+
+    april = {row.month: row.total for row in db.session.query(MonthlyRollup)
+             if row.count}
+    assert april == {'2026-04': pytest.approx(15)}
+
+
+def test_cashflow_is_the_callers_share(db, household):
+    alice, bob, card = household
+    now = datetime.now().replace(day=1, hour=12)
+
+    ExpenseFactory(user_id=alice.id, account_id=card.id, amount=3000.0,
+                   date=now, transaction_type='income')
+    ExpenseFactory(user_id=alice.id, account_id=card.id, amount=40.0, date=now)
+    ExpenseFactory(user_id=alice.id, account_id=card.id, amount=100.0, date=now,
+                   split_method='equal', split_with=bob.id)
+    db.session.commit()
+
+    this_month = AnalyticsService().get_cashflow_data(alice.id, months=1)[-1]
+
+    assert this_month['income'] == pytest.approx(3000.0)
+    # 40 in full, plus her half of the shared 100.
+    assert this_month['expenses'] == pytest.approx(90.0)
+
+
+def test_deleting_an_account_rebuilds_what_the_bulk_update_moved(db, household):
+    alice, bob, card = household
+    ExpenseFactory(user_id=alice.id, account_id=card.id, amount=25.0,
+                   date=datetime(2026, 5, 5, 12))
+    db.session.commit()
+
+    AccountService().delete_account(card.id, alice.id)
+
+    rows = [r for r in db.session.query(MonthlyRollup).all() if r.count]
+    assert [(r.account_id, r.total) for r in rows] == [(None, 25)]
+    _assert_matches_rebuild(db)
@@ -0,0 +1,135 @@
+"""pointsPal counts a commit's expenses in one pass after it commits.
+
+The bridge used to run inside the flush, about ten statements per inserted
+expense, so a SimpleFin sync of a few hundred rows spent most of its commit in
+pointsPal. These tests pin that the pass after commit costs the same number of
+statements for three expenses as for thirty, that the totals and points it
+writes are what one-at-a-time processing gave, that a crossed cap raises one
+alert, and that a rolled-back insert is never counted.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from src.extensions import db
+from src.models.transaction import Expense
+from src.modules.pointspal import simplefin_bridge
+from src.modules.pointspal.models import (
+    OptimizerAlert, PointsEarnCategory, PointsProgram, SimpleFinCardLink,
+    SpendPeriodTotal, UserCard,
+)
+from tests.factories import AccountFactory, CategoryFactory, UserFactory
+
+
+def _linked_card(cap_amount=100):
+    """A user with a dining category and a SimpleFin account linked to a card
+    earning 4x on dining, 1x past a monthly cap."""
+    user = UserFactory()
+    db.session.add(PointsProgram(program_id='test-card', program_name='Test Card',
+                                 issuer='Test Bank', tpg_cpp=1.5))
+    db.session.add(PointsEarnCategory(program_id='test-card', category='dining',
+                                      multiplier=4, multiplier_fallback=1,
+                                      cap_amount=cap_amount, cap_period='monthly'))
+    card = UserCard(user_id=user.id, program_id='test-card')
+    db.session.add(card)
+    db.session.flush()
+    account = AccountFactory(user_id=user.id, type='credit', external_id='sf-card-1')
+    db.session.add(SimpleFinCardLink(user_id=user.id, user_card_id=card.id,
+                                     simplefin_account_id='sf-card-1'))
+    db.session.commit()
+    category = CategoryFactory(user_id=user.id, name='Dining')
+    return user, account, category, card
+
+
+def _expenses(user, account, category, count, amount=5):
+    return [Expense(description=f'Lunch {i}', amount=amount,
+                    date=datetime(2026, 7, 1 + i % 28), user_id=user.id,
+                    paid_by=user.id, card_used='', split_method='none',
+                    transaction_type='expense', account_id=account.id,
+                    category_id=category.id)
+            for i in range(count)]
+
+
+def _totals(card):
+    return {row.period_type: (row.period_key, row.total_spent,
+                              row.total_pts_earned, row.total_pts_missed)
+            for row in SpendPeriodTotal.query.filter_by(user_card_id=card.id)}
+
+
+def test_one_commit_is_one_pass_of_the_same_size(db, monkeypatch):
+    # A cap neither batch reaches, so neither writes an alert.
+    user, account, category, _ = _linked_card(cap_amount=1000)
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    counts = []
+    original = simplefin_bridge.process_new_expenses
+
+    def _counted(expense_ids):
+        del statements[:]
+        event.listen(db.engine, 'before_cursor_execute', _record)
+        try:
+            original(expense_ids)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _record)
+        counts.append((len(expense_ids), len(statements)))
+
+    monkeypatch.setattr(simplefin_bridge, 'process_new_expenses', _counted)
+
+    for count in (3, 30):
+        db.session.add_all(_expenses(user, account, category, count))
+        db.session.commit()
+
+    assert [size for size, _ in counts] == [3, 30]
+    assert counts[0][1] == counts[1][1]
+
+
+def test_the_totals_and_points_match_one_at_a_time(db):
+    user, account, category, card = _linked_card(cap_amount=100)
+
+    # 30 × $5: the first 20 reach the $100 cap at 4x, the last 10 earn 1x.
+    db.session.add_all(_expenses(user, account, category, 30))
+    db.session.commit()
+
+    totals = _totals(card)
+    assert totals['monthly'] == ('2026-07', pytest.approx(150), pytest.approx(450),
+                                 pytest.approx(150))
+    assert totals['quarterly'] == ('2026-Q3', pytest.approx(150), pytest.approx(600),
+                                   pytest.approx(0))
+    assert totals['annual'] == ('2026', pytest.approx(150), pytest.approx(600),
+                                pytest.approx(0))
+
+    # A later commit adds to the same rows, already past the cap.
+    db.session.add_all(_expenses(user, account, category, 2))
+    db.session.commit()
+    assert _totals(card)['monthly'][1:] == (pytest.approx(160), pytest.approx(460),
+                                            pytest.approx(180))
+
+    alerts = OptimizerAlert.query.filter_by(user_card_id=card.id).all()
+    assert [(a.period_key, a.alert_type, a.pct_used) for a in alerts] == [
+        ('2026-07', 'capped', 150.0)]
+
+
+def test_a_rolled_back_insert_is_never_counted(db, monkeypatch):
+    user, account, category, card = _linked_card()
+    dispatched = []
+    original = simplefin_bridge.process_new_expenses
+
+    def _noted(expense_ids):
+        dispatched.append(list(expense_ids))
+        return original(expense_ids)
+
+    monkeypatch.setattr(simplefin_bridge, 'process_new_expenses', _noted)
+
+    db.session.add_all(_expenses(user, account, category, 3))
+    db.session.flush()
+    db.session.rollback()
+    kept = _expenses(user, account, category, 1)[0]
+    db.session.add(kept)
+    db.session.commit()
+
+    assert dispatched == [[kept.id]]
+    assert _totals(card)['monthly'][1] == pytest.approx(5)
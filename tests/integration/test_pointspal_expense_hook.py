@@ -1,10 +1,11 @@
 """The Expense after_insert hook that reaches pointsPal's SimpleFin bridge.
 
-`src/models/transaction.py` registers an `after_insert` listener on Expense that
-dispatches 'expense_created'; pointsPal's `on_event` lazily imports
-`simplefin_bridge.handle_new_transaction`. That module was untracked, so it was
-absent from the built image and the import failed on every insert — swallowed as
-a warning by the registry, leaving pointsPal spend tracking silently dead.
+`src/models/transaction.py` registers an `after_insert` listener on Expense whose
+ids are dispatched as 'expenses_created' after commit; pointsPal's `on_event`
+lazily imports `simplefin_bridge.process_new_expenses`. That module was
+untracked, so it was absent from the built image and the import failed on every
+insert — swallowed as a warning by the registry, leaving pointsPal spend
+tracking silently dead.
 
 These tests exist because committing the file *activates* that path in
 production. They pin the two properties that make it safe to turn on: the hook
@@ -32,8 +33,8 @@ def _expense(user, **kw):
 def test_the_bridge_module_is_importable():
     """If this fails, the file is missing from the checkout — which is the
     original bug: the image shipped without it."""
-    from src.modules.pointspal.simplefin_bridge import handle_new_transaction
-    assert callable(handle_new_transaction)
+    from src.modules.pointspal.simplefin_bridge import process_new_expenses
+    assert callable(process_new_expenses)
 
 
 def test_inserting_an_expense_reaches_the_bridge(db, monkeypatch):
@@ -41,16 +42,15 @@ def test_inserting_an_expense_reaches_the_bridge(db, monkeypatch):
     calls = []
 
     import src.modules.pointspal.simplefin_bridge as bridge
-    monkeypatch.setattr(
-        bridge, 'handle_new_transaction',
-        lambda connection, expense: calls.append(expense.description))
+    monkeypatch.setattr(bridge, 'process_new_expenses', calls.append)
 
     user = UserFactory()
-    db.session.add(_expense(user, description='Hook probe', account_id=1))
+    probe = _expense(user, description='Hook probe', account_id=1)
+    db.session.add(probe)
     db.session.commit()
 
-    assert calls == ['Hook probe'], (
-        'the after_insert hook did not reach handle_new_transaction; '
+    assert calls == [[probe.id]], (
+        'the after_insert hook did not reach process_new_expenses; '
         'pointsPal spend tracking would be silently dead')
 
 
@@ -59,10 +59,10 @@ def test_a_failing_bridge_cannot_break_the_expense_insert(db, monkeypatch):
     ever regresses, a pointsPal bug starts losing users' transactions."""
     import src.modules.pointspal.simplefin_bridge as bridge
 
-    def explode(connection, expense):
+    def explode(expense_ids):
         raise RuntimeError('bridge is broken')
 
-    monkeypatch.setattr(bridge, 'handle_new_transaction', explode)
+    monkeypatch.setattr(bridge, 'process_new_expenses', explode)
 
     user = UserFactory()
     db.session.add(_expense(user, description='Survives a broken bridge', account_id=1))
@@ -417,3 +417,95 @@ def test_the_rule_preview_reports_the_rule_acting_on_a_categorised_sample(
     assert body['result']['category_id'] == target.id, (
         'the preview claims the rule would leave the category at %r, but the rule '
         'sets it to %r' % (body['result'].get('category_id'), target.id))
+
+
+def test_bulk_apply_categorises_each_row_and_counts_once_per_rule(client, db):
+    """`apply_transaction_rules_bulk` is what the importers call: one rule-set load
+    and one counter write per matched rule, not one commit per row."""
+    from src.utils.rule_engine import apply_transaction_rules_bulk
+
+    user = UserFactory()
+    food = _category(user)
+    rule = _rule(user, pattern='tesco', auto_category_id=food.id)
+    rows = [_txn(), _txn(description='Corner shop'), _txn(), _txn()]
+
+    results = apply_transaction_rules_bulk(rows, user.id)
+
+    assert [r['category_id'] for r in results] == [food.id, None, food.id, food.id]
+    db.session.commit()
+    db.session.expire_all()
+    assert rule.match_count == 3
+    assert rule.last_matched is not None
+
+
+def test_bulk_apply_leaves_the_commit_to_the_caller(client, db):
+    """The counters belong to the import that produced them: an import that rolls
+    back takes its matches with it."""
+    from src.utils.rule_engine import apply_transaction_rules_bulk
+
+    user = UserFactory()
+    rule = _rule(user, pattern='tesco')
+
+    apply_transaction_rules_bulk([_txn()], user.id)
+    db.session.rollback()
+
+    db.session.expire_all()
+    assert not rule.match_count
+
+
+def test_bulk_apply_streams_in_chunks_and_keeps_the_rollups(
+        client, db, monkeypatch):
+    """Re-categorising history writes in chunks outside the session, so the
+    progress reports and the monthly rollups are what show it happened."""
+    from datetime import datetime
+
+    from src.models.rollup import MonthlyRollup
+    from src.models.transaction import Expense
+    from src.utils import rule_engine
+
+    monkeypatch.setattr(rule_engine, 'BULK_APPLY_CHUNK', 2)
+    user = UserFactory()
+    food = _category(user)
+    _rule(user, pattern='tesco', auto_category_id=food.id)
+    for description in ('Tesco 1', 'Corner shop', 'Tesco 2', 'Tesco 3', 'Tesco 4'):
+        db.session.add(Expense(
+            description=description, amount=10.0, date=datetime(2026, 8, 5),
+            user_id=user.id, paid_by=user.id, card_used='', split_method='none',
+            transaction_type='expense'))
+    db.session.commit()
+
+    reports = []
+    result = bulk_apply_rules(user.id, progress=lambda *p: reports.append(p))
+
+    assert result['transactions_processed'] == 5
+    assert result['transactions_updated'] == 4
+    assert reports[-1] == (5, 4) and len(reports) >= 3
+    db.session.expire_all()
+    assert Expense.query.filter_by(category_id=food.id).count() == 4
+    by_category = {r.category_id: r.count for r in MonthlyRollup.query if r.count}
+    assert by_category == {food.id: 4, None: 1}
+
+
+def test_a_dry_run_counts_and_writes_nothing(client, db, auth_headers):
+    from datetime import datetime
+
+    from src.models.transaction import Expense
+
+    user = UserFactory()
+    food = _category(user)
+    rule = _rule(user, pattern='tesco', auto_category_id=food.id)
+    db.session.add(Expense(
+        description='Tesco Extra', amount=10.0, date=datetime(2026, 8, 5),
+        user_id=user.id, paid_by=user.id, card_used='', split_method='none',
+        transaction_type='expense'))
+    db.session.commit()
+
+    resp = client.post('/api/v1/transaction-rules/bulk-apply',
+                       headers=auth_headers(user), json={'dry_run': True})
+
+    assert resp.status_code == 200, resp.get_data(as_text=True)[:200]
+    body = resp.get_json()
+    assert body['dry_run'] is True and body['transactions_updated'] == 1
+    db.session.expire_all()
+    assert Expense.query.one().category_id is None
+    assert not rule.match_count
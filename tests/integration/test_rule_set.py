@@ -0,0 +1,116 @@
+"""The compiled rule set agrees with `TransactionRule.matches`, and is cached.
+
+`RuleSet` replaced a per-call `matches()` walk for the engine, while the rule
+preview still asks the model. If the two ever disagree, the preview tells a user
+one thing and their next import does another — so the first test drives both
+over the same rules and samples and compares every answer.
+"""
+from src.extensions import db
+from src.models.transaction_rule import TransactionRule
+from src.services.transaction_rule.rule_set import RuleSet, rule_set_for
+from src.utils.rule_engine import apply_transaction_rules
+from tests.factories import CategoryFactory, UserFactory
+
+
+RULES = [
+    dict(pattern='tesco'),
+    dict(pattern='Tesco', case_sensitive=True),
+    dict(pattern='esco ex'),
+    dict(pattern=r'^sains\w+', is_regex=True),
+    dict(pattern=r'\D+', is_regex=True),
+    dict(pattern='[unclosed', is_regex=True),
+    dict(pattern='acme', transaction_type_filter='income'),
+    dict(pattern='shop', amount_min=10, amount_max=50),
+    dict(pattern='42', pattern_field='amount'),
+    dict(pattern='he', pattern_field='notes'),
+]
+
+SAMPLES = [
+    dict(description='Tesco Extra', amount=42.0, transaction_type='expense'),
+    dict(description='TESCO EXPRESS', amount=-12, transaction_type='expense'),
+    dict(description='Sainsbury Local', amount=5, transaction_type='expense'),
+    dict(description='ACME payroll', amount=3000, transaction_type='income'),
+    dict(description='ACME refund', amount=3000, transaction_type='expense'),
+    dict(description='Corner shop', amount='n/a', transaction_type='expense'),
+    dict(description='Corner shop', amount=20),
+    dict(description='', amount=42, notes='the shed'),
+    dict(description='12345', amount=None),
+]
+
+
+def _rules(user):
+    rules = []
+    for priority, fields in enumerate(reversed(RULES)):
+        rule = TransactionRule(user_id=user.id, name='r%d' % priority,
+                               priority=priority, active=True, **fields)
+        db.session.add(rule)
+        rules.append(rule)
+    db.session.commit()
+    return sorted(rules, key=lambda r: -r.priority)
+
+
+def test_the_compiled_set_matches_exactly_what_the_model_matches(client, db):
+    user = UserFactory()
+    rules = _rules(user)
+    compiled = RuleSet(rules)
+
+    for sample in SAMPLES:
+        expected = [r.id for r in rules if r.matches(sample)]
+        got = [r.id for r in compiled.matching(sample)]
+        assert got == expected, 'disagreement on %r' % sample
+
+
+def test_the_set_is_reused_until_a_rule_is_written(
+        client, db, auth_headers):
+    user = UserFactory()
+    food = CategoryFactory(name='Food', user_id=user.id)
+    fuel = CategoryFactory(name='Fuel', user_id=user.id)
+    rule = TransactionRule(user_id=user.id, name='r', pattern='tesco',
+                           auto_category_id=food.id, priority=1, active=True)
+    db.session.add(rule)
+    db.session.commit()
+
+    first = rule_set_for(user.id)
+    result = apply_transaction_rules({'description': 'Tesco'}, user.id)
+    assert result['category_id'] == food.id
+    # Counting the match must not count as an edit.
+    assert rule_set_for(user.id) is first
+    db.session.expire_all()
+    assert rule.match_count == 1
+
+    resp = client.put('/api/v1/transaction-rules/%d' % rule.id,
+                      headers=auth_headers(user),
+                      json={'auto_category_id': fuel.id})
+    assert resp.status_code == 200, resp.get_data(as_text=True)[:200]
+
+    assert rule_set_for(user.id) is not first
+    result = apply_transaction_rules({'description': 'Tesco'}, user.id)
+    assert result['category_id'] == fuel.id, 'a stale rule set was used'
+
+    resp = client.delete('/api/v1/transaction-rules/%d' % rule.id,
+                         headers=auth_headers(user))
+    assert resp.status_code == 200
+    assert apply_transaction_rules(
+        {'description': 'Tesco'}, user.id).get('category_id') is None
+
+
+def test_a_later_rule_sees_what_an_earlier_one_changed(client, db):
+    """The old loop asked each rule's `matches()` after applying the ones above it,
+    so a rule that retypes a row feeds a lower-priority rule filtered on the new
+    type. The compiled set has to keep doing that."""
+    user = UserFactory()
+    salary = CategoryFactory(name='Salary', user_id=user.id)
+    db.session.add_all([
+        TransactionRule(user_id=user.id, name='retype', pattern='payroll',
+                        auto_transaction_type='income', priority=9, active=True),
+        TransactionRule(user_id=user.id, name='salary', pattern='acme',
+                        transaction_type_filter='income',
+                        auto_category_id=salary.id, priority=1, active=True),
+    ])
+    db.session.commit()
+
+    result = apply_transaction_rules(
+        {'description': 'ACME PAYROLL', 'transaction_type': 'expense'}, user.id)
+
+    assert result['transaction_type'] == 'income'
+    assert result['category_id'] == salary.id
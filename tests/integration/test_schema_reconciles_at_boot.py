@@ -82,6 +82,23 @@ def test_the_query_that_used_to_raise_now_works(app, db, client, auth_headers):
     assert 'number_locale' in _columns('users')
 
 
+def test_a_dropped_index_is_recreated(app, db):
+    """Indexes drift the same way columns do: `create_all()` builds them with the
+    table and never again, so one declared after install reaches nobody."""
+    def _indexes():
+        return {i['name'] for i in inspect(db.engine).get_indexes('expenses')}
+
+    with db.engine.begin() as connection:
+        connection.execute(text('DROP INDEX ix_expenses_account_date'))
+    assert 'ix_expenses_account_date' not in _indexes()
+
+    applied = reconcile_schema(app, db)
+
+    assert 'ix_expenses_account_date' in _indexes(), applied
+    assert applied == ['CREATE INDEX ix_expenses_account_date ON expenses '
+                       '(account_id, date)'], applied
+
+
 def test_it_is_idempotent(app, db):
     """A healthy database must be left completely alone.
 
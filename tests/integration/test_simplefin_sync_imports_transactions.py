@@ -330,3 +330,41 @@ def test_sync_all_reports_failure_when_every_account_failed(db):
     assert all(not r['success'] for r in results), results
     assert not success, (
         'every account failed to sync and the call still reported overall success')
+
+
+def test_sync_all_fetches_once_and_reports_each_account(db):
+    """
+    Bridge's `/accounts` answers for every account on the connection, and
+    `sync_all_accounts` used to download it once per account. One download now
+    feeds all of them -- and an account missing from it still fails on its own,
+    without costing the others their transactions.
+    """
+    from src.extensions import db as _db
+
+    user = UserFactory()
+    savings = _connected_account(user)
+    closed = Account(
+        name='Closed', type='checking', institution='SimpleFIN Demo',
+        balance=0, currency_code='USD', import_source='simplefin',
+        external_id='Gone from the bridge', user_id=user.id,
+    )
+    _db.session.add(closed)
+    _db.session.commit()
+
+    calls = []
+
+    def _fetch(self, access_url, days_back=30):
+        calls.append(days_back)
+        return RAW
+
+    with patch('integrations.simplefin.client.SimpleFin.get_accounts_with_transactions',
+               _fetch):
+        success, message, results = SimpleFinService().sync_all_accounts(user.id)
+
+    assert len(calls) == 1, f'{len(calls)} downloads for one connection'
+    assert success, message
+    by_account = {r['account_id']: r for r in results}
+    assert by_account[savings.id]['success'] and by_account[savings.id]['imported'] == 2
+    assert not by_account[closed.id]['success']
+    assert by_account[closed.id]['message'] == 'Account not found in SimpleFin response'
+    assert Expense.query.filter_by(account_id=savings.id).count() == 2
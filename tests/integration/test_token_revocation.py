@@ -0,0 +1,134 @@
+"""The JWT blocklist is answered from memory and pruned of expired rows.
+
+`check_if_token_revoked` used to query `revoked_tokens` on every request. These
+tests pin that a warm process does not, that a revocation written elsewhere is
+picked up from the id sequence once the refresh interval passes — or by the
+full refresh, when it committed below ids already read — that one which rolled
+back is not kept, and that the nightly purge deletes only rows whose token has
+expired.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import decode_token
+from sqlalchemy import event, insert
+
+from src.models.user import RevokedToken
+from src.services.auth import revocation
+from tests.factories import UserFactory
+
+
+@pytest.fixture
+def blocklist(db, monkeypatch):
+    # The test database is recreated per test, so its ids start again; a set
+    # carried over from another test would be reading from the wrong place.
+    revocation.reset()
+    clock = [1000.0]
+    monkeypatch.setattr(revocation, 'monotonic', lambda: clock[0])
+    yield clock
+    revocation.reset()
+
+
+def _blocklist_queries(db, fn):
+    statements = []
+
+    def _record(conn, cursor, statement, params, context, executemany):
+        if 'revoked_tokens' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+    return statements
+
+
+def test_a_warm_process_does_not_ask_the_database(client, db, auth_headers, blocklist):
+    headers = auth_headers(UserFactory())
+    assert client.get('/api/v1/auth/me', headers=headers).status_code == 200
+
+    queries = _blocklist_queries(db, lambda: [
+        client.get('/api/v1/auth/me', headers=headers) for _ in range(5)])
+
+    assert queries == []
+
+
+def test_a_revocation_from_another_worker_lands_at_the_next_refresh(
+        client, db, auth_headers, blocklist):
+    headers = auth_headers(UserFactory())
+    assert client.get('/api/v1/auth/me', headers=headers).status_code == 200
+    jti = decode_token(headers['Authorization'].split()[1])['jti']
+
+    # A core insert does not flush, so this process's hook does not see it —
+    # as if another worker had written it.
+    db.session.execute(insert(RevokedToken).values(jti=jti))
+    db.session.commit()
+
+    assert client.get('/api/v1/auth/me', headers=headers).status_code == 200
+    blocklist[0] += revocation.REFRESH_SECONDS
+    assert client.get('/api/v1/auth/me', headers=headers).status_code == 401
+
+
+def test_a_row_committed_late_below_the_watermark_lands_at_the_full_refresh(
+        client, db, auth_headers, blocklist):
+    headers = auth_headers(UserFactory())
+    jti = decode_token(headers['Authorization'].split()[1])['jti']
+    db.session.execute(insert(RevokedToken), [
+        {'id': 100 + i, 'jti': f'other-{i}'} for i in range(200)])
+    db.session.commit()
+    assert client.get('/api/v1/auth/me', headers=headers).status_code == 200
+
+    # An id handed out long before the ones already read, committed only now.
+    db.session.execute(insert(RevokedToken).values(id=5, jti=jti))
+    db.session.commit()
+
+    blocklist[0] += revocation.REFRESH_SECONDS
+    assert client.get('/api/v1/auth/me', headers=headers).status_code == 200
+    blocklist[0] += revocation.FULL_REFRESH_SECONDS
+    assert client.get('/api/v1/auth/me', headers=headers).status_code == 401
+
+
+def test_a_revocation_that_rolls_back_is_not_kept(client, db, auth_headers, blocklist):
+    headers = auth_headers(UserFactory())
+    jti = decode_token(headers['Authorization'].split()[1])['jti']
+    assert client.get('/api/v1/auth/me', headers=headers).status_code == 200
+
+    revocation.revoke(jti)
+    db.session.flush()
+    db.session.rollback()
+    with db.session.begin_nested() as savepoint:
+        revocation.revoke(jti)
+        db.session.flush()
+        savepoint.rollback()
+    db.session.commit()
+
+    assert client.get('/api/v1/auth/me', headers=headers).status_code == 200
+
+
+def test_logout_records_when_the_token_expires(client, db, auth_headers, blocklist):
+    headers = auth_headers(UserFactory())
+    assert client.post('/api/v1/auth/logout', headers=headers).status_code == 200
+
+    row = RevokedToken.query.one()
+    assert timedelta(hours=23) < row.expires_at - row.revoked_at <= timedelta(hours=24)
+    assert client.get('/api/v1/auth/me', headers=headers).status_code == 401
+
+
+def test_the_purge_deletes_only_rows_past_their_expiry(app, db, blocklist):
+    now = datetime(2026, 6, 1, 12, 0)
+    db.session.add_all([
+        RevokedToken(jti='expired', revoked_at=now - timedelta(days=2),
+                     expires_at=now - timedelta(days=1)),
+        RevokedToken(jti='live', revoked_at=now - timedelta(hours=1),
+                     expires_at=now + timedelta(hours=23)),
+        # From before expires_at was recorded: kept for the refresh lifetime.
+        RevokedToken(jti='old', revoked_at=now - timedelta(days=31)),
+        RevokedToken(jti='recent', revoked_at=now - timedelta(days=29)),
+    ])
+    db.session.commit()
+
+    assert revocation.purge(now) == 2
+    db.session.commit()
+
+    assert sorted(r.jti for r in RevokedToken.query) == ['live', 'recent']
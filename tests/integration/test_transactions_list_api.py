@@ -293,3 +293,56 @@ def test_slashless_path_honours_query_params(client, headers, ledger):
     assert len(body['transactions']) == 5
     assert body['pagination']['total'] == 5
     assert body['summary']['total_expense'] == 100.0
+
+
+def _walk(client, headers, query=''):
+    """Every page of cursor mode, following `next_cursor` until `has_next` is false."""
+    rows, cursor = [], ''
+    while True:
+        body = get(client, headers, f'?after={cursor}&per_page=7{query}')
+        rows += body['transactions']
+        if not body['pagination']['has_next']:
+            return rows
+        cursor = body['pagination']['next_cursor']
+
+
+def test_cursor_mode_returns_every_row_exactly_once(client, headers):
+    """68 rows over 10 pages, many sharing a date — the `id` tie-break is what
+    keeps a same-day run that straddles a page boundary from repeating or skipping."""
+    rows = _walk(client, headers)
+
+    assert len(rows) == 68
+    assert len({row['id'] for row in rows}) == 68
+    keys = [(row['date'], row['id']) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_cursor_mode_applies_the_filters(client, headers, ledger):
+    rows = _walk(client, headers, f"&account_id={ledger['other_account'].id}")
+
+    assert len(rows) == 20
+
+
+def test_cursor_mode_counts_only_when_asked(client, headers):
+    """No COUNT or totals on a scroll; the same figures as page mode on request."""
+    body = get(client, headers, '?after=&per_page=5')
+
+    assert 'summary' not in body
+    assert body['pagination'] == {
+        'per_page': 5,
+        'has_next': True,
+        'next_cursor': body['pagination']['next_cursor'],
+    }
+
+    cursor = body['pagination']['next_cursor']
+    totals = get(client, headers, f'?after={cursor}&per_page=5&include_totals=true')
+    assert totals['pagination']['total'] == 68
+    assert totals['summary']['total_expense'] == 700.0
+    assert totals['summary']['total_income'] == 300.0
+
+
+def test_a_malformed_cursor_is_refused(client, headers):
+    resp = client.get('/api/v1/transactions/?after=yesterday', headers=headers)
+
+    assert resp.status_code == 400
+    assert resp.get_json() == {'success': False, 'error': 'Invalid cursor'}
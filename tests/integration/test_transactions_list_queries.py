@@ -0,0 +1,77 @@
+"""A page of transactions costs the same number of queries at any size.
+
+`TransactionSchema` lazy-loaded the category (and its subcategories), the account
+and its owner, the category splits, and — through `calculate_splits` — a `User`
+per payer and participant, for every row. These tests count the statements one
+list request sends and require 5 rows and 40 rows to cost the same, with the
+split names still resolved.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from src.models.category import Category
+from src.models.transaction import CategorySplit
+from tests.factories import (
+    AccountFactory,
+    CategoryFactory,
+    ExpenseFactory,
+    UserFactory,
+)
+
+
+@pytest.fixture
+def household(db):
+    owner = UserFactory(password_plain='secret')
+    housemates = [UserFactory() for _ in range(3)]
+    account = AccountFactory(user_id=owner.id)
+    for i in range(40):
+        parent = CategoryFactory(user_id=owner.id)
+        child = Category(name=f'Child {i}', user_id=owner.id, parent_id=parent.id)
+        db.session.add(child)
+        db.session.commit()
+        mate = housemates[i % 3]
+        expense = ExpenseFactory(
+            user_id=owner.id, account_id=account.id,
+            category_id=(parent if i % 2 else child).id,
+            amount=30, date=datetime(2026, 3, 1 + i % 28),
+            paid_by=owner.id, split_method='equal', split_with=mate.id,
+            has_category_splits=bool(i % 5 == 0))
+        if expense.has_category_splits:
+            db.session.add(CategorySplit(expense_id=expense.id,
+                                         category_id=parent.id, amount=30))
+    db.session.commit()
+    return owner
+
+
+def _statements(client, db, headers, query):
+    statements = []
+
+    def _record(conn, cursor, statement, params, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        resp = client.get(f'/api/v1/transactions/{query}', headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+    assert resp.status_code == 200, resp.get_json()
+    return statements, resp.get_json()
+
+
+@pytest.mark.parametrize('mode', ['?page=1&', '?after=&'])
+def test_a_page_costs_the_same_at_any_size(client, db, auth_headers, household, mode):
+    headers = auth_headers(household, password='secret')
+
+    small, _ = _statements(client, db, headers, f'{mode}per_page=5')
+    large, body = _statements(client, db, headers, f'{mode}per_page=40')
+
+    assert len(body['transactions']) == 40
+    assert len(large) == len(small), '\n\n'.join(large)
+
+    # The batching did not cost the names: every split still resolves its person.
+    for row in body['transactions']:
+        assert row['splits']['payer']['id'] == household.id
+        assert [s['email'] for s in row['splits']['splits']] != []
+        assert row['account']['owner']['id'] == household.id
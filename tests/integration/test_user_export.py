@@ -0,0 +1,71 @@
+"""`GET /users/export` is streamed, and is still the file the import reads.
+
+The export used to build the whole document in memory — three copies of it — and
+send it at the end. It is now written table by table as rows are fetched. These
+tests pin that the response streams in pieces without hydrating a row, and that
+what it streams still restores through `_import_user_data` (schema_version 1.0).
+"""
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from api.v1.users import _import_user_data
+from src.models.transaction import Expense
+from src.services.backup import export
+from tests.factories import (AccountFactory, BudgetFactory, CategoryFactory,
+                             ExpenseFactory, UserFactory)
+
+
+def _history(user, rows=30):
+    parent = CategoryFactory(user_id=user.id, name='Home')
+    child = CategoryFactory(user_id=user.id, name='Rent', parent_id=parent.id)
+    AccountFactory(user_id=user.id, name='Checking', balance=1234.5)
+    BudgetFactory(user_id=user.id, category_id=child.id, amount=900)
+    start = datetime(2020, 1, 1)
+    for i in range(rows):
+        ExpenseFactory(user_id=user.id, amount=10 + i, category_id=child.id,
+                       date=start + timedelta(days=i))
+
+
+def test_the_export_streams_without_loading_rows(client, db, auth_headers,
+                                                  monkeypatch):
+    user = UserFactory(password_plain='secret')
+    _history(user)
+    monkeypatch.setattr(export, '_CHUNK', 256)
+
+    loaded = []
+
+    def _record(target, context):
+        loaded.append(target.id)
+
+    event.listen(Expense, 'load', _record)
+    try:
+        resp = client.get('/api/v1/users/export', headers=auth_headers(user, 'secret'))
+        chunks = list(resp.response)
+    finally:
+        event.remove(Expense, 'load', _record)
+
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert 'attachment; filename=finpal_export_' in resp.headers['Content-Disposition']
+    assert len(chunks) > 1
+    assert loaded == []
+
+
+def test_the_export_restores_through_the_import(client, db, auth_headers):
+    user = UserFactory(password_plain='secret')
+    _history(user)
+
+    resp = client.get('/api/v1/users/export', headers=auth_headers(user, 'secret'))
+    payload = json.loads(resp.get_data(as_text=True))
+
+    assert payload['schema_version'] == '1.0'
+    assert [c['name'] for c in payload['categories']][:1] == ['Home']
+    assert payload['accounts'][0]['balance'] == 1234.5
+    assert len(payload['transactions']) == 30
+    assert payload['transactions'][0]['date'] > payload['transactions'][-1]['date']
+
+    other = UserFactory()
+    stats = _import_user_data(other.id, payload)
+    assert stats == {'categories': 2, 'accounts': 1, 'transactions': 30, 'budgets': 1}
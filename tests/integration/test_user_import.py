@@ -0,0 +1,112 @@
+"""`POST /users/import` reads the upload in pieces and inserts it in chunks.
+
+It used to `json.load` the whole file and add a row at a time, flushing after
+every category and account. These tests pin that the statements issued do not
+grow with the rows, that subcategories still find their parents through the
+exported-id map across chunks, and that a file which breaks part way through
+changes nothing and says where it broke.
+"""
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from src.models.budget import Budget
+from src.models.category import Category
+from src.models.rollup import MonthlyRollup
+from src.models.transaction import Expense
+from src.services.backup import restore
+from tests.factories import UserFactory
+
+
+def _payload(rows=40):
+    start = datetime(2021, 1, 1)
+    categories = [{'exported_id': 1, 'name': 'Home', 'parent_exported_id': None}]
+    categories += [{'exported_id': 10 + i, 'name': 'Sub %d' % i,
+                    'parent_exported_id': 1} for i in range(5)]
+    categories.append({'exported_id': 99, 'name': 'Deep',
+                       'parent_exported_id': 14})
+    return {
+        'schema_version': '1.0',
+        'exported_at': '2024-01-01T00:00:00',
+        'user': {'email': 'someone@example.com'},
+        'categories': categories,
+        'accounts': [{'name': 'Checking', 'type': 'checking', 'balance': 12.5}],
+        'transactions': [{'description': 'Row %d' % i, 'amount': 1.25 + i,
+                          'date': (start + timedelta(days=i)).isoformat(),
+                          'category_exported_id': 99}
+                         for i in range(rows)],
+        'budgets': [{'name': 'Deep', 'amount': 300, 'period': 'monthly',
+                     'category_exported_id': 99},
+                    {'name': 'Lost', 'amount': 5, 'category_exported_id': 404}],
+    }
+
+
+def _upload(client, headers, body):
+    return client.post('/api/v1/users/import', headers=headers,
+                       data={'data': (io.BytesIO(body), 'backup.json')},
+                       content_type='multipart/form-data')
+
+
+def test_the_import_restores_in_chunks(client, db, auth_headers, monkeypatch):
+    user = UserFactory(password_plain='secret')
+    monkeypatch.setattr(restore, '_CHUNK', 3)
+    monkeypatch.setattr(restore, '_READ', 64)
+    seen = []
+
+    stats = restore.restore(
+        user.id, restore.read_backup(io.BytesIO(json.dumps(_payload()).encode())),
+        progress=lambda table, count: seen.append((table, count)))
+
+    assert stats == {'categories': 7, 'accounts': 1, 'transactions': 40, 'budgets': 1}
+    assert ('transactions', 40) in seen
+    deep = Category.query.filter_by(user_id=user.id, name='Deep').one()
+    assert deep.parent.name == 'Sub 4'
+    assert deep.parent.parent.name == 'Home'
+    assert Expense.query.filter_by(user_id=user.id, category_id=deep.id).count() == 40
+    assert Budget.query.filter_by(user_id=user.id).one().category_id == deep.id
+    # The bulk inserts bypass the flush hook; the rollups are rebuilt instead.
+    assert float(sum(r.total for r in
+                     MonthlyRollup.query.filter_by(user_id=user.id))) == \
+        pytest.approx(sum(1.25 + i for i in range(40)))
+
+
+def test_statements_do_not_grow_with_rows(client, db, auth_headers):
+    def count(rows):
+        user = UserFactory(password_plain='secret')
+        statements = []
+
+        def _record(conn, cursor, statement, params, context, executemany):
+            if statement.lstrip().upper().startswith('INSERT'):
+                statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', _record)
+        try:
+            resp = _upload(client, auth_headers(user, 'secret'),
+                           json.dumps(_payload(rows)).encode())
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _record)
+        assert resp.status_code == 200, resp.get_json()
+        return len(statements)
+
+    assert count(10) == count(400)
+
+
+def test_a_file_that_breaks_part_way_changes_nothing(client, db, auth_headers,
+                                                      monkeypatch):
+    user = UserFactory(password_plain='secret')
+    monkeypatch.setattr(restore, '_CHUNK', 5)
+    text = json.dumps(_payload(), indent=1)
+    # Cut a transaction in half, well after the categories were inserted.
+    broken = text[:text.index('"Row 30"')] + '"Row 30", }]}'
+
+    resp = _upload(client, auth_headers(user, 'secret'), broken.encode())
+
+    assert resp.status_code == 400
+    line = broken[:broken.index('}]}')].count('\n') + 1
+    assert resp.get_json()['message'].startswith(
+        'That file is not valid JSON (line %d, column' % line)
+    assert Category.query.filter_by(user_id=user.id).count() == 0
+    assert Expense.query.filter_by(user_id=user.id).count() == 0
@@ -76,3 +76,79 @@ def test_import_rows_stamps_batch_id(db):
     import_rows(rows, MAPPING, MapperConfig(), user.id, batch_id=None)
     from src.models.transaction import Expense
     assert Expense.query.filter_by(user_id=user.id).one().import_batch_id is None
+
+
+def test_import_rows_checks_duplicates_without_a_query_per_row(db, monkeypatch):
+    """The duplicate check loads each chunk's date window once; it used to ask
+    the database about every row."""
+    from sqlalchemy import event
+    from src.services.csv_import import mapper
+
+    monkeypatch.setattr(mapper, 'IMPORT_CHUNK', 50)
+    user = UserFactory()
+    import_rows([{'Date': '2026-01-15', 'Description': 'Kept', 'Amount': '-9.50'}],
+                MAPPING, MapperConfig(), user.id)
+
+    rows = [{'Date': '2026-01-%02d' % (1 + i % 28), 'Description': 'Row %d' % i,
+             'Amount': '-1.00'} for i in range(200)]
+    rows.append({'Date': '2026-01-15', 'Description': 'Kept', 'Amount': '-9.50'})
+    rows.append(dict(rows[0]))
+
+    selects = []
+
+    def _record(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'expenses' in statement:
+            selects.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        result = import_rows(rows, MAPPING, MapperConfig(), user.id)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+    assert result.imported == 200
+    assert result.skipped == 2, 'an existing row and a repeat within the file'
+    assert len(selects) <= 5, '%d queries for 202 rows' % len(selects)
+
+
+def test_import_rows_looks_each_name_up_once(db):
+    """Category and account names are resolved per import, not per row."""
+    from sqlalchemy import event
+    from src.models.category import Category
+    from src.models.transaction import Expense
+    from tests.factories import AccountFactory
+
+    user = UserFactory()
+    checking = AccountFactory(user_id=user.id, name='Checking')
+    rows = [{'Date': '2026-02-%02d' % (1 + i % 28), 'Description': 'Row %d' % i,
+             'Amount': '-1.00', 'Category': ('Food', 'Fuel')[i % 2],
+             'Account': 'Checking'} for i in range(300)]
+
+    selects = []
+
+    def _record(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and (
+                'FROM categories' in statement or 'FROM accounts' in statement):
+            selects.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        result = import_rows(rows, Mapping(date='Date', description='Description',
+                                           amount='Amount', category='Category',
+                                           account='Account'),
+                             MapperConfig(), user.id)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+    assert result.imported == 300
+    assert len(selects) == 3, 'two categories and one account'
+    assert Category.query.filter_by(user_id=user.id, name='Food').count() == 1
+    assert {e.account_id for e in Expense.query.filter_by(user_id=user.id)} == {checking.id}
+
+
+def test_import_rows_counts_every_error_but_describes_a_few(db):
+    user = UserFactory()
+    rows = [{'Date': 'bad', 'Description': 'X', 'Amount': '-1.00'}] * 250
+    result = import_rows(rows, MAPPING, MapperConfig(), user.id)
+    assert result.errors == 250
+    assert len(result.error_details) == 100
@@ -0,0 +1,66 @@
+"""Unit tests for the inotify folder watcher."""
+import os
+import threading
+
+import pytest
+
+from src.services.csv_import import watcher
+from src.services.csv_import.watcher import FolderWatcher
+
+pytestmark = pytest.mark.skipif(not watcher.available(), reason='needs inotify')
+
+
+@pytest.fixture
+def inbox(tmp_path, monkeypatch):
+    monkeypatch.setenv('CSV_IMPORT_ROOT', str(tmp_path))
+    return tmp_path
+
+
+class Calls:
+    def __init__(self):
+        self.calls = []
+        self.arrived = threading.Event()
+
+    def __call__(self, source_id, names):
+        self.calls.append((source_id, set(names)))
+        if names:
+            self.arrived.set()
+
+
+def test_a_finished_file_is_reported_by_name(inbox):
+    calls = Calls()
+    folder = FolderWatcher(lambda: {7: str(inbox)}, calls, settle=0.05,
+                           recheck=60).start()
+    try:
+        # The first sync watches the folder and asks for a full scan.
+        for _ in range(50):
+            if folder.watching(7):
+                break
+            threading.Event().wait(0.05)
+        assert folder.watching(7)
+        (inbox / 'chase.csv.part').write_text('Date,Amount\n')
+        os.rename(inbox / 'chase.csv.part', inbox / 'chase.csv')
+        (inbox / 'notes.txt').write_text('ignored')
+        (inbox / 'amex.csv').write_text('Date,Amount\n')
+        assert calls.arrived.wait(5)
+    finally:
+        folder.stop()
+
+    assert calls.calls[0] == (7, set())
+    assert calls.calls[1] == (7, {'chase.csv', 'amex.csv'})
+    assert not folder.watching(7)
+
+
+def test_a_folder_that_cannot_be_watched_is_left_to_polling(inbox, tmp_path_factory):
+    outside = tmp_path_factory.mktemp('outside')
+    calls = Calls()
+    folder = FolderWatcher(lambda: {1: str(inbox / 'missing'), 2: str(outside)},
+                           calls, settle=0.05).start()
+    try:
+        threading.Event().wait(0.3)
+        assert not folder.watching(1)
+        assert not folder.watching(2)
+        assert watcher.polled(1)
+    finally:
+        folder.stop()
+    assert calls.calls == []
@@ -0,0 +1,76 @@
+"""Holding prices are fetched once per symbol and written back in one UPDATE.
+
+The nightly job used to fetch every holding of every portfolio of every user,
+one `Ticker.info` call after another. These tests pin that a symbol held in
+several portfolios is downloaded once, in one batch, and that the prices are
+written by a single statement.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import event
+
+import integrations.investments.yfinance as yfinance_integration
+from src.models.investment import Investment, Portfolio
+from src.services.investment import prices
+from src.services.investment.service import InvestmentService
+from tests.factories import UserFactory
+
+
+def _holdings(db, users=3):
+    for n in range(users):
+        user = UserFactory()
+        portfolio = Portfolio(user_id=user.id, name='Main %d' % n)
+        db.session.add(portfolio)
+        db.session.flush()
+        for symbol in ('AAPL', 'msft', 'NOPE'):
+            db.session.add(Investment(portfolio_id=portfolio.id, symbol=symbol,
+                                      shares=1, purchase_price=1))
+    db.session.commit()
+
+
+def _fake_download(calls):
+    quotes = {'AAPL': 190.5, 'MSFT': 410.25}
+
+    def download(tickers, **kwargs):
+        calls.append(list(tickers))
+        columns = pd.MultiIndex.from_product([['Close'], tickers])
+        row = [quotes.get(t, np.nan) for t in tickers]
+        return pd.DataFrame([row], columns=columns)
+    return download
+
+
+def test_each_symbol_is_fetched_once_and_written_in_one_update(db, monkeypatch):
+    _holdings(db)
+    calls = []
+    monkeypatch.setattr(yfinance_integration.yf, 'download', _fake_download(calls))
+    monkeypatch.setattr('src.config.Config.FMP_API_KEY', None)
+    updates = []
+
+    def _record(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith('UPDATE'):
+            updates.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        result = prices.refresh()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+    db.session.commit()
+
+    assert calls == [['AAPL', 'MSFT', 'NOPE']]
+    assert len(updates) == 1
+    assert (result.symbols, result.updated, result.failed) == (3, 6, ['NOPE'])
+    assert {float(i.current_price) for i in
+            Investment.query.filter(Investment.symbol != 'NOPE')} == {190.5, 410.25}
+
+
+def test_update_prices_touches_only_its_portfolio(db, monkeypatch):
+    _holdings(db, users=2)
+    monkeypatch.setattr(yfinance_integration.yf, 'download', _fake_download([]))
+    monkeypatch.setattr('src.config.Config.FMP_API_KEY', None)
+    first, second = Portfolio.query.order_by(Portfolio.id).all()
+
+    ok, message = InvestmentService().update_prices(first.id)
+
+    assert ok and message == 'Updated 2 price(s); failed: NOPE'
+    assert all(i.current_price == 0 for i in second.investments)
@@ -0,0 +1,91 @@
+"""Past months value holdings at their own closes, read from `investment_prices`.
+
+The asset/debt trend used to add today's portfolio value to every past month, so
+net worth was flat wherever investments dominated. These tests pin that the
+nightly history fill stores closes from the provider's history, and that the
+trend then values each month at its month-end close without asking a provider.
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import integrations.investments.yfinance as yfinance_integration
+from src.models.investment import Investment, InvestmentPrice, Portfolio
+from src.services.investment import history
+from src.utils.helpers import calculate_asset_debt_trends
+from tests.factories import UserFactory
+
+
+def _month_key(day):
+    return day.strftime('%Y-%m')
+
+
+def _months_back(n, today=None):
+    """The 15th of the month `n` months before this one."""
+    day = (today or date.today()).replace(day=15)
+    for _ in range(n):
+        day = (day.replace(day=1) - timedelta(days=1)).replace(day=15)
+    return day
+
+
+class _History:
+    def __init__(self, closes):
+        self.closes = closes
+        self.asked = []
+
+    def get_ticker_history(self, symbol, exchange=None, period='1mo'):
+        self.asked.append((symbol, period))
+        return [{'date': day.isoformat(), 'close': close}
+                for day, close in self.closes.get(symbol, [])]
+
+
+def _holding(db, symbol='ACME', shares=10, current_price=30, purchased=None):
+    user = UserFactory()
+    portfolio = Portfolio(user_id=user.id, name='Main')
+    db.session.add(portfolio)
+    db.session.flush()
+    db.session.add(Investment(portfolio_id=portfolio.id, symbol=symbol, shares=shares,
+                              purchase_price=5, current_price=current_price,
+                              purchase_date=purchased))
+    db.session.commit()
+    return user
+
+
+def test_record_fetches_a_year_once_then_tops_up(db, monkeypatch):
+    _holding(db, symbol='acme')
+    today = date(2026, 6, 10)
+    source = _History({'ACME': [(date(2026, 6, 1), 10.5), (date(2026, 6, 2), 11)]})
+    monkeypatch.setattr(yfinance_integration, 'shared_cache', lambda: source)
+
+    assert history.record(today=today) == 2
+    source.closes['ACME'] = [(date(2026, 6, 2), 12), (date(2026, 6, 3), 13)]
+    assert history.record(today=today) == 2
+    db.session.commit()
+
+    assert source.asked == [('ACME', '1y'), ('ACME', '1mo')]
+    stored = {p.date.day: float(p.close) for p in InvestmentPrice.query}
+    assert stored == {1: 10.5, 2: 12.0, 3: 13.0}
+
+
+def test_the_trend_values_each_month_at_its_own_close(db, monkeypatch):
+    two_ago, one_ago = _months_back(2), _months_back(1)
+    user = _holding(db, shares=10, current_price=30,
+                    purchased=datetime.combine(two_ago.replace(day=1), datetime.min.time()))
+    db.session.add_all([InvestmentPrice(symbol='ACME', date=two_ago, close=10),
+                        InvestmentPrice(symbol='ACME', date=one_ago, close=20)])
+    db.session.commit()
+
+    def _no_provider(*args, **kwargs):
+        raise AssertionError('the trend asked the provider')
+    monkeypatch.setattr(yfinance_integration.yf, 'Ticker', _no_provider)
+    monkeypatch.setattr(yfinance_integration.yf, 'download', _no_provider)
+
+    result = calculate_asset_debt_trends(user)
+
+    assets = dict(zip(result['months'], result['assets']))
+    assert result['months'] == [_month_key(two_ago), _month_key(one_ago),
+                                _month_key(date.today())]
+    assert assets[_month_key(two_ago)] == pytest.approx(100)
+    assert assets[_month_key(one_ago)] == pytest.approx(200)
+    assert assets[_month_key(date.today())] == pytest.approx(300)
+    assert result['investment_total'] == pytest.approx(300)
@@ -0,0 +1,105 @@
+"""The quote cache is one SQLite file every worker reads, with stable keys.
+
+`FMPCache` used to key its files with the per-process salted `hash()`, so a
+second worker or a restart never found what the first had paid for. These tests
+open the same file through separate `QuoteCache` objects, standing in for
+separate processes.
+"""
+import os
+
+import pytest
+
+from integrations.investments import quote_cache
+from integrations.investments.fmp_cache import FMPCache
+from integrations.investments.quote_cache import QuoteCache, cache_key
+from tests.factories import UserFactory
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_an_fmp_response_fetched_by_one_worker_is_a_hit_in_another(tmp_path, monkeypatch):
+    path = str(tmp_path / 'quotes.sqlite3')
+    calls = []
+
+    class _Response:
+        status_code = 200
+
+        def json(self):
+            return [{'symbol': 'AAPL', 'price': 190.5}]
+
+    def _get(url, params):
+        calls.append(url)
+        return _Response()
+
+    monkeypatch.setattr('integrations.investments.fmp_cache.requests.get', _get)
+
+    first = FMPCache(QuoteCache(path))
+    second = FMPCache(QuoteCache(path))
+    assert first.get('https://fmp', 'quote/AAPL', 'key-1') == [{'symbol': 'AAPL', 'price': 190.5}]
+    # A rotated API key is the same question.
+    assert second.get('https://fmp', 'quote/AAPL', 'key-2') == [{'symbol': 'AAPL', 'price': 190.5}]
+
+    assert calls == ['https://fmp/quote/AAPL']
+    stats = second.get_stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+
+def test_entries_expire_by_kind_and_are_evicted(tmp_path):
+    clock = _Clock()
+    cache = QuoteCache(str(tmp_path / 'quotes.sqlite3'), clock=clock)
+    cache.put('info', cache_key('info', 'AAPL'), {'price': 1})
+    cache.put('history', cache_key('history', 'AAPL', '1mo'), [{'close': 1}])
+
+    clock.now += quote_cache.TTL_SECONDS['info']
+    assert cache.get('info', cache_key('info', 'AAPL')) is None
+    assert cache.get('history', cache_key('history', 'AAPL', '1mo')) == [{'close': 1}]
+
+    assert cache.evict_expired() == 1
+    assert cache.stats()['entries'] == 1
+
+
+def test_hit_rates_add_up_across_workers(tmp_path):
+    path = str(tmp_path / 'quotes.sqlite3')
+    one, two = QuoteCache(path), QuoteCache(path)
+    key = cache_key('info', 'MSFT')
+    one.put('info', key, {'price': 2})
+
+    one.get('info', key)
+    two.get('info', key)
+    two.get('info', cache_key('info', 'NOPE'))
+    one.flush_stats()
+
+    stats = two.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (2, 1, 66.7)
+    assert stats['kinds']['info']['hits'] == 2
+
+
+def test_the_default_file_is_in_the_instance_folder(app, monkeypatch):
+    monkeypatch.delenv('QUOTE_CACHE_PATH')
+    with app.app_context():
+        assert quote_cache.default_path() == os.path.join(
+            app.instance_path, 'cache', 'quotes.sqlite3')
+
+    # Without an app there is no instance folder, and no guessing one either.
+    monkeypatch.setattr('flask.has_app_context', lambda: False)
+    with pytest.raises(RuntimeError, match='QUOTE_CACHE_PATH'):
+        quote_cache.default_path()
+
+
+def test_the_stats_are_for_administrators(client, db, auth_headers, tmp_path, monkeypatch):
+    monkeypatch.setattr(quote_cache, '_shared', QuoteCache(str(tmp_path / 'q.sqlite3')))
+    member = UserFactory(is_admin=False)
+    admin = UserFactory(is_admin=True)
+
+    denied = client.get('/api/v1/investments/cache-stats', headers=auth_headers(member))
+    resp = client.get('/api/v1/investments/cache-stats', headers=auth_headers(admin))
+
+    assert denied.status_code == 403
+    assert resp.status_code == 200
+    assert resp.get_json()['cache']['entries'] == 0